@@ -0,0 +1,304 @@
+import os
+import re
+import sys
+import time
+import shutil
+import sqlite3
+import hashlib
+import argparse
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 文章状态
+STATUS_FETCHED = 'fetched'
+STATUS_CONVERTED = 'converted'
+STATUS_PUBLISHED = 'published'
+STATUS_FAILED = 'failed'
+
+DB_FILENAME = 'articles.db'
+BLOB_DIRNAME = 'blobs'
+
+# 规范化URL时去掉的通用跟踪参数（另外去掉所有 utm_*），其他参数可能决定页面内容，一律保留
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', 'spm', 'share_token',
+}
+
+# 公众号链接上的分享和客户端参数，只对 mp.weixin.qq.com 去掉
+WEIXIN_TRACKING_PARAMS = TRACKING_PARAMS | {
+    'chksm', 'scene', 'srcid', 'sharer_sharetime', 'sharer_shareid', 'from', 'isappinstalled',
+    'clicktime', 'enterid', 'ascene', 'devicetype', 'version', 'nettype', 'lang', 'exportkey',
+    'pass_ticket', 'wx_header', 'sessionid', 'subscene', 'key',
+}
+
+# 公众号文章只需要这几个参数就能唯一定位
+WEIXIN_PARAMS = ('__biz', 'mid', 'idx', 'sn')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    content_hash TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    account TEXT NOT NULL DEFAULT '',
+    fetched_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    save_dir TEXT NOT NULL DEFAULT '',
+    original_blob TEXT,
+    converted_blob TEXT,
+    converted_at REAL,
+    published_at REAL,
+    post_url TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_articles_status ON articles(status, fetched_at);
+CREATE INDEX IF NOT EXISTS idx_articles_hash ON articles(content_hash);
+CREATE TABLE IF NOT EXISTS images (
+    article_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    path TEXT,
+    blob TEXT,
+    PRIMARY KEY (article_id, position)
+);
+"""
+
+
+@dataclass
+class ArticleRecord:
+    id: int
+    url: str
+    content_hash: str
+    title: str
+    account: str
+    fetched_at: float
+    status: str
+    save_dir: str
+    original_blob: Optional[str]
+    converted_blob: Optional[str]
+    converted_at: Optional[float]
+    published_at: Optional[float]
+    post_url: Optional[str]
+
+
+def canonical_url(url: str) -> str:
+    """规范化URL：小写域名、去掉跟踪参数和锚点，公众号链接只保留定位参数"""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or 'https').lower()
+    netloc = parts.netloc.lower()
+    path = parts.path or '/'
+    params = parse_qsl(parts.query, keep_blank_values=False)
+    if netloc == 'mp.weixin.qq.com' and any(k == '__biz' for k, _ in params):
+        params = [(k, v) for k, v in params if k in WEIXIN_PARAMS]
+    else:
+        tracking = WEIXIN_TRACKING_PARAMS if netloc == 'mp.weixin.qq.com' else TRACKING_PARAMS
+        params = [(k, v) for k, v in params if k not in tracking and not k.startswith('utm_')]
+    params.sort()
+    if len(path) > 1:
+        path = path.rstrip('/')
+    return urlunsplit((scheme, netloc, path, urlencode(params), ''))
+
+
+class ArticleStore:
+    """本地文章库：SQLite 索引 + 按内容哈希存放的文件目录
+
+    文章以规范化URL为主键，记录标题、公众号、抓取时间、转换状态和图片引用，
+    文本内容存放在 blobs/ 目录下。按URL查找、列出待发布文章都走索引。
+    """
+
+    def __init__(self, root: str = r"E:\fy\智企内推\data"):
+        self.root = root
+        self.blob_dir = os.path.join(root, BLOB_DIRNAME)
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(root, DB_FILENAME), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        self.conn.close()
+
+    # ---- 内容文件 ----
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def put_blob(self, data: bytes) -> str:
+        """按内容哈希保存数据，相同内容只存一份"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def get_blob(self, digest: str) -> bytes:
+        """读取内容文件"""
+        with open(self._blob_path(digest), 'rb') as f:
+            return f.read()
+
+    def read_text(self, digest: Optional[str]) -> str:
+        """读取文本内容"""
+        return self.get_blob(digest).decode('utf-8') if digest else ''
+
+    # ---- 文章记录 ----
+
+    def _record(self, row) -> Optional[ArticleRecord]:
+        return ArticleRecord(**dict(row)) if row else None
+
+    def save_article(self, url: str, title: str, text: str, account: str = '',
+                     save_dir: str = '') -> ArticleRecord:
+        """保存抓取到的文章，同一URL重复抓取时更新内容；内容变化时重置转换和发布状态"""
+        url = canonical_url(url)
+        blob = self.put_blob(text.encode('utf-8'))
+        with self._lock, self.conn:
+            self.conn.execute(
+                """INSERT INTO articles (url, content_hash, title, account, fetched_at, status, save_dir, original_blob)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET
+                       content_hash=excluded.content_hash, title=excluded.title,
+                       account=excluded.account, fetched_at=excluded.fetched_at,
+                       save_dir=excluded.save_dir, original_blob=excluded.original_blob,
+                       status=CASE WHEN content_hash = excluded.content_hash THEN status ELSE excluded.status END,
+                       converted_blob=CASE WHEN content_hash = excluded.content_hash THEN converted_blob END,
+                       converted_at=CASE WHEN content_hash = excluded.content_hash THEN converted_at END,
+                       published_at=CASE WHEN content_hash = excluded.content_hash THEN published_at END,
+                       post_url=CASE WHEN content_hash = excluded.content_hash THEN post_url END""",
+                (url, blob, title, account, time.time(), STATUS_FETCHED, save_dir, blob),
+            )
+        return self.get(url)
+
+    def add_images(self, article_id: int, images: List[Tuple[str, Optional[str]]]) -> None:
+        """登记文章图片 (原始URL, 本地路径)，未下载的图片本地路径为 None"""
+        with self._lock, self.conn:
+            self.conn.execute('DELETE FROM images WHERE article_id = ?', (article_id,))
+            self.conn.executemany(
+                'INSERT INTO images (article_id, position, url, path) VALUES (?, ?, ?, ?)',
+                [(article_id, i, url, path) for i, (url, path) in enumerate(images, 1)],
+            )
+
+    def append_images(self, article_id: int, images: List[Tuple[str, Optional[str]]]) -> None:
+        """在已登记的图片之后追加图片 (来源, 本地路径)，例如生成的文字卡片"""
+        with self._lock, self.conn:
+            last = self.conn.execute(
+                'SELECT COALESCE(MAX(position), 0) FROM images WHERE article_id = ?', (article_id,)
+            ).fetchone()[0]
+            self.conn.executemany(
+                'INSERT INTO images (article_id, position, url, path) VALUES (?, ?, ?, ?)',
+                [(article_id, last + i, url, path) for i, (url, path) in enumerate(images, 1)],
+            )
+
+    def get_images(self, article_id: int, downloaded_only: bool = True) -> List[str]:
+        """按顺序返回文章图片的本地路径"""
+        rows = self.conn.execute(
+            'SELECT url, path FROM images WHERE article_id = ? ORDER BY position', (article_id,)
+        ).fetchall()
+        if downloaded_only:
+            return [row['path'] for row in rows if row['path'] and os.path.exists(row['path'])]
+        return [row['path'] or row['url'] for row in rows]
+
+    def set_converted(self, url: str, content: str) -> None:
+        """保存转换后的小红书内容"""
+        blob = self.put_blob(content.encode('utf-8'))
+        with self._lock, self.conn:
+            self.conn.execute(
+                'UPDATE articles SET converted_blob = ?, converted_at = ?, status = ? WHERE url = ?',
+                (blob, time.time(), STATUS_CONVERTED, canonical_url(url)),
+            )
+
+    def set_published(self, url: str, post_url: Optional[str] = None) -> None:
+        """标记为已发布"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                'UPDATE articles SET status = ?, published_at = ?, post_url = ? WHERE url = ?',
+                (STATUS_PUBLISHED, time.time(), post_url, canonical_url(url)),
+            )
+
+    def set_status(self, url: str, status: str) -> None:
+        """更新文章状态"""
+        with self._lock, self.conn:
+            self.conn.execute('UPDATE articles SET status = ? WHERE url = ?', (status, canonical_url(url)))
+
+    def get(self, url: str) -> Optional[ArticleRecord]:
+        """按URL查找文章"""
+        row = self.conn.execute('SELECT * FROM articles WHERE url = ?', (canonical_url(url),)).fetchone()
+        return self._record(row)
+
+    def find_by_hash(self, digest: str) -> List[ArticleRecord]:
+        """按内容哈希查找文章（完全相同的转载）"""
+        rows = self.conn.execute('SELECT * FROM articles WHERE content_hash = ?', (digest,)).fetchall()
+        return [self._record(row) for row in rows]
+
+    def list_by_status(self, status: str, limit: int = 100) -> List[ArticleRecord]:
+        """按状态列出文章，先抓取的在前"""
+        rows = self.conn.execute(
+            'SELECT * FROM articles WHERE status = ? ORDER BY fetched_at LIMIT ?', (status, limit)
+        ).fetchall()
+        return [self._record(row) for row in rows]
+
+    def list_pending(self, limit: int = 100) -> List[ArticleRecord]:
+        """已转换但尚未发布的文章"""
+        return self.list_by_status(STATUS_CONVERTED, limit)
+
+    def count(self) -> int:
+        """文章总数"""
+        return self.conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+
+    # ---- 导出为目录结构 ----
+
+    def export(self, record: ArticleRecord, dest_root: str) -> str:
+        """导出为 文章标题/original.txt、xiaohongshu.txt、images/ 的目录结构"""
+        safe_title = re.sub(r'[\\/:*?"<>|]', '_', record.title) or f'article_{record.id}'
+        save_dir = os.path.join(dest_root, safe_title)
+        os.makedirs(os.path.join(save_dir, 'images'), exist_ok=True)
+        with open(os.path.join(save_dir, 'original.txt'), 'w', encoding='utf-8') as f:
+            f.write(self.read_text(record.original_blob))
+        if record.converted_blob:
+            with open(os.path.join(save_dir, 'xiaohongshu.txt'), 'w', encoding='utf-8') as f:
+                f.write(self.read_text(record.converted_blob))
+        for i, path in enumerate(self.get_images(record.id), 1):
+            shutil.copyfile(path, os.path.join(save_dir, 'images', f'image_{i}{os.path.splitext(path)[1]}'))
+        return save_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地文章库")
+    parser.add_argument('--root', default=r"E:\fy\智企内推\data", help="数据目录")
+    sub = parser.add_subparsers(dest='command', required=True)
+    list_parser = sub.add_parser('list', help="按状态列出文章")
+    list_parser.add_argument('status', nargs='?', default=STATUS_CONVERTED)
+    list_parser.add_argument('--limit', type=int, default=50)
+    show_parser = sub.add_parser('show', help="按URL查看文章")
+    show_parser.add_argument('url')
+    export_parser = sub.add_parser('export', help="按URL导出为目录结构")
+    export_parser.add_argument('url')
+    export_parser.add_argument('dest')
+    args = parser.parse_args()
+
+    store = ArticleStore(args.root)
+    try:
+        if args.command == 'list':
+            for record in store.list_by_status(args.status, args.limit):
+                print(f"[{record.status}] {record.title}  {record.url}")
+        elif args.command == 'show':
+            record = store.get(args.url)
+            print(record if record else "未找到文章")
+        elif args.command == 'export':
+            record = store.get(args.url)
+            if not record:
+                print("未找到文章")
+                sys.exit(1)
+            print(f"已导出到：{store.export(record, args.dest)}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
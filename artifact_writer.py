@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import atexit
+import shutil
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 落盘方式：off=不调用 fsync（进程崩溃不会留下半截文件，断电可能丢失最近写入的文件），
+# batch=一组提交的文件全部写完后再逐个刷盘，always=每个文件写完立即 fsync；两者都在重命名后同步目录
+ARTIFACT_FSYNC = os.getenv('ARTIFACT_FSYNC', 'off').lower()
+# 等待写入的数据上限，超过时提交方等待，避免内存无限增长
+ARTIFACT_BUFFER_MB = float(os.getenv('ARTIFACT_BUFFER_MB', '64'))
+# I/O 线程数，同一个文章目录的提交总是由同一个线程按顺序处理
+ARTIFACT_IO_THREADS = int(os.getenv('ARTIFACT_IO_THREADS', '2'))
+# I/O 线程一次最多合并处理的提交数
+ARTIFACT_GROUP_SIZE = int(os.getenv('ARTIFACT_GROUP_SIZE', '32'))
+# batch 模式下同时刷盘的文件数：并发的 fsync 由文件系统合并成一次日志提交
+ARTIFACT_SYNC_THREADS = int(os.getenv('ARTIFACT_SYNC_THREADS', '8'))
+
+FSYNC_MODES = ('off', 'batch', 'always')
+# 暂存目录建在文章目录下，保证和目标文件在同一个文件系统，重命名是原子的
+STAGING_PREFIX = '.staging-'
+# 超过这个时间的暂存目录视为进程崩溃留下的，清理掉
+STALE_STAGING_SECONDS = 3600
+
+
+class ArtifactBatch:
+    """一篇文章的一组输出文件，commit() 后由 I/O 线程写入暂存目录并原子重命名到目标位置"""
+
+    def __init__(self, writer: 'ArtifactWriter', save_dir: str):
+        self.writer = writer
+        self.save_dir = save_dir
+        self.files: List[Tuple[str, bytes]] = []
+
+    def add_bytes(self, name: str, data: bytes) -> str:
+        """加入一个文件（name 是相对文章目录的路径，如 images/image_1.jpg），返回最终路径"""
+        name = os.path.join(*name.split('/'))
+        self.files.append((name, data if isinstance(data, bytes) else bytes(data)))
+        return os.path.join(self.save_dir, name)
+
+    def add_text(self, name: str, text: str) -> str:
+        return self.add_bytes(name, text.encode('utf-8'))
+
+    def add_json(self, name: str, obj) -> str:
+        return self.add_text(name, json.dumps(obj, ensure_ascii=False, indent=2))
+
+    def add_image(self, name: str, image, format: str = 'JPEG', **params) -> str:
+        """在调用方线程编码图片（占用 CPU），写文件交给 I/O 线程"""
+        buffer = BytesIO()
+        image.save(buffer, format, **params)
+        return self.add_bytes(name, buffer.getvalue())
+
+    def commit(self) -> Future:
+        """提交写入，返回 Future，结果为最终路径列表；写入失败时 result() 抛出 OSError
+
+        调用方不必等待，之后的步骤要读取这些文件时先调用 writer.flush(save_dir)
+        """
+        return self.writer.submit(self.save_dir, self.files)
+
+
+class ArtifactWriter:
+    """文章输出文件的写入器
+
+    - 每次提交的文件先写入文章目录下的暂存目录，写完后逐个 os.replace 到目标位置：
+      进程中途崩溃时目标位置要么是完整的旧文件，要么是完整的新文件，不会出现半截文件
+    - 写文件在专门的 I/O 线程中进行（按文章目录分配，同一目录的提交保持顺序），
+      待写数据超过缓冲区上限时提交方等待
+    - I/O 线程把排队的多个提交合并成一组处理，按 fsync 配置统一刷盘，减少小文件同步写的开销
+    - 提交方不等待写入完成，读取文件前用 flush(save_dir) 等待该目录的提交写完；写入失败时打印错误
+    """
+
+    def __init__(self, fsync: str = ARTIFACT_FSYNC, buffer_mb: float = ARTIFACT_BUFFER_MB,
+                 group_size: int = ARTIFACT_GROUP_SIZE, sync_threads: int = ARTIFACT_SYNC_THREADS,
+                 io_threads: int = ARTIFACT_IO_THREADS):
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"ARTIFACT_FSYNC 必须是 {', '.join(FSYNC_MODES)} 之一：{fsync}")
+        self.fsync = fsync
+        self.buffer_bytes = int(buffer_mb * 1024 * 1024)
+        self.group_size = max(1, group_size)
+        self.sync_threads = max(1, sync_threads)
+        # batch 模式的并发刷盘线程池（线程按需创建）
+        self._sync_pool = (ThreadPoolExecutor(max_workers=self.sync_threads, thread_name_prefix='artifact-sync')
+                           if fsync == 'batch' and self.sync_threads > 1 else None)
+        # 每个 I/O 线程一个队列
+        self._pending: List[deque] = [deque() for _ in range(max(1, io_threads))]
+        self._pending_bytes = 0
+        self._writing = 0
+        # 文章目录 -> 还没写完的提交数
+        self._dir_pending: Dict[str, int] = {}
+        self._cond = threading.Condition()
+        self._stats_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+        # 已经确认存在（并清理过暂存目录）的文章目录
+        self._known_dirs: set = set()
+        self.counts = {'commits': 0, 'files': 0, 'bytes': 0, 'groups': 0, 'syncs': 0, 'errors': 0}
+        self.blocked_seconds = 0.0
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.counts[name] += n
+
+    def begin(self, save_dir: str) -> ArtifactBatch:
+        return ArtifactBatch(self, save_dir)
+
+    def submit(self, save_dir: str, files: List[Tuple[str, bytes]]) -> Future:
+        """加入写入队列；缓冲区已满时等待（单个超过上限的提交在队列为空时放行）"""
+        future: Future = Future()
+        if not files:
+            future.set_result([])
+            return future
+        size = sum(len(data) for _, data in files)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("写入器已关闭")
+            if not self._threads:
+                self._threads = [threading.Thread(target=self._run, args=(i,), name=f'artifact-writer-{i}', daemon=True)
+                                 for i in range(len(self._pending))]
+                for thread in self._threads:
+                    thread.start()
+            started = time.perf_counter()
+            while self._pending_bytes and self._pending_bytes + size > self.buffer_bytes:
+                self._cond.wait()
+            self.blocked_seconds += time.perf_counter() - started
+            self._pending[hash(save_dir) % len(self._pending)].append((save_dir, list(files), size, future))
+            self._pending_bytes += size
+            self._dir_pending[save_dir] = self._dir_pending.get(save_dir, 0) + 1
+            self._cond.notify_all()
+        return future
+
+    def write(self, save_dir: str, files) -> List[str]:
+        """同步写入一组文件（[(相对路径, 内容)] 或 {相对路径: 内容}），返回最终路径"""
+        if isinstance(files, dict):
+            files = list(files.items())
+        return self.submit(save_dir, files).result()
+
+    # ---- I/O 线程 ----
+
+    def _run(self, index: int) -> None:
+        pending = self._pending[index]
+        while True:
+            with self._cond:
+                while not pending and not self._closed:
+                    self._cond.wait()
+                if not pending:
+                    return
+                group = [pending.popleft() for _ in range(min(self.group_size, len(pending)))]
+                self._writing += 1
+            try:
+                self._write_group(group)
+            finally:
+                with self._cond:
+                    self._writing -= 1
+                    self._pending_bytes -= sum(item[2] for item in group)
+                    for save_dir, _, _, _ in group:
+                        left = self._dir_pending[save_dir] - 1
+                        if left:
+                            self._dir_pending[save_dir] = left
+                        else:
+                            del self._dir_pending[save_dir]
+                    self._cond.notify_all()
+
+    def _clean_stale(self, save_dir: str) -> None:
+        """清理进程崩溃时留下的暂存目录"""
+        now = time.time()
+        for name in os.listdir(save_dir):
+            path = os.path.join(save_dir, name)
+            if name.startswith(STAGING_PREFIX) and now - os.path.getmtime(path) > STALE_STAGING_SECONDS:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _stage(self, save_dir: str, files: List[Tuple[str, bytes]]) -> Tuple[str, List[Tuple[str, str]]]:
+        """写入暂存目录，返回 (暂存目录, [(暂存文件, 目标路径)])"""
+        if save_dir not in self._known_dirs:
+            os.makedirs(save_dir, exist_ok=True)
+            self._clean_stale(save_dir)
+            self._known_dirs.add(save_dir)
+        try:
+            staging = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=save_dir)
+        except FileNotFoundError:
+            # 文章目录在写入器运行期间被删除
+            os.makedirs(save_dir, exist_ok=True)
+            staging = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=save_dir)
+        moves = []
+        try:
+            for i, (name, data) in enumerate(files):
+                tmp_path = os.path.join(staging, f'{i}.part')
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                    if self.fsync == 'always':
+                        f.flush()
+                        os.fsync(f.fileno())
+                        self._count('syncs')
+                moves.append((tmp_path, os.path.join(save_dir, name)))
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return staging, moves
+
+    @staticmethod
+    def _sync_file(path: str) -> None:
+        fd = os.open(path, os.O_RDWR)
+        try:
+            getattr(os, 'fdatasync', os.fsync)(fd)
+        finally:
+            os.close(fd)
+
+    def _sync_files(self, paths: List[str]) -> None:
+        """一组文件全部写完后并发刷盘，文件系统把同时进行的 fsync 合并成少数几次日志提交"""
+        if self._sync_pool is None or len(paths) == 1:
+            for path in paths:
+                self._sync_file(path)
+        else:
+            list(self._sync_pool.map(self._sync_file, paths))
+        self._count('syncs', len(paths))
+
+    def _sync_dirs(self, directories: set) -> None:
+        """重命名后同步目录项（Windows 不支持打开目录，跳过）"""
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        for directory in directories:
+            fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._count('syncs')
+
+    def _fail(self, save_dir: str, future: Future, error: OSError) -> None:
+        """提交方通常不等待结果，失败时在这里打印"""
+        self._count('errors')
+        print(f"写入文件失败 {save_dir}: {str(error)}")
+        future.set_exception(error)
+
+    def _write_group(self, group: list) -> None:
+        staged = []
+        for save_dir, files, size, future in group:
+            try:
+                staging, moves = self._stage(save_dir, files)
+                staged.append((save_dir, staging, moves, size, future))
+            except OSError as e:
+                self._fail(save_dir, future, e)
+        if not staged:
+            return
+        try:
+            if self.fsync == 'batch':
+                self._sync_files([tmp for _, _, moves, _, _ in staged for tmp, _ in moves])
+        except OSError as e:
+            for save_dir, staging, _, _, future in staged:
+                shutil.rmtree(staging, ignore_errors=True)
+                self._fail(save_dir, future, e)
+            return
+        directories = set()
+        done = []
+        for save_dir, staging, moves, size, future in staged:
+            try:
+                for tmp_path, final_path in moves:
+                    directory = os.path.dirname(final_path)
+                    try:
+                        os.replace(tmp_path, final_path)
+                    except FileNotFoundError:
+                        # 子目录（如 images）还不存在
+                        os.makedirs(directory, exist_ok=True)
+                        os.replace(tmp_path, final_path)
+                    directories.add(directory)
+                os.rmdir(staging)
+                done.append((moves, size, future))
+            except OSError as e:
+                shutil.rmtree(staging, ignore_errors=True)
+                self._fail(save_dir, future, e)
+        if self.fsync != 'off':
+            try:
+                self._sync_dirs(directories)
+            except OSError:
+                pass
+        self._count('groups')
+        for moves, size, future in done:
+            self._count('commits')
+            self._count('files', len(moves))
+            self._count('bytes', size)
+            future.set_result([final_path for _, final_path in moves])
+
+    # ---- 生命周期 ----
+
+    def flush(self, save_dir: Optional[str] = None) -> None:
+        """等待已提交的写入完成；指定 save_dir 时只等待该文章目录的提交"""
+        with self._cond:
+            if save_dir is not None:
+                while self._dir_pending.get(save_dir):
+                    self._cond.wait()
+                return
+            while any(self._pending) or self._writing:
+                self._cond.wait()
+
+    def close(self) -> None:
+        """写完剩余的提交后结束 I/O 线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        if self._sync_pool is not None:
+            self._sync_pool.shutdown()
+
+    def stats(self) -> Dict[str, object]:
+        stats = dict(self.counts)
+        stats['blocked_seconds'] = round(self.blocked_seconds, 3)
+        return stats
+
+
+_writer: Optional[ArtifactWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> ArtifactWriter:
+    """全局共享的写入器，进程退出前写完剩余的提交"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = ArtifactWriter()
+                atexit.register(_writer.close)
+    return _writer
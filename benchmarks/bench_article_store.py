@@ -0,0 +1,70 @@
+"""文章库查询基准
+
+向临时文章库写入大量文章（默认10万篇），测量按URL查找和列出待发布文章的耗时。
+
+用法：
+    python benchmarks/bench_article_store.py [--articles 100000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from article_store import ArticleStore, STATUS_CONVERTED, STATUS_FETCHED, STATUS_PUBLISHED
+
+
+def populate(store: ArticleStore, count: int) -> None:
+    """批量写入文章记录，每20篇有1篇待发布"""
+    now = time.time()
+    blob = store.put_blob("基准测试正文".encode('utf-8'))
+    rows = []
+    for i in range(count):
+        status = STATUS_CONVERTED if i % 20 == 0 else (STATUS_PUBLISHED if i % 2 else STATUS_FETCHED)
+        rows.append((f'https://mp.weixin.qq.com/s/bench{i:07d}', f'{i:064x}', f'标题{i}', '网易智企',
+                     now + i, status, '', blob, blob if status != STATUS_FETCHED else None))
+    with store.conn:
+        store.conn.executemany(
+            """INSERT INTO articles (url, content_hash, title, account, fetched_at, status, save_dir,
+                                     original_blob, converted_blob) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            rows,
+        )
+
+
+def timed(func, repeat: int = 200) -> float:
+    """返回中位耗时（毫秒）"""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文章库查询基准")
+    parser.add_argument('--articles', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = ArticleStore(root)
+        t0 = time.perf_counter()
+        populate(store, args.articles)
+        print(f"写入 {store.count()} 篇文章：{time.perf_counter() - t0:.2f} s")
+
+        probe = [f'https://mp.weixin.qq.com/s/bench{i:07d}?scene=21#wechat_redirect'
+                 for i in range(0, args.articles, max(1, args.articles // 200))]
+        it = iter(probe * 2)
+        print(f"按URL查找：{timed(lambda: store.get(next(it)), len(probe)):.3f} ms")
+        print(f"列出待发布（前100篇）：{timed(lambda: store.list_pending(100), 50):.3f} ms")
+        print(f"按内容哈希查找：{timed(lambda: store.find_by_hash(f'{args.articles // 2:064x}')):.3f} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
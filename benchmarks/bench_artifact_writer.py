@@ -0,0 +1,175 @@
+"""文章输出文件写入基准：原地写入与 ArtifactWriter
+
+--threads 个线程同时保存 --articles 篇文章，每篇是 original.txt、xiaohongshu.txt、xiaohongshu.json
+和 --images 张图片（约 150 KB）。比较：
+- 原地写入（原来的做法，每个文件单独 open/write），以及每个文件 fsync 的原地写入
+- ArtifactWriter 的 off / batch / always 三种落盘方式
+统计总吞吐（篇/秒、MB/秒）和工作线程花在写文件上的时间。
+
+另外测试崩溃时的完整性：子进程反复覆盖写同一篇文章，随机时刻 SIGKILL，检查目标位置有没有半截文件。
+
+用法：
+    python benchmarks/bench_artifact_writer.py [--articles 400] [--threads 32] [--repeat 3] [--kills 20]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from artifact_writer import ArtifactWriter
+
+IMAGE_SIZE = 150 * 1024
+
+
+def article_files(n: int, images: int, rng: random.Random):
+    """一篇文章的输出文件 [(相对路径, 内容)]"""
+    text = ''.join(f'第 {n} 篇文章第 {i} 段正文内容。' for i in range(400)).encode('utf-8')
+    note = {'titles': [f'标题 {n}'], 'body': '正文' * 300, 'tags': ['#话题'] * 8}
+    files = [('original.txt', text), ('xiaohongshu.txt', text[:3000]),
+             ('xiaohongshu.json', json.dumps(note, ensure_ascii=False).encode('utf-8'))]
+    files += [(f'images/image_{i + 1}.jpg', rng.randbytes(IMAGE_SIZE)) for i in range(images)]
+    return files
+
+
+def write_direct(save_dir: str, files, fsync: bool) -> None:
+    """原来的做法：逐个文件原地覆盖写"""
+    os.makedirs(os.path.join(save_dir, 'images'), exist_ok=True)
+    for name, data in files:
+        with open(os.path.join(save_dir, name), 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def run(mode: str, workdir: str, payloads, threads: int) -> dict:
+    writer = None if mode.startswith('direct') else ArtifactWriter(fsync=mode)
+    queue = list(range(len(payloads)))
+    lock = threading.Lock()
+    write_seconds = [0.0]
+
+    def worker() -> None:
+        while True:
+            with lock:
+                if not queue:
+                    return
+                n = queue.pop()
+            save_dir = os.path.join(workdir, f'article_{n}')
+            started = time.perf_counter()
+            if writer is None:
+                write_direct(save_dir, payloads[n], fsync=mode == 'direct+fsync')
+            else:
+                batch = writer.begin(save_dir)
+                for name, data in payloads[n]:
+                    batch.add_bytes(name, data)
+                batch.commit()
+            with lock:
+                write_seconds[0] += time.perf_counter() - started
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    stats = {}
+    if writer:
+        writer.close()
+        stats = writer.stats()
+    seconds = time.perf_counter() - started
+    return {'seconds': seconds, 'write_seconds': write_seconds[0], 'syncs': stats.get('syncs', '-'),
+            'groups': stats.get('groups', '-')}
+
+
+# ---- 崩溃测试 ----
+
+CRASH_FILES = [('original.txt', 4 * 1024 * 1024), ('xiaohongshu.txt', 1024 * 1024), ('images/image_1.jpg', 4 * 1024 * 1024)]
+
+
+def crash_child(mode: str, save_dir: str) -> None:
+    """反复覆盖写同一篇文章，每个文件的内容是同一个字节，大小固定"""
+    writer = None if mode == 'direct' else ArtifactWriter(fsync='off')
+    round_ = 0
+    while True:
+        round_ += 1
+        files = [(name, bytes([round_ % 256]) * size) for name, size in CRASH_FILES]
+        if writer is None:
+            write_direct(save_dir, files, fsync=False)
+        else:
+            writer.write(save_dir, dict(files))
+
+
+def crash_test(mode: str, workdir: str, kills: int, rng: random.Random) -> int:
+    """返回目标位置出现半截文件的次数"""
+    torn = 0
+    for i in range(kills):
+        save_dir = os.path.join(workdir, f'{mode}_{i}')
+        child = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--crash-child', mode, save_dir],
+                                 cwd=ROOT)
+        time.sleep(0.3 + rng.random() * 0.3)
+        child.send_signal(signal.SIGKILL)
+        child.wait()
+        for name, size in CRASH_FILES:
+            path = os.path.join(save_dir, name)
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                torn += 1
+                break
+    return torn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文章输出文件写入基准")
+    parser.add_argument('--articles', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--images', type=int, default=9)
+    parser.add_argument('--repeat', type=int, default=3, help="每种方式运行次数，取最快的一次")
+    parser.add_argument('--kills', type=int, default=20, help="崩溃测试的次数，0 表示跳过")
+    parser.add_argument('--crash-child', nargs=2, metavar=('MODE', 'DIR'))
+    args = parser.parse_args()
+
+    if args.crash_child:
+        crash_child(*args.crash_child)
+        return
+
+    rng = random.Random(0)
+    payloads = [article_files(n, args.images, rng) for n in range(args.articles)]
+    total_mb = sum(len(data) for files in payloads for _, data in files) / 1024 / 1024
+    print(f"{args.articles} 篇文章（{args.images + 3} 个文件/篇，共 {total_mb:.0f} MB），{args.threads} 个线程\n")
+    print(f"{'方式':<16}{'总耗时(s)':>10}{'篇/秒':>9}{'MB/秒':>9}{'线程写入(s)':>12}{'刷盘次数':>9}{'合并组数':>9}")
+    workdir = tempfile.mkdtemp(prefix='bench_artifact_writer_')
+    try:
+        for mode in ('direct', 'direct+fsync', 'off', 'batch', 'always'):
+            target = os.path.join(workdir, mode)
+            results = []
+            for _ in range(args.repeat):
+                # 先把之前的脏页刷到磁盘，避免上一次的回写影响本次
+                os.sync()
+                results.append(run(mode, target, payloads, args.threads))
+                shutil.rmtree(target, ignore_errors=True)
+            result = min(results, key=lambda r: r['seconds'])
+            label = {'direct': '原地写入', 'direct+fsync': '原地写入+fsync'}.get(mode, f'Writer {mode}')
+            print(f"{label:<16}{result['seconds']:>10.2f}{args.articles / result['seconds']:>9.0f}"
+                  f"{total_mb / result['seconds']:>9.0f}{result['write_seconds']:>12.1f}"
+                  f"{result['syncs']:>9}{result['groups']:>9}")
+
+        if args.kills:
+            print(f"\n崩溃测试：写入过程中随机 SIGKILL {args.kills} 次，目标位置出现半截文件的次数")
+            for mode, label in (('direct', '原地写入'), ('writer', 'ArtifactWriter')):
+                print(f"  {label:<16}{crash_test(mode, workdir, args.kills, rng)}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
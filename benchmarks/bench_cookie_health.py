@@ -0,0 +1,111 @@
+"""登录状态检查基准：浏览器检查与 CookieHealthChecker
+
+本地启动模拟接口（benchmarks/mock_xhs_api.py 的 user/me，每次请求有 --latency-ms 延迟），
+生成 --accounts 个账号的 Cookie 文件，其中有效、已过有效期、服务端已注销、缺少登录 Cookie 的各占一部分。比较：
+- 浏览器检查：XHSPublisher.login / test_xhs_cookie.py 每个账号至少等待 5 秒（打开页面 2 秒 + 刷新 3 秒），
+  还未计启动 Chrome；这里只列出这个下限
+- 逐个检查、--workers 个并发检查（忽略缓存）
+- 缓存命中：新建检查器（相当于另一个进程）从缓存文件读取结果
+并核对每个账号的检查结果是否正确、发出的请求数。
+
+用法：
+    python benchmarks/bench_cookie_health.py [--accounts 40] [--workers 8] [--latency-ms 200]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+if BENCH_DIR not in sys.path:
+    sys.path.insert(0, BENCH_DIR)
+
+from cookie_health import (STATUS_EXPIRED, STATUS_INVALID, STATUS_VALID, CookieHealthChecker)
+from mock_xhs_api import ME_PATH, MockState, start_mock_server
+
+# 浏览器检查每个账号固定的等待时间（秒）
+BROWSER_WAIT = 2 + 3
+
+
+def make_accounts(directory: str, count: int, state: MockState):
+    """生成账号 Cookie 文件，返回 [(路径, 期望的状态)]；按 有效、有效、已过期、已注销、缺少登录 Cookie 循环"""
+    accounts = []
+    now = time.time()
+    for i in range(count):
+        kind = ('valid', 'valid', 'expired', 'revoked', 'missing')[i % 5]
+        session = f'session-{i:04d}-{kind}'
+        cookies = [{'name': 'a1', 'value': f'a1-{i}', 'domain': '.xiaohongshu.com', 'path': '/'}]
+        if kind != 'missing':
+            expiry = now - 3600 if kind == 'expired' else now + 30 * 24 * 3600
+            cookies.append({'name': 'web_session', 'value': session, 'domain': '.xiaohongshu.com',
+                            'path': '/', 'expiry': int(expiry)})
+        if kind in ('valid', 'expired'):
+            state.sessions.add(session)
+        expected = {'valid': STATUS_VALID, 'expired': STATUS_EXPIRED}.get(kind, STATUS_INVALID)
+        path = os.path.join(directory, f'account_{i:04d}.json')
+        with open(path, 'w') as f:
+            json.dump(cookies, f)
+        accounts.append((path, expected))
+    return accounts
+
+
+def run(checker: CookieHealthChecker, state: MockState, accounts, workers: int, force: bool) -> dict:
+    requests = state.me_requests
+    started = time.perf_counter()
+    results = checker.check_many([path for path, _ in accounts], workers, force)
+    seconds = time.perf_counter() - started
+    wrong = sum(1 for health, (_, expected) in zip(results, accounts) if health.status != expected)
+    return {'seconds': seconds, 'requests': state.me_requests - requests, 'wrong': wrong,
+            'cached': sum(1 for health in results if health.cached)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="登录状态检查基准")
+    parser.add_argument('--accounts', type=int, default=40)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=200, help="模拟接口每次请求的延迟")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_cookie_health_')
+    try:
+        state = MockState(me_latency=args.latency_ms / 1000)
+        server, address = start_mock_server(state)
+        accounts = make_accounts(workdir, args.accounts, state)
+        cache_path = os.path.join(workdir, 'cookie_health.json')
+        checker = CookieHealthChecker(url=address + ME_PATH, cache_path=cache_path)
+
+        print(f"{args.accounts} 个账号（有效 {sum(1 for _, s in accounts if s == STATUS_VALID)}，"
+              f"已过期 {sum(1 for _, s in accounts if s == STATUS_EXPIRED)}，"
+              f"已注销或缺少登录 Cookie {sum(1 for _, s in accounts if s == STATUS_INVALID)}），"
+              f"接口延迟 {args.latency_ms:g} ms\n")
+        print(f"{'方式':<20}{'总耗时(s)':>10}{'每账号(ms)':>11}{'请求数':>8}{'缓存命中':>9}{'结果错误':>9}")
+        print(f"{'浏览器（下限）':<20}{BROWSER_WAIT * args.accounts:>10.1f}{BROWSER_WAIT * 1000:>11.0f}"
+              f"{'-':>8}{'-':>9}{'-':>9}  （只计页面等待，不含启动 Chrome）")
+        rows = [('逐个检查', 1, True), (f'{args.workers} 个并发', args.workers, True), ('缓存（另一进程）', args.workers, False)]
+        for label, workers, force in rows:
+            if not force:
+                # 新建检查器，相当于另一个进程读取缓存文件
+                checker = CookieHealthChecker(url=address + ME_PATH, cache_path=cache_path)
+            result = run(checker, state, accounts, workers, force)
+            print(f"{label:<20}{result['seconds']:>10.3f}{result['seconds'] * 1000 / args.accounts:>11.1f}"
+                  f"{result['requests']:>8}{result['cached']:>9}{result['wrong']:>9}")
+
+        with open(cache_path, 'r') as f:
+            cached = f.read()
+        sessions = [cookie['value'] for path, _ in accounts for cookie in json.load(open(path))
+                    if cookie['name'] == 'web_session']
+        leaked = sum(1 for session in sessions if session in cached)
+        print(f"\n缓存文件 {len(json.loads(cached))} 条，包含原始 Cookie 的条目 {leaked} 条")
+        server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
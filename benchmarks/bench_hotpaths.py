@@ -0,0 +1,243 @@
+"""热点路径微基准测试
+
+覆盖文章解析与本地排版的热点：
+- WeixinCrawler.get_article_content  公众号文章解析与提取
+- PageCrawler.process_url            网页解析（网络请求被替换为本地样本）
+- WeixinToXiaohongshu.convert_to_xhs_style
+- FastConverter.render              本地快速转换（TextRank 抽取式摘要）
+- KeywordMatcher.annotate            5000 条规则的关键词标注
+- WeixinToXiaohongshu.process_image  多种尺寸图片
+- xhs_publisher.process_content      纯文本与结构化 JSON 输出的解析校验
+
+用法：
+    python benchmarks/bench_hotpaths.py                  # 运行并与基线对比
+    python benchmarks/bench_hotpaths.py --save-baseline  # 运行并写入基线
+    python benchmarks/bench_hotpaths.py --threshold 0.3 --filter convert
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, redirect_stdout
+from io import BytesIO
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# 反复请求同一个本地样本，不做按域名限速
+os.environ['POLITE_ENABLED'] = 'false'
+
+import requests
+from PIL import Image
+
+from make_fixtures import FIXTURES, fixture_path
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+IMAGE_SIZES = {
+    'thumb': (320, 240),
+    'phone': (1080, 1440),
+    'camera': (3000, 4000),
+}
+
+SAMPLE_XHS_OUTPUT = """一. 标题
+1. 🔥AI眼镜竟然是美瞳一哥做的！
+2. ✨CES最火单品，国产之光
+3. 😱戴上它，世界都变了
+4. 💡科技圈新宠，你pick吗
+5. 🎉一副眼镜改变生活
+
+二. 正文
+家人们谁懂啊！🔥今年CES上最火的竟然是一副AI眼镜👓
+""" + "\n".join(f"第{i}段：这款眼镜真的太好用了，推荐给大家✨" for i in range(40)) + """
+标签：#AI眼镜 #CES #黑科技 #数码好物"""
+
+
+@contextmanager
+def stub_network(pages: Dict[str, bytes]):
+    """用本地样本替换所有 HTTP 请求，未登记的URL返回一张小图片"""
+    buf = BytesIO()
+    Image.new('RGB', (64, 64), (200, 120, 80)).save(buf, 'JPEG')
+    image_bytes = buf.getvalue()
+    original = requests.Session.request
+
+    def fake_request(self, method, url, *args, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = pages.get(url, image_bytes)
+        response._content_consumed = True
+        response.encoding = 'utf-8'
+        response.headers['Content-Type'] = 'text/html' if url in pages else 'image/jpeg'
+        return response
+
+    requests.Session.request = fake_request
+    try:
+        yield
+    finally:
+        requests.Session.request = original
+
+
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> Dict[str, float]:
+    """多次计时，返回中位数和最小值（毫秒）"""
+    samples: List[float] = []
+    # 被测函数会打印进度信息，计时期间丢弃
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+        func()  # 预热
+        started = time.perf_counter()
+        while len(samples) < repeat or time.perf_counter() - started < min_time:
+            t0 = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - t0) * 1000)
+            if len(samples) >= repeat * 20:
+                break
+    return {
+        'median_ms': round(statistics.median(samples), 4),
+        'min_ms': round(min(samples), 4),
+        'runs': len(samples),
+    }
+
+
+def make_image(size) -> Image.Image:
+    """生成带渐变纹理的测试图片"""
+    gradient = Image.linear_gradient('L').resize(size)
+    return Image.merge('RGB', (gradient, gradient.rotate(90).resize(size), Image.new('L', size, 128)))
+
+
+def build_cases(workdir: str) -> Tuple[Dict[str, Callable[[], object]], Dict[str, bytes]]:
+    """构建所有基准用例"""
+    import weixin_crawler
+    import xhs_converte_page
+    import xhs_publisher
+    from gzh2xhs import WeixinToXiaohongshu
+
+    cases: Dict[str, Callable[[], object]] = {}
+    pages = {}
+    texts = {}
+    for name in FIXTURES:
+        with open(fixture_path(name), 'rb') as f:
+            pages[f'https://bench.local/{name}'] = f.read()
+
+    crawler = weixin_crawler.WeixinCrawler(base_save_path=workdir)
+    page_crawler = xhs_converte_page.PageCrawler(base_save_path=workdir)
+    styler = WeixinToXiaohongshu(base_save_path=workdir)
+
+    for name in FIXTURES:
+        url = f'https://bench.local/{name}'
+        cases[f'weixin_extract[{name}]'] = lambda url=url: crawler.get_article_content(url)
+        cases[f'page_process_url[{name}]'] = lambda url=url: page_crawler.process_url(url)
+        with stub_network(pages), open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+            article = crawler.get_article_content(url)
+        texts[name] = (article.title, article.text)
+
+    for name, (title, text) in texts.items():
+        cases[f'convert_to_xhs_style[{name}]'] = lambda t=title, c=text: styler.convert_to_xhs_style(t, c)
+
+    from fast_converter import FastConverter
+    fast = FastConverter()
+    for name, (title, text) in texts.items():
+        cases[f'fast_convert[{name}]'] = lambda t=title, c=text: fast.render(t, c)
+
+    # 大词典下的关键词标注：耗时应只随文本长度增长
+    from keyword_annotator import KeywordMatcher
+    big_rules = {f"词{i:04d}": "✨" for i in range(5000)}
+    big_rules.update(styler.emoji_matcher.rules)
+    big_matcher = KeywordMatcher(big_rules)
+    for name, (title, text) in texts.items():
+        cases[f'keyword_annotate_5k[{name}]'] = lambda c=text: big_matcher.annotate(c)
+
+    for name, size in IMAGE_SIZES.items():
+        img = make_image(size)
+        cases[f'process_image[{name}]'] = lambda img=img: styler.process_image(img)
+
+    cases['process_content[sample]'] = lambda: xhs_publisher.process_content(SAMPLE_XHS_OUTPUT)
+    # 格式不正确的输出会抛出 ValueError，这里只测解析本身
+    from xhs_schema import parse_note
+    cases['process_content[malformed]'] = lambda: parse_note("没有任何分隔符的模型输出\n" * 50)
+    sample_json = json.dumps(parse_note(SAMPLE_XHS_OUTPUT).note.to_dict(), ensure_ascii=False)
+    cases['process_content[json]'] = lambda: xhs_publisher.process_content(sample_json)
+
+    return cases, pages
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    """与基线对比，返回超过阈值的回归用例"""
+    regressions = []
+    print(f"\n{'用例':<36}{'基线(ms)':>12}{'本次(ms)':>12}{'变化':>10}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<36}{'-':>12}{result['median_ms']:>12.3f}{'新增':>10}")
+            continue
+        change = result['median_ms'] / base['median_ms'] - 1 if base['median_ms'] else 0.0
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = ' ⚠'
+        print(f"{name:<36}{base['median_ms']:>12.3f}{result['median_ms']:>12.3f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def load_baseline(path: str) -> Optional[Dict]:
+    """读取基线文件"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="热点路径微基准测试")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="基线JSON路径")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果写为新基线")
+    parser.add_argument('--threshold', type=float, default=0.25, help="中位数变慢超过该比例视为回归")
+    parser.add_argument('--repeat', type=int, default=5, help="每个用例最少运行次数")
+    parser.add_argument('--min-time', type=float, default=0.2, help="每个用例最少运行秒数")
+    parser.add_argument('--filter', default='', help="只运行名称包含该字符串的用例")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cases, pages = build_cases(workdir)
+        results = {}
+        with stub_network(pages):
+            for name, func in cases.items():
+                if args.filter and args.filter not in name:
+                    continue
+                results[name] = measure(func, args.repeat, args.min_time)
+                print(f"{name:<36}{results[name]['median_ms']:>12.3f} ms  (x{results[name]['runs']})")
+
+    if args.save_baseline:
+        data = {
+            'meta': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            },
+            'results': results,
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"\n基线已保存到：{args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print("\n未找到基线文件，使用 --save-baseline 生成")
+        return 0
+
+    regressions = compare(results, baseline.get('results', {}), args.threshold)
+    if regressions:
+        print(f"\n发现 {len(regressions)} 个回归（阈值 {args.threshold:.0%}）：{', '.join(regressions)}")
+        return 1
+    print("\n未发现性能回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""HTTP/2 多路复用与 HTTP/1.1 连接池对比基准
+
+在本地启动两个模拟图片CDN的服务（每个响应固定延迟，模拟 mmbiz.qpic.cn 的往返时间）：
+- HTTP/1.1 keep-alive 服务（http.server）
+- 明文 HTTP/2 服务（h2，客户端以 prior knowledge 方式连接）
+
+对一篇文章的全部图片分别用以下方式抓取，比较耗时和新建连接数：
+- HTTP/1.1 连接池逐张下载（默认路径）
+- HTTP/1.1 连接池 + 线程池并发
+- HTTP/2 单连接多路复用
+
+用法：
+    python benchmarks/bench_http2.py [--images 60] [--latency-ms 30]
+需要 pip install httpx[http2]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from http_client import HttpClient
+from http2_client import Http2Fetcher, http2_available
+
+IMAGE_BYTES = b'\xff\xd8\xff' + b'0' * 60000
+
+
+class H2Protocol(asyncio.Protocol):
+    """最小的 HTTP/2 服务端：每个请求延迟后返回固定图片，处理流量控制"""
+
+    def __init__(self, stats: dict, latency: float):
+        from h2.config import H2Configuration
+        from h2.connection import H2Connection
+
+        self.conn = H2Connection(config=H2Configuration(client_side=False))
+        self.stats = stats
+        self.latency = latency
+        self.pending = {}
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.stats['connections'] += 1
+        self.transport = transport
+        self.conn.initiate_connection()
+        self.transport.write(self.conn.data_to_send())
+
+    def data_received(self, data):
+        import h2.events
+
+        for event in self.conn.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                self.stats['requests'] += 1
+                asyncio.get_running_loop().call_later(self.latency, self.respond, event.stream_id)
+            elif isinstance(event, h2.events.WindowUpdated):
+                self.flush()
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self.transport.close()
+        self.transport.write(self.conn.data_to_send())
+
+    def respond(self, stream_id):
+        self.conn.send_headers(stream_id, [
+            (':status', '200'),
+            ('content-type', 'image/jpeg'),
+            ('content-length', str(len(IMAGE_BYTES))),
+        ])
+        self.pending[stream_id] = IMAGE_BYTES
+        self.flush()
+
+    def flush(self):
+        """在流量窗口允许的范围内尽量发送待发数据"""
+        for stream_id in list(self.pending):
+            data = self.pending[stream_id]
+            while data:
+                window = min(self.conn.local_flow_control_window(stream_id),
+                             self.conn.max_outbound_frame_size)
+                if window <= 0:
+                    break
+                chunk, data = data[:window], data[window:]
+                self.conn.send_data(stream_id, chunk, end_stream=not data)
+            if data:
+                self.pending[stream_id] = data
+            else:
+                del self.pending[stream_id]
+        self.transport.write(self.conn.data_to_send())
+
+
+def start_h2_server(latency: float):
+    """在后台线程启动 HTTP/2 服务，返回 (端口, 统计)"""
+    stats = {'connections': 0, 'requests': 0}
+    ready = threading.Event()
+    holder = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        server = loop.run_until_complete(
+            loop.create_server(lambda: H2Protocol(stats, latency), '127.0.0.1', 0))
+        holder['port'] = server.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return holder['port'], stats
+
+
+def start_http1_server(latency: float):
+    """在后台线程启动 HTTP/1.1 keep-alive 服务，返回 (端口, 统计)"""
+    stats = {'connections': 0, 'requests': 0}
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+
+        def process_request(self, request, client_address):
+            stats['connections'] += 1
+            super().process_request(request, client_address)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            stats['requests'] += 1
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(IMAGE_BYTES)))
+            self.end_headers()
+            self.wfile.write(IMAGE_BYTES)
+
+        def log_message(self, *args):
+            pass
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1], stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/2 多路复用基准")
+    parser.add_argument('--images', type=int, default=60)
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--threads', type=int, default=8, help="HTTP/1.1 并发线程数")
+    args = parser.parse_args()
+
+    if not http2_available():
+        print("需要先安装 HTTP/2 依赖：pip install httpx[http2]")
+        return 1
+
+    latency = args.latency_ms / 1000
+    h1_port, h1_stats = start_http1_server(latency)
+    h2_port, h2_stats = start_h2_server(latency)
+    h1_urls = [f'http://127.0.0.1:{h1_port}/img/{i}.jpg' for i in range(args.images)]
+    h2_urls = [f'http://127.0.0.1:{h2_port}/img/{i}.jpg' for i in range(args.images)]
+
+    print(f"{args.images} 张图片，服务端延迟 {args.latency_ms:.0f} ms\n")
+    print(f"{'方式':<28}{'耗时(s)':>10}{'新建连接':>10}")
+
+    client = HttpClient(pool_maxsize=args.threads)
+    started = time.perf_counter()
+    for url in h1_urls:
+        client.get(url).content
+    print(f"{'HTTP/1.1 连接池逐张':<28}{time.perf_counter() - started:>10.2f}{h1_stats['connections']:>10}")
+
+    h1_stats['connections'] = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        list(pool.map(lambda u: client.get(u).content, h1_urls))
+    print(f"{f'HTTP/1.1 连接池 x{args.threads} 线程':<28}{time.perf_counter() - started:>10.2f}{h1_stats['connections']:>10}")
+
+    fetcher = Http2Fetcher(prior_knowledge=True)
+    started = time.perf_counter()
+    contents = fetcher.fetch_many(h2_urls)
+    elapsed = time.perf_counter() - started
+    ok = sum(1 for c in contents if c == IMAGE_BYTES)
+    print(f"{'HTTP/2 多路复用':<28}{elapsed:>10.2f}{h2_stats['connections']:>10}")
+    print(f"\nHTTP/2 成功 {ok}/{len(h2_urls)}，协议统计：{fetcher.stats()}")
+    client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
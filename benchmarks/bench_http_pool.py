@@ -0,0 +1,97 @@
+"""HTTP 连接复用基准
+
+启动本地 HTTP/1.1 keep-alive 服务，模拟一批公众号文章（每篇一个页面加若干图片），
+对比逐次 requests.get 与共享 HttpClient 的新建连接数（握手次数）和耗时。
+
+用法：
+    python benchmarks/bench_http_pool.py [--articles 20] [--images 30]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import requests
+
+from http_client import HttpClient
+
+IMAGE_BYTES = b'\xff\xd8\xff' + b'0' * 20000
+
+
+class CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 头和正文分两次写出，不关 Nagle 时长连接上每个响应都会卡在延迟确认上
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = IMAGE_BYTES if self.path.startswith('/img/') else ('<html>' + 'x' * 50000 + '</html>').encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Content-Type', 'image/jpeg' if self.path.startswith('/img/') else 'text/html')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(fetch, base: str, articles: int, images: int) -> float:
+    """按爬虫的顺序抓取：文章页面，然后逐张图片"""
+    started = time.perf_counter()
+    for a in range(articles):
+        fetch(f'{base}/article/{a}').content
+        for i in range(images):
+            fetch(f'{base}/img/{a}_{i}.jpg').content
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP 连接复用基准")
+    parser.add_argument('--articles', type=int, default=20)
+    parser.add_argument('--images', type=int, default=30)
+    args = parser.parse_args()
+
+    server = CountingServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    total = args.articles * (args.images + 1)
+
+    print(f"{args.articles} 篇文章，每篇 {args.images} 张图片，共 {total} 个请求\n")
+    print(f"{'方式':<20}{'新建连接':>10}{'连接/篇':>10}{'耗时(s)':>10}")
+
+    server.connections = 0
+    elapsed = run(requests.get, base, args.articles, args.images)
+    print(f"{'逐次 requests.get':<20}{server.connections:>10}{server.connections / args.articles:>10.2f}{elapsed:>10.2f}")
+
+    server.connections = 0
+    client = HttpClient()
+    elapsed = run(client.get, base, args.articles, args.images)
+    print(f"{'共享 HttpClient':<20}{server.connections:>10}{server.connections / args.articles:>10.2f}{elapsed:>10.2f}")
+    print(f"\n客户端统计：{client.stats()}")
+
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
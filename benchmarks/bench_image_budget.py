@@ -0,0 +1,158 @@
+"""图片预算基准：全部下载处理 vs 只处理入选图片
+
+在本地启动一个模拟图片CDN（每张图片固定延迟），生成一篇图片很多的公众号文章：
+正文照片、分隔条、小图标、表情 GIF 混排，部分图片没有声明尺寸。分别用：
+- 全部：下载并处理（滤镜）文章中的每一张图片（原来的做法）
+- 预算：按位置、声明尺寸、比例和文件头探测选出不超过 IMAGE_BUDGET 张，只处理这些
+
+比较下载字节数、处理张数和耗时（发布时上传的张数与处理张数相同）。
+
+用法：
+    python benchmarks/bench_image_budget.py [--photos 40] [--budget 9] [--latency-ms 20]
+"""
+import argparse
+import os
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from PIL import Image
+
+from image_budget import ImageBudget
+
+
+def make_image(size, fmt: str) -> bytes:
+    """生成带噪点的图片，压缩后的大小接近真实照片"""
+    img = Image.effect_noise(size, 40).convert('RGB')
+    buf = BytesIO()
+    img.save(buf, 'GIF' if fmt == 'gif' else 'JPEG', quality=85)
+    return buf.getvalue()
+
+
+def build_article(args):
+    """返回 (路径 -> 图片内容, [(路径, img 标签属性)])"""
+    rng = random.Random(42)
+    images = {}
+    tags = []
+    kinds = ['photo'] * args.photos + ['divider'] * args.dividers + ['icon'] * args.icons + ['gif'] * args.gifs
+    rng.shuffle(kinds)
+    cache = {}
+    for i, kind in enumerate(kinds):
+        size, fmt = {
+            'photo': (rng.choice([(1080, 1440), (1280, 960), (1080, 1080)]), 'jpeg'),
+            'divider': ((1080, 40), 'jpeg'),
+            'icon': ((64, 64), 'jpeg'),
+            'gif': ((240, 240), 'gif'),
+        }[kind]
+        key = (size, fmt)
+        if key not in cache:
+            cache[key] = make_image(size, fmt)
+        path = f'/img/{i}?wx_fmt={fmt}'
+        images[path] = cache[key]
+        attrs = {'data-type': fmt}
+        # 约四分之一的图片没有声明尺寸，需要探测文件头
+        if rng.random() > 0.25:
+            attrs.update({'data-w': str(size[0]), 'data-ratio': f'{size[1] / size[0]:.4f}'})
+        tags.append((path, attrs))
+    return images, tags
+
+
+def start_server(images, args):
+    state = {'bytes': 0}
+    lock = threading.Lock()
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+
+        def handle_error(self, request, client_address):
+            # 探测文件头后客户端会提前断开连接
+            if not isinstance(sys.exc_info()[1], ConnectionError):
+                super().handle_error(request, client_address)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            # 发送缓冲区调小，客户端探测完文件头断开后服务端不会继续写入大量数据，统计的字节数接近实际传输量
+            self.request.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 32 * 1024)
+
+        def do_GET(self):
+            body = images.get(self.path, b'')
+            time.sleep(args.latency_ms / 1000)
+            self.send_response(200 if body else 404)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            try:
+                for i in range(0, len(body), 16384):
+                    self.wfile.write(body[i:i + 16384])
+                    with lock:
+                        state['bytes'] += len(body[i:i + 16384])
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *a):
+            pass
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1], state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图片预算基准")
+    parser.add_argument('--photos', type=int, default=40)
+    parser.add_argument('--dividers', type=int, default=15)
+    parser.add_argument('--icons', type=int, default=15)
+    parser.add_argument('--gifs', type=int, default=10)
+    parser.add_argument('--budget', type=int, default=9)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    args = parser.parse_args()
+
+    from gzh2xhs import WeixinToXiaohongshu
+
+    images, tags = build_article(args)
+    port, state = start_server(images, args)
+    base = f'http://127.0.0.1:{port}'
+    print(f"{len(tags)} 张图片（照片 {args.photos}、分隔条 {args.dividers}、图标 {args.icons}、GIF {args.gifs}），"
+          f"预算 {args.budget} 张，图片延迟 {args.latency_ms:.0f} ms\n")
+    print(f"{'方式':<8}{'下载(MB)':>10}{'处理张数':>10}{'选择(ms)':>10}{'总耗时(s)':>10}")
+
+    workdir = tempfile.mkdtemp(prefix='bench_budget_')
+    try:
+        styler = WeixinToXiaohongshu(base_save_path=workdir)
+        save_dir = styler.create_save_directory('bench')
+        for mode in ('全部', '预算'):
+            state['bytes'] = 0
+            urls = [base + path for path, _ in tags]
+            started = time.perf_counter()
+            with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+                if mode == '预算':
+                    budget = ImageBudget(args.budget, headers=styler.headers)
+                    for url, (_, attrs) in zip(urls, tags):
+                        budget.add(url, attrs)
+                    urls = budget.select_urls()
+                selected = time.perf_counter()
+                saved = styler.save_images(save_dir, urls)
+            elapsed = time.perf_counter() - started
+            print(f"{mode:<8}{state['bytes'] / 1e6:>10.2f}{len(saved):>10}"
+                  f"{(selected - started) * 1000:>10.1f}{elapsed:>10.2f}")
+        styler.store.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""大模型接口降级时的自适应超时与熔断基准
+
+本地模拟一个流式 /chat/completions 接口：先正常服务一段时间，然后在 --outage-s 秒内
+只接受连接不返回数据（模拟服务商卡死），之后恢复。按流水线的节奏逐篇"转换"文章，比较：
+- 固定超时（原来的做法：每篇都等满 --timeout 秒后失败）
+- 自适应超时 + 熔断器（超时取观测到的 p99 加余量，连续失败后熔断快速失败，半开探测恢复）
+- 同上，熔断期间改用备用服务商
+
+时间全部按比例缩小（秒级超时代替分钟级），结论与真实规模一致。
+
+用法：
+    python benchmarks/bench_llm_breaker.py [--articles 400] [--outage-s 10]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# 按缩小后的时间尺度配置超时下限、余量和熔断等待时间，必须在导入前设置
+os.environ.setdefault('LLM_TIMEOUT_FLOOR', '0.2')
+os.environ.setdefault('LLM_TIMEOUT_PAD', '0.1')
+os.environ.setdefault('LLM_BREAKER_RESET', '1')
+
+from llm_engine import LLMEngine, ProviderConfig
+import provider_health
+
+
+def start_server(args):
+    """启动模拟服务，返回 (端口, 状态)"""
+    state = {'served': 0, 'outage_until': None, 'calls': 0}
+    lock = threading.Lock()
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.0'
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            with lock:
+                state['calls'] += 1
+                state['served'] += 1
+                if state['served'] == args.healthy and state['outage_until'] is None:
+                    state['outage_until'] = time.monotonic() + args.outage_s
+                down = state['outage_until'] is not None and time.monotonic() < state['outage_until']
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            try:
+                # 故障期间不返回任何数据，直到客户端超时断开
+                time.sleep(args.timeout * 2 if down else args.first_token_ms / 1000)
+                for token in ('小红书', '风格', '内容'):
+                    chunk = {'choices': [{'delta': {'content': token}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *a):
+            pass
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1], state
+
+
+def run_batch(engine: LLMEngine, args):
+    """逐篇转换，返回 (总耗时, 大模型成功篇数, 失败篇数, 失败调用累计等待时间)"""
+    messages = [{'role': 'user', 'content': '改写这篇文章'}]
+    ok = failed = 0
+    wasted = 0.0
+    started = time.perf_counter()
+    for _ in range(args.articles):
+        time.sleep(args.work_ms / 1000)  # 抓取、保存等其他工作
+        call_started = time.perf_counter()
+        if engine.complete(messages):
+            ok += 1
+        else:
+            failed += 1
+            wasted += time.perf_counter() - call_started
+    return time.perf_counter() - started, ok, failed, wasted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自适应超时与熔断基准")
+    parser.add_argument('--articles', type=int, default=400)
+    parser.add_argument('--healthy', type=int, default=30, help="故障前正常服务的请求数")
+    parser.add_argument('--outage-s', type=float, default=10)
+    parser.add_argument('--timeout', type=float, default=2, help="固定超时（秒），也是自适应超时的上限")
+    parser.add_argument('--first-token-ms', type=float, default=40)
+    parser.add_argument('--work-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    print(f"{args.articles} 篇文章，第 {args.healthy} 个请求后接口卡死 {args.outage_s:.0f}s，"
+          f"固定超时 {args.timeout:.0f}s\n")
+    print(f"{'方式':<20}{'总耗时(s)':>10}{'成功':>6}{'失败':>6}{'失败等待(s)':>12}{'接口调用':>10}")
+
+    # 备用服务商始终正常
+    backup_args = argparse.Namespace(**{**vars(args), 'healthy': 0})
+    backup_port, _ = start_server(backup_args)
+    backup = ProviderConfig('backup', f'http://127.0.0.1:{backup_port}', 'key', 'fake', timeout=args.timeout)
+
+    for label, adaptive, secondary in (('固定超时', False, None), ('自适应+熔断', True, None),
+                                       ('自适应+熔断+备用', True, 'backup')):
+        port, state = start_server(args)
+        provider = ProviderConfig('fake', f'http://127.0.0.1:{port}', 'key', 'fake', timeout=args.timeout)
+        engine = LLMEngine('fake', secondary, providers={'fake': provider, 'backup': backup})
+        health = engine.health(provider)
+        if not adaptive:
+            # 还原原来的行为：不按延迟调整超时，不熔断
+            health.failure_threshold = health.error_rate_threshold = float('inf')
+            health.timeout = lambda ceiling, first_token=True: ceiling
+        elapsed, ok, failed, wasted = run_batch(engine, args)
+        print(f"{label:<20}{elapsed:>10.2f}{ok:>6}{failed:>6}{wasted:>12.2f}{state['calls']:>10}")
+        if secondary:
+            print(f"\n服务商状态：{health.snapshot(provider.timeout)}")
+            print(f"故障转移 {engine.failovers} 次")
+        provider_health._registry.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""大模型对冲请求基准
+
+在本地启动两个模拟 /chat/completions 流式接口的服务：
+- 主服务商：大多数请求首 token 很快，少数请求卡顿很久（长尾）
+- 备用服务商：首 token 稍慢但稳定
+
+分别在不对冲和对冲两种方式下发出同样数量的请求，比较端到端延迟的分位数，
+以及备用服务商被调用的比例（即额外成本）。
+
+用法：
+    python benchmarks/bench_llm_hedge.py [--requests 200] [--slow-ratio 0.05]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from llm_engine import LLMEngine, ProviderConfig
+import provider_health
+
+TOKENS = ['小红书', '风格', '的', '内容', '来啦', '✨'] * 5
+
+
+def start_server(args):
+    """启动模拟服务，返回 (端口, 各路径的调用次数)"""
+    calls = {'primary': 0, 'secondary': 0}
+    lock = threading.Lock()
+    rng = random.Random(7)
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.0'
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            name = 'primary' if self.path.startswith('/primary') else 'secondary'
+            with lock:
+                calls[name] += 1
+                slow = name == 'primary' and rng.random() < args.slow_ratio
+            if name == 'primary':
+                first = args.slow_ms if slow else args.primary_ms
+            else:
+                first = args.secondary_ms
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            try:
+                time.sleep(first / 1000)
+                for token in TOKENS:
+                    chunk = {'choices': [{'delta': {'content': token}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(args.token_ms / 1000)
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *a):
+            pass
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1], calls
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def run(engine: LLMEngine, count: int):
+    messages = [{'role': 'user', 'content': '改写这篇文章'}]
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        content = engine.complete(messages)
+        if content:
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大模型对冲请求基准")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--slow-ratio', type=float, default=0.05, help="主服务商卡顿请求的比例")
+    parser.add_argument('--primary-ms', type=float, default=40)
+    parser.add_argument('--slow-ms', type=float, default=1500)
+    parser.add_argument('--secondary-ms', type=float, default=80)
+    parser.add_argument('--token-ms', type=float, default=2)
+    parser.add_argument('--percentile', type=float, default=0.9, help="触发对冲的首 token 延迟分位数")
+    args = parser.parse_args()
+
+    port, calls = start_server(args)
+    base = f'http://127.0.0.1:{port}'
+    providers = {
+        'primary': ProviderConfig('primary', f'{base}/primary', 'key', 'fake', timeout=30),
+        'secondary': ProviderConfig('secondary', f'{base}/secondary', 'key', 'fake', timeout=30),
+    }
+
+    print(f"{args.requests} 次请求，主服务商 {args.slow_ratio:.0%} 的请求首 token 延迟 {args.slow_ms:.0f} ms\n")
+    print(f"{'方式':<12}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'备用调用':>10}")
+
+    for label, secondary in (('不对冲', None), ('对冲', 'secondary')):
+        calls['primary'] = calls['secondary'] = 0
+        provider_health._registry.clear()
+        engine = LLMEngine('primary', secondary, providers=providers, hedge_percentile=args.percentile)
+        # 预热：积累首 token 延迟样本后再计时
+        run(engine, args.warmup)
+        calls['primary'] = calls['secondary'] = 0
+        latencies = run(engine, args.requests)
+        row = ''.join(f"{percentile(latencies, p) * 1000:>10.0f}" for p in (0.5, 0.95, 0.99))
+        print(f"{label:<12}{row}{calls['secondary']:>10}")
+        if secondary:
+            print(f"\n对冲统计：{engine.stats()}")
+
+
+if __name__ == "__main__":
+    main()
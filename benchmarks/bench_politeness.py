@@ -0,0 +1,178 @@
+"""按域名自适应限速基准：模拟有反爬限制的站点
+
+本地启动一个模拟公众号站点（benchmarks/fixtures 中的样本），按令牌桶限制请求速率：
+超过 --limit 次/秒（允许 --burst 次突发）后返回验证页，并在 --penalty 秒内对所有请求返回验证页。
+用 --threads 个线程通过 WeixinCrawler.get_article_content 抓取 --articles 篇文章，比较：
+- 不限速：被限流的文章直接丢失（原来的做法）
+- 固定速率：按 --limit 的一半匀速请求
+- 自适应（AIMD）：从较低速率开始提速，被限流时减速、暂停并重新排队
+时间按比例缩小（默认每秒 3 次，低于本机解析速度，限制才会起作用），参数见 main()。
+
+用法：
+    python benchmarks/bench_politeness.py [--articles 150] [--limit 3]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import politeness
+from make_fixtures import fixture_path
+from politeness import PolitenessScheduler, ThrottledError
+from weixin_crawler import WeixinCrawler
+
+VERIFY_PAGE = '<html><body><p class="weui-msg__desc">当前环境异常，完成验证后即可继续访问。</p></body></html>'.encode()
+
+
+class Limiter:
+    """令牌桶，超出后进入惩罚期"""
+
+    def __init__(self, rate: float, burst: int, penalty: float):
+        self.rate = rate
+        self.burst = burst
+        self.penalty = penalty
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+        self.allowed = 0
+        self.blocked = 0
+
+    def allow(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if now >= self.blocked_until and self.tokens >= 1:
+                self.tokens -= 1
+                self.allowed += 1
+                return True
+            if now >= self.blocked_until:
+                self.blocked_until = now + self.penalty
+            self.blocked += 1
+            return False
+
+
+def start_server(fixture: str, limiter: Limiter):
+    with open(fixture_path(fixture), 'rb') as f:
+        page = f.read()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            if self.path.startswith('/img/'):
+                body = b''
+            else:
+                body = self.server.page if self.server.limiter.allow() else VERIFY_PAGE
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *a):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    port = server.server_address[1]
+    server.page = page.replace(b'https://mmbiz.qpic.cn/', f'http://127.0.0.1:{port}/img/'.encode())
+    server.limiter = limiter
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, port
+
+
+def run(port: int, args, workdir: str, scheduler) -> dict:
+    """多线程抓取；启用调度器时被限流的文章放回队尾重新处理"""
+    pending = deque(f'http://127.0.0.1:{port}/s/{i}' for i in range(args.articles))
+    lock = threading.Lock()
+    result = {'ok': 0, 'lost': 0, 'requeued': 0}
+
+    def worker(n: int) -> None:
+        crawler = WeixinCrawler(base_save_path=os.path.join(workdir, str(n)))
+        while True:
+            with lock:
+                if not pending:
+                    break
+                url = pending.popleft()
+            try:
+                article = crawler.get_article_content(url, prefetch=False)
+                outcome = 'ok' if article else 'lost'
+            except ThrottledError:
+                outcome = 'requeued' if scheduler else 'lost'
+                if scheduler:
+                    with lock:
+                        pending.append(url)
+                    # 模拟任务队列的延迟重新领取
+                    time.sleep(0.2)
+            with lock:
+                result[outcome] += 1
+        crawler.store.close()
+
+    politeness.POLITE_ENABLED = scheduler is not None
+    politeness._scheduler = scheduler
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    started = time.perf_counter()
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按域名自适应限速基准")
+    parser.add_argument('--articles', type=int, default=150)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--limit', type=float, default=3, help="站点允许的每秒请求数")
+    parser.add_argument('--burst', type=int, default=3)
+    parser.add_argument('--penalty', type=float, default=2, help="超出后返回验证页的秒数")
+    parser.add_argument('--fixture', default='typical')
+    args = parser.parse_args()
+
+    print(f"模拟站点：每秒 {args.limit:g} 次（突发 {args.burst} 次），超出后 {args.penalty:g} 秒内返回验证页")
+    print(f"{args.articles} 篇文章，{args.threads} 个线程\n")
+    print(f"{'方式':<18}{'总耗时(s)':>10}{'成功':>6}{'丢失':>6}{'重新排队':>10}{'成功/秒':>9}{'占上限':>8}{'验证页':>8}")
+
+    # 时间按比例缩小：暂停、最长等待和提速幅度都按站点速率换算
+    scale = args.limit / 3
+    configs = [
+        ('不限速', None),
+        ('固定速率 50%', PolitenessScheduler(rate=args.limit / 2, increase=0, jitter=0.1, retries=0,
+                                         cooldown=args.penalty, max_wait=args.penalty * 2)),
+        ('自适应 AIMD', PolitenessScheduler(rate=args.limit / 5, min_rate=0.15 * scale, max_rate=args.limit * 3,
+                                          increase=0.06 * scale, jitter=0.1, retries=0, cooldown=args.penalty,
+                                          max_cooldown=args.penalty * 8, max_wait=args.penalty * 2)),
+    ]
+    workdir = tempfile.mkdtemp(prefix='bench_politeness_')
+    try:
+        for label, scheduler in configs:
+            limiter = Limiter(args.limit, args.burst, args.penalty)
+            server, port = start_server(args.fixture, limiter)
+            result = run(port, args, os.path.join(workdir, label), scheduler)
+            server.shutdown()
+            throughput = result['ok'] / result['seconds']
+            print(f"{label:<18}{result['seconds']:>10.2f}{result['ok']:>6}{result['lost']:>6}"
+                  f"{result['requeued']:>10}{throughput:>9.2f}{throughput / args.limit:>8.0%}{limiter.blocked:>8}")
+            if scheduler:
+                for host, stats in scheduler.stats().items():
+                    print(f"{'':<18}结束时速率 {stats['rate']} 次/秒，被限流 {stats['throttled']} 次，变慢 {stats['slow']} 次")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
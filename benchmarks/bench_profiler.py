@@ -0,0 +1,127 @@
+"""按阶段性能分析的开销基准
+
+在本地启动一个模拟站点（benchmarks/fixtures 中的公众号样本 + JPEG 图片），用 WeixinCrawler
+抓取 --articles 篇文章并用本地快速转换生成文案，分别在以下配置下运行：
+- 关闭（PROFILE=off）
+- 采样，抽样比例 --rate（适合生产环境长期开启）
+- 采样，全部文章；再加上 tracemalloc 内存峰值
+- cProfile，全部文章
+比较总耗时相对关闭时的开销，并输出采样报告的阶段汇总。
+
+用法：
+    python benchmarks/bench_profiler.py [--articles 20] [--rate 0.1]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+os.environ['CONVERT_MODE'] = 'local'
+os.environ['POLITE_ENABLED'] = 'false'
+
+from PIL import Image
+
+import profiler
+from make_fixtures import fixture_path
+from weixin_crawler import WeixinCrawler
+from xhs_converter import XHSConverter, convert_weixin_url
+
+
+def start_server(fixture: str):
+    buf = BytesIO()
+    Image.effect_noise((1080, 1440), 40).convert('RGB').save(buf, 'JPEG', quality=85)
+    image_bytes = buf.getvalue()
+    with open(fixture_path(fixture), 'rb') as f:
+        page = f.read()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            body = image_bytes if self.path.startswith('/img/') else self.server.page
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg' if body is image_bytes else 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *a):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    port = server.server_address[1]
+    server.page = page.replace(b'https://mmbiz.qpic.cn/', f'http://127.0.0.1:{port}/img/'.encode())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return port
+
+
+def run_batch(port: int, articles: int, workdir: str) -> float:
+    converter = XHSConverter()
+    started = time.perf_counter()
+    for i in range(articles):
+        # 每篇文章用单独的目录，避免被查重跳过
+        crawler = WeixinCrawler(base_save_path=os.path.join(workdir, str(i)))
+        convert_weixin_url(f'http://127.0.0.1:{port}/s/{i}', crawler, converter)
+        crawler.store.close()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="性能分析开销基准")
+    parser.add_argument('--articles', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=0.1)
+    parser.add_argument('--fixture', default='typical')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    port = start_server(args.fixture)
+    workdir = tempfile.mkdtemp(prefix='bench_profiler_')
+    off = profiler.Profiler(mode='off')
+    per_call = min(timeit.repeat(lambda: off.stage('x').__enter__(), number=100000, repeat=3)) / 100000
+    print(f"关闭时每次 stage() 调用 {per_call * 1e9:.0f} ns\n")
+    print(f"{args.articles} 篇文章（样本 {args.fixture}，每篇保存 9 张图片，本地快速转换）\n")
+    print(f"{'配置':<22}{'总耗时(s)':>10}{'开销':>8}{'抽中文章':>10}")
+
+    configs = [('关闭', 'off', 1.0, False),
+               (f'采样 rate={args.rate}', 'sample', args.rate, False),
+               ('采样 rate=1', 'sample', 1.0, False),
+               ('采样 rate=1 + 内存', 'sample', 1.0, True),
+               ('cProfile rate=1', 'cprofile', 1.0, False)]
+    baseline = None
+    reports = {}
+    try:
+        for label, mode, rate, memory in configs:
+            times = []
+            for _ in range(args.repeat):
+                prof = profiler.configure(mode, rate, memory)
+                prof.out_dir = os.path.join(workdir, 'profiles')
+                run_dir = tempfile.mkdtemp(dir=workdir)
+                with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+                    times.append(run_batch(port, args.articles, run_dir))
+                shutil.rmtree(run_dir, ignore_errors=True)
+            elapsed = min(times)
+            baseline = baseline or elapsed
+            profiled = len({r.article for r in prof.records if r.profiled})
+            print(f"{label:<22}{elapsed:>10.2f}{elapsed / baseline - 1:>8.1%}{profiled:>10}")
+            if mode != 'off':
+                reports[label] = prof.report(print_summary=False)
+        print()
+        with open(os.path.join(reports['采样 rate=1 + 内存'], 'summary.txt'), encoding='utf-8') as f:
+            print(f.read().split('\n\n', 1)[0])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""发布方式基准：接口发布与浏览器发布的耗时和内存
+
+本地启动模拟的发布接口（benchmarks/mock_xhs_api.py），每张图片上传有固定延迟加带宽限制。
+每种方式在单独的子进程中发布 --notes 篇笔记（每篇 --images 张 1080x1440 的 JPEG），比较：
+- 接口发布：逐张上传与 --workers 张并发上传的每篇耗时、进程内存峰值
+- 浏览器发布：启动 Chrome 并打开页面的耗时和浏览器进程的内存（需要 selenium 和 Chrome，没有时跳过）
+- Cookie 过期时接口发布能否及时识别（不改用浏览器，只看返回结果）
+
+用法：
+    python benchmarks/bench_publish.py [--notes 5] [--images 9] [--workers 4]
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+if BENCH_DIR not in sys.path:
+    sys.path.insert(0, BENCH_DIR)
+
+from cookie_health import CookieHealthChecker
+from mock_xhs_api import ME_PATH, SESSION, MockState, start_mock_server
+
+
+def make_images(directory: str, count: int):
+    """生成带噪点的图片，大小接近真实照片"""
+    from PIL import Image
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f'image_{i}.jpg')
+        Image.effect_noise((1080, 1440), 40 + i).convert('RGB').save(path, quality=85)
+        paths.append(path)
+    return paths
+
+
+def write_cookies(path: str, session: str) -> None:
+    with open(path, 'w') as f:
+        json.dump([{'name': 'web_session', 'value': session, 'domain': '.xiaohongshu.com', 'path': '/'},
+                   {'name': 'a1', 'value': 'bench', 'domain': '.xiaohongshu.com', 'path': '/'}], f)
+
+
+def process_tree_rss_kb(pid: int) -> int:
+    """进程及其所有子进程的常驻内存之和（读取 /proc）"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+        stack.extend(children.get(current, []))
+    return total
+
+
+# ---- 子进程 ----
+
+def child_api(args) -> dict:
+    started = time.perf_counter()
+    from xhs_api_publisher import ApiPublisher
+
+    publisher = ApiPublisher(args.cookies, upload_workers=args.workers, fallback=False,
+                             creator_api=args.address, edith_api=args.address, sign_url='',
+                             checker=CookieHealthChecker(url=args.address + ME_PATH, cache_path=None))
+    ready = time.perf_counter() - started
+    images = sorted(os.path.join(args.image_dir, name) for name in os.listdir(args.image_dir))
+    seconds, failures = [], []
+    for i in range(args.notes):
+        note_started = time.perf_counter()
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+            result = publisher.publish_note(f'基准笔记 {i}', '正文内容 #话题', images)
+        seconds.append(time.perf_counter() - note_started)
+        if not result.success:
+            failures.append(result.message)
+    publisher.close()
+    return {'ready': ready, 'seconds': seconds, 'failures': failures,
+            'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def child_browser(args) -> dict:
+    started = time.perf_counter()
+    try:
+        from xhs_publisher import XHSPublisher
+        publisher = XHSPublisher(args.cookies)
+    except Exception as e:
+        reason = str(e).split(';')[0].strip()
+        return {'skipped': f'{type(e).__name__}: {reason}'}
+    try:
+        publisher.driver.get(f'{args.address}/api/media/v1/upload/web/permit')
+        ready = time.perf_counter() - started
+        return {'ready': ready, 'rss_kb': process_tree_rss_kb(os.getpid())}
+    finally:
+        publisher.close()
+
+
+def run_child(mode: str, args, address: str, cookies: str, image_dir: str, workers: int = 1) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), '--child', mode, '--address', address,
+               '--cookies', cookies, '--image-dir', image_dir, '--notes', str(args.notes), '--workers', str(workers)]
+    output = subprocess.run(command, capture_output=True, text=True, cwd=ROOT, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="发布方式基准")
+    parser.add_argument('--notes', type=int, default=5)
+    parser.add_argument('--images', type=int, default=9)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--upload-latency-ms', type=float, default=150, help="每张图片上传的固定延迟")
+    parser.add_argument('--upload-kbps', type=float, default=2048, help="每个上传连接的带宽 KB/s")
+    parser.add_argument('--child', choices=('api', 'browser'))
+    parser.add_argument('--address')
+    parser.add_argument('--cookies')
+    parser.add_argument('--image-dir')
+    args = parser.parse_args()
+
+    if args.child:
+        result = child_api(args) if args.child == 'api' else child_browser(args)
+        print(json.dumps(result))
+        return
+
+    workdir = tempfile.mkdtemp(prefix='bench_publish_')
+    try:
+        image_dir = os.path.join(workdir, 'images')
+        images = make_images(image_dir, args.images)
+        size_kb = sum(os.path.getsize(path) for path in images) / 1024
+        cookies = os.path.join(workdir, '.cookies.json')
+        write_cookies(cookies, SESSION)
+        state = MockState(upload_latency=args.upload_latency_ms / 1000, upload_kbps=args.upload_kbps)
+        server, address = start_mock_server(state)
+
+        print(f"{args.notes} 篇笔记，每篇 {args.images} 张图片（共 {size_kb:.0f} KB），"
+              f"上传延迟 {args.upload_latency_ms:g} ms + {args.upload_kbps:g} KB/s\n")
+        print(f"{'方式':<22}{'就绪(s)':>9}{'每篇中位(s)':>12}{'每篇最慢(s)':>12}{'内存峰值(MB)':>13}{'失败':>6}")
+        for workers in (1, args.workers):
+            result = run_child('api', args, address, cookies, image_dir, workers)
+            seconds = sorted(result['seconds'])
+            print(f"{f'接口，{workers} 张并发上传':<22}{result['ready']:>9.2f}{seconds[len(seconds) // 2]:>12.2f}"
+                  f"{seconds[-1]:>12.2f}{result['rss_kb'] / 1024:>13.0f}{len(result['failures']):>6}")
+        print(f"{'':<22}模拟服务收到 {len(state.notes)} 篇笔记，同时上传最多 {state.max_uploading} 张")
+
+        result = run_child('browser', args, address, cookies, image_dir)
+        if 'skipped' in result:
+            print(f"{'浏览器（Selenium）':<22}跳过：{result['skipped']}")
+        else:
+            print(f"{'浏览器（Selenium）':<22}{result['ready']:>9.2f}{'-':>12}{'-':>12}{result['rss_kb'] / 1024:>13.0f}"
+                  f"{'':>6}  （只计启动 Chrome 和打开页面）")
+
+        # Cookie 过期：接口返回未登录，应立即识别，不上传图片
+        expired = os.path.join(workdir, 'expired.json')
+        write_cookies(expired, 'expired')
+        from xhs_api_publisher import ApiPublisher
+        publisher = ApiPublisher(expired, fallback=False, creator_api=address, edith_api=address, sign_url='',
+                                 checker=CookieHealthChecker(url=address + ME_PATH, cache_path=None))
+        uploads = len(state.uploaded)
+        started = time.perf_counter()
+        result = publisher.publish_note('标题', '正文', images)
+        print(f"\nCookie 过期：{time.perf_counter() - started:.2f} 秒返回，{result.message}，"
+              f"上传图片 {len(state.uploaded) - uploads} 张")
+        server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""栏目抓取基准：本地生成的产品站点
+
+本地启动一个模拟站点：/solutions/ 下 --pages 个页面，每个页面有十几个链接，指向栏目内的其他页面
+（带跟踪参数、锚点、末尾斜杠、相对路径等不同写法）和栏目外的页面、PDF、邮件地址；
+robots.txt 禁止 /solutions/private/，sitemap 列出一半页面。每个页面响应延迟 --latency-ms。
+用 SiteCrawler 只抓取保存（--crawl-only，不调用大模型），比较：
+- 1 个并发与 --workers 个并发的耗时
+- 服务端收到的页面请求数与不同页面数（有没有重复抓取）
+- 布隆过滤器与 Python set 保存全部URL的内存
+- 再次运行（进度已保存）时的请求数
+
+用法：
+    python benchmarks/bench_site_crawl.py [--pages 3000] [--workers 8]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# 本地站点不做按域名限速，只测抓取和去重本身
+os.environ['POLITE_ENABLED'] = 'false'
+
+from site_crawler import SiteCrawler, SiteScope, SiteState
+
+
+def page_links(n: int, pages: int, rng: random.Random):
+    links = []
+    for _ in range(12):
+        target = rng.randrange(pages)
+        links.append(rng.choice([
+            f'/solutions/p{target}',
+            f'/solutions/p{target}/',
+            f'/solutions/p{target}?utm_source=nav&utm_medium=web',
+            f'/solutions/p{target}#section-{rng.randrange(5)}',
+            f'p{target}',
+            f'https://127.0.0.1:443/solutions/p{target}',
+        ]))
+    links += ['/blog/news', '/about', '/solutions/brochure.pdf', 'mailto:sales@example.com',
+              f'/solutions/private/p{n}', '#top', 'javascript:void(0)']
+    # 保证所有页面都能从起始页到达
+    links += [f'/solutions/p{child}' for child in (2 * n + 1, 2 * n + 2) if child < pages]
+    return links
+
+
+def start_server(pages: int, latency: float):
+    rng = random.Random(0)
+    bodies = {}
+    for n in range(pages):
+        anchors = ''.join(f'<a href="{link}">链接</a>' for link in page_links(n, pages, rng))
+        paragraphs = ''.join(f'<p>第 {n} 页第 {i} 段产品介绍，方案特点与适用场景。</p>' for i in range(8))
+        bodies[f'/solutions/p{n}'] = (f'<html><head><title>p{n}</title></head><body><nav>{anchors}</nav>'
+                                      f'<h1>解决方案 {n}</h1>{paragraphs}</body></html>').encode()
+    bodies['/solutions'] = bodies['/solutions/p0']
+    robots = 'User-agent: *\nDisallow: /solutions/private/\nSitemap: /sitemap.xml\n'
+    sitemap = ('<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+               + ''.join(f'<url><loc>/solutions/p{n}</loc></url>' for n in range(0, pages, 2)) + '</urlset>')
+    requests = Counter()
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0].rstrip('/') or '/'
+            if path == '/robots.txt':
+                body, status = robots.replace('/sitemap.xml', f'http://{self.headers["Host"]}/sitemap.xml').encode(), 200
+            elif path == '/sitemap.xml':
+                body, status = sitemap.replace('<loc>', f'<loc>http://{self.headers["Host"]}').encode(), 200
+            else:
+                with lock:
+                    requests[path] += 1
+                time.sleep(latency)
+                body = bodies.get(path)
+                status = 200 if body else 404
+                body = body or b'not found'
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *a):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, requests
+
+
+def crawl(port: int, root: str, workers: int, pages: int):
+    scope = SiteScope(f'http://127.0.0.1:{port}/solutions/', max_depth=50, max_pages=pages * 2)
+    crawler = SiteCrawler(scope, root=root, workers=workers, convert=False)
+    try:
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+            stats = crawler.crawl()
+        return stats, crawler
+    finally:
+        crawler.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="栏目抓取基准")
+    parser.add_argument('--pages', type=int, default=3000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    args = parser.parse_args()
+
+    print(f"模拟站点：/solutions/ 下 {args.pages} 个页面，每页约 20 个链接，响应延迟 {args.latency_ms:g} ms\n")
+    print(f"{'方式':<14}{'总耗时(s)':>10}{'页面/分钟':>10}{'处理页面':>10}{'页面请求':>10}{'重复请求':>10}{'robots跳过':>12}")
+    workdir = tempfile.mkdtemp(prefix='bench_site_crawl_')
+    try:
+        for workers in (1, args.workers):
+            server, requests = start_server(args.pages, args.latency_ms / 1000)
+            port = server.server_address[1]
+            root = os.path.join(workdir, str(workers))
+            stats, crawler = crawl(port, root, workers, args.pages)
+            fetched = sum(requests.values())
+            duplicates = fetched - len(requests)
+            print(f"{f'{workers} 个并发':<14}{stats['seconds']:>10.1f}{stats['pages_per_minute']:>10.0f}"
+                  f"{stats['processed']:>10}{fetched:>10}{duplicates:>10}{stats['robots_blocked']:>12}")
+            if workers == args.workers:
+                # 再次运行：进度已保存，不再请求已处理的页面
+                requests.clear()
+                again, _ = crawl(port, root, workers, args.pages)
+                print(f"{'再次运行':<14}{again['seconds']:>10.1f}{'':>10}{again['processed']:>10}"
+                      f"{sum(requests.values()):>10}{'':>10}{'':>12}")
+                state = SiteState(root)
+                urls = set(state.urls(crawler.scope.section))
+                state.close()
+                set_bytes = sys.getsizeof(urls) + sum(sys.getsizeof(url) for url in urls)
+                print(f"\n{len(urls)} 个URL：布隆过滤器 {len(crawler.bloom.bits) / 1024:.0f} KB"
+                      f"（容量 {crawler.bloom.capacity} 个），Python set {set_bytes / 1024:.0f} KB")
+            server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
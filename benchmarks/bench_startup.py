@@ -0,0 +1,114 @@
+"""入口模块启动耗时基准
+
+对每个入口模块在新进程中执行 `python -X importtime -c "import 模块"`，
+统计导入总耗时和进程总耗时，并列出最慢的导入项。
+
+用法：
+    python benchmarks/bench_startup.py                 # 所有入口
+    python benchmarks/bench_startup.py xhs_converter   # 指定入口
+    python benchmarks/bench_startup.py --budget-ms 500 # 任一入口超出预算时退出码为 1
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = [
+    'weixin_crawler',
+    'xhs_converter',
+    'xhs_converte_page',
+    'xhs_publisher',
+    'xhs_api_publisher',
+    'cookie_health',
+    'text_card',
+    'gzh2xhs',
+    'article_store',
+    'dedup_index',
+    'watcher',
+    'worker',
+    'job_queue',
+    'profiler',
+    'politeness',
+    'site_crawler',
+]
+
+# 这些模块只应在对应阶段按需加载
+HEAVY_MODULES = ('selenium', 'PIL', 'bs4', 'requests', 'fake_useragent')
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def run_once(module: str) -> Tuple[float, Dict[str, int], Dict[str, int]]:
+    """运行一次，返回进程耗时（毫秒）、目标模块子树和直接依赖的累计导入耗时（微秒）"""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{proc.stderr[-2000:]}")
+
+    # importtime 按后序输出，缩进表示层级；从目标模块所在行往回找它的子树
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            entries.append((len(match.group(3)), match.group(4), int(match.group(2))))
+    subtree: Dict[str, int] = {}
+    direct: Dict[str, int] = {}
+    for pos in range(len(entries) - 1, -1, -1):
+        depth, name, us = entries[pos]
+        if name == module:
+            subtree[name] = us
+            for child_depth, child, child_us in reversed(entries[:pos]):
+                if child_depth <= depth:
+                    break
+                subtree[child] = child_us
+                if child_depth == depth + 2:
+                    direct[child] = child_us
+            break
+    return wall_ms, subtree, direct
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="入口模块启动耗时基准")
+    parser.add_argument('modules', nargs='*', default=ENTRY_POINTS)
+    parser.add_argument('--repeat', type=int, default=5, help="每个入口运行次数")
+    parser.add_argument('--top', type=int, default=5, help="列出最慢的导入项数量")
+    parser.add_argument('--budget-ms', type=float, default=0, help="进程总耗时预算，0 表示不检查")
+    args = parser.parse_args(argv)
+
+    # 空解释器的启动耗时作为参照
+    baseline = statistics.median(run_once('sys')[0] for _ in range(args.repeat))
+    print(f"空解释器启动：{baseline:.1f} ms\n")
+    print(f"{'入口':<22}{'进程(ms)':>10}{'导入(ms)':>10}  重依赖")
+
+    over_budget = []
+    for module in args.modules:
+        runs = [run_once(module) for _ in range(args.repeat)]
+        wall = statistics.median(r[0] for r in runs)
+        _, subtree, direct = runs[-1]
+        import_ms = subtree.get(module, 0) / 1000
+        heavy = [m for m in HEAVY_MODULES if m in subtree]
+        print(f"{module:<22}{wall:>10.1f}{import_ms:>10.1f}  {', '.join(heavy) or '-'}")
+        slowest = sorted(((v, k) for k, v in direct.items()), reverse=True)[:args.top]
+        for us, name in slowest:
+            print(f"{'':<24}{name:<28}{us / 1000:>8.1f} ms")
+        if args.budget_ms and wall > args.budget_ms:
+            over_budget.append(module)
+
+    if over_budget:
+        print(f"\n超出预算 {args.budget_ms:.0f} ms：{', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
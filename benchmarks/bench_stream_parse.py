@@ -0,0 +1,148 @@
+"""流式增量解析与整页下载后解析的对比基准
+
+在本地启动一个限速服务模拟慢速网络：文章页面按 --kbps 分块发送，图片每张固定延迟。
+对同一篇文章（benchmarks/fixtures 中的样本，图片地址改为本地服务）分别用：
+- bs4：下载完整页面 → BeautifulSoup 解析 → 逐张下载图片（原来的做法）
+- stream：边下载边解析，发现图片地址立即在线程池中开始下载
+
+比较首张图片开始下载的时间、抓取一篇文章（页面+全部图片）的总耗时和解析时的内存峰值。
+
+用法：
+    python benchmarks/bench_stream_parse.py [--fixture typical] [--kbps 512] [--image-latency-ms 50]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from PIL import Image
+
+from make_fixtures import FIXTURES, fixture_path
+from stream_parser import ImagePrefetcher
+from weixin_crawler import WeixinCrawler
+
+CHUNK = 4096
+
+
+def start_server(args):
+    """启动限速服务，返回 (端口, 状态)；页面内容放在 state['page']"""
+    buf = BytesIO()
+    Image.new('RGB', (64, 64), (200, 120, 80)).save(buf, 'JPEG')
+    image_bytes = buf.getvalue()
+    state = {'first_image': None, 'page': b''}
+    lock = threading.Lock()
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+
+        def handle_error(self, request, client_address):
+            # 流式解析读完内容容器后会提前断开连接
+            if not isinstance(sys.exc_info()[1], ConnectionError):
+                super().handle_error(request, client_address)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if self.path.startswith('/img/'):
+                with lock:
+                    if state['first_image'] is None:
+                        state['first_image'] = time.perf_counter()
+                time.sleep(args.image_latency_ms / 1000)
+                body, content_type = image_bytes, 'image/jpeg'
+            else:
+                body, content_type = state['page'], 'text/html; charset=utf-8'
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            try:
+                if content_type == 'image/jpeg':
+                    self.wfile.write(body)
+                    return
+                # 按带宽限速分块发送页面
+                delay = CHUNK / (args.kbps * 1024)
+                for i in range(0, len(body), CHUNK):
+                    self.wfile.write(body[i:i + CHUNK])
+                    self.wfile.flush()
+                    time.sleep(delay)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *a):
+            pass
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1], state
+
+
+def run(mode: str, crawler: WeixinCrawler, url: str, state, workdir: str):
+    """抓取一篇文章，返回 (首张图片开始下载时间, 解析完成时间, 总耗时, 解析内存峰值, 图片数)"""
+    state['first_image'] = None
+    tracemalloc.start()
+    started = time.perf_counter()
+    if mode == 'bs4':
+        prefetcher = None
+        _, _, _, images = crawler.parse_with_bs4(url)
+    else:
+        prefetcher = ImagePrefetcher(crawler.headers)
+        _, _, _, images = crawler.parse_streaming(url, prefetcher)
+    parsed = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    os.makedirs(os.path.join(workdir, 'images'), exist_ok=True)
+    saved = crawler.save_images(workdir, images, prefetcher)
+    total = time.perf_counter() - started
+    first = state['first_image'] - started if state['first_image'] else float('nan')
+    return first, parsed - started, total, peak, len(saved)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式增量解析基准")
+    parser.add_argument('--fixture', choices=FIXTURES, default='typical')
+    parser.add_argument('--kbps', type=float, default=512, help="页面下载带宽（KB/s）")
+    parser.add_argument('--image-latency-ms', type=float, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with open(fixture_path(args.fixture), 'rb') as f:
+        page = f.read()
+    port, state = start_server(args)
+    page = page.replace(b'https://mmbiz.qpic.cn/', f'http://127.0.0.1:{port}/img/'.encode())
+    state['page'] = page
+    page_url = f'http://127.0.0.1:{port}/s/{args.fixture}'
+
+    print(f"样本 {args.fixture}（{len(page) / 1024:.0f} KB），带宽 {args.kbps:.0f} KB/s，"
+          f"图片延迟 {args.image_latency_ms:.0f} ms\n")
+    print(f"{'方式':<10}{'首张图片(ms)':>14}{'解析完成(ms)':>14}{'总耗时(ms)':>12}{'解析内存峰值(KB)':>18}{'图片':>6}")
+
+    workdir = tempfile.mkdtemp(prefix='bench_stream_')
+    try:
+        crawler = WeixinCrawler(base_save_path=workdir)
+        for mode in ('bs4', 'stream'):
+            results = []
+            for _ in range(args.repeat):
+                with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+                    results.append(run(mode, crawler, page_url, state, workdir))
+            first, parsed, total, peak, count = min(results, key=lambda r: r[2])
+            print(f"{mode:<10}{first * 1000:>14.1f}{parsed * 1000:>14.1f}{total * 1000:>12.1f}"
+                  f"{peak / 1024:>18.0f}{count:>6}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
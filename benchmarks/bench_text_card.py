@@ -0,0 +1,180 @@
+"""文字卡片渲染基准：逐行绘制与字形缓存
+
+生成 --notes 篇小红书风格的笔记（中英文混排、带表情，每篇内容不同），每篇渲染成 --cards 张
+（封面 + 正文分页）1080x1440 的卡片并编码为 JPEG，比较：
+- 无缓存：每张卡片重新加载字体，量宽不缓存，逐行 ImageDraw.text（每次都由 FreeType 栅格化）
+- CardRenderer 第一篇：空缓存，包含加载字体和栅格化新出现的字
+- CardRenderer 后续文章：字体和字形已缓存，只拼接新的字形串
+- 同一篇再渲染一次：字形串全部命中缓存
+- 批量渲染：逐篇与 --workers 个进程的进程池
+表中的耗时都是一篇（--cards 张卡片）的平均值，批量一行另列总耗时。
+
+需要中文字体：默认使用 TEXT_CARD_FONT 或常见的系统字体，也可以用 --font 指定。
+
+用法：
+    python benchmarks/bench_text_card.py [--notes 20] [--cards 9] [--workers 4] [--font 字体文件] [--emoji-font 字体文件]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from text_card import (EMOJI_FONT_CANDIDATES, FONT_CANDIDATES, TEXT_CARD_EMOJI_FONT, TEXT_CARD_FONT,
+                       TEXT_CARD_QUALITY, CardRenderer, find_font, get_face, wrap_text)
+
+SENTENCES = [
+    '企业在数字化转型过程中，需要重新梳理客户服务流程，把分散在各个渠道的咨询统一起来。',
+    '我们先用 3 个月时间搭建了统一的工单系统，响应时间从 24 小时缩短到 2 小时以内🚀',
+    '很多团队一上来就买 CRM，结果数据口径不一致，报表谁也不信。',
+    '第一步：把常见问题整理成知识库，客服新人培训从两周缩短到三天✅',
+    '第二步：按客户价值分层，重点客户由专属顾问跟进，普通咨询交给智能助手。',
+    '别忽视一线同事的反馈（他们最清楚客户在哪里卡住），每周复盘一次就够了。',
+    '💡 小建议：指标不要贪多，先盯住首次响应时长和一次解决率这两个数。',
+    '用 Excel 也能起步，关键是字段统一、每天更新，等流程跑顺了再上系统。',
+    '最后，转型不是项目而是习惯，坚持半年以上才能看到明显变化✨',
+]
+
+
+def make_note(index: int, paragraphs: int = 24):
+    """第 index 篇笔记：句子顺序和编号不同，保证各篇的行内容不同"""
+    rng = random.Random(index)
+    lines = []
+    for i in range(paragraphs):
+        picked = rng.sample(SENTENCES, 3)
+        lines.append(f'{i + 1}. ' + ''.join(picked) + f'（第 {index} 篇）')
+    title = f'🔥干货｜企业客户服务数字化转型实践：从 0 到 1 的完整方法论 No.{index}'
+    return title, '\n'.join(lines), ['#干货分享', '#效率提升', '#职场成长', '#数字化转型']
+
+
+class _PlainFace:
+    """无缓存的量宽，用于按相同的版式分页"""
+
+    def __init__(self, font):
+        self.measure = font.getlength
+
+
+def naive_render(renderer: CardRenderer, title: str, body: str, tags, max_cards: int):
+    """同样的版式，不做任何缓存：每张卡片重新加载字体，逐行用 ImageDraw.text 绘制"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    style = renderer.style
+    width, height, margin = renderer.width, renderer.height, style.margin
+
+    def load():
+        return (ImageFont.truetype(renderer.title_font_path, style.title_size),
+                ImageFont.truetype(renderer.font_path, style.body_size),
+                ImageFont.truetype(renderer.font_path, style.small_size))
+
+    _, body_font, _ = load()
+    pages = renderer.paginate(body, _PlainFace(body_font))[:max_cards - 1]
+    total = len(pages) + 1
+    rule, top, _ = renderer._body_box()
+    encoded = []
+    for number in range(1, total + 1):
+        title_font, body_font, small_font = load()
+        card = Image.new('RGB', (width, height), style.background)
+        draw = ImageDraw.Draw(card)
+        if number == 1:
+            y = margin * 2 + 80
+            for line in wrap_text(title, title_font.getlength, width - 2 * margin)[:style.title_lines]:
+                draw.text((margin, y), line, font=title_font, fill=style.text)
+                y += style.title_size * style.title_spacing
+            draw.text((margin, height - margin - 120), ' '.join(tags), font=small_font, fill=style.accent)
+        else:
+            draw.text((margin, margin), title, font=small_font, fill=style.muted)
+            draw.line((margin, rule, width - margin, rule), fill=style.muted, width=2)
+            y = top
+            for i, (line, paragraph_start) in enumerate(pages[number - 2]):
+                if paragraph_start and i:
+                    y += style.body_size * style.line_spacing * style.paragraph_gap
+                draw.text((margin, y), line, font=body_font, fill=style.text)
+                y += style.body_size * style.line_spacing
+        draw.text((width - margin - 60, height - margin - 50), f'{number}/{total}', font=small_font, fill=style.muted)
+        buffer = BytesIO()
+        card.save(buffer, 'JPEG', quality=TEXT_CARD_QUALITY)
+        encoded.append(buffer.getvalue())
+    return encoded
+
+
+def timed(run):
+    started = time.perf_counter()
+    result = run()
+    return time.perf_counter() - started, result
+
+
+def face_stats(renderer: CardRenderer) -> dict:
+    totals = {'glyph_misses': 0, 'run_hits': 0, 'run_misses': 0}
+    for face in renderer.faces():
+        for key in totals:
+            totals[key] += face.stats()[key]
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文字卡片渲染基准")
+    parser.add_argument('--notes', type=int, default=20)
+    parser.add_argument('--cards', type=int, default=9, help="每篇的卡片数（封面 + 正文页）")
+    parser.add_argument('--workers', type=int, default=4, help="批量渲染的进程数")
+    parser.add_argument('--font', default='', help="中文字体文件")
+    parser.add_argument('--emoji-font', default=None, help="彩色表情字体文件，空字符串表示不用表情字体")
+    args = parser.parse_args()
+
+    font = args.font or find_font(TEXT_CARD_FONT, FONT_CANDIDATES)
+    if not font:
+        print("未找到中文字体，请用 --font 指定")
+        sys.exit(1)
+    emoji_font = args.emoji_font if args.emoji_font is not None else find_font(TEXT_CARD_EMOJI_FONT,
+                                                                                 EMOJI_FONT_CANDIDATES)
+    renderer = CardRenderer(font_path=font, title_font_path=font, emoji_font_path=emoji_font or '')
+    notes = [make_note(i) for i in range(args.notes)]
+    print(f"字体 {os.path.basename(font)}，表情字体 {os.path.basename(emoji_font) if emoji_font else '无'}；"
+          f"{args.notes} 篇笔记，每篇 {args.cards} 张 {renderer.width}x{renderer.height} 卡片（含 JPEG 编码），"
+          f"CPU {os.cpu_count()} 核\n")
+    print(f"{'方式':<28}{'每篇(ms)':>10}{'卡片数':>8}{'新栅格化字形':>14}{'字形串命中':>12}")
+
+    seconds = 0.0
+    for title, body, tags in notes:
+        elapsed, cards = timed(lambda: naive_render(renderer, title, body, tags, args.cards))
+        seconds += elapsed
+    print(f"{'无缓存（逐行 draw.text）':<28}{seconds * 1000 / len(notes):>10.1f}{len(cards):>8}{'-':>14}{'-':>12}")
+
+    get_face.cache_clear()
+    elapsed, cards = timed(lambda: renderer.render_jpeg(*notes[0], args.cards))
+    stats = face_stats(renderer)
+    print(f"{'CardRenderer 第一篇（空缓存）':<28}{elapsed * 1000:>10.1f}{len(cards):>8}"
+          f"{stats['glyph_misses']:>14}{stats['run_hits']:>12}")
+
+    before = face_stats(renderer)
+    seconds = 0.0
+    for note in notes[1:]:
+        elapsed, cards = timed(lambda: renderer.render_jpeg(*note, args.cards))
+        seconds += elapsed
+    stats = face_stats(renderer)
+    rest = max(1, len(notes) - 1)
+    print(f"{'CardRenderer 后续文章':<28}{seconds * 1000 / rest:>10.1f}{len(cards):>8}"
+          f"{(stats['glyph_misses'] - before['glyph_misses']) / rest:>14.1f}"
+          f"{(stats['run_hits'] - before['run_hits']) / rest:>12.1f}")
+
+    before = stats
+    elapsed, cards = timed(lambda: renderer.render_jpeg(*notes[-1], args.cards))
+    stats = face_stats(renderer)
+    print(f"{'同一篇再渲染一次':<28}{elapsed * 1000:>10.1f}{len(cards):>8}"
+          f"{stats['glyph_misses'] - before['glyph_misses']:>14}{stats['run_hits'] - before['run_hits']:>12}")
+
+    jobs = [(title, body, tags, args.cards) for title, body, tags in notes]
+    print()
+    for label, workers in (('批量逐篇', 1), (f'批量 {args.workers} 个进程', args.workers)):
+        get_face.cache_clear()
+        elapsed, results = timed(lambda: renderer.render_many(jobs, workers))
+        rendered = sum(len(cards) for cards in results)
+        print(f"{label:<28}{elapsed * 1000 / len(notes):>10.1f}{rendered:>8}  总耗时 {elapsed:.2f} s（含进程启动）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""多风格生成基准：逐个请求与一次生成多个风格
+
+在本地启动模拟的 /chat/completions 流式接口，按以下方式模拟耗时和计费：
+- 首 token 延迟 = 固定延迟 + 未命中前缀缓存的输入 × 每千 token 预填充耗时
+- 前缀缓存：请求预填充完成后，按 --cache-block 个 token 一块缓存输入前缀，之后前缀相同的请求命中缓存
+- 输出逐 token 返回，每个 token 固定耗时；n 参数的多个结果并行输出
+输入、输出 token 按字符数近似。
+
+对同一篇文章生成 --styles 个风格，比较：
+- 修改 get_prompt 后逐个调用（目前的做法：风格要求写在原文之前，每次重新发送并预填充整篇原文），及其并发版本
+- combined：所有风格在一个请求中生成
+- parallel：每个风格一个请求，共享原文前缀，第一个请求开始输出后再发出其余请求
+- n 参数：同一风格的多个版本，一次请求返回
+统计总耗时、请求数、输入 token、其中未命中缓存的输入 token 和输出 token。
+
+用法：
+    python benchmarks/bench_variants.py [--styles 3] [--article-chars 6000] [--prefill-ms 150] [--token-ms 4]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from xhs_schema import FIELDS
+
+BODY_CHARS = 420
+
+
+class MockLLM:
+    """模拟服务的状态：前缀缓存和计费统计"""
+
+    def __init__(self, args):
+        self.args = args
+        self.cache = set()
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.cache.clear()
+            self.requests = 0
+            self.input_tokens = 0
+            self.uncached_tokens = 0
+            self.output_tokens = 0
+
+    def cached_prefix(self, prompt: str) -> int:
+        block = self.args.cache_block
+        cached = 0
+        with self.lock:
+            for end in range(block, len(prompt) + 1, block):
+                if prompt[:end] not in self.cache:
+                    break
+                cached = end
+        return cached
+
+    def remember(self, prompt: str) -> None:
+        block = self.args.cache_block
+        with self.lock:
+            for end in range(block, len(prompt) + 1, block):
+                self.cache.add(prompt[:end])
+
+
+def fake_note(key: str, index: int) -> dict:
+    titles = [f'{key} 版本{index} 标题{i}✨' for i in range(1, 6)]
+    body = (f'{key} 风格的正文第 {index} 版。' + '这是一段小红书风格的正文内容，' * 40)[:BODY_CHARS]
+    return {'titles': titles, 'body': body, 'tags': ['#干货分享', '#效率提升', '#职场']}
+
+
+def start_server(llm: MockLLM):
+    args = llm.args
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.0'
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            prompt = ''.join(message['content'] for message in request['messages'])
+            cached = llm.cached_prefix(prompt)
+            n = request.get('n', 1)
+            schema = (request.get('response_format') or {}).get('json_schema', {}).get('schema', {})
+            keys = list(schema.get('properties', {}))
+            outputs = []
+            for index in range(n):
+                if keys == list(FIELDS):
+                    output = fake_note('single', index + 1)
+                else:
+                    output = {key: fake_note(key, index + 1) for key in keys}
+                outputs.append(json.dumps(output, ensure_ascii=False))
+            with llm.lock:
+                llm.requests += 1
+                llm.input_tokens += len(prompt)
+                llm.uncached_tokens += len(prompt) - cached
+                llm.output_tokens += sum(len(output) for output in outputs)
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            try:
+                time.sleep((args.base_ms + (len(prompt) - cached) / 1000 * args.prefill_ms) / 1000)
+                llm.remember(prompt)
+                # 一个 token 约 2 个字符，n 个结果并行输出
+                step = 2
+                for start in range(0, max(len(output) for output in outputs), step):
+                    choices = [{'index': i, 'delta': {'content': output[start:start + step]}}
+                               for i, output in enumerate(outputs) if start < len(output)]
+                    self.wfile.write(f"data: {json.dumps({'choices': choices}, ensure_ascii=False)}\n\n".encode())
+                    time.sleep(args.token_ms / 1000)
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *a):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def make_article(chars: int) -> str:
+    paragraph = '企业在数字化转型过程中，需要重新梳理客户服务流程，把分散在各个渠道的咨询统一起来。'
+    return (paragraph * (chars // len(paragraph) + 1))[:chars]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多风格生成基准")
+    parser.add_argument('--styles', type=int, default=3, help="生成的风格数（不超过内置风格数）")
+    parser.add_argument('--article-chars', type=int, default=6000)
+    parser.add_argument('--base-ms', type=float, default=200, help="每个请求的固定延迟")
+    parser.add_argument('--prefill-ms', type=float, default=150, help="每千个未命中缓存的输入 token 的预填充耗时")
+    parser.add_argument('--token-ms', type=float, default=4, help="每个输出 token 的耗时")
+    parser.add_argument('--cache-block', type=int, default=128, help="前缀缓存的块大小（token）")
+    args = parser.parse_args()
+
+    llm = MockLLM(args)
+    server, address = start_server(llm)
+    workdir = tempfile.mkdtemp(prefix='bench_variants_')
+    providers_path = os.path.join(workdir, 'providers.json')
+    with open(providers_path, 'w', encoding='utf-8') as f:
+        json.dump([{'name': 'mock', 'base_url': address, 'api_key': 'bench', 'model': 'mock',
+                    'response_format': 'json_schema', 'timeout': 120},
+                   {'name': 'mock-n', 'base_url': address, 'api_key': 'bench', 'model': 'mock-n',
+                    'response_format': 'json_schema', 'timeout': 120, 'supports_n': True}], f)
+    os.environ['LLM_PROVIDERS_PATH'] = providers_path
+    os.environ['ARTIFACT_FSYNC'] = 'off'
+
+    from xhs_converter import STYLES, XHSConverter, resolve_styles
+
+    names = list(STYLES)[:args.styles]
+    styles = resolve_styles(names)
+    title, article = '企业客户服务数字化转型实践', make_article(args.article_chars)
+
+    class EditedPromptConverter(XHSConverter):
+        """目前的做法：把 get_prompt 里的风格要求换掉再调用一次"""
+
+        def styled_prompt(self, instruction: str) -> str:
+            return self.get_prompt(title, article).replace('采用轻松活泼的写作风格', f'写作风格：{instruction}')
+
+    def old_sequential(converter):
+        return [converter.generate_note(converter.styled_prompt(instruction)) for instruction in styles.values()]
+
+    def old_parallel(converter):
+        with ThreadPoolExecutor(max_workers=len(styles)) as pool:
+            return list(pool.map(lambda instruction: converter.generate_note(converter.styled_prompt(instruction)),
+                                 styles.values()))
+
+    converter = EditedPromptConverter(provider='mock', styles=[])
+    rows = [
+        ('逐个请求（旧提示词）', lambda: old_sequential(converter)),
+        (f'{len(styles)} 个并发请求（旧提示词）', lambda: old_parallel(converter)),
+        ('combined（一个请求）', lambda: XHSConverter(provider='mock', variant_strategy='combined')
+         .generate_variants(title, article, styles)),
+        ('parallel（共享前缀）', lambda: XHSConverter(provider='mock', variant_strategy='parallel')
+         .generate_variants(title, article, styles)),
+        (f'n 参数（同一风格 {len(styles)} 版）', lambda: XHSConverter(provider='mock-n')
+         .generate_variants(title, article, resolve_styles([names[0]] * len(styles)))),
+    ]
+    print(f"原文 {len(article)} 字，生成 {len(styles)} 个版本；首 token {args.base_ms:g} ms + "
+          f"{args.prefill_ms:g} ms/千 token（未命中缓存），输出 {args.token_ms:g} ms/token\n")
+    print(f"{'方式':<26}{'耗时(s)':>9}{'请求数':>7}{'输入token':>11}{'未命中缓存':>11}{'输出token':>11}{'成功版本':>9}")
+    try:
+        for label, run in rows:
+            # 每种方式从空缓存开始（只比较同一篇文章内的复用）
+            llm.reset()
+            started = time.perf_counter()
+            with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+                result = run()
+            seconds = time.perf_counter() - started
+            produced = len([note for note in result if note]) if isinstance(result, list) else len(result)
+            print(f"{label:<26}{seconds:>9.2f}{llm.requests:>7}{llm.input_tokens:>11}{llm.uncached_tokens:>11}"
+                  f"{llm.output_tokens:>11}{produced:>9}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
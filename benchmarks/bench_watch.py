@@ -0,0 +1,180 @@
+"""监控模式轮询开销基准
+
+在本地启动一个模拟站点，提供 --sources 个来源（RSS、Atom、sitemap 索引 + 子 sitemap、文章列表页，
+每个来源 --links 篇文章），一半来源支持 ETag / Last-Modified，另一半不支持（只能比较内容哈希）。
+抓取和转换流程替换为只计数的函数，只测轮询本身：
+- 第 1 轮：新来源，建立已见集合
+- 第 2 轮：没有任何变化
+- 第 3 轮：部分来源各发布 1 篇新文章
+- 关闭条件请求（每轮都完整下载并解析）作为对比
+
+用法：
+    python benchmarks/bench_watch.py [--sources 60] [--links 200]
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import watcher
+from watcher import Source, Watcher
+from xhs_converter import RESULT_CONVERTED
+
+KINDS = ('rss', 'atom', 'sitemap', 'index')
+
+
+def render(kind: str, base: str, source_id: int, links: list) -> bytes:
+    """按来源类型生成内容"""
+    urls = [f'{base}/post/{source_id}/{n}?utm_source=feed' for n in links]
+    if kind == 'rss':
+        items = ''.join(f'<item><title>第{n}篇</title><link>{u}</link></item>' for n, u in zip(links, urls))
+        body = f'<?xml version="1.0"?><rss version="2.0"><channel><title>s</title>{items}</channel></rss>'
+    elif kind == 'atom':
+        entries = ''.join(f'<entry><title>第{n}篇</title><link href="{u}"/></entry>' for n, u in zip(links, urls))
+        body = f'<?xml version="1.0"?><feed xmlns="http://www.w3.org/2005/Atom">{entries}</feed>'
+    elif kind == 'sitemap':
+        locs = ''.join(f'<url><loc>{u}</loc></url>' for u in urls)
+        body = f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</urlset>'
+    else:
+        anchors = ''.join(f'<li><a href="/post/{source_id}/{n}">第{n}篇</a></li>' for n in links)
+        body = f'<html><body><nav><a href="/">首页</a></nav><ul>{anchors}</ul></body></html>'
+    return body.encode('utf-8')
+
+
+def start_server(args):
+    """返回 (端口, 状态)；state['links'][来源编号] 是该来源当前的文章编号列表"""
+    state = {'links': {i: list(range(args.links, 0, -1)) for i in range(args.sources)}, 'bytes': 0, 'requests': 0}
+    lock = threading.Lock()
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            base = f'http://127.0.0.1:{self.server.server_address[1]}'
+            parts = self.path.strip('/').split('/')
+            if parts[0] == 'index':  # sitemap 索引，指向一个子 sitemap
+                source_id = int(parts[1])
+                body = (f'<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                        f'<sitemap><loc>{base}/source/{source_id}</loc></sitemap></sitemapindex>').encode()
+            else:
+                source_id = int(parts[1])
+                body = render(KINDS[source_id % len(KINDS)], base, source_id, state['links'][source_id])
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            # 偶数编号的来源支持条件请求
+            conditional = source_id % 2 == 0
+            with lock:
+                state['requests'] += 1
+            if conditional and self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8' if KINDS[source_id % len(KINDS)] == 'index'
+                             else 'application/xml')
+            if conditional:
+                self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            with lock:
+                state['bytes'] += len(body)
+
+        def log_message(self, *a):
+            pass
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1], state
+
+
+def make_sources(port: int, count: int):
+    sources = []
+    for i in range(count):
+        kind = KINDS[i % len(KINDS)]
+        url = f'http://127.0.0.1:{port}/index/{i}' if kind == 'sitemap' else f'http://127.0.0.1:{port}/source/{i}'
+        sources.append(Source(f'来源{i}', url, crawler='page',
+                              pattern=r'/post/' if kind == 'index' else ''))
+    return sources
+
+
+def run_cycle(w: Watcher, state) -> dict:
+    for source in w.sources:
+        source.next_poll = 0
+    state['bytes'] = state['requests'] = 0
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+        stats = w.run_once()
+    stats['served_kb'] = round(state['bytes'] / 1024, 1)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="监控模式轮询开销基准")
+    parser.add_argument('--sources', type=int, default=60)
+    parser.add_argument('--links', type=int, default=200)
+    parser.add_argument('--publish-every', type=int, default=5, help="第 3 轮每隔几个来源发布 1 篇新文章")
+    args = parser.parse_args()
+
+    port, state = start_server(args)
+    processed = []
+
+    def handler(url):
+        processed.append(url)
+        return RESULT_CONVERTED
+
+    print(f"{args.sources} 个来源，每个 {args.links} 篇文章，一半支持条件请求\n")
+    print(f"{'轮次':<16}{'请求':>6}{'传输(KB)':>10}{'304':>6}{'未变化':>8}{'新文章':>8}{'处理':>6}{'耗时(ms)':>10}")
+
+    def show(label, stats):
+        print(f"{label:<16}{stats['requests']:>6}{stats['served_kb']:>10.1f}{stats['not_modified']:>6}"
+              f"{stats['unchanged']:>8}{stats['new']:>8}{len(processed):>6}{stats['seconds'] * 1000:>10.1f}")
+
+    workdir = tempfile.mkdtemp(prefix='bench_watch_')
+    try:
+        w = Watcher(make_sources(port, args.sources), root=workdir, handlers={'page': handler, 'weixin': handler})
+        show('1 新来源', run_cycle(w, state))
+        show('2 无变化', run_cycle(w, state))
+        for source_id in range(0, args.sources, args.publish_every):
+            state['links'][source_id].insert(0, args.links + 1)
+        processed.clear()
+        show('3 部分有新文章', run_cycle(w, state))
+        processed.clear()
+        show('4 无变化', run_cycle(w, state))
+        w.close()
+
+        # 对比：不使用条件请求和内容哈希，每轮完整下载并解析
+        original_fetch = Watcher._fetch
+
+        def unconditional(self, url):
+            response = watcher.get_client().get(url, headers=self.headers)
+            return 'changed', response.content, None
+
+        Watcher._fetch = unconditional
+        try:
+            w = Watcher(make_sources(port, args.sources), root=tempfile.mkdtemp(dir=workdir),
+                        handlers={'page': handler, 'weixin': handler})
+            run_cycle(w, state)
+            processed.clear()
+            show('无条件请求', run_cycle(w, state))
+            w.close()
+        finally:
+            Watcher._fetch = original_fetch
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""分布式工作模式基准：任务队列吞吐和按阶段扩展
+
+1. 队列吞吐：预先入队 --jobs 个空任务，用 1/2/4 个进程领取并完成，分别测 SQLite 队列
+   和网络队列（本地队列服务），得到每秒完成的任务数（即队列本身的开销上限）
+2. 按阶段扩展：--articles 篇文章，每篇 crawl（等待 --crawl-ms 模拟下载）→ image（PIL 滤镜，占用 CPU）
+   + convert（等待 --convert-ms 模拟大模型调用）。处理函数替换为模拟实现，只测调度：
+   - 单进程顺序执行（原来 main() 的做法）
+   - 工作模式：image 阶段按 CPU 核数开进程，crawl / convert 阶段在一个进程内多线程并发
+
+用法：
+    python benchmarks/bench_workers.py [--jobs 2000] [--articles 24]
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from job_queue import HttpQueue, SQLiteQueue, make_server
+from worker import Worker
+
+
+def open_queue(spec: str):
+    """spec 为 SQLite 文件路径或队列服务地址"""
+    return HttpQueue(spec) if spec.startswith('http') else SQLiteQueue(spec)
+
+
+# ---- 模拟的处理函数（子进程中按阶段调用） ----
+
+_queue = None
+_options = {}
+
+
+def crawl(job):
+    time.sleep(_options['crawl_ms'] / 1000)
+    url = job.payload['url']
+    _queue.enqueue('image', {'url': url}, dedupe_key=f'image:{url}')
+    _queue.enqueue('convert', {'url': url}, dedupe_key=f'convert:{url}')
+    return None
+
+
+def image(job):
+    from PIL import Image, ImageFilter
+
+    img = Image.effect_noise((1080, 1440), 40).convert('RGB')
+    for _ in range(_options['image_rounds']):
+        img = img.filter(ImageFilter.GaussianBlur(2))
+    return None
+
+
+def convert(job):
+    time.sleep(_options['convert_ms'] / 1000)
+    return None
+
+
+def noop(job):
+    return None
+
+
+HANDLERS = {'crawl': crawl, 'image': image, 'convert': convert}
+
+
+def run_stage_worker(spec: str, stages, concurrency: int, options: dict, handlers: str = 'pipeline') -> None:
+    global _queue
+    _queue = open_queue(spec)
+    _options.update(options)
+    chosen = {stage: noop for stage in stages} if handlers == 'noop' else HANDLERS
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+        Worker(_queue, stages, concurrency, visibility=60, handlers=chosen, poll_interval=0.02).run(drain=True)
+
+
+def start_processes(targets):
+    ctx = multiprocessing.get_context('spawn')
+    processes = [ctx.Process(target=run_stage_worker, args=args) for args in targets]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+# ---- 1. 队列吞吐 ----
+
+def bench_throughput(args, workdir):
+    print(f"队列吞吐：{args.jobs} 个空任务\n")
+    print(f"{'队列':<10}{'进程':>6}{'入队(任务/秒)':>16}{'领取+完成(任务/秒)':>22}")
+    for backend in ('sqlite', 'http'):
+        for processes in (1, 2, 4):
+            path = os.path.join(workdir, f'throughput_{backend}_{processes}.db')
+            queue = SQLiteQueue(path)
+            server = None
+            spec = path
+            if backend == 'http':
+                server = make_server(queue, '127.0.0.1', 0, token='')
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                spec = f'http://127.0.0.1:{server.server_address[1]}'
+            client = open_queue(spec)
+            started = time.perf_counter()
+            for i in range(args.jobs):
+                client.enqueue('crawl', {'n': i})
+            enqueued = time.perf_counter() - started
+            started = time.perf_counter()
+            start_processes([(spec, ['crawl'], 1, {}, 'noop')] * processes)
+            drained = time.perf_counter() - started
+            assert queue.stats()['crawl'].get('done') == args.jobs
+            print(f"{backend:<10}{processes:>6}{args.jobs / enqueued:>16.0f}{args.jobs / drained:>22.0f}")
+            if server:
+                server.shutdown()
+            queue.close()
+    print()
+
+
+# ---- 2. 按阶段扩展 ----
+
+def bench_pipeline(args, workdir):
+    options = {'crawl_ms': args.crawl_ms, 'convert_ms': args.convert_ms, 'image_rounds': args.image_rounds}
+    _options.update(options)
+    cores = os.cpu_count() or 1
+    print(f"按阶段扩展：{args.articles} 篇文章，抓取 {args.crawl_ms} ms、转换 {args.convert_ms} ms、"
+          f"图片处理占用 CPU，{cores} 个核心\n")
+    print(f"{'方式':<36}{'总耗时(s)':>10}{'文章/分钟':>10}")
+
+    # 单进程顺序执行：抓取 → 图片 → 转换
+    class Job:
+        payload = {}
+
+    started = time.perf_counter()
+    for _ in range(args.articles):
+        time.sleep(args.crawl_ms / 1000)
+        image(Job)
+        convert(Job)
+    elapsed = time.perf_counter() - started
+    print(f"{'单进程顺序执行':<36}{elapsed:>10.2f}{args.articles / elapsed * 60:>10.1f}")
+
+    layouts = [
+        ('1 进程 × 全部阶段，4 线程', [(['crawl', 'image', 'convert'], 4)]),
+        (f'crawl+convert 8 线程 / image {cores} 进程',
+         [(['crawl', 'convert'], 8)] + [(['image'], 1)] * cores),
+    ]
+    for label, layout in layouts:
+        path = os.path.join(workdir, f'pipeline_{len(layout)}.db')
+        queue = SQLiteQueue(path)
+        for i in range(args.articles):
+            queue.enqueue('crawl', {'url': f'https://example.com/{i}'}, dedupe_key=f'crawl:{i}')
+        started = time.perf_counter()
+        start_processes([(path, stages, concurrency, options) for stages, concurrency in layout])
+        elapsed = time.perf_counter() - started
+        stats = queue.stats()
+        assert all(stats[stage].get('done') == args.articles for stage in ('crawl', 'image', 'convert')), stats
+        print(f"{label:<36}{elapsed:>10.2f}{args.articles / elapsed * 60:>10.1f}")
+        queue.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分布式工作模式基准")
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--articles', type=int, default=24)
+    parser.add_argument('--crawl-ms', type=int, default=100)
+    parser.add_argument('--convert-ms', type=int, default=1500)
+    parser.add_argument('--image-rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_workers_')
+    try:
+        bench_throughput(args, workdir)
+        bench_pipeline(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
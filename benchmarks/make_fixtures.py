@@ -0,0 +1,121 @@
+"""生成基准测试用的文章HTML样本
+
+样本按固定随机种子生成，保证每次运行的输入完全一致：
+- small.html         短文，几段文字、两张图片
+- typical.html       常见长度的公众号文章，带脚本和样式
+- large_nested.html  超长文章，段落嵌套很深，图片很多（运行时生成，不入库）
+"""
+import os
+import random
+import sys
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+WORDS = [
+    "推荐", "分享", "喜欢", "建议", "提醒", "注意", "重要", "游戏", "直播", "玩家",
+    "成本", "营销", "人工智能", "数据", "增长", "用户", "体验", "产品", "团队", "客户",
+    "今天", "我们", "这个", "方案", "效果", "提升", "行业", "企业", "服务", "平台",
+    "内容", "运营", "创新", "技术", "模型", "智能", "场景", "落地", "价值", "未来",
+]
+
+SCRIPT_BLOCK = """<script type="text/javascript">
+var biz = "MzA3NjUzNjQ1Mw==";var sn = "abcdef0123456789";var mid = "2650000000";
+window.__second_open__ = !!window.__second_open__;
+(function(){for(var i=0;i<200;i++){window['_v'+i]=i*{seed};}})();
+</script>"""
+
+STYLE_BLOCK = """<style>
+.rich_media_content{overflow:hidden;color:#333;font-size:17px;line-height:1.6}
+.rich_media_title{font-size:22px;line-height:1.4;margin-bottom:14px}
+</style>"""
+
+
+def make_sentence(rng: random.Random) -> str:
+    """随机拼一句中文"""
+    n = rng.randint(6, 18)
+    return "".join(rng.choice(WORDS) for _ in range(n)) + rng.choice(["。", "！", "？", "，真的很棒。"])
+
+
+def make_paragraph(rng: random.Random, depth: int) -> str:
+    """生成一个段落，depth 控制 section/span 的嵌套层数"""
+    text = "".join(make_sentence(rng) for _ in range(rng.randint(1, 4)))
+    inner = f'<span style="font-size:15px">{text}</span>'
+    for _ in range(depth):
+        inner = f'<section style="margin:0">{inner}</section>'
+    return f"<p>{inner}</p>"
+
+
+def make_image(rng: random.Random, index: int) -> str:
+    """生成一个公众号风格的懒加载图片标签"""
+    w = rng.choice([640, 1080, 1280])
+    h = rng.choice([360, 720, 1440])
+    return (f'<p><img class="rich_pages wxw-img" data-ratio="{h / w:.4f}" data-w="{w}" '
+            f'data-src="https://mmbiz.qpic.cn/mmbiz_jpg/bench{index:04d}/640?wx_fmt=jpeg" '
+            f'src="https://mmbiz.qpic.cn/mmbiz_jpg/bench{index:04d}/640?wx_fmt=jpeg"></p>')
+
+
+def make_article(seed: int, paragraphs: int, images: int, depth: int, scripts: int) -> str:
+    """生成一篇完整的公众号文章页面"""
+    rng = random.Random(seed)
+    title = "".join(rng.choice(WORDS) for _ in range(6))
+    body = []
+    image_every = max(1, paragraphs // max(1, images))
+    image_index = 0
+    for i in range(paragraphs):
+        body.append(make_paragraph(rng, rng.randint(0, depth)))
+        if image_index < images and i % image_every == 0:
+            image_index += 1
+            body.append(make_image(rng, image_index))
+    head_scripts = "\n".join(SCRIPT_BLOCK.replace("{seed}", str(i)) for i in range(scripts))
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+{STYLE_BLOCK}
+{head_scripts}
+</head>
+<body id="activity-detail" class="zh_CN">
+<div id="js_article" class="rich_media">
+<div class="rich_media_inner">
+<h1 class="rich_media_title" id="activity-name">
+{title}
+</h1>
+<div class="rich_media_meta_list"><span class="rich_media_meta rich_media_meta_nickname" id="profileBt"><a id="js_name">网易智企</a></span></div>
+<div class="rich_media_content" id="js_content">
+{chr(10).join(body)}
+</div>
+</div>
+</div>
+{head_scripts}
+</body>
+</html>
+"""
+
+
+FIXTURES = {
+    'small': dict(seed=1, paragraphs=8, images=2, depth=1, scripts=1),
+    'typical': dict(seed=2, paragraphs=60, images=12, depth=3, scripts=6),
+    'large_nested': dict(seed=3, paragraphs=3000, images=80, depth=40, scripts=40),
+}
+
+
+def fixture_path(name: str) -> str:
+    """返回样本文件路径，不存在时按固定种子生成"""
+    path = os.path.join(FIXTURE_DIR, f'{name}.html')
+    if not os.path.exists(path):
+        os.makedirs(FIXTURE_DIR, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(make_article(**FIXTURES[name]))
+    return path
+
+
+def main():
+    names = sys.argv[1:] or list(FIXTURES)
+    for name in names:
+        path = fixture_path(name)
+        print(f"{name}: {path} ({os.path.getsize(path) // 1024} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""小红书创作者平台发布接口的本地模拟服务
+
+实现 ApiPublisher 和 CookieHealthChecker 用到的接口：
+- GET  /api/sns/web/v2/user/me           当前登录用户（未登录时 guest 为 true）
+- GET  /api/media/v1/upload/web/permit   申请上传凭证（检查登录 Cookie）
+- PUT  /<文件ID>                          上传图片（检查 X-Cos-Security-Token）
+- POST /web_api/sns/v2/note               创建笔记（检查登录 Cookie、图片是否都已上传）
+可以模拟上传耗时、要求请求签名，并记录收到的笔记和同时上传的最大数量。
+
+单独运行：
+    python benchmarks/mock_xhs_api.py --port 8900
+然后设置 XHS_CREATOR_API / XHS_EDITH_API 为 http://127.0.0.1:8900，用 web_session=mock-session 的 Cookie 文件发布；
+XHS_ME_URL=http://127.0.0.1:8900/api/sns/web/v2/user/me 时用同一个服务检查登录状态。
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SESSION = 'mock-session'
+ME_PATH = '/api/sns/web/v2/user/me'
+
+
+class MockState:
+    """服务端状态：有效的登录态、已签发的上传凭证、已上传的文件、创建的笔记"""
+
+    def __init__(self, session: str = SESSION, upload_latency: float = 0.0, upload_kbps: float = 0,
+                 require_sign: bool = False, me_latency: float = 0.0):
+        self.session = session
+        # 多账号时其他有效的登录态
+        self.sessions = {session}
+        self.me_latency = me_latency
+        self.me_requests = 0
+        self.upload_latency = upload_latency
+        self.upload_kbps = upload_kbps
+        self.require_sign = require_sign
+        self.tokens = {}
+        self.uploaded = {}
+        self.notes = []
+        self.requests = 0
+        self.uploading = 0
+        self.max_uploading = 0
+        self.lock = threading.Lock()
+
+
+def start_mock_server(state: MockState, port: int = 0):
+    """在后台线程启动模拟服务，返回 (server, 地址)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status: int, body: dict) -> None:
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _session(self) -> str:
+            cookies = dict(part.strip().split('=', 1) for part in self.headers.get('Cookie', '').split(';')
+                           if '=' in part)
+            return cookies.get('web_session', '')
+
+        def _authorized(self) -> bool:
+            if self._session() not in state.sessions:
+                self._send(200, {'success': False, 'code': -100, 'msg': '登录已过期'})
+                return False
+            if state.require_sign and not (self.headers.get('x-s') and self.headers.get('x-t')):
+                self._send(461, {'success': False, 'code': 461, 'msg': '签名无效'})
+                return False
+            return True
+
+        def _read_body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+        def do_GET(self):
+            with state.lock:
+                state.requests += 1
+            url = urlsplit(self.path)
+            if url.path == ME_PATH:
+                return self._me()
+            if url.path != '/api/media/v1/upload/web/permit':
+                return self._send(404, {'success': False, 'msg': 'not found'})
+            if not self._authorized():
+                return
+            count = int(parse_qs(url.query).get('file_count', ['1'])[0])
+            token = uuid.uuid4().hex
+            file_ids = [f'spectrum/{uuid.uuid4().hex}' for _ in range(count)]
+            with state.lock:
+                for file_id in file_ids:
+                    state.tokens[file_id] = token
+            self._send(200, {'success': True, 'code': 0, 'data': {'uploadTempPermits': [{
+                'fileIds': file_ids, 'token': token, 'uploadAddr': f'http://{self.headers["Host"]}',
+                'expireTime': int(time.time() * 1000) + 600000,
+            }]}})
+
+        def _me(self) -> None:
+            with state.lock:
+                state.me_requests += 1
+            time.sleep(state.me_latency)
+            session = self._session()
+            if session not in state.sessions:
+                return self._send(200, {'success': True, 'code': 0, 'data': {'guest': True}})
+            user_id = hashlib.md5(session.encode('utf-8')).hexdigest()[:24]
+            self._send(200, {'success': True, 'code': 0, 'data': {
+                'guest': False, 'user_id': user_id, 'nickname': f'用户{user_id[:6]}'}})
+
+        def do_PUT(self):
+            body = self._read_body()
+            file_id = urlsplit(self.path).path.lstrip('/')
+            with state.lock:
+                state.requests += 1
+                expected = state.tokens.get(file_id)
+                state.uploading += 1
+                state.max_uploading = max(state.max_uploading, state.uploading)
+            try:
+                if not expected or self.headers.get('X-Cos-Security-Token') != expected:
+                    return self._send(403, {'msg': 'invalid token'})
+                # 模拟上传耗时：固定延迟加按带宽计算的传输时间
+                delay = state.upload_latency + (len(body) / 1024 / state.upload_kbps if state.upload_kbps else 0)
+                time.sleep(delay)
+                with state.lock:
+                    state.uploaded[file_id] = len(body)
+                self.send_response(200)
+                self.send_header('ETag', f'"{uuid.uuid4().hex}"')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            finally:
+                with state.lock:
+                    state.uploading -= 1
+
+        def do_POST(self):
+            body = self._read_body()
+            with state.lock:
+                state.requests += 1
+            if urlsplit(self.path).path != '/web_api/sns/v2/note':
+                return self._send(404, {'success': False, 'msg': 'not found'})
+            if not self._authorized():
+                return
+            note = json.loads(body)
+            images = note['image_info']['images']
+            with state.lock:
+                missing = [image['file_id'] for image in images if image['file_id'] not in state.uploaded]
+            if missing or not note['common']['title']:
+                return self._send(200, {'success': False, 'code': -1, 'msg': f'图片未上传: {missing}'})
+            note_id = uuid.uuid4().hex[:24]
+            with state.lock:
+                state.notes.append({'id': note_id, 'title': note['common']['title'],
+                                    'desc': note['common']['desc'], 'images': [image['file_id'] for image in images]})
+            self._send(200, {'success': True, 'code': 0, 'data': {'id': note_id}})
+
+        def log_message(self, *a):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="小红书发布接口模拟服务")
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--upload-latency-ms', type=float, default=0)
+    parser.add_argument('--require-sign', action='store_true', help="要求 x-s / x-t 签名头")
+    args = parser.parse_args()
+
+    state = MockState(upload_latency=args.upload_latency_ms / 1000, require_sign=args.require_sign)
+    server, address = start_mock_server(state, args.port)
+    print(f"模拟服务已启动：{address}")
+    print(f"XHS_CREATOR_API={address} XHS_EDITH_API={address}，Cookie 文件中 web_session={state.session}")
+    try:
+        while True:
+            time.sleep(5)
+            if state.notes:
+                print(f"已创建 {len(state.notes)} 篇笔记，上传 {len(state.uploaded)} 张图片")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import os
+import sys
+import json
+import glob
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from http_client import get_client
+
+# 加载环境变量
+load_dotenv()
+
+# 用一次带 Cookie 的请求确认登录状态：返回当前用户，未登录时 guest 为 true
+XHS_ME_URL = os.getenv('XHS_ME_URL', 'https://edith.xiaohongshu.com/api/sns/web/v2/user/me')
+# 检查结果的缓存时间（秒）和缓存文件，多个进程共享
+COOKIE_HEALTH_TTL = float(os.getenv('COOKIE_HEALTH_TTL', '300'))
+COOKIE_HEALTH_CACHE = os.getenv('COOKIE_HEALTH_CACHE', '.cookie_health.json')
+# 并发检查的账号数
+COOKIE_CHECK_WORKERS = int(os.getenv('COOKIE_CHECK_WORKERS', '8'))
+
+# 登录态所在的 Cookie
+SESSION_COOKIE = 'web_session'
+# 检查结果：有效、已过期（按 Cookie 有效期判断）、已失效（服务端确认未登录）、无法确认（网络错误等）
+STATUS_VALID = 'valid'
+STATUS_EXPIRED = 'expired'
+STATUS_INVALID = 'invalid'
+STATUS_UNKNOWN = 'unknown'
+# 表示未登录的返回码
+AUTH_CODES = frozenset((-100, -101, -104))
+# 有效期不足这么多秒时提醒尽快重新登录
+EXPIRY_WARNING = 24 * 3600
+
+
+@dataclass
+class CookieHealth:
+    account: str
+    status: str
+    reason: str = ''
+    checked_at: float = 0.0
+    # 登录 Cookie 的过期时间（时间戳），浏览器会话 Cookie 或 Cookie 字符串没有有效期时为 None
+    expires_at: Optional[float] = None
+    user_id: str = ''
+    nickname: str = ''
+    cached: bool = False
+
+    @property
+    def valid(self) -> bool:
+        return self.status == STATUS_VALID
+
+    @property
+    def needs_login(self) -> bool:
+        """需要人工重新登录（网络错误等无法确认时不算）"""
+        return self.status in (STATUS_EXPIRED, STATUS_INVALID)
+
+
+def load_cookie_file(path: str) -> List[dict]:
+    """读取浏览器保存的 Cookie 文件（Selenium 的 get_cookies 格式）"""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def parse_cookie_header(header: str) -> List[dict]:
+    """把 "a=1; b=2" 形式的 Cookie 字符串转成与 Cookie 文件相同的格式（没有有效期）"""
+    cookies = []
+    for part in header.split(';'):
+        name, sep, value = part.strip().partition('=')
+        if sep and name:
+            cookies.append({'name': name, 'value': value})
+    return cookies
+
+
+def cookie_header(cookies: List[dict]) -> str:
+    """Cookie 请求头，同名的 Cookie（不同域名下）只保留最后一个"""
+    values = {cookie['name']: cookie['value'] for cookie in cookies if cookie.get('name')}
+    return '; '.join(f'{name}={value}' for name, value in values.items())
+
+
+def session_expiry(cookies: List[dict]) -> Optional[float]:
+    """登录 Cookie 的过期时间，没有有效期时返回 None"""
+    for cookie in cookies:
+        if cookie.get('name') == SESSION_COOKIE and cookie.get('expiry'):
+            return float(cookie['expiry'])
+    return None
+
+
+def fingerprint(cookies: List[dict]) -> str:
+    """缓存的键：登录 Cookie 的哈希，不在缓存文件中保存 Cookie 本身"""
+    session = next((cookie['value'] for cookie in cookies if cookie.get('name') == SESSION_COOKIE), '')
+    return hashlib.sha256(session.encode('utf-8')).hexdigest()[:32]
+
+
+class CookieHealthChecker:
+    """不启动浏览器检查登录 Cookie 是否有效
+
+    - 先看 Cookie 本身：没有登录 Cookie 或已过有效期时直接判定，不发请求
+    - 否则用一次带 Cookie 的请求确认服务端仍认可这个登录态
+    - 结果按登录 Cookie 缓存 ttl 秒（内存 + 缓存文件，多个进程共享），无法确认的结果不缓存
+    """
+
+    def __init__(self, url: str = XHS_ME_URL, ttl: float = COOKIE_HEALTH_TTL,
+                 cache_path: Optional[str] = COOKIE_HEALTH_CACHE):
+        self.url = url
+        self.ttl = ttl
+        self.cache_path = cache_path
+        self._cache: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self._load_cache()
+
+    # ---- 缓存 ----
+
+    def _load_cache(self) -> None:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                self._cache = json.load(f)
+        except (OSError, ValueError):
+            self._cache = {}
+
+    def _save_cache(self) -> None:
+        if not self.cache_path:
+            return
+        now = time.time()
+        entries = {key: entry for key, entry in self._cache.items() if now - entry['checked_at'] < self.ttl}
+        tmp_path = f'{self.cache_path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"保存登录检查缓存失败: {str(e)}")
+
+    def _cached(self, key: str, account: str) -> Optional[CookieHealth]:
+        with self._lock:
+            entry = self._cache.get(key)
+        if not entry or time.time() - entry['checked_at'] >= self.ttl:
+            return None
+        # 缓存期间 Cookie 可能到期
+        if entry.get('expires_at') and entry['expires_at'] <= time.time():
+            return None
+        entry = dict(entry, account=account, cached=True)
+        return CookieHealth(**entry)
+
+    def _remember(self, key: str, health: CookieHealth) -> None:
+        if health.status == STATUS_UNKNOWN:
+            return
+        entry = asdict(health)
+        entry.pop('account')
+        entry.pop('cached')
+        with self._lock:
+            self._cache[key] = entry
+            self._save_cache()
+
+    # ---- 检查 ----
+
+    def _request(self, cookies: List[dict]) -> Tuple[str, str, str, str]:
+        """发送一次带 Cookie 的请求，返回 (状态, 原因, 用户ID, 昵称)"""
+        self.requests += 1
+        try:
+            response = get_client().get(self.url, headers={
+                'Cookie': cookie_header(cookies),
+                'Origin': 'https://www.xiaohongshu.com',
+                'Referer': 'https://www.xiaohongshu.com/',
+            })
+        except OSError as e:
+            return STATUS_UNKNOWN, f"请求失败: {str(e)}", '', ''
+        if response.status_code in (401, 403):
+            return STATUS_INVALID, f"HTTP {response.status_code}", '', ''
+        try:
+            body = response.json()
+        except ValueError:
+            return STATUS_UNKNOWN, f"返回的不是 JSON（HTTP {response.status_code}）", '', ''
+        data = body.get('data') or {}
+        if body.get('code') in AUTH_CODES or data.get('guest'):
+            return STATUS_INVALID, body.get('msg') or "未登录", '', ''
+        if response.status_code != 200 or not body.get('success'):
+            return STATUS_UNKNOWN, f"HTTP {response.status_code}: {body.get('msg', '')}", '', ''
+        return STATUS_VALID, '', str(data.get('user_id', '')), data.get('nickname', '')
+
+    def check(self, cookies: List[dict], account: str = '', force: bool = False) -> CookieHealth:
+        """检查一组 Cookie；force 为 True 时忽略缓存"""
+        now = time.time()
+        if not any(cookie.get('name') == SESSION_COOKIE for cookie in cookies):
+            return CookieHealth(account, STATUS_INVALID, f"没有登录 Cookie（{SESSION_COOKIE}）", now)
+        expires_at = session_expiry(cookies)
+        if expires_at is not None and expires_at <= now:
+            return CookieHealth(account, STATUS_EXPIRED, "登录 Cookie 已过有效期", now, expires_at)
+        key = fingerprint(cookies)
+        if not force:
+            cached = self._cached(key, account)
+            if cached:
+                return cached
+        status, reason, user_id, nickname = self._request(cookies)
+        health = CookieHealth(account, status, reason, time.time(), expires_at, user_id, nickname)
+        self._remember(key, health)
+        return health
+
+    def check_file(self, path: str, force: bool = False) -> CookieHealth:
+        """检查 Cookie 文件，文件不存在或格式不对时判定为已失效"""
+        try:
+            cookies = load_cookie_file(path)
+        except FileNotFoundError:
+            return CookieHealth(path, STATUS_INVALID, "Cookie 文件不存在", time.time())
+        except (OSError, ValueError) as e:
+            return CookieHealth(path, STATUS_INVALID, f"读取 Cookie 文件失败: {str(e)}", time.time())
+        return self.check(cookies, path, force)
+
+    def check_header(self, header: str, account: str = 'XHS_COOKIE', force: bool = False) -> CookieHealth:
+        return self.check(parse_cookie_header(header or ''), account, force)
+
+    def check_many(self, sources: List[str], workers: int = COOKIE_CHECK_WORKERS,
+                   force: bool = False) -> List[CookieHealth]:
+        """并发检查多个账号，来源是 Cookie 文件路径或 env:变量名（Cookie 字符串）"""
+        def check_source(source: str) -> CookieHealth:
+            if source.startswith('env:'):
+                name = source[4:]
+                return self.check_header(os.getenv(name, ''), source, force)
+            return self.check_file(source, force)
+
+        if not sources:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(sources)))) as pool:
+            return list(pool.map(check_source, sources))
+
+
+_checker: Optional[CookieHealthChecker] = None
+_checker_lock = threading.Lock()
+
+
+def get_checker() -> CookieHealthChecker:
+    """进程内共享的检查器"""
+    global _checker
+    if _checker is None:
+        with _checker_lock:
+            if _checker is None:
+                _checker = CookieHealthChecker()
+    return _checker
+
+
+def describe(health: CookieHealth) -> str:
+    """一行检查结果"""
+    labels = {STATUS_VALID: '有效', STATUS_EXPIRED: '已过期', STATUS_INVALID: '已失效', STATUS_UNKNOWN: '无法确认'}
+    parts = [f"{health.account}: {labels[health.status]}"]
+    if health.nickname:
+        parts.append(f"用户 {health.nickname}")
+    if health.expires_at:
+        remaining = health.expires_at - time.time()
+        expiry = time.strftime('%Y-%m-%d %H:%M', time.localtime(health.expires_at))
+        parts.append(f"有效期至 {expiry}" + ("（即将过期，请尽快重新登录）" if 0 < remaining < EXPIRY_WARNING else ''))
+    if health.reason:
+        parts.append(health.reason)
+    if health.cached:
+        parts.append("缓存")
+    return '，'.join(parts)
+
+
+def default_sources() -> List[str]:
+    sources = ['.cookies.json']
+    if os.getenv('XHS_COOKIE') and os.getenv('XHS_COOKIE') != 'your_cookie_here':
+        sources.append('env:XHS_COOKIE')
+    return sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查小红书登录 Cookie 是否有效（不启动浏览器）")
+    parser.add_argument('sources', nargs='*',
+                        help="Cookie 文件（支持通配符，如 accounts/*.json）或 env:变量名，默认 .cookies.json 和 XHS_COOKIE")
+    parser.add_argument('--force', action='store_true', help="忽略缓存重新检查")
+    parser.add_argument('--workers', type=int, default=COOKIE_CHECK_WORKERS, help="并发检查的账号数")
+    args = parser.parse_args()
+
+    sources = []
+    for source in args.sources or default_sources():
+        matched = [] if source.startswith('env:') else sorted(glob.glob(source))
+        sources.extend(matched or [source])
+    started = time.perf_counter()
+    results = get_checker().check_many(sources, args.workers, args.force)
+    for health in results:
+        print(describe(health))
+    print(f"共检查 {len(results)} 个账号，耗时 {time.perf_counter() - started:.2f} 秒")
+    if any(health.needs_login for health in results):
+        print("有账号需要重新登录：python test_xhs_login.py")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+# 索引文件名，保存在数据根目录下，每行一条记录，只追加不重写
+INDEX_FILENAME = '.dedup_index.jsonl'
+
+SIMHASH_BITS = 64
+
+# 海明距离不超过该值视为近似重复（64位中最多3位不同，约95%相似）
+MAX_DISTANCE = 3
+
+# 去掉空白和标点，转载时改动排版、标点不影响指纹
+NORMALIZE_PATTERN = re.compile(r'[\s\W_]+', re.UNICODE)
+
+# 去掉标点后不足这么多个 n-gram 的文本（空文本、只有标点或图片的页面等）不查重也不登记，
+# 这类文本的指纹区分不开，会和其他短文本互相判为重复
+MIN_GRAMS = 30
+
+
+@dataclass
+class DuplicateMatch:
+    key: str
+    save_dir: str
+    similarity: float
+    distance: int
+
+
+@lru_cache(maxsize=16)
+def simhash(text: str, shingle: int = 3) -> int:
+    """计算文本的64位 SimHash 指纹（字符 n-gram，按出现次数加权）
+    结果有缓存：保存前查重和保存后登记是同一篇文本，只计算一次
+    """
+    normalized = NORMALIZE_PATTERN.sub('', text)
+    if len(normalized) < shingle:
+        grams = Counter([normalized]) if normalized else Counter()
+    else:
+        grams = Counter(normalized[i:i + shingle] for i in range(len(normalized) - shingle + 1))
+
+    # 按哈希的每个字节累加次数（每个 n-gram 8 次加法而不是 64 次），最后再展开到各位：
+    # 某一位的权重 = 该位为 1 的次数 - 该位为 0 的次数
+    tables = [[0] * 256 for _ in range(SIMHASH_BITS // 8)]
+    total = 0
+    for gram, count in grams.items():
+        total += count
+        for table, byte in zip(tables, hashlib.blake2b(gram.encode('utf-8'), digest_size=8).digest()):
+            table[byte] += count
+
+    fingerprint = 0
+    for i, table in enumerate(tables):
+        # 摘要按大端序转成整数，第 i 个字节是从高位数第 i 个字节
+        shift = (len(tables) - 1 - i) * 8
+        # 对半折叠：后一半是最高位为 1 的值，折叠后继续看下一位
+        for bit in range(7, -1, -1):
+            half = len(table) // 2
+            if 2 * sum(table[half:]) > total:
+                fingerprint |= 1 << (shift + bit)
+            table = [a + b for a, b in zip(table[:half], table[half:])]
+    return fingerprint
+
+
+def too_short(text: str, shingle: int = 3) -> bool:
+    """文本太短，指纹不可靠"""
+    return len(NORMALIZE_PATTERN.sub('', text)) - shingle + 1 < MIN_GRAMS
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个指纹的海明距离"""
+    return bin(a ^ b).count('1')
+
+
+class DedupIndex:
+    """近似重复文章索引（SimHash + LSH 分段）
+
+    64位指纹按 max_distance+1 段切分，每段建一张哈希表。
+    海明距离不超过 max_distance 的两个指纹至少有一段完全相同，
+    所以查询只需比较同段的候选，不用遍历全部文章。
+
+    同一进程的多个线程通过 get_index 共用一个索引；查询前先读入其他进程追加到文件的记录。
+    """
+
+    def __init__(self, data_root: str, max_distance: int = MAX_DISTANCE):
+        self.data_root = data_root
+        self.index_path = os.path.join(data_root, INDEX_FILENAME)
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = -(-SIMHASH_BITS // self.bands)
+        self.entries: Dict[str, Tuple[int, str]] = {}
+        self.buckets: List[Dict[int, set]] = [defaultdict(set) for _ in range(self.bands)]
+        # 已查重、还没保存完的文章，只在内存中占位
+        self.reserved: Set[str] = set()
+        self._offset = 0
+        self._lock = threading.RLock()
+        self.load()
+
+    def _band_keys(self, fingerprint: int) -> Iterator[Tuple[int, int]]:
+        """指纹切分后的各段值"""
+        mask = (1 << self.band_bits) - 1
+        for band in range(self.bands):
+            yield band, fingerprint >> (band * self.band_bits) & mask
+
+    def _insert(self, key: str, fingerprint: int, save_dir: str) -> None:
+        """写入内存索引"""
+        old = self.entries.get(key)
+        if old:
+            for band, value in self._band_keys(old[0]):
+                self.buckets[band][value].discard(key)
+        self.entries[key] = (fingerprint, save_dir)
+        for band, value in self._band_keys(fingerprint):
+            self.buckets[band][value].add(key)
+
+    def load(self) -> None:
+        """从索引文件加载上次之后追加的记录，后写入的记录覆盖先前的"""
+        with self._lock:
+            try:
+                size = os.path.getsize(self.index_path)
+            except OSError:
+                return
+            if size == self._offset:
+                return
+            if size < self._offset:
+                # 文件被其他进程重写（compact / rebuild），从头读
+                self._offset = 0
+            try:
+                with open(self.index_path, 'rb') as f:
+                    f.seek(self._offset)
+                    data = f.read(size - self._offset)
+                # 最后一行可能还没写完，留到下次
+                end = data.rfind(b'\n') + 1
+                for line in data[:end].decode('utf-8').splitlines():
+                    line = line.strip()
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    self._insert(record['key'], int(record['simhash'], 16), record['save_dir'])
+                self._offset += end
+            except Exception as e:
+                print(f"加载查重索引失败: {str(e)}")
+
+    def add(self, key: str, text: str, save_dir: str) -> Optional[int]:
+        """加入一篇文章并追加写入索引文件，返回指纹；文本太短时不登记，返回 None"""
+        if too_short(text):
+            return None
+        fingerprint = simhash(text)
+        with self._lock:
+            if self.entries.get(key) == (fingerprint, save_dir) and key not in self.reserved:
+                return fingerprint
+            self._insert(key, fingerprint, save_dir)
+            self.reserved.discard(key)
+            os.makedirs(self.data_root, exist_ok=True)
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({
+                    'key': key,
+                    'simhash': f'{fingerprint:016x}',
+                    'save_dir': save_dir,
+                }, ensure_ascii=False) + '\n')
+        return fingerprint
+
+    def query(self, text: str, exclude: Optional[str] = None) -> List[DuplicateMatch]:
+        """查找与文本近似重复的文章，按相似度从高到低排列；文本太短时不查重"""
+        if too_short(text):
+            return []
+        fingerprint = simhash(text)
+        self.load()
+        with self._lock:
+            candidates = set()
+            for band, value in self._band_keys(fingerprint):
+                candidates.update(self.buckets[band].get(value, ()))
+            candidates.discard(exclude)
+            entries = [(key, self.entries[key]) for key in candidates]
+
+        matches = []
+        for key, (other, save_dir) in entries:
+            distance = hamming_distance(fingerprint, other)
+            if distance <= self.max_distance:
+                matches.append(DuplicateMatch(
+                    key=key,
+                    save_dir=save_dir,
+                    similarity=1 - distance / SIMHASH_BITS,
+                    distance=distance,
+                ))
+        matches.sort(key=lambda m: m.distance)
+        return matches
+
+    def find_duplicate(self, text: str, exclude: Optional[str] = None) -> Optional[DuplicateMatch]:
+        """返回最相似的近似重复文章，没有则返回 None"""
+        matches = self.query(text, exclude=exclude)
+        return matches[0] if matches else None
+
+    def claim(self, key: str, text: str, save_dir: str) -> Optional[DuplicateMatch]:
+        """查重，没有重复时在内存中占位，同时处理的同一篇转载能查到这篇；保存成功后由 add 写入文件"""
+        with self._lock:
+            match = self.find_duplicate(text, exclude=key)
+            if match is None and not too_short(text):
+                fingerprint = simhash(text)
+                if self.entries.get(key) != (fingerprint, save_dir):
+                    self._insert(key, fingerprint, save_dir)
+                    self.reserved.add(key)
+            return match
+
+    def compact(self) -> None:
+        """重写索引文件，去掉被覆盖的旧记录"""
+        tmp_path = self.index_path + '.tmp'
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for key, (fingerprint, save_dir) in self.entries.items():
+                    if key in self.reserved:
+                        continue
+                    f.write(json.dumps({
+                        'key': key,
+                        'simhash': f'{fingerprint:016x}',
+                        'save_dir': save_dir,
+                    }, ensure_ascii=False) + '\n')
+            os.replace(tmp_path, self.index_path)
+            self._offset = os.path.getsize(self.index_path)
+
+    def rebuild(self) -> int:
+        """扫描数据根目录下所有 original.txt 重建索引，返回文章数"""
+        self.entries.clear()
+        self.reserved.clear()
+        self.buckets = [defaultdict(set) for _ in range(self.bands)]
+        if os.path.isdir(self.data_root):
+            for name in sorted(os.listdir(self.data_root)):
+                path = os.path.join(self.data_root, name, 'original.txt')
+                if not os.path.isfile(path):
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                if not too_short(text):
+                    self._insert(name, simhash(text), os.path.join(self.data_root, name))
+        os.makedirs(self.data_root, exist_ok=True)
+        self.compact()
+        return len(self.entries)
+
+
+_indexes: Dict[str, DedupIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(data_root: str) -> DedupIndex:
+    """进程内共享的查重索引，同一数据目录的多个爬虫实例（多个线程）共用一个"""
+    key = os.path.abspath(data_root)
+    index = _indexes.get(key)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(key)
+            if index is None:
+                index = _indexes[key] = DedupIndex(data_root)
+    return index
+
+
+def article_key(save_dir: str) -> str:
+    """文章在索引中的键：文章目录名"""
+    return os.path.basename(os.path.normpath(save_dir))
+
+
+def check_duplicate(index: DedupIndex, save_dir: str, text: str) -> Optional[DuplicateMatch]:
+    """保存前查重：重复则返回匹配；不重复时只在内存中占位，保存成功后再调用 register_article 写入索引"""
+    match = index.claim(article_key(save_dir), text, save_dir)
+    if match:
+        print(f"发现近似重复文章（相似度 {match.similarity:.0%}）：{match.save_dir}")
+    return match
+
+
+def register_article(index: DedupIndex, save_dir: str, text: str) -> None:
+    """文章保存成功后登记到索引"""
+    index.add(article_key(save_dir), text, save_dir)
+
+
+def main():
+    data_root = sys.argv[1] if len(sys.argv) > 1 else r"E:\fy\智企内推\data"
+    index = DedupIndex(data_root)
+    count = index.rebuild()
+    print(f"已索引 {count} 篇文章：{index.index_path}")
+
+    # 输出重复分组
+    reported = set()
+    for key in sorted(index.entries):
+        if key in reported:
+            continue
+        path = os.path.join(index.entries[key][1], 'original.txt')
+        with open(path, 'r', encoding='utf-8') as f:
+            matches = index.query(f.read(), exclude=key)
+        if matches:
+            reported.add(key)
+            reported.update(m.key for m in matches)
+            print(f"\n{key}")
+            for m in matches:
+                print(f"  ≈ {m.key}（相似度 {m.similarity:.0%}）")
+
+
+if __name__ == "__main__":
+    main()
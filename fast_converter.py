@@ -0,0 +1,190 @@
+import re
+import math
+import heapq
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Dict, List
+
+from keyword_annotator import DEFAULT_TAGS, get_matcher
+
+# 句子切分：中文句末标点、英文句末标点和换行
+SENTENCE_SPLIT = re.compile(r'(?<=[。！？!?；;])|\n+')
+
+# 参与排序的最多句子数，超长文章只取前面这些句子，保证耗时可控
+MAX_CANDIDATES = 200
+
+# TextRank 图中每个句子保留的最多邻居数
+MAX_NEIGHBORS = 12
+
+TITLE_TEMPLATES = [
+    "✨{title}",
+    "🔥{kw1}真的太绝了！{kw2}必看",
+    "😱原来{kw1}还能这样！",
+    "💡关于{kw1}，看这一篇就够了",
+    "🎉{kw1}+{kw2}，一文讲透",
+    "📌收藏！{title}",
+    "👀{kw1}的正确打开方式",
+]
+
+OPENINGS = [
+    "家人们谁懂啊！今天挖到一篇宝藏文章 🌟",
+    "姐妹们快来！这篇干货必须分享给你们 ✨",
+    "今天给大家分享一篇超有料的文章 📖",
+]
+
+CLOSINGS = [
+    "你们怎么看？评论区聊聊吧 💬",
+    "觉得有用的话记得点赞收藏哦 ❤️",
+]
+
+# 标题关键词的兜底
+FALLBACK_KEYWORDS = ["这件事", "干货"]
+
+
+def split_sentences(content: str) -> List[str]:
+    """切分句子并去重"""
+    sentences = []
+    seen = set()
+    for s in SENTENCE_SPLIT.split(content):
+        s = (s or '').strip()
+        if len(s) >= 4 and s not in seen:
+            sentences.append(s)
+            seen.add(s)
+    return sentences
+
+
+def _bigrams(sentence: str) -> set:
+    """字符二元组，中文不分词也能衡量句子重合度"""
+    chars = re.sub(r'\s+', '', sentence)
+    return {chars[i:i + 2] for i in range(len(chars) - 1)}
+
+
+def textrank(sentences: List[str], damping: float = 0.85, iterations: int = 30,
+             tol: float = 1e-4) -> List[float]:
+    """TextRank：以句子间二元组重合度为边权，迭代计算句子得分"""
+    n = len(sentences)
+    if n <= 1:
+        return [1.0] * n
+
+    grams = [_bigrams(s) for s in sentences]
+    # 倒排索引只比较共享二元组的句子对，避免 n^2 全量比较
+    index: Dict[str, List[int]] = defaultdict(list)
+    for i, g in enumerate(grams):
+        for gram in g:
+            index[gram].append(i)
+
+    # 几乎每句都有的二元组（如“我们”）没有区分度，不参与相似度
+    common_limit = n // 2 + 1
+    postings = {gram: ids for gram, ids in index.items() if 1 < len(ids) <= common_limit}
+
+    log_len = [math.log(len(g) + 2) for g in grams]
+    edges: List[Dict[int, float]] = []
+    for a in range(n):
+        overlap = Counter(chain.from_iterable(postings[g] for g in grams[a] if g in postings))
+        overlap.pop(a, None)
+        edges.append({b: common / (log_len[a] + log_len[b]) for b, common in overlap.items()})
+    # 每句只保留最相似的若干条边，图变稀疏后迭代开销与句子数成线性
+    for a in range(n):
+        if len(edges[a]) > MAX_NEIGHBORS:
+            edges[a] = dict(heapq.nlargest(MAX_NEIGHBORS, edges[a].items(), key=lambda kv: kv[1]))
+    out_weight = [sum(e.values()) for e in edges]
+    # 入边按出度归一化，迭代时只需乘加
+    incoming: List[List[tuple]] = [[] for _ in range(n)]
+    for j in range(n):
+        for i, w in edges[j].items():
+            incoming[i].append((j, w / out_weight[j]))
+
+    scores = [1.0] * n
+    for _ in range(iterations):
+        new_scores = [(1 - damping) + damping * sum(w * scores[j] for j, w in incoming[i])
+                      for i in range(n)]
+        delta = max(abs(a - b) for a, b in zip(scores, new_scores))
+        scores = new_scores
+        if delta < tol:
+            break
+    return scores
+
+
+def select_sentences(sentences: List[str], target_length: int) -> List[str]:
+    """按得分挑选关键句，凑够目标长度后按原文顺序返回"""
+    candidates = sentences[:MAX_CANDIDATES]
+    scores = textrank(candidates)
+    # 靠前的句子略微加权，开头通常是导语
+    ranked = sorted(range(len(candidates)),
+                    key=lambda i: scores[i] * (1 + 0.3 / (1 + i)), reverse=True)
+    chosen = []
+    total = 0
+    for i in ranked:
+        if total >= target_length:
+            break
+        chosen.append(i)
+        total += len(candidates[i])
+    selected = []
+    for i in sorted(chosen):
+        sentence = candidates[i]
+        selected.append(sentence if len(sentence) <= target_length else sentence[:target_length] + "…")
+    return selected
+
+
+class FastConverter:
+    """本地快速转换：不调用大模型，毫秒级生成小红书风格文案
+
+    在规则排版的基础上做抽取式摘要（TextRank 选关键句）、模板标题、
+    关键词 emoji 与话题标签，并控制正文长度。输出格式与大模型一致，
+    发布模块可以直接解析。
+    """
+
+    def __init__(self, target_length: int = 600, footer: str = "转载自微信公众号：网易智企"):
+        self.target_length = target_length
+        self.footer = footer
+        self.emoji_matcher = get_matcher('emoji')
+        self.tag_matcher = get_matcher('tag')
+
+    def make_titles(self, title: str, keywords: List[str], count: int = 5) -> List[str]:
+        """用模板生成标题，标题不超过20字"""
+        kws = (keywords + FALLBACK_KEYWORDS)[:2]
+        short_title = title[:16] if title else kws[0]
+        titles = []
+        for template in TITLE_TEMPLATES:
+            candidate = template.format(title=short_title, kw1=kws[0], kw2=kws[1])[:20]
+            if candidate not in titles:
+                titles.append(candidate)
+            if len(titles) >= count:
+                break
+        return titles
+
+    def make_paragraphs(self, sentences: List[str], per_paragraph: int = 2) -> List[str]:
+        """把关键句两两合并成短段落，并加上 emoji"""
+        paragraphs = []
+        for i in range(0, len(sentences), per_paragraph):
+            paragraph = "".join(sentences[i:i + per_paragraph])
+            paragraphs.append(self.emoji_matcher.annotate(paragraph))
+        return paragraphs
+
+    def render(self, title: str, content: str) -> str:
+        """生成与大模型输出同格式的文案"""
+        sentences = split_sentences(content)
+        if not sentences:
+            sentences = [title] if title else []
+        selected = select_sentences(sentences, self.target_length)
+
+        tags = self.tag_matcher.pick(title + "\n" + content, defaults=DEFAULT_TAGS)
+        keywords = [tag.lstrip('#') for tag in tags if tag not in DEFAULT_TAGS]
+        titles = self.make_titles(title, keywords)
+
+        seed = len(title) + len(selected)
+        body = [OPENINGS[seed % len(OPENINGS)], ""]
+        for paragraph in self.make_paragraphs(selected):
+            body.append(paragraph)
+            body.append("")
+        body.append(CLOSINGS[seed % len(CLOSINGS)])
+        body.append("")
+        body.append(self.footer)
+
+        lines = ["一. 标题"]
+        lines.extend(f"{i}. {t}" for i, t in enumerate(titles, 1))
+        lines.append("")
+        lines.append("二. 正文")
+        lines.extend(body)
+        lines.append(f"标签：{' '.join(tags)}")
+        return "\n".join(lines)
@@ -1,17 +1,24 @@
 import os
 import time
-import requests
 import re
 from io import BytesIO
-from bs4 import BeautifulSoup
-from PIL import Image, ImageEnhance
-from fake_useragent import UserAgent
 from dotenv import load_dotenv
+from keyword_annotator import DEFAULT_TAGS, get_matcher
+from dedup_index import check_duplicate, get_index, register_article
+from article_store import ArticleStore
+from ua_pool import random_user_agent
+from http_client import get_client
+from http2_client import get_fetcher
+from image_budget import ImageBudget
+from politeness import ThrottledError, check_response, get_scheduler, is_verify_page
+from profiler import get_profiler, stage
+from artifact_writer import get_writer
+from text_card import add_text_cards, note_parts
 
 class WeixinToXiaohongshu:
-    def __init__(self):
+    def __init__(self, base_save_path: str = r"E:\fy\智企内推\data"):
         self.headers = {
-            'User-Agent': UserAgent().random,
+            'User-Agent': random_user_agent(),
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2',
             'Connection': 'keep-alive',
@@ -19,13 +26,32 @@ class WeixinToXiaohongshu:
         }
         load_dotenv()
         self.xhs_cookie = os.getenv('XHS_COOKIE')
-        self.base_save_path = r"E:\fy\智企内推\data"
+        self.base_save_path = base_save_path
+        self.emoji_matcher = get_matcher('emoji')
+        self.tag_matcher = get_matcher('tag')
+        self.dedup_index = get_index(self.base_save_path)
+        self.store = ArticleStore(self.base_save_path)
         
-    def create_save_directory(self, title):
-        """创建保存目录"""
+    def check_xhs_cookie(self):
+        """不启动浏览器检查 .env 中的 XHS_COOKIE 是否仍然有效，未配置时返回 None"""
+        from cookie_health import describe, get_checker
+        
+        if not self.xhs_cookie or self.xhs_cookie == 'your_cookie_here':
+            return None
+        health = get_checker().check_header(self.xhs_cookie)
+        if not health.valid:
+            print(f"小红书Cookie: {describe(health)}")
+        return health
+        
+    def save_directory(self, title):
+        """文章的保存目录（不创建）"""
         # 清理标题中的非法字符
         safe_title = re.sub(r'[\\/:*?"<>|]', '_', title)
-        save_dir = os.path.join(self.base_save_path, safe_title)
+        return os.path.join(self.base_save_path, safe_title)
+        
+    def create_save_directory(self, title):
+        """创建保存目录"""
+        save_dir = self.save_directory(title)
         
         # 创建目录
         os.makedirs(save_dir, exist_ok=True)
@@ -34,23 +60,34 @@ class WeixinToXiaohongshu:
         return save_dir
         
     def save_content(self, save_dir, content, styled_content):
-        """保存文本内容"""
-        # 保存原始内容
-        with open(os.path.join(save_dir, 'original.txt'), 'w', encoding='utf-8') as f:
-            f.write(content)
-            
-        # 保存小红书风格内容
-        with open(os.path.join(save_dir, 'xiaohongshu.txt'), 'w', encoding='utf-8') as f:
-            f.write(styled_content)
+        """保存文本内容（原始内容和小红书风格内容一起原子写入）"""
+        batch = get_writer().begin(save_dir)
+        batch.add_text('original.txt', content)
+        batch.add_text('xiaohongshu.txt', styled_content)
+        batch.commit()
             
     def save_images(self, save_dir, images):
         """下载并保存图片"""
+        from PIL import Image
+        
+        # HTTP/2 后端先在一条连接上并发下载全部图片，否则逐张下载
+        fetcher = get_fetcher()
+        prefetched = fetcher.fetch_many(images, self.headers) if fetcher else None
+        
+        # 全部处理完后一起原子写入
+        batch = get_writer().begin(save_dir)
         saved_images = []
         for i, img_url in enumerate(images):
             try:
                 print(f"正在下载第 {i+1}/{len(images)} 张图片...")
-                response = requests.get(img_url, headers=self.headers)
-                img = Image.open(BytesIO(response.content))
+                with stage('image_download'):
+                    if prefetched is not None:
+                        if prefetched[i] is None:
+                            raise Exception("图片下载失败")
+                        data = prefetched[i]
+                    else:
+                        data = get_client().get(img_url, headers=self.headers).content
+                img = Image.open(BytesIO(data))
                 
                 # 如果图片是RGBA模式，转换为RGB
                 if img.mode == 'RGBA':
@@ -63,22 +100,29 @@ class WeixinToXiaohongshu:
                     img = img.convert('RGB')
                 
                 # 处理图片
-                processed_img = self.process_image(img)
+                with stage('image_filter'):
+                    processed_img = self.process_image(img)
                 if processed_img:
                     # 保存处理后的图片
-                    save_path = os.path.join(save_dir, 'images', f'image_{i+1}.jpg')
-                    processed_img.save(save_path, 'JPEG', quality=95)
+                    with stage('image_encode'):
+                        save_path = batch.add_image(f'images/image_{i+1}.jpg', processed_img, 'JPEG', quality=95)
                     saved_images.append(save_path)
-                    print(f"图片已保存: {save_path}")
                     
             except Exception as e:
                 print(f"处理第 {i+1} 张图片时出错: {str(e)}")
                 continue
                 
+        # 写文件交给 I/O 线程，之后读取图片的步骤（文字卡片、发布）先等待写完
+        with stage('image_write'):
+            batch.commit()
+        for save_path in saved_images:
+            print(f"图片已保存: {save_path}")
         return saved_images
         
     def process_image(self, img):
         """处理图片，添加小红书风格滤镜"""
+        from PIL import ImageEnhance
+        
         try:
             # 增加饱和度
             enhancer = ImageEnhance.Color(img)
@@ -100,13 +144,23 @@ class WeixinToXiaohongshu:
             
     def get_weixin_content(self, url):
         """获取微信公众号文章内容"""
-        try:
-            print("正在访问文章链接...")
-            response = requests.get(url, headers=self.headers, timeout=30)
+        from bs4 import BeautifulSoup
+        
+        def fetch(headers):
+            response = get_client().get(url, headers=headers)
+            check_response(response)
             response.raise_for_status()
             
             print("解析文章内容...")
             soup = BeautifulSoup(response.text, 'html.parser')
+            if not soup.find(id="js_content") and is_verify_page(text=soup.get_text()):
+                raise ThrottledError("返回了验证页")
+            return soup
+            
+        try:
+            print("正在访问文章链接...")
+            # 按域名自适应限速，被限流时换身份重试
+            soup = get_scheduler().call(url, fetch, self.headers)
             
             # 获取文章内容
             content_div = soup.find(id="js_content")
@@ -129,15 +183,19 @@ class WeixinToXiaohongshu:
                     seen_texts.add(text)
                     
             # 提取图片
+            budget = ImageBudget(headers=self.headers)
             for img in content_div.find_all('img'):
                 img_url = img.get('data-src')
                 if img_url and img_url not in images:  # 去重
                     images.append(img_url)
+                    budget.add(img_url, img.attrs)
                     
             return {
                 'title': title,
                 'text': '\n'.join(text_content),
-                'images': images
+                'images': images,
+                # 只有入选预算的图片做下载和滤镜处理
+                'selected_images': budget.select_urls()
             }
             
         except Exception as e:
@@ -180,80 +238,85 @@ class WeixinToXiaohongshu:
         if len(filtered_paragraphs) > 1:
             styled_content.append("2️⃣ " + filtered_paragraphs[1][:100] + "...")
             
-        # 添加emoji
-        emoji_dict = {
-            "推荐": "👍",
-            "分享": "🎉",
-            "喜欢": "❤️",
-            "建议": "💡",
-            "提醒": "⚠️",
-            "注意": "❗",
-            "重要": "‼️",
-            "游戏": "🎮",
-            "直播": "📱",
-            "玩家": "👥",
-            "成本": "💰",
-            "营销": "📢"
-        }
-        
-        # 添加标签
-        tags = [
-            "#经验分享",
-            "#干货分享",
-            "#每日一读",
-            "#文章推荐",
-            "#干货必看"
-        ]
-        
         # 合并内容
         final_content = "\n".join(styled_content)
         
-        # 添加emoji
-        for key, emoji in emoji_dict.items():
-            final_content = final_content.replace(key, f"{key}{emoji}")
-            
-        # 添加标签
+        # 添加emoji（所有关键词一次扫描完成，已插入的emoji不会被再次匹配）
+        final_content = self.emoji_matcher.annotate(final_content)
+        
+        # 根据正文关键词挑选话题标签
+        tags = self.tag_matcher.pick(title + "\n" + content, defaults=DEFAULT_TAGS)
         final_content += "\n\n" + " ".join(tags)
         
         return final_content
         
     def process_url(self, url):
         """处理单个URL"""
+        with get_profiler().article(url):
+            return self._process_url(url)
+        
+    def _process_url(self, url):
         print(f"\n开始处理URL: {url}")
         
         # 1. 获取文章内容
-        content = self.get_weixin_content(url)
+        with stage('fetch_parse'):
+            content = self.get_weixin_content(url)
         if not content:
             print("获取文章失败！")
             return False
             
         print(f"\n成功获取文章：{content['title']}")
         
-        # 2. 创建保存目录
-        save_dir = self.create_save_directory(content['title'])
+        # 2. 查重，近似重复的文章不创建目录，跳过转换和图片下载
+        save_dir = self.save_directory(content['title'])
+        with stage('dedup'):
+            duplicate = check_duplicate(self.dedup_index, save_dir, content['text'])
+        if duplicate:
+            return True
+        
+        self.create_save_directory(content['title'])
         print(f"创建保存目录：{save_dir}")
         
         # 3. 转换为小红书风格
-        styled_content = self.convert_to_xhs_style(content['title'], content['text'])
+        with stage('convert'):
+            styled_content = self.convert_to_xhs_style(content['title'], content['text'])
         
         # 4. 保存文本内容
-        self.save_content(save_dir, content['text'], styled_content)
+        with stage('save_text'):
+            self.save_content(save_dir, content['text'], styled_content)
+            record = self.store.save_article(url, content['title'], content['text'], save_dir=save_dir)
+            self.store.set_converted(url, styled_content)
+            register_article(self.dedup_index, save_dir, content['text'])
         print("文本内容已保存")
         
         # 5. 下载并保存图片
-        saved_images = self.save_images(save_dir, content['images'])
+        with stage('images'):
+            saved_images = self.save_images(save_dir, content['selected_images'])
+        # 未入选的图片只登记地址，需要时再下载
+        saved = set(saved_images)
+        paths = {img_url: os.path.join(save_dir, 'images', f'image_{i+1}.jpg')
+                 for i, img_url in enumerate(content['selected_images'])}
+        image_refs = [(img_url, paths[img_url] if paths.get(img_url) in saved else None)
+                      for img_url in content['images']]
+        self.store.add_images(record.id, image_refs)
         print(f"共保存 {len(saved_images)} 张图片")
+        # 图片不足时用文字卡片补足
+        add_text_cards(self.store, url, save_dir, *note_parts(styled_content, content['title']))
         
         return True
 
 def main():
     url = input("请输入微信公众号文章URL：")
     converter = WeixinToXiaohongshu()
+    converter.check_xhs_cookie()
     
     if converter.process_url(url):
         print("\n处理完成！")
     else:
         print("\n处理失败！")
+    get_client().report()
+    get_scheduler().report()
+    get_profiler().report()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,129 @@
+import os
+import asyncio
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from http_client import CONNECT_TIMEOUT, READ_TIMEOUT, _verify_setting, get_client
+
+# 加载环境变量：配置在导入时读取
+load_dotenv()
+
+# 抓取后端：http1（默认，共享连接池逐个请求）或 http2（单连接多路复用并发抓取）
+HTTP_BACKEND = os.getenv('HTTP_BACKEND', 'http1').lower()
+
+# 同时在途的请求数
+MAX_CONCURRENCY = int(os.getenv('HTTP2_MAX_CONCURRENCY', '32'))
+
+
+def http2_available() -> bool:
+    """是否安装了 HTTP/2 所需的 httpx 和 h2"""
+    try:
+        import httpx  # noqa: F401
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class Http2Fetcher:
+    """HTTP/2 多路复用抓取器（基于 httpx）
+
+    同一域名的请求复用一条 HTTP/2 连接并发发出；服务端不支持 h2 时
+    httpx 通过 ALPN 自动退回 HTTP/1.1，此时最多开 max_concurrency 条连接。
+    没有安装 h2 时整体退回共享的 HTTP/1.1 连接池。
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, prior_knowledge: bool = False):
+        self.max_concurrency = max_concurrency
+        # prior_knowledge 用于明文 h2c 服务（如本地测试服务），HTTPS 下通过 ALPN 协商
+        self.prior_knowledge = prior_knowledge
+        self.enabled = http2_available()
+        self.versions: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _new_client(self):
+        import httpx
+
+        return httpx.AsyncClient(
+            http1=not self.prior_knowledge,
+            http2=True,
+            verify=_verify_setting(),
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=self.max_concurrency,
+                                max_keepalive_connections=self.max_concurrency),
+            follow_redirects=True,
+        )
+
+    async def _fetch(self, client, semaphore: asyncio.Semaphore, url: str,
+                     headers: Optional[Dict[str, str]]) -> Optional[bytes]:
+        async with semaphore:
+            try:
+                response = await client.get(url, headers=headers)
+                with self._lock:
+                    self.versions[response.http_version] += 1
+                if response.status_code != 200:
+                    print(f"下载失败 {response.status_code}: {url}")
+                    return None
+                return response.content
+            except Exception as e:
+                print(f"下载失败: {url} {str(e)}")
+                return None
+
+    async def fetch_many_async(self, urls: List[str],
+                               headers: Optional[Dict[str, str]] = None) -> List[Optional[bytes]]:
+        """并发抓取，按输入顺序返回内容，失败的为 None"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._new_client() as client:
+            return await asyncio.gather(*(self._fetch(client, semaphore, url, headers) for url in urls))
+
+    def fetch_many(self, urls: List[str], headers: Optional[Dict[str, str]] = None) -> List[Optional[bytes]]:
+        """同步接口：在独立事件循环中并发抓取"""
+        if not urls:
+            return []
+        if not self.enabled:
+            return self._fetch_http1(urls, headers)
+        coro = self.fetch_many_async(urls, headers)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        # 已在事件循环中（如被异步代码调用）时换一个线程运行
+        result: List[Optional[bytes]] = []
+        thread = threading.Thread(target=lambda: result.extend(asyncio.run(coro)))
+        thread.start()
+        thread.join()
+        return result
+
+    def _fetch_http1(self, urls: List[str], headers: Optional[Dict[str, str]]) -> List[Optional[bytes]]:
+        """没有 h2 依赖时用共享连接池逐个抓取"""
+        contents = []
+        for url in urls:
+            try:
+                response = get_client().get(url, headers=headers)
+                self.versions['HTTP/1.1'] += 1
+                contents.append(response.content if response.status_code == 200 else None)
+            except Exception as e:
+                print(f"下载失败: {url} {str(e)}")
+                contents.append(None)
+        return contents
+
+    def stats(self) -> Dict[str, int]:
+        """各协议版本的请求数"""
+        return dict(self.versions)
+
+
+_fetcher: Optional[Http2Fetcher] = None
+
+
+def get_fetcher() -> Optional[Http2Fetcher]:
+    """HTTP_BACKEND=http2 时返回共享的抓取器，否则返回 None"""
+    global _fetcher
+    if HTTP_BACKEND != 'http2':
+        return None
+    if _fetcher is None:
+        _fetcher = Http2Fetcher()
+        if not _fetcher.enabled:
+            print("未安装 h2（pip install httpx[http2]），退回 HTTP/1.1 连接池")
+    return _fetcher
@@ -0,0 +1,154 @@
+import os
+import threading
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+
+# 加载环境变量：各入口先导入本模块再调用 load_dotenv()，配置在导入时读取，这里要先加载
+load_dotenv()
+
+# 连接池和超时配置，可在 .env 中覆盖
+POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '4'))
+POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '16'))
+CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '30'))
+MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '2'))
+
+
+def _verify_setting() -> Union[bool, str]:
+    """TLS 校验：默认开启；HTTP_VERIFY=false 关闭，或填写自定义CA证书路径"""
+    value = os.getenv('HTTP_VERIFY', 'true').strip()
+    if value.lower() in ('0', 'false', 'no', 'off'):
+        return False
+    if value.lower() in ('', '1', 'true', 'yes', 'on'):
+        return True
+    return value
+
+
+class HttpClient:
+    """共享的 HTTP 客户端
+
+    每个域名一个长连接会话，连接池复用 TCP/TLS 连接；统一超时、重试、
+    gzip/br 解压和证书校验，并统计连接复用情况。
+    """
+
+    def __init__(self, pool_connections: int = POOL_CONNECTIONS, pool_maxsize: int = POOL_MAXSIZE,
+                 timeout: Optional[Tuple[float, float]] = None, verify: Optional[Union[bool, str]] = None,
+                 max_retries: int = MAX_RETRIES):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+        self.verify = _verify_setting() if verify is None else verify
+        self.max_retries = max_retries
+        self._sessions: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        if self.verify is False:
+            import urllib3
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    def _new_session(self):
+        """创建带连接池的会话"""
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util import Retry
+        from urllib3.util.request import ACCEPT_ENCODING
+
+        session = requests.Session()
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({'GET', 'HEAD'}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize, max_retries=retry)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        # 安装了 brotli 时 ACCEPT_ENCODING 会包含 br
+        session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        session.verify = self.verify
+        return session
+
+    def session_for(self, url: str):
+        """返回该URL所在域名的会话"""
+        host = urlsplit(url).netloc.lower()
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = self._new_session()
+                    self._sessions[host] = session
+        return session
+
+    def reset(self, url: str) -> None:
+        """丢弃该URL所在域名的会话（Cookie 和连接），下次请求新建；
+        不主动关闭，其他线程正在进行的请求不受影响"""
+        with self._lock:
+            self._sessions.pop(urlsplit(url).netloc.lower(), None)
+
+    def request(self, method: str, url: str, **kwargs):
+        """发送请求，未指定时使用统一的超时"""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session_for(url).request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self) -> Dict[str, object]:
+        """连接复用统计：请求数、新建连接数（即握手次数）、复用率"""
+        per_host = {}
+        total_requests = 0
+        total_connections = 0
+        for host, session in list(self._sessions.items()):
+            requests_count = 0
+            connections = 0
+            for adapter in set(session.adapters.values()):
+                for key in list(adapter.poolmanager.pools.keys()):
+                    pool = adapter.poolmanager.pools.get(key)
+                    if pool is None:
+                        continue
+                    requests_count += pool.num_requests
+                    connections += pool.num_connections
+            per_host[host] = {'requests': requests_count, 'connections': connections}
+            total_requests += requests_count
+            total_connections += connections
+        reuse = 1 - total_connections / total_requests if total_requests else 0.0
+        return {
+            'requests': total_requests,
+            'connections': total_connections,
+            'reuse_ratio': round(reuse, 4),
+            'hosts': per_host,
+        }
+
+    def report(self) -> None:
+        """打印连接复用统计"""
+        stats = self.stats()
+        if stats['requests']:
+            print(f"HTTP 请求 {stats['requests']} 次，新建连接 {stats['connections']} 次，"
+                  f"连接复用率 {stats['reuse_ratio']:.0%}")
+
+    def close(self) -> None:
+        """关闭所有会话"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """全局共享的 HTTP 客户端"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
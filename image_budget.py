@@ -0,0 +1,217 @@
+import os
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from http_client import get_client
+
+# 加载环境变量：入口模块可能在调用 load_dotenv() 之前导入本模块
+load_dotenv()
+
+# 小红书单篇笔记最多 18 张图片
+XHS_MAX_IMAGES = 18
+# 每篇文章完整下载、处理和上传的图片数，不超过平台上限
+IMAGE_BUDGET = max(1, min(int(os.getenv('IMAGE_BUDGET', '9')), XHS_MAX_IMAGES))
+# 尺寸未知的图片是否只下载文件头探测尺寸
+IMAGE_PROBE = os.getenv('IMAGE_PROBE', 'true').lower() not in ('0', 'false', 'no')
+# 探测时最多读取的字节数，JPEG/PNG/GIF 的尺寸都在文件头里
+PROBE_BYTES = 32 * 1024
+# 每篇文章最多探测的图片数和并发数
+PROBE_MAX = 30
+PROBE_WORKERS = 8
+
+# 短边小于该值的视为图标、表情、分隔线
+MIN_SIDE = 200
+# 长边与短边之比超过该值的视为横幅、分隔条或长截图
+MAX_ASPECT = 3.0
+# 小红书笔记的主流比例 3:4（高/宽）
+TARGET_RATIO = 4 / 3
+# 达到该像素数的图片尺寸分记满分
+TARGET_PIXELS = 1080 * 1440
+# 各项打分的权重
+POSITION_WEIGHT = 1.0
+ASPECT_WEIGHT = 0.5
+UNKNOWN_SIZE_SCORE = 0.5
+GIF_PENALTY = 1.0
+# 不能作为笔记图片的格式
+SKIP_FORMATS = ('svg',)
+
+_FORMAT_RE = re.compile(r'(?:wx_fmt=|\.)(jpe?g|png|gif|webp|svg|bmp)\b', re.I)
+
+
+@dataclass
+class ImageCandidate:
+    url: str
+    position: int  # 在文章中的顺序，从 0 开始
+    width: Optional[int] = None
+    height: Optional[int] = None
+    format: str = ''
+    probed: bool = False
+    score: Optional[float] = None  # None 表示不适合发布
+
+    @property
+    def has_size(self) -> bool:
+        return bool(self.width and self.height)
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(str(value).strip().rstrip('px')) if value else None
+    except ValueError:
+        return None
+
+
+def candidate_from_attrs(url: str, position: int, attrs: Dict[str, str]) -> ImageCandidate:
+    """从 img 标签的属性中读取声明的尺寸和格式
+
+    公众号文章：data-w 为原图宽度，data-ratio 为高宽比，data-type 为格式；
+    普通网页：width / height 属性
+    """
+    width = _number(attrs.get('data-w')) or _number(attrs.get('width'))
+    height = _number(attrs.get('height'))
+    ratio = _number(attrs.get('data-ratio'))
+    if width and ratio and not height:
+        height = width * ratio
+    fmt = (attrs.get('data-type') or '').lower()
+    if not fmt:
+        match = _FORMAT_RE.search(url)
+        fmt = match.group(1).lower() if match else ''
+    if fmt == 'jpg':
+        fmt = 'jpeg'
+    return ImageCandidate(url, position, int(width) if width else None,
+                          int(height) if height else None, fmt)
+
+
+def score_candidate(candidate: ImageCandidate, total: int) -> Optional[float]:
+    """按位置、尺寸、比例和格式打分，不适合发布的返回 None"""
+    if candidate.format in SKIP_FORMATS:
+        return None
+    score = POSITION_WEIGHT * (1 - candidate.position / max(total, 1))
+    if candidate.has_size:
+        short, long = sorted((candidate.width, candidate.height))
+        if short < MIN_SIDE or long / short > MAX_ASPECT:
+            return None
+        score += min(candidate.width * candidate.height / TARGET_PIXELS, 1.0)
+        # 越接近 3:4 越好，比例偏离到 MAX_ASPECT 时不加分
+        deviation = abs(math.log(candidate.height / candidate.width / TARGET_RATIO))
+        score += ASPECT_WEIGHT * max(0.0, 1 - deviation / math.log(MAX_ASPECT * TARGET_RATIO))
+    else:
+        score += UNKNOWN_SIZE_SCORE
+    if candidate.format == 'gif':
+        score -= GIF_PENALTY
+    return score
+
+
+def probe_size(url: str, headers: Optional[Dict[str, str]] = None) -> Optional[Tuple[int, int, str]]:
+    """只下载文件头探测图片尺寸和格式，返回 (宽, 高, 格式)"""
+    from PIL import ImageFile
+
+    try:
+        response = get_client().get(url, headers=headers, stream=True)
+    except Exception as e:
+        print(f"探测图片失败: {url} {str(e)}")
+        return None
+    try:
+        if response.status_code != 200:
+            return None
+        parser = ImageFile.Parser()
+        received = 0
+        for chunk in response.iter_content(4096):
+            parser.feed(chunk)
+            received += len(chunk)
+            if parser.image is not None:
+                width, height = parser.image.size
+                return width, height, (parser.image.format or '').lower()
+            if received >= PROBE_BYTES:
+                break
+    except Exception as e:
+        print(f"探测图片失败: {url} {str(e)}")
+    finally:
+        response.close()
+    return None
+
+
+class ImageBudget:
+    """一篇文章的图片预算
+
+    解析页面时逐张登记候选图片（add），按声明的尺寸判断是否值得立即开始下载；
+    解析完成后（select）对尺寸未知的图片探测文件头，按位置、尺寸、比例和格式打分，
+    选出不超过预算的图片做完整下载、处理和上传，其余只登记地址。
+    """
+
+    def __init__(self, limit: int = IMAGE_BUDGET, headers: Optional[Dict[str, str]] = None,
+                 probe: bool = IMAGE_PROBE):
+        self.limit = max(1, min(limit, XHS_MAX_IMAGES))
+        self.headers = headers
+        self.probe = probe
+        self.candidates: List[ImageCandidate] = []
+        self._urls = set()
+        self.admitted = 0
+
+    def add(self, url: str, attrs: Optional[Dict[str, str]] = None) -> bool:
+        """登记候选图片，返回是否值得在解析过程中提前下载"""
+        if url in self._urls:
+            return False
+        self._urls.add(url)
+        candidate = candidate_from_attrs(url, len(self.candidates), attrs or {})
+        self.candidates.append(candidate)
+        # 提前下载的图片数不超过预算，声明了不合适尺寸或格式的不提前下载
+        if self.admitted >= self.limit or candidate.format == 'gif':
+            return False
+        if score_candidate(candidate, len(self.candidates)) is None:
+            return False
+        self.admitted += 1
+        return True
+
+    def _probe_unknown(self) -> None:
+        unknown = [c for c in self.candidates if not c.has_size and c.format not in SKIP_FORMATS][:PROBE_MAX]
+        if not unknown:
+            return
+        with ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(unknown))) as pool:
+            results = list(pool.map(lambda c: probe_size(c.url, self.headers), unknown))
+        for candidate, result in zip(unknown, results):
+            candidate.probed = True
+            if result:
+                candidate.width, candidate.height, fmt = result
+                candidate.format = fmt or candidate.format
+
+    def select(self) -> List[ImageCandidate]:
+        """选出要完整处理的图片，按文章中的顺序返回"""
+        total = len(self.candidates)
+        if self.probe and total > self.limit:
+            self._probe_unknown()
+        for candidate in self.candidates:
+            candidate.score = score_candidate(candidate, total)
+        # 没有合适的图片时返回空列表，由文字卡片补足（text_card.py）
+        eligible = [c for c in self.candidates if c.score is not None]
+        ranked = sorted(eligible, key=lambda c: (-c.score, c.position))[:self.limit]
+        return sorted(ranked, key=lambda c: c.position)
+
+    def select_urls(self) -> List[str]:
+        selected = self.select()
+        skipped = len(self.candidates) - len(selected)
+        if skipped:
+            print(f"图片预算：{len(self.candidates)} 张中选出 {len(selected)} 张，其余 {skipped} 张只登记地址")
+        return [c.url for c in selected]
+
+
+def select_files(paths: List[str], limit: int = IMAGE_BUDGET) -> List[str]:
+    """从本地图片中选出要上传的图片（只读取文件头获取尺寸），按原顺序返回"""
+    from PIL import Image
+
+    if len(paths) <= limit:
+        return paths
+    budget = ImageBudget(limit, probe=False)
+    for path in paths:
+        budget.add(path)
+    for candidate in budget.candidates:
+        try:
+            with Image.open(candidate.url) as img:
+                candidate.width, candidate.height = img.size
+                candidate.format = (img.format or '').lower()
+        except Exception as e:
+            print(f"读取图片失败: {candidate.url} {str(e)}")
+    return budget.select_urls()
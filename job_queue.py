@@ -0,0 +1,445 @@
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional
+from dotenv import load_dotenv
+from http_client import get_client
+
+# 加载环境变量
+load_dotenv()
+
+# 数据目录，默认的任务队列文件保存在这里
+DATA_ROOT = r"E:\fy\智企内推\data"
+QUEUE_DB = 'jobs.db'
+
+# 任务队列：默认使用本地 SQLite 文件（同一台机器上的多个进程共享）；
+# 设置 JOB_QUEUE_URL 后改用网络队列（python job_queue.py serve 启动的服务），多台机器共享
+JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', '')
+JOB_QUEUE_URL = os.getenv('JOB_QUEUE_URL', '').rstrip('/')
+JOB_QUEUE_TOKEN = os.getenv('JOB_QUEUE_TOKEN', '')
+# 领取任务后的租约时长（秒），期间没有心跳续约的任务会被其他进程重新领取
+JOB_VISIBILITY = float(os.getenv('JOB_VISIBILITY', '300'))
+# 每个任务最多尝试的次数，超过后进入死信
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+# 失败重试的退避时间（秒），按尝试次数翻倍
+JOB_RETRY_BACKOFF = float(os.getenv('JOB_RETRY_BACKOFF', '30'))
+
+# 处理阶段：抓取文本、下载处理图片、大模型转换、发布
+STAGES = ('crawl', 'image', 'convert', 'publish')
+
+# 任务状态
+JOB_READY = 'ready'
+JOB_LEASED = 'leased'
+JOB_DONE = 'done'
+JOB_DEAD = 'dead'
+
+# 因依赖的任务进入死信而连带进入死信的任务，依赖的任务重新处理时一并恢复
+DEPENDENCY_DEAD = '依赖的任务进入死信'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    stage TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedupe_key TEXT UNIQUE,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_until REAL,
+    worker TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, stage, available_at);
+CREATE TABLE IF NOT EXISTS job_deps (
+    job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    depends_on INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    PRIMARY KEY (job_id, depends_on)
+);
+CREATE INDEX IF NOT EXISTS idx_job_deps_parent ON job_deps(depends_on);
+"""
+
+
+@dataclass
+class Job:
+    id: int
+    stage: str
+    payload: Dict[str, Any]
+    status: str = JOB_READY
+    attempts: int = 0
+    max_attempts: int = JOB_MAX_ATTEMPTS
+    worker: Optional[str] = None
+    lease_until: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = field(default=None, repr=False)
+
+
+class JobQueue(ABC):
+    """任务队列接口
+
+    任务按阶段（STAGES）入队，工作进程只领取自己负责的阶段。领取（lease）后任务在
+    visibility 秒内对其他进程不可见，处理期间定时心跳续约；进程崩溃或卡住时租约过期，
+    任务重新变为可领取。失败的任务按退避时间重试，超过最大尝试次数后进入死信，
+    依赖它的后续任务一并进入死信。
+    """
+
+    @abstractmethod
+    def enqueue(self, stage: str, payload: Dict[str, Any], dedupe_key: Optional[str] = None,
+                depends_on: Iterable[int] = (), max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        """入队并返回任务编号；dedupe_key 相同的任务只入队一次，返回已有任务的编号"""
+
+    @abstractmethod
+    def lease(self, stages: Iterable[str], worker: str, visibility: float = JOB_VISIBILITY) -> Optional[Job]:
+        """领取一个可处理的任务（依赖的任务都已完成），没有时返回 None"""
+
+    @abstractmethod
+    def heartbeat(self, job_id: int, worker: str, visibility: float = JOB_VISIBILITY) -> bool:
+        """续约，返回 False 表示租约已失效（任务已被其他进程领取）"""
+
+    @abstractmethod
+    def complete(self, job_id: int, worker: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        """标记完成，返回 False 表示租约已失效"""
+
+    @abstractmethod
+    def fail(self, job_id: int, worker: str, error: str) -> str:
+        """标记失败，返回任务的新状态（ready=等待重试，dead=进入死信）"""
+
+    @abstractmethod
+    def defer(self, job_id: int, worker: str, delay: float, reason: str = '') -> bool:
+        """放回队列，delay 秒后再领取，不计入尝试次数（如被目标网站限流）"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """各阶段各状态的任务数"""
+
+    @abstractmethod
+    def dead_letters(self, limit: int = 50) -> List[Job]:
+        """列出死信任务"""
+
+    @abstractmethod
+    def retry_dead(self, job_ids: Optional[Iterable[int]] = None) -> int:
+        """把死信任务（默认全部）重新放回队列，返回数量"""
+
+    def close(self) -> None:
+        pass
+
+
+def _job(row) -> Job:
+    return Job(
+        id=row['id'], stage=row['stage'], payload=json.loads(row['payload']), status=row['status'],
+        attempts=row['attempts'], max_attempts=row['max_attempts'], worker=row['worker'],
+        lease_until=row['lease_until'], error=row['error'],
+        result=json.loads(row['result']) if row['result'] else None,
+    )
+
+
+class SQLiteQueue(JobQueue):
+    """基于 SQLite 文件的任务队列，同一台机器上的多个进程通过文件锁共享
+
+    领取任务在 BEGIN IMMEDIATE 事务中完成，同一时刻只有一个进程能修改队列，
+    不会有两个进程领到同一个任务。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        path = path or JOB_QUEUE_PATH or os.path.join(DATA_ROOT, QUEUE_DB)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        # 自己管理事务（isolation_level=None），领取任务时需要 BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+
+    def enqueue(self, stage: str, payload: Dict[str, Any], dedupe_key: Optional[str] = None,
+                depends_on: Iterable[int] = (), max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        if stage not in STAGES:
+            raise ValueError(f"阶段必须是 {', '.join(STAGES)} 之一：{stage}")
+        now = time.time()
+        with self._transaction() as conn:
+            if dedupe_key:
+                row = conn.execute('SELECT id FROM jobs WHERE dedupe_key = ?', (dedupe_key,)).fetchone()
+                if row:
+                    return row['id']
+            job_id = conn.execute(
+                'INSERT INTO jobs (stage, payload, dedupe_key, status, max_attempts, available_at, created_at, '
+                'updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (stage, json.dumps(payload, ensure_ascii=False), dedupe_key, JOB_READY, max_attempts, now, now, now),
+            ).lastrowid
+            conn.executemany('INSERT OR IGNORE INTO job_deps (job_id, depends_on) VALUES (?, ?)',
+                             [(job_id, parent) for parent in depends_on])
+        return job_id
+
+    def _bury(self, conn, job_ids: List[int], error: str, now: float) -> None:
+        """任务进入死信，依赖它的任务（逐级）也进入死信"""
+        while job_ids:
+            marks = ','.join('?' * len(job_ids))
+            conn.execute(f'UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ? '
+                         f'WHERE id IN ({marks})', (JOB_DEAD, error, now, *job_ids))
+            rows = conn.execute(
+                f'SELECT DISTINCT d.job_id FROM job_deps d JOIN jobs j ON j.id = d.job_id '
+                f'WHERE d.depends_on IN ({marks}) AND j.status IN (?, ?)', (*job_ids, JOB_READY, JOB_LEASED),
+            ).fetchall()
+            job_ids = [row[0] for row in rows]
+            error = DEPENDENCY_DEAD
+
+    def lease(self, stages: Iterable[str], worker: str, visibility: float = JOB_VISIBILITY) -> Optional[Job]:
+        stages = list(stages)
+        marks = ','.join('?' * len(stages))
+        now = time.time()
+        with self._transaction() as conn:
+            # 租约过期的任务：还有尝试次数的重新放回队列，否则进入死信
+            expired = conn.execute(
+                f'SELECT id, attempts, max_attempts FROM jobs WHERE status = ? AND lease_until <= ? '
+                f'AND stage IN ({marks})', (JOB_LEASED, now, *stages),
+            ).fetchall()
+            for row in expired:
+                if row['attempts'] >= row['max_attempts']:
+                    self._bury(conn, [row['id']], '租约过期（处理超时或进程退出）', now)
+                else:
+                    conn.execute('UPDATE jobs SET status = ?, lease_until = NULL, error = ?, updated_at = ? '
+                                 'WHERE id = ?', (JOB_READY, '租约过期（处理超时或进程退出）', now, row['id']))
+            row = conn.execute(
+                f'SELECT * FROM jobs WHERE status = ? AND stage IN ({marks}) AND available_at <= ? '
+                f'AND NOT EXISTS (SELECT 1 FROM job_deps d JOIN jobs p ON p.id = d.depends_on '
+                f'WHERE d.job_id = jobs.id AND p.status != ?) ORDER BY available_at, id LIMIT 1',
+                (JOB_READY, *stages, now, JOB_DONE),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                'UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, lease_until = ?, updated_at = ? '
+                'WHERE id = ?', (JOB_LEASED, worker, now + visibility, now, row['id']),
+            )
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone()
+        return _job(row)
+
+    def heartbeat(self, job_id: int, worker: str, visibility: float = JOB_VISIBILITY) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            return conn.execute(
+                'UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = ?',
+                (now + visibility, now, job_id, worker, JOB_LEASED),
+            ).rowcount > 0
+
+    def complete(self, job_id: int, worker: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        with self._transaction() as conn:
+            return conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = NULL, lease_until = NULL, updated_at = ? '
+                'WHERE id = ? AND worker = ? AND status = ?',
+                (JOB_DONE, json.dumps(result, ensure_ascii=False) if result is not None else None, time.time(),
+                 job_id, worker, JOB_LEASED),
+            ).rowcount > 0
+
+    def fail(self, job_id: int, worker: str, error: str) -> str:
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None or row['status'] != JOB_LEASED or row['worker'] != worker:
+                # 租约已失效，以当前持有者的处理结果为准
+                return row['status'] if row else JOB_DEAD
+            if row['attempts'] >= row['max_attempts']:
+                self._bury(conn, [job_id], error, now)
+                return JOB_DEAD
+            delay = JOB_RETRY_BACKOFF * 2 ** (row['attempts'] - 1)
+            conn.execute('UPDATE jobs SET status = ?, error = ?, lease_until = NULL, available_at = ?, '
+                         'updated_at = ? WHERE id = ?', (JOB_READY, error, now + delay, now, job_id))
+            return JOB_READY
+
+    def defer(self, job_id: int, worker: str, delay: float, reason: str = '') -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            return conn.execute(
+                'UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), error = ?, lease_until = NULL, '
+                'available_at = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = ?',
+                (JOB_READY, reason or None, now + delay, now, job_id, worker, JOB_LEASED),
+            ).rowcount > 0
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            rows = self.conn.execute('SELECT stage, status, COUNT(*) AS n FROM jobs GROUP BY stage, status').fetchall()
+        result: Dict[str, Dict[str, int]] = {}
+        for row in rows:
+            result.setdefault(row['stage'], {})[row['status']] = row['n']
+        return result
+
+    def dead_letters(self, limit: int = 50) -> List[Job]:
+        with self._lock:
+            rows = self.conn.execute('SELECT * FROM jobs WHERE status = ? ORDER BY updated_at DESC LIMIT ?',
+                                     (JOB_DEAD, limit)).fetchall()
+        return [_job(row) for row in rows]
+
+    def retry_dead(self, job_ids: Optional[Iterable[int]] = None) -> int:
+        now = time.time()
+        reset = ('UPDATE jobs SET status = ?, attempts = 0, available_at = ?, lease_until = NULL, worker = NULL, '
+                 'updated_at = ? WHERE status = ?')
+        with self._transaction() as conn:
+            if job_ids is None:
+                return conn.execute(reset, (JOB_READY, now, now, JOB_DEAD)).rowcount
+            ids = list(job_ids)
+            count = 0
+            while ids:
+                marks = ','.join('?' * len(ids))
+                count += conn.execute(f'{reset} AND id IN ({marks})', (JOB_READY, now, now, JOB_DEAD, *ids)).rowcount
+                rows = conn.execute(
+                    f'SELECT DISTINCT d.job_id FROM job_deps d JOIN jobs j ON j.id = d.job_id '
+                    f'WHERE d.depends_on IN ({marks}) AND j.status = ? AND j.error = ?',
+                    (*ids, JOB_DEAD, DEPENDENCY_DEAD),
+                ).fetchall()
+                ids = [row[0] for row in rows]
+            return count
+
+
+class HttpQueue(JobQueue):
+    """网络任务队列客户端，请求转发给 serve() 启动的队列服务，多台机器共享同一个队列"""
+
+    def __init__(self, base_url: str = JOB_QUEUE_URL, token: str = JOB_QUEUE_TOKEN):
+        self.base_url = base_url.rstrip('/')
+        self.headers = {'Authorization': f'Bearer {token}'} if token else {}
+
+    def _call(self, method: str, **params) -> Any:
+        response = get_client().post(f'{self.base_url}/{method}', json=params, headers=self.headers)
+        if response.status_code != 200:
+            raise RuntimeError(f"任务队列服务返回 {response.status_code}: {response.text[:200]}")
+        return response.json()['result']
+
+    def enqueue(self, stage: str, payload: Dict[str, Any], dedupe_key: Optional[str] = None,
+                depends_on: Iterable[int] = (), max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        return self._call('enqueue', stage=stage, payload=payload, dedupe_key=dedupe_key,
+                          depends_on=list(depends_on), max_attempts=max_attempts)
+
+    def lease(self, stages: Iterable[str], worker: str, visibility: float = JOB_VISIBILITY) -> Optional[Job]:
+        job = self._call('lease', stages=list(stages), worker=worker, visibility=visibility)
+        return Job(**job) if job else None
+
+    def heartbeat(self, job_id: int, worker: str, visibility: float = JOB_VISIBILITY) -> bool:
+        return self._call('heartbeat', job_id=job_id, worker=worker, visibility=visibility)
+
+    def complete(self, job_id: int, worker: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        return self._call('complete', job_id=job_id, worker=worker, result=result)
+
+    def fail(self, job_id: int, worker: str, error: str) -> str:
+        return self._call('fail', job_id=job_id, worker=worker, error=error)
+
+    def defer(self, job_id: int, worker: str, delay: float, reason: str = '') -> bool:
+        return self._call('defer', job_id=job_id, worker=worker, delay=delay, reason=reason)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return self._call('stats')
+
+    def dead_letters(self, limit: int = 50) -> List[Job]:
+        return [Job(**job) for job in self._call('dead_letters', limit=limit)]
+
+    def retry_dead(self, job_ids: Optional[Iterable[int]] = None) -> int:
+        return self._call('retry_dead', job_ids=list(job_ids) if job_ids is not None else None)
+
+
+# 队列服务对外开放的方法
+QUEUE_METHODS = ('enqueue', 'lease', 'heartbeat', 'complete', 'fail', 'defer', 'stats', 'dead_letters',
+                 'retry_dead')
+
+
+def make_server(queue: JobQueue, host: str = '127.0.0.1', port: int = 8765,
+                token: str = JOB_QUEUE_TOKEN) -> ThreadingHTTPServer:
+    """创建队列服务：POST /<方法名>，请求体为 JSON 参数，返回 {"result": ...}"""
+
+    class Handler(BaseHTTPRequestHandler):
+        # 长连接复用，关闭 Nagle 算法避免小响应被延迟发送
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            method = self.path.strip('/')
+            # 先读完请求体，长连接上的下一个请求才能正确解析
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if token and self.headers.get('Authorization') != f'Bearer {token}':
+                return self._reply(401, {'error': '未授权'})
+            if method not in QUEUE_METHODS:
+                return self._reply(404, {'error': f'未知方法: {method}'})
+            try:
+                params = json.loads(body or b'{}')
+                result = getattr(queue, method)(**params)
+            except (TypeError, ValueError) as e:
+                return self._reply(400, {'error': str(e)})
+            except Exception as e:
+                return self._reply(500, {'error': str(e)})
+            if isinstance(result, Job):
+                result = asdict(result)
+            elif isinstance(result, list):
+                result = [asdict(item) if isinstance(item, Job) else item for item in result]
+            self._reply(200, {'result': result})
+
+        def _reply(self, status: int, body: Dict[str, Any]) -> None:
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def get_queue() -> JobQueue:
+    """按配置返回任务队列：设置了 JOB_QUEUE_URL 时使用网络队列，否则使用本地 SQLite 队列"""
+    if JOB_QUEUE_URL:
+        return HttpQueue(JOB_QUEUE_URL, JOB_QUEUE_TOKEN)
+    return SQLiteQueue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="任务队列服务：供多台机器上的工作进程共享同一个队列")
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve_parser = sub.add_parser('serve', help="启动队列服务（数据保存在本地 SQLite 文件）")
+    serve_parser.add_argument('--host', default='0.0.0.0')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--path', default=None, help="队列文件，默认为数据目录下的 jobs.db")
+    args = parser.parse_args()
+
+    queue = SQLiteQueue(args.path)
+    server = make_server(queue, args.host, args.port)
+    if not JOB_QUEUE_TOKEN and args.host not in ('127.0.0.1', 'localhost'):
+        print("提示：未设置 JOB_QUEUE_TOKEN，任何能访问该端口的机器都可以操作队列")
+    print(f"任务队列服务已启动：http://{args.host}:{args.port}（{queue.path}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n停止服务")
+    finally:
+        server.server_close()
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import os
+import json
+from collections import Counter
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# 关键词 -> emoji
+EMOJI_RULES: Dict[str, str] = {
+    "推荐": "👍",
+    "分享": "🎉",
+    "喜欢": "❤️",
+    "建议": "💡",
+    "提醒": "⚠️",
+    "注意": "❗",
+    "重要": "‼️",
+    "游戏": "🎮",
+    "直播": "📱",
+    "玩家": "👥",
+    "成本": "💰",
+    "营销": "📢",
+    "人工智能": "🤖",
+    "AI": "🤖",
+    "数据": "📊",
+    "增长": "📈",
+    "下降": "📉",
+    "用户": "🙋",
+    "客户": "🤝",
+    "合作": "🤝",
+    "团队": "👨‍💻",
+    "技术": "🔧",
+    "创新": "💡",
+    "安全": "🔒",
+    "效率": "⚡",
+    "时间": "⏰",
+    "目标": "🎯",
+    "成功": "🏆",
+    "第一": "🥇",
+    "冠军": "🏆",
+    "学习": "📚",
+    "课程": "📖",
+    "干货": "📝",
+    "免费": "🆓",
+    "福利": "🎁",
+    "礼物": "🎁",
+    "惊喜": "😮",
+    "开心": "😄",
+    "旅行": "✈️",
+    "美食": "🍜",
+    "咖啡": "☕",
+    "音乐": "🎵",
+    "电影": "🎬",
+    "手机": "📱",
+    "电脑": "💻",
+    "眼镜": "👓",
+    "汽车": "🚗",
+    "健康": "💪",
+    "运动": "🏃",
+    "火爆": "🔥",
+    "热门": "🔥",
+    "爆款": "💥",
+    "新品": "🆕",
+    "发布": "🚀",
+    "上线": "🚀",
+    "未来": "🔮",
+    "全球": "🌍",
+    "中国": "🇨🇳",
+    "品牌": "🏷️",
+    "电商": "🛒",
+    "购物": "🛍️",
+    "价格": "💰",
+    "省钱": "💸",
+}
+
+# 关键词 -> 话题标签
+TAG_RULES: Dict[str, str] = {
+    "人工智能": "#人工智能",
+    "AI": "#AI",
+    "大模型": "#大模型",
+    "ChatGPT": "#ChatGPT",
+    "机器学习": "#机器学习",
+    "数据": "#数据分析",
+    "数字化": "#数字化转型",
+    "营销": "#营销干货",
+    "品牌": "#品牌营销",
+    "增长": "#用户增长",
+    "运营": "#运营干货",
+    "私域": "#私域运营",
+    "电商": "#电商",
+    "直播": "#直播带货",
+    "带货": "#直播带货",
+    "游戏": "#游戏",
+    "玩家": "#游戏",
+    "电竞": "#电竞",
+    "客服": "#智能客服",
+    "客户服务": "#智能客服",
+    "出海": "#出海",
+    "创业": "#创业",
+    "职场": "#职场干货",
+    "面试": "#求职面试",
+    "招聘": "#招聘",
+    "内推": "#内推",
+    "学习": "#学习方法",
+    "读书": "#读书笔记",
+    "科技": "#科技",
+    "黑科技": "#黑科技",
+    "数码": "#数码好物",
+    "手机": "#数码好物",
+    "眼镜": "#智能眼镜",
+    "CES": "#CES",
+    "汽车": "#汽车",
+    "新能源": "#新能源",
+    "健康": "#健康生活",
+    "运动": "#运动健身",
+    "美食": "#美食分享",
+    "旅行": "#旅行攻略",
+    "护肤": "#护肤",
+    "美妆": "#美妆",
+    "美瞳": "#美瞳",
+    "穿搭": "#穿搭",
+    "理财": "#理财",
+    "投资": "#投资理财",
+    "教育": "#教育",
+    "设计": "#设计灵感",
+    "产品": "#产品经理",
+    "程序员": "#程序员",
+    "开发": "#程序员",
+    "云计算": "#云计算",
+    "安全": "#网络安全",
+}
+
+# 话题匹配不足时补充的通用标签
+DEFAULT_TAGS: List[str] = [
+    "#经验分享",
+    "#干货分享",
+    "#每日一读",
+    "#文章推荐",
+    "#干货必看",
+]
+
+
+class KeywordMatcher:
+    """多关键词匹配器（Aho-Corasick）
+
+    所有关键词编译成一个自动机，一次扫描完成匹配，耗时只与文本长度有关，
+    与词典大小无关。重叠时取最左、最长的关键词。
+    """
+
+    def __init__(self, rules: Dict[str, str]):
+        self.rules = {k: v for k, v in rules.items() if k}
+        # 对反转后的关键词建自动机：反向扫描时每个位置得到的是“从该位置开始的最长关键词”
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[int] = [0]
+        for key in self.rules:
+            self._add(key[::-1])
+        self._build()
+
+    def _add(self, word: str) -> None:
+        """向字典树加入一个词"""
+        node = 0
+        for ch in word:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(0)
+            node = nxt
+        self._out[node] = len(word)
+
+    def _build(self) -> None:
+        """按层计算失败指针，并把后缀上的最长输出传递下来"""
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                fail = self._goto[f].get(ch, 0)
+                self._fail[child] = fail if fail != child else 0
+                if not self._out[child]:
+                    self._out[child] = self._out[self._fail[child]]
+
+    def _longest_at(self, text: str) -> List[int]:
+        """返回每个位置开始的最长关键词长度（0 表示没有）"""
+        goto, fail, out = self._goto, self._fail, self._out
+        lengths = [0] * len(text)
+        node = 0
+        for i in range(len(text) - 1, -1, -1):
+            ch = text[i]
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            lengths[i] = out[node]
+        return lengths
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """依次产出不重叠的匹配 (起点, 终点, 规则值)"""
+        if not self.rules or not text:
+            return
+        lengths = self._longest_at(text)
+        i = 0
+        n = len(text)
+        while i < n:
+            length = lengths[i]
+            if length:
+                yield i, i + length, self.rules[text[i:i + length]]
+                i += length
+            else:
+                i += 1
+
+    def annotate(self, text: str, fmt: Optional[Callable[[str, str], str]] = None) -> str:
+        """在匹配到的关键词后插入规则值，默认格式为 关键词+emoji"""
+        fmt = fmt or (lambda key, value: f"{key}{value}")
+        parts = []
+        last = 0
+        for start, end, value in self.finditer(text):
+            parts.append(text[last:start])
+            parts.append(fmt(text[start:end], value))
+            last = end
+        if not parts:
+            return text
+        parts.append(text[last:])
+        return "".join(parts)
+
+    def count_values(self, text: str) -> Counter:
+        """统计每个规则值被命中的次数"""
+        return Counter(value for _, _, value in self.finditer(text))
+
+    def pick(self, text: str, max_count: int = 6, min_count: int = 3,
+             defaults: Optional[List[str]] = None) -> List[str]:
+        """按命中次数选出最多 max_count 个值，不足 min_count 时用默认值补齐"""
+        picked = [value for value, _ in self.count_values(text).most_common(max_count)]
+        for value in defaults or []:
+            if len(picked) >= min_count:
+                break
+            if value not in picked:
+                picked.append(value)
+        return picked
+
+
+def load_rules(path: Optional[str], default: Dict[str, str]) -> Dict[str, str]:
+    """从JSON文件加载 关键词->值 规则表，文件不存在时使用默认规则"""
+    if not path:
+        return dict(default)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            rules = json.load(f)
+        if not isinstance(rules, dict):
+            raise ValueError("规则文件必须是 关键词->值 的JSON对象")
+        print(f"已加载 {len(rules)} 条规则: {path}")
+        return {str(k): str(v) for k, v in rules.items()}
+    except Exception as e:
+        print(f"加载规则文件失败，使用默认规则: {str(e)}")
+        return dict(default)
+
+
+_matchers: Dict[Tuple[str, str], KeywordMatcher] = {}
+
+
+def get_matcher(kind: str) -> KeywordMatcher:
+    """获取编译好的匹配器（按规则文件缓存），kind 为 'emoji' 或 'tag'"""
+    if kind == 'emoji':
+        path, default = os.getenv('EMOJI_RULES_PATH', ''), EMOJI_RULES
+    elif kind == 'tag':
+        path, default = os.getenv('TAG_RULES_PATH', ''), TAG_RULES
+    else:
+        raise ValueError(f"未知的规则类型: {kind}")
+    cache_key = (kind, path)
+    if cache_key not in _matchers:
+        _matchers[cache_key] = KeywordMatcher(load_rules(path, default))
+    return _matchers[cache_key]
@@ -0,0 +1,374 @@
+import os
+import json
+import time
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from http_client import CONNECT_TIMEOUT, get_client
+from provider_health import ProviderHealth, get_health
+
+# 鉴权方式：bearer -> "Authorization: Bearer <key>"，raw -> "Authorization: <key>"，api-key -> "api-key: <key>"
+AUTH_STYLES = ('bearer', 'raw', 'api-key')
+RESPONSE_FORMATS = ('', 'json_object', 'json_schema')
+
+# 对冲请求：主服务商首个 token 的延迟超过历史该分位数时，向备用服务商发同样的请求
+HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', '0.95'))
+# 样本不足时使用的对冲等待时间（秒）
+HEDGE_DEFAULT_DELAY = float(os.getenv('LLM_HEDGE_DELAY', '8'))
+# 开始按分位数计算前需要的样本数
+HEDGE_MIN_SAMPLES = 10
+
+
+@dataclass
+class ProviderConfig:
+    name: str
+    base_url: str
+    api_key: str
+    model: str
+    auth_style: str = 'bearer'
+    timeout: float = 60
+    temperature: float = 0.7
+    stream: bool = True
+    # 结构化输出：json_schema（按 schema 约束）、json_object（只保证是JSON），留空表示不支持，只靠提示词约束
+    response_format: str = ''
+    # 是否支持 n 参数（一次请求返回多个结果，输入只计费一次）
+    supports_n: bool = False
+
+    @property
+    def key(self) -> str:
+        """健康状态按 服务商/模型 区分"""
+        return f'{self.name}/{self.model}'
+
+    def headers(self) -> Dict[str, str]:
+        """按鉴权方式生成请求头"""
+        headers = {'Content-Type': 'application/json'}
+        if self.auth_style == 'raw':
+            headers['Authorization'] = self.api_key
+        elif self.auth_style == 'api-key':
+            headers['api-key'] = self.api_key
+        else:
+            headers['Authorization'] = f'Bearer {self.api_key}'
+        return headers
+
+
+def load_providers() -> Dict[str, ProviderConfig]:
+    """加载服务商配置
+
+    内置两个使用 BASE_URL / ZHI_API_KEY 的配置：gpt-4（原始密钥鉴权）和 qwen-max（Bearer 鉴权）。
+    LLM_PROVIDERS_PATH 指向的JSON文件可以追加或覆盖配置，格式为对象列表，
+    密钥可以写在 api_key，或用 api_key_env 指定环境变量名。
+    """
+    base_url = os.getenv('BASE_URL', '')
+    api_key = os.getenv('ZHI_API_KEY', '')
+    timeout = float(os.getenv('LLM_TIMEOUT', '60'))
+    providers = {
+        'gpt-4': ProviderConfig('gpt-4', base_url, api_key, 'gpt-4', auth_style='raw', timeout=timeout),
+        'qwen-max': ProviderConfig('qwen-max', base_url, api_key, 'qwen-max', auth_style='bearer', timeout=timeout,
+                                   response_format='json_object'),
+    }
+    path = os.getenv('LLM_PROVIDERS_PATH')
+    if path:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for item in json.load(f):
+                    item = dict(item)
+                    key_env = item.pop('api_key_env', None)
+                    if key_env:
+                        item['api_key'] = os.getenv(key_env, '')
+                    config = ProviderConfig(**item)
+                    if config.auth_style not in AUTH_STYLES:
+                        raise ValueError(f"服务商 {config.name} 的鉴权方式无效: {config.auth_style}")
+                    if config.response_format not in RESPONSE_FORMATS:
+                        raise ValueError(f"服务商 {config.name} 的结构化输出方式无效: {config.response_format}")
+                    providers[config.name] = config
+        except Exception as e:
+            print(f"加载服务商配置失败: {str(e)}")
+    return providers
+
+
+class Cancelled(Exception):
+    """请求被对冲的另一方抢先完成"""
+
+
+class LLMEngine:
+    """统一的大模型调用引擎
+
+    服务商（地址、鉴权方式、模型、超时）可插拔，按任务选择。配置了备用服务商时使用对冲请求：
+    主服务商在历史首 token 延迟的分位数内没有返回首个 token，就向备用服务商发同样的请求，
+    谁先完成用谁，另一方取消。只有慢请求才会触发对冲，不会让每次调用的成本翻倍。
+    """
+
+    def __init__(self, primary: str, secondary: Optional[str] = None,
+                 providers: Optional[Dict[str, ProviderConfig]] = None,
+                 hedge_percentile: float = HEDGE_PERCENTILE):
+        self.providers = providers or load_providers()
+        if primary not in self.providers:
+            raise ValueError(f"未知的服务商: {primary}，可选: {', '.join(self.providers)}")
+        if secondary and secondary not in self.providers:
+            raise ValueError(f"未知的备用服务商: {secondary}，可选: {', '.join(self.providers)}")
+        self.primary = self.providers[primary]
+        self.secondary = self.providers[secondary] if secondary and secondary != primary else None
+        self.hedge_percentile = hedge_percentile
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self._lock = threading.Lock()
+
+    def health(self, provider: ProviderConfig) -> ProviderHealth:
+        return get_health(provider.key)
+
+    # ---- 单个服务商 ----
+
+    def _payload(self, provider: ProviderConfig, messages: List[Dict[str, str]], stream: bool,
+                 extra: Optional[Dict] = None, json_schema: Optional[Dict] = None, n: int = 1) -> Dict:
+        data = {
+            'model': provider.model,
+            'messages': messages,
+            'temperature': provider.temperature,
+        }
+        if stream:
+            data['stream'] = True
+        if n > 1 and provider.supports_n:
+            data['n'] = n
+        if json_schema and provider.response_format == 'json_schema':
+            data['response_format'] = {
+                'type': 'json_schema',
+                'json_schema': {'name': 'output', 'schema': json_schema, 'strict': True},
+            }
+        elif json_schema and provider.response_format == 'json_object':
+            data['response_format'] = {'type': 'json_object'}
+        if extra:
+            data.update(extra)
+        return data
+
+    def call(self, provider: ProviderConfig, messages: List[Dict[str, str]],
+             cancel: Optional[threading.Event] = None, on_first_token=None,
+             on_response=None, extra: Optional[Dict] = None, json_schema: Optional[Dict] = None,
+             on_delta: Optional[Callable[[str, str], None]] = None) -> Optional[str]:
+        """调用一个服务商，返回生成的内容，失败或熔断中返回 None
+
+        cancel 被设置后停止读取；on_response 收到响应对象，供对冲的另一方关闭连接；
+        on_delta 收到 (服务商名称, 新生成的文本)，用于边生成边解析；
+        json_schema 按服务商支持的方式开启结构化输出。
+        读取超时由观测到的 p99 推算，结果计入该服务商的熔断器。
+        """
+        choices = self._call(provider, messages, cancel, on_first_token, on_response, extra, json_schema, on_delta)
+        return choices[0] if choices else None
+
+    def _call(self, provider: ProviderConfig, messages: List[Dict[str, str]],
+              cancel: Optional[threading.Event] = None, on_first_token=None,
+              on_response=None, extra: Optional[Dict] = None, json_schema: Optional[Dict] = None,
+              on_delta: Optional[Callable[[str, str], None]] = None, n: int = 1) -> Optional[List[str]]:
+        """同 call，返回全部结果（n > 1 且服务商支持 n 参数时有多个），on_delta 只收到第一个结果的文本"""
+        health = self.health(provider)
+        if not health.allow():
+            print(f"[{provider.name}] 熔断中，跳过请求")
+            return None
+
+        started = time.perf_counter()
+        stream = provider.stream
+        got_first = False
+        # True=成功，False=失败（计入熔断），None=不计（被取消或请求本身有误）
+        outcome = None
+        response = None
+        try:
+            response = get_client().post(
+                f'{provider.base_url}/chat/completions',
+                headers=provider.headers(),
+                json=self._payload(provider, messages, stream, extra, json_schema, n),
+                timeout=(CONNECT_TIMEOUT, health.timeout(provider.timeout, first_token=stream)),
+                stream=stream,
+            )
+            if on_response:
+                on_response(response)
+            if response.status_code != 200:
+                # 限流和服务端错误说明服务商不健康；其他 4xx 是请求本身的问题
+                outcome = False if response.status_code == 429 or response.status_code >= 500 else None
+                print(f"[{provider.name}] API调用失败: {response.status_code}")
+                print(f"错误信息: {response.text[:500]}")
+                return None
+
+            if not stream:
+                result = response.json()
+                health.record_first_token(time.perf_counter() - started)
+                if on_first_token:
+                    on_first_token()
+                outcome = False
+                if 'choices' not in result:
+                    print(f"[{provider.name}] API响应格式错误，缺少 'choices' 字段")
+                    return None
+                if not result['choices'] or 'message' not in result['choices'][0]:
+                    print(f"[{provider.name}] API响应格式错误，无法获取生成的内容")
+                    return None
+                outcome = True
+                ordered = sorted(result['choices'], key=lambda choice: choice.get('index', 0))
+                contents = [choice['message']['content'] for choice in ordered if choice.get('message')]
+                if on_delta and contents[0]:
+                    on_delta(provider.name, contents[0])
+                return [content for content in contents if content] or None
+
+            # 流式响应：逐块读取，首个 token 到达时记录延迟
+            # 按字节分行再用 UTF-8 解码：SSE 响应常不带 charset，按 latin-1 解码后 splitlines 会在中文中间断行
+            # 使用 n 参数时各个结果的片段交错到达，按 index 分开
+            parts: Dict[int, List[str]] = {}
+            for raw in response.iter_lines():
+                if cancel is not None and cancel.is_set():
+                    raise Cancelled()
+                line = raw.decode('utf-8')
+                if not line or not line.startswith('data:'):
+                    continue
+                chunk = line[5:].strip()
+                if chunk == '[DONE]':
+                    break
+                for choice in json.loads(chunk).get('choices') or []:
+                    delta = choice.get('delta') or choice.get('message') or {}
+                    text = delta.get('content')
+                    if not text:
+                        continue
+                    if not got_first:
+                        got_first = True
+                        health.record_first_token(time.perf_counter() - started)
+                        if on_first_token:
+                            on_first_token()
+                    index = choice.get('index') or 0
+                    parts.setdefault(index, []).append(text)
+                    if on_delta and index == 0:
+                        on_delta(provider.name, text)
+            outcome = bool(parts)
+            return [''.join(parts[index]) for index in sorted(parts)] or None
+
+        except Exception as e:
+            if cancel is not None and cancel.is_set():
+                # 被对冲的另一方取消。不记录延迟：被取消的慢请求如果计入样本，
+                # 分位数会被推高到慢请求的水平，对冲从此不再触发
+                outcome = None
+                return None
+            outcome = False
+            if isinstance(e, json.JSONDecodeError):
+                print(f"[{provider.name}] API响应解析失败: {str(e)}")
+            else:
+                print(f"[{provider.name}] 调用API时出错: {str(e)}")
+            return None
+        finally:
+            if response is not None:
+                response.close()
+            if outcome is True:
+                health.record_success(time.perf_counter() - started)
+            elif outcome is False:
+                health.record_failure()
+            else:
+                health.release()
+
+    # ---- 对冲请求 ----
+
+    def hedge_delay(self) -> float:
+        """主服务商首 token 延迟的分位数，样本不足时用默认值"""
+        window = self.health(self.primary).first_token
+        if len(window.samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return window.percentile(self.hedge_percentile)
+
+    def complete(self, messages: List[Dict[str, str]], extra: Optional[Dict] = None,
+                 json_schema: Optional[Dict] = None,
+                 on_delta: Optional[Callable[[str, str], None]] = None) -> Optional[str]:
+        """生成内容
+
+        配置了备用服务商时：主服务商首 token 太慢则对冲；主服务商失败或熔断中则直接改用备用服务商。
+        对冲时两个服务商的 on_delta 交错到达，用服务商名称区分。
+        """
+        choices = self._complete(messages, extra, json_schema, on_delta)
+        return choices[0] if choices else None
+
+    def supports_n(self) -> bool:
+        """主服务商和备用服务商都支持 n 参数"""
+        return all(p.supports_n for p in (self.primary, self.secondary) if p)
+
+    def complete_choices(self, messages: List[Dict[str, str]], n: int, extra: Optional[Dict] = None,
+                         json_schema: Optional[Dict] = None) -> Optional[List[str]]:
+        """用 n 参数一次生成多个结果（同样的输入只发送、计费一次），服务商不支持时只有一个结果"""
+        return self._complete(messages, extra, json_schema, None, n)
+
+    def _complete(self, messages: List[Dict[str, str]], extra: Optional[Dict] = None,
+                  json_schema: Optional[Dict] = None,
+                  on_delta: Optional[Callable[[str, str], None]] = None, n: int = 1) -> Optional[List[str]]:
+        if not self.secondary:
+            return self._call(self.primary, messages, extra=extra, json_schema=json_schema, on_delta=on_delta, n=n)
+
+        results: queue.Queue = queue.Queue()
+        # 主服务商返回首个 token 或结束时唤醒
+        wake = threading.Event()
+        primary_first = threading.Event()
+        cancels = {self.primary.name: threading.Event(), self.secondary.name: threading.Event()}
+        responses = {}
+
+        def worker(provider: ProviderConfig, on_first_token=None):
+            content = self._call(provider, messages, cancel=cancels[provider.name],
+                                 on_first_token=on_first_token,
+                                 on_response=lambda r: responses.__setitem__(provider.name, r),
+                                 extra=extra, json_schema=json_schema, on_delta=on_delta, n=n)
+            results.put((provider, content))
+            wake.set()
+
+        def start_secondary():
+            threading.Thread(target=worker, args=(self.secondary,), daemon=True).start()
+
+        def on_primary_first_token():
+            primary_first.set()
+            wake.set()
+
+        threading.Thread(target=worker, args=(self.primary, on_primary_first_token), daemon=True).start()
+        running = 1
+        secondary_started = False
+        hedged = False
+
+        # 等待主服务商的首个 token，超过阈值仍没有就发起对冲
+        delay = self.hedge_delay()
+        if not wake.wait(delay):
+            with self._lock:
+                self.hedges += 1
+            print(f"[{self.primary.name}] {delay:.1f}s 内没有返回首个 token，同时请求 {self.secondary.name}")
+            start_secondary()
+            running += 1
+            secondary_started = hedged = True
+
+        while running:
+            provider, content = results.get()
+            running -= 1
+            if content:
+                # 取消另一方：设置标志并关闭连接。关闭可能要等对方正在进行的读取结束，放到后台线程
+                for name, cancel in cancels.items():
+                    if name != provider.name:
+                        cancel.set()
+                        loser = responses.get(name)
+                        if loser is not None:
+                            threading.Thread(target=loser.close, daemon=True).start()
+                if provider is self.secondary and hedged:
+                    with self._lock:
+                        self.hedge_wins += 1
+                    if not primary_first.is_set():
+                        # 备用服务商整篇生成完时主服务商连首个 token 都没返回，计入主服务商的熔断器，
+                        # 否则主服务商卡死时每次都被对冲掩盖，熔断器永远不会打开
+                        self.health(self.primary).record_failure()
+                return content
+            if provider is self.primary and not secondary_started:
+                # 主服务商失败或熔断中，改用备用服务商
+                with self._lock:
+                    self.failovers += 1
+                print(f"[{self.primary.name}] 调用失败，改用 {self.secondary.name}")
+                start_secondary()
+                running += 1
+                secondary_started = True
+        return None
+
+    def stats(self) -> Dict[str, object]:
+        """对冲/故障转移统计，以及各服务商的熔断状态、错误率、延迟分位数和当前超时"""
+        providers = [p for p in (self.primary, self.secondary) if p]
+        return {
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'failovers': self.failovers,
+            'hedge_delay': round(self.hedge_delay(), 3),
+            'providers': {p.key: self.health(p).snapshot(p.timeout) for p in providers},
+        }
@@ -0,0 +1,291 @@
+import os
+import time
+import random
+import threading
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, TypeVar
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+from http_client import get_client
+from ua_pool import random_user_agent
+
+# 加载环境变量
+load_dotenv()
+
+# 按域名自适应限速（AIMD）：正常响应时每次增加 POLITE_INCREASE 次/秒，
+# 被限流（429/503、验证页）时乘以 POLITE_DECREASE 并暂停一段时间
+POLITE_ENABLED = os.getenv('POLITE_ENABLED', 'true').lower() not in ('0', 'false', 'no', 'off')
+# 初始速率和上下限（每个域名每秒请求数，进程内共享）
+POLITE_RATE = float(os.getenv('POLITE_RATE', '0.5'))
+POLITE_MIN_RATE = float(os.getenv('POLITE_MIN_RATE', '0.02'))
+POLITE_MAX_RATE = float(os.getenv('POLITE_MAX_RATE', '5'))
+POLITE_INCREASE = float(os.getenv('POLITE_INCREASE', '0.05'))
+POLITE_DECREASE = float(os.getenv('POLITE_DECREASE', '0.5'))
+# 请求间隔的随机浮动比例，避免固定节奏
+POLITE_JITTER = float(os.getenv('POLITE_JITTER', '0.3'))
+# 被限流后暂停的秒数，连续被限流时翻倍，最多 POLITE_MAX_COOLDOWN
+POLITE_COOLDOWN = float(os.getenv('POLITE_COOLDOWN', '30'))
+POLITE_MAX_COOLDOWN = float(os.getenv('POLITE_MAX_COOLDOWN', '900'))
+# 进程内最多等待的秒数，超过时不再等待，抛出 ThrottledError 交给调用方稍后重试
+POLITE_MAX_WAIT = float(os.getenv('POLITE_MAX_WAIT', '60'))
+# 被限流后在进程内换身份重试的次数
+POLITE_RETRIES = int(os.getenv('POLITE_RETRIES', '1'))
+# 响应耗时超过平均值的倍数时视为服务端开始吃力，不再提速并小幅降速
+POLITE_SLOW_FACTOR = float(os.getenv('POLITE_SLOW_FACTOR', '3'))
+
+# 表示被限流的状态码
+THROTTLE_STATUSES = frozenset((429, 503))
+# 公众号的验证页：跳转地址和页面中的提示文字
+VERIFY_URL_MARKERS = ('wappoc_appmsgcaptcha', '/mp/verify', 'secitptpage')
+VERIFY_TEXT_MARKERS = ('环境异常', '完成验证后即可继续访问', '访问过于频繁', '请输入验证码')
+# 接近上次被限流时的速率后放慢提速，平均速率更接近服务端能承受的上限
+CEILING_MARGIN = 0.9
+# 响应耗时的指数移动平均系数，至少 SLOW_MIN_SAMPLES 个样本后才判断变慢，
+# 且比平均值至少多 SLOW_MIN_DELAY 秒（避免本来就很快的响应偶尔波动被当成变慢）
+LATENCY_ALPHA = 0.2
+SLOW_MIN_SAMPLES = 5
+SLOW_MIN_DELAY = 1.0
+
+T = TypeVar('T')
+
+
+class ThrottledError(Exception):
+    """被目标网站限流（状态码或验证页），retry_after 秒后再试"""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def retry_after_seconds(value: Optional[str]) -> float:
+    """解析 Retry-After 响应头（秒数或 HTTP 日期），无法解析时返回 0"""
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def is_verify_page(url: str = '', text: str = '') -> bool:
+    """是否为验证页（按跳转地址或页面文字判断）；正文中也可能出现提示文字，
+    只在页面缺少正文时按文字判断"""
+    return any(marker in url for marker in VERIFY_URL_MARKERS) or any(marker in text for marker in VERIFY_TEXT_MARKERS)
+
+
+def check_response(response) -> None:
+    """检查状态码和跳转地址，被限流时抛出 ThrottledError"""
+    if response.status_code in THROTTLE_STATUSES:
+        raise ThrottledError(f"被限流（{response.status_code}）",
+                             retry_after_seconds(response.headers.get('Retry-After')))
+    if is_verify_page(response.url or ''):
+        raise ThrottledError("跳转到了验证页")
+
+
+@dataclass
+class HostState:
+    rate: float
+    user_agent: str
+    # 下一个请求最早的发出时间（time.monotonic）
+    next_at: float = 0.0
+    # 被限流后的暂停截止时间
+    blocked_until: float = 0.0
+    # 上次被限流时的速率
+    ceiling: float = 0.0
+    # 连续被限流的次数，决定暂停时长
+    strikes: int = 0
+    # 上次降速的时间，在此之前发出的请求再被限流不重复降速
+    decreased_at: float = 0.0
+    # 站点声明的速率上限（如 robots.txt 的 Crawl-delay），0 表示不限
+    max_rate: float = 0.0
+    latency: float = 0.0
+    samples: int = 0
+    requests: int = 0
+    throttled: int = 0
+    slow: int = 0
+
+
+class PolitenessScheduler:
+    """按域名的自适应请求调度
+
+    - 每个域名单独维护速率，请求间隔为 1/速率 并随机浮动，同一进程内的所有线程共享
+    - 正常响应时线性提速，被限流时速率减半并暂停（加性增、乘性减），接近上次被限流的速率后放慢提速
+    - 响应明显变慢时不再提速并小幅降速
+    - 被限流后更换 User-Agent 并丢弃该域名的会话（Cookie），以新的身份重试
+    - 暂停时间超过 POLITE_MAX_WAIT 时不再等待，抛出 ThrottledError，由调用方重新排队
+    """
+
+    def __init__(self, rate: float = POLITE_RATE, min_rate: float = POLITE_MIN_RATE,
+                 max_rate: float = POLITE_MAX_RATE, increase: float = POLITE_INCREASE,
+                 decrease: float = POLITE_DECREASE, jitter: float = POLITE_JITTER,
+                 cooldown: float = POLITE_COOLDOWN, max_cooldown: float = POLITE_MAX_COOLDOWN,
+                 max_wait: float = POLITE_MAX_WAIT, retries: int = POLITE_RETRIES,
+                 slow_factor: float = POLITE_SLOW_FACTOR):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.jitter = jitter
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_wait = max_wait
+        self.retries = retries
+        self.slow_factor = slow_factor
+        self._hosts: Dict[str, HostState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host: str) -> HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState(rate=self.rate, user_agent=random_user_agent())
+        return state
+
+    def headers_for(self, url: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """请求头加上该域名当前使用的 User-Agent"""
+        with self._lock:
+            user_agent = self._state(host_of(url)).user_agent
+        return dict(headers or {}, **{'User-Agent': user_agent})
+
+    def set_max_rate(self, url: str, rate: float) -> None:
+        """设置该域名的速率上限（次/秒），如按 robots.txt 的 Crawl-delay"""
+        with self._lock:
+            state = self._state(host_of(url))
+            state.max_rate = rate
+            state.rate = min(state.rate, rate)
+
+    def wait(self, url: str) -> None:
+        """等到该域名的下一个请求时间；暂停时间过长时抛出 ThrottledError"""
+        host = host_of(url)
+        while True:
+            with self._lock:
+                state = self._state(host)
+                now = time.monotonic()
+                if state.blocked_until - now > self.max_wait:
+                    raise ThrottledError(f"{host} 暂停请求中", state.blocked_until - now)
+                # 等待期间可能有其他线程被限流，醒来后重新检查
+                delay = max(state.next_at, state.blocked_until) - now
+                if delay <= 0:
+                    spacing = 1 / state.rate * random.uniform(1 - self.jitter, 1 + self.jitter)
+                    state.next_at = now + spacing
+                    state.requests += 1
+                    return
+            time.sleep(delay)
+
+    def cooldown_remaining(self, url: str) -> float:
+        """该域名被限流后还需暂停的秒数"""
+        with self._lock:
+            return max(0.0, self._state(host_of(url)).blocked_until - time.monotonic())
+
+    def on_success(self, url: str, latency: float) -> None:
+        """正常响应：提速，响应明显变慢时小幅降速"""
+        with self._lock:
+            state = self._state(host_of(url))
+            state.strikes = 0
+            slow = (state.samples >= SLOW_MIN_SAMPLES and latency > state.latency * self.slow_factor
+                    and latency - state.latency > SLOW_MIN_DELAY)
+            state.latency = latency if not state.samples else (
+                state.latency * (1 - LATENCY_ALPHA) + latency * LATENCY_ALPHA)
+            state.samples += 1
+            if slow:
+                state.slow += 1
+                state.rate = max(self.min_rate, state.rate * (1 + self.decrease) / 2)
+                return
+            step = self.increase
+            if state.ceiling and state.rate >= state.ceiling * CEILING_MARGIN:
+                step /= 4
+            state.rate = min(state.max_rate or self.max_rate, self.max_rate, state.rate + step)
+
+    def on_error(self, url: str) -> None:
+        """连接错误、超时：按变慢处理"""
+        with self._lock:
+            state = self._state(host_of(url))
+            state.slow += 1
+            state.rate = max(self.min_rate, state.rate * (1 + self.decrease) / 2)
+
+    def on_throttled(self, url: str, retry_after: float = 0.0, started: float = 0.0) -> float:
+        """被限流：降速、暂停、更换身份，返回暂停秒数
+        started: 请求的发出时间；同一批并发请求先后被限流时只降速一次
+        """
+        host = host_of(url)
+        with self._lock:
+            state = self._state(host)
+            state.throttled += 1
+            now = time.monotonic()
+            if started and started < state.decreased_at:
+                return max(0.0, state.blocked_until - now, retry_after)
+            state.decreased_at = now
+            state.ceiling = state.rate
+            state.rate = max(self.min_rate, state.rate * self.decrease)
+            cooldown = min(self.max_cooldown, self.cooldown * 2 ** state.strikes)
+            cooldown = max(cooldown, retry_after)
+            state.strikes += 1
+            state.blocked_until = max(state.blocked_until, now + cooldown)
+            state.user_agent = random_user_agent()
+        # 丢弃带有旧 Cookie 的会话，下次请求以新的身份发出
+        get_client().reset(url)
+        return cooldown
+
+    def call(self, url: str, fetch: Callable[[Dict[str, str]], T],
+             headers: Optional[Dict[str, str]] = None) -> T:
+        """按域名限速调用 fetch(请求头)；fetch 抛出 ThrottledError 时换身份重试，
+        重试次数用完或需要暂停太久时把 ThrottledError 抛给调用方"""
+        if not POLITE_ENABLED:
+            return fetch(dict(headers or {}))
+        attempt = 0
+        while True:
+            self.wait(url)
+            started = time.monotonic()
+            try:
+                result = fetch(self.headers_for(url, headers))
+            except ThrottledError as e:
+                cooldown = self.on_throttled(url, e.retry_after, started)
+                if attempt >= self.retries or cooldown > self.max_wait:
+                    raise ThrottledError(f"{e}，{cooldown:.0f} 秒后重试", cooldown) from e
+                print(f"{e}，暂停 {cooldown:.0f} 秒后更换身份重试")
+                attempt += 1
+                continue
+            except OSError:
+                # 连接错误、超时（requests 的异常都是 OSError）；其他错误如页面缺少正文与速率无关
+                self.on_error(url)
+                raise
+            self.on_success(url, time.monotonic() - started)
+            return result
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        """各域名的当前速率和请求、限流、变慢次数"""
+        with self._lock:
+            return {host: {'rate': round(state.rate, 3), 'requests': state.requests,
+                           'throttled': state.throttled, 'slow': state.slow,
+                           'latency_ms': round(state.latency * 1000, 1)}
+                    for host, state in self._hosts.items()}
+
+    def report(self) -> None:
+        """打印各域名的限速统计"""
+        for host, stats in self.stats().items():
+            if stats['requests']:
+                print(f"{host}：请求 {stats['requests']} 次，被限流 {stats['throttled']} 次，"
+                      f"当前速率 {stats['rate']} 次/秒")
+
+
+_scheduler: Optional[PolitenessScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> PolitenessScheduler:
+    """全局共享的请求调度器"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = PolitenessScheduler()
+    return _scheduler
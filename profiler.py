@@ -0,0 +1,459 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# 加载环境变量：入口模块可能在调用 load_dotenv() 之前导入本模块
+load_dotenv()
+
+# 性能分析：off=关闭（默认），sample=采样调用栈（开销低，可长期开启），cprofile=确定性分析（开销大，定位细节）
+PROFILE_MODES = ('off', 'sample', 'cprofile')
+PROFILE = os.getenv('PROFILE', 'off').lower()
+# 抽样分析的文章比例，各阶段耗时对所有文章都记录
+PROFILE_RATE = float(os.getenv('PROFILE_RATE', '1'))
+# 调用栈采样间隔（毫秒）
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '10'))
+# 是否用 tracemalloc 记录各阶段内存峰值（只对抽中的文章）
+PROFILE_MEMORY = os.getenv('PROFILE_MEMORY', 'true').lower() not in ('0', 'false', 'no')
+# 报告输出目录和每个阶段列出的函数数
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_TOP = int(os.getenv('PROFILE_TOP', '20'))
+# 采样时最多保留的栈深度（从最内层算起）
+MAX_STACK_DEPTH = 64
+
+_NULL = nullcontext()
+
+
+@dataclass
+class StageRecord:
+    article: str
+    stage: str  # 嵌套阶段用 / 连接，如 images/image_encode
+    wall_ms: float
+    cpu_ms: float
+    mem_peak_kb: Optional[float] = None
+    profiled: bool = False
+
+
+class _MemoryWindow:
+    """一个阶段的内存峰值：每次其他阶段重置峰值前先把当前峰值记到这里"""
+
+    def __init__(self, start: int):
+        self.start = start
+        self.peak = start
+
+
+class Profiler:
+    """按阶段的性能分析
+
+    入口函数用 article() 标记一篇文章，各处理步骤用 stage() 标记阶段（可以嵌套）。
+    每个阶段都记录耗时和 CPU 时间；按 rate 抽中的文章额外记录调用栈（采样或 cProfile）
+    和 tracemalloc 内存峰值。report() 汇总整批文章，输出 collapsed-stack（可直接生成火焰图）
+    和各阶段耗时最多的函数。并发处理时内存峰值是进程内同一时段的峰值。
+    """
+
+    def __init__(self, mode: str = PROFILE, rate: float = PROFILE_RATE,
+                 interval_ms: float = PROFILE_INTERVAL_MS, memory: bool = PROFILE_MEMORY,
+                 out_dir: str = PROFILE_DIR, top: int = PROFILE_TOP):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"PROFILE 必须是 {', '.join(PROFILE_MODES)} 之一：{mode}")
+        self.mode = mode
+        self.enabled = mode != 'off'
+        self.rate = rate
+        self.interval = interval_ms / 1000
+        self.memory = memory
+        self.out_dir = out_dir
+        self.top = top
+        self.records: List[StageRecord] = []
+        # (阶段路径, 调用栈) -> 采样次数
+        self.samples: Counter = Counter()
+        self._stats: Dict[str, object] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._random = random.Random()
+        # 线程编号 -> 正在执行的阶段路径（只含抽中的文章），供采样线程读取
+        self._active: Dict[int, Tuple[str, ...]] = {}
+        self._sampler: Optional[threading.Thread] = None
+        # 有抽中的阶段在执行时才采样，空闲时采样线程阻塞等待
+        self._busy = threading.Event()
+        self._closed = False
+        self._cprofile_busy = False
+        self._memory_windows: List[_MemoryWindow] = []
+        self._owns_tracing = False
+
+    # ---- 标记文章和阶段 ----
+
+    def article(self, key: str):
+        """标记一篇文章，决定是否抽中做详细分析；已在文章中时不再嵌套"""
+        if not self.enabled or getattr(self._local, 'article', None) is not None:
+            return _NULL
+        return self._article(key)
+
+    @contextmanager
+    def _article(self, key: str):
+        self._local.article = key
+        self._local.sampled = self._random.random() < self.rate
+        try:
+            yield
+        finally:
+            self._local.article = None
+            self._local.sampled = False
+
+    def stage(self, name: str):
+        """标记一个处理阶段"""
+        if not self.enabled:
+            return _NULL
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name: str):
+        local = self._local
+        stack = local.__dict__.setdefault('stack', [])
+        standalone = getattr(local, 'article', None) is None
+        if standalone and not stack:
+            # 不在文章中的阶段，每个最外层阶段单独抽样
+            local.sampled = self._random.random() < self.rate
+        sampled = getattr(local, 'sampled', False)
+        stack.append(name)
+        path = tuple(stack)
+        thread_id = threading.get_ident()
+        profile = window = None
+        if sampled:
+            if self.memory:
+                window = self._memory_enter()
+            if self.mode == 'cprofile' and len(stack) == 1:
+                profile = self._cprofile_start()
+            elif self.mode == 'sample':
+                self._ensure_sampler()
+                with self._lock:
+                    self._active[thread_id] = path
+                    self._busy.set()
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - started
+            cpu = time.thread_time() - cpu_started
+            if profile is not None:
+                self._cprofile_stop(name, profile)
+            peak = self._memory_exit(window) if window is not None else None
+            stack.pop()
+            if sampled and self.mode == 'sample':
+                with self._lock:
+                    if stack:
+                        self._active[thread_id] = tuple(stack)
+                    else:
+                        self._active.pop(thread_id, None)
+                        if not self._active:
+                            self._busy.clear()
+            if standalone and not stack:
+                local.sampled = False
+            record = StageRecord(getattr(local, 'article', None) or '', '/'.join(path), round(wall * 1000, 2),
+                                 round(cpu * 1000, 2), round(peak / 1024, 1) if peak is not None else None,
+                                 sampled)
+            with self._lock:
+                self.records.append(record)
+
+    # ---- 内存峰值 ----
+
+    def _memory_enter(self) -> _MemoryWindow:
+        import tracemalloc
+
+        with self._lock:
+            if not self._memory_windows:
+                # 已经在跟踪（如基准测试自己开启了 tracemalloc）时不负责关闭
+                self._owns_tracing = not tracemalloc.is_tracing()
+                if self._owns_tracing:
+                    tracemalloc.start()
+            current, peak = tracemalloc.get_traced_memory()
+            # 重置峰值前先记到正在进行的阶段上，嵌套和并发的阶段互不影响
+            for other in self._memory_windows:
+                other.peak = max(other.peak, peak)
+            tracemalloc.reset_peak()
+            window = _MemoryWindow(current)
+            self._memory_windows.append(window)
+        return window
+
+    def _memory_exit(self, window: _MemoryWindow) -> int:
+        import tracemalloc
+
+        with self._lock:
+            peak = max(window.peak, tracemalloc.get_traced_memory()[1])
+            self._memory_windows.remove(window)
+            if not self._memory_windows and self._owns_tracing:
+                tracemalloc.stop()
+        return max(0, peak - window.start)
+
+    # ---- cProfile ----
+
+    def _cprofile_start(self):
+        import cProfile
+
+        # 同一时刻只运行一个 cProfile（Python 3.12 起每个进程只能启用一个），其他线程的阶段只记录耗时
+        with self._lock:
+            if self._cprofile_busy:
+                return None
+            self._cprofile_busy = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            with self._lock:
+                self._cprofile_busy = False
+            return None
+        return profile
+
+    def _cprofile_stop(self, name: str, profile) -> None:
+        import pstats
+
+        profile.disable()
+        with self._lock:
+            self._cprofile_busy = False
+            if name in self._stats:
+                self._stats[name].add(profile)
+            else:
+                self._stats[name] = pstats.Stats(profile)
+
+    # ---- 调用栈采样 ----
+
+    def _ensure_sampler(self) -> None:
+        if self._sampler is None:
+            with self._lock:
+                if self._sampler is None:
+                    self._sampler = threading.Thread(target=self._sample_loop, name='profiler-sampler', daemon=True)
+                    self._sampler.start()
+
+    def _sample_loop(self) -> None:
+        while not self._closed:
+            self._busy.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.items())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            taken = []
+            for thread_id, path in active:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                    frame = frame.f_back
+                stack.reverse()
+                taken.append((path, tuple(stack)))
+            del frames
+            with self._lock:
+                self.samples.update(taken)
+
+    def close(self) -> None:
+        """停止采样线程"""
+        self._closed = True
+        self._busy.set()
+
+    # ---- 报告 ----
+
+    def report(self, print_summary: bool = True) -> Optional[str]:
+        """汇总整批的分析结果写入 PROFILE_DIR，返回输出目录"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            records = list(self.records)
+            samples = Counter(self.samples)
+            stats = dict(self._stats)
+        if not records:
+            return None
+        out_dir = os.path.join(self.out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, 'stages.jsonl'), 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(asdict(record), ensure_ascii=False) + '\n')
+        if samples:
+            write_collapsed(os.path.join(out_dir, 'collapsed.txt'), samples)
+        for name, stage_stats in stats.items():
+            stage_stats.dump_stats(os.path.join(out_dir, f'{name}.prof'))
+        summary = format_summary(records, samples, stats, self.top)
+        with open(os.path.join(out_dir, 'summary.txt'), 'w', encoding='utf-8') as f:
+            f.write(summary)
+        if print_summary:
+            print(summary.split('\n\n', 1)[0])
+            print(f"性能分析报告已保存到：{out_dir}")
+        return out_dir
+
+
+def write_collapsed(path: str, samples: Counter) -> None:
+    """collapsed-stack 格式：阶段;函数;函数 次数，可用 flamegraph.pl / speedscope 生成火焰图"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for (stage_path, stack), count in samples.most_common():
+            f.write(f"{';'.join(stage_path + stack)} {count}\n")
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def format_summary(records: Iterable[StageRecord], samples: Counter, stats: Dict[str, object],
+                   top: int = PROFILE_TOP) -> str:
+    """各阶段耗时、CPU、内存峰值汇总表，以及各阶段耗时最多的函数"""
+    import io
+
+    by_stage: Dict[str, List[StageRecord]] = {}
+    for record in records:
+        by_stage.setdefault(record.stage, []).append(record)
+    articles = {record.article for record in records if record.article}
+    lines = [f"性能分析：{len(articles)} 篇文章，{sum(len(v) for v in by_stage.values())} 个阶段记录",
+             f"{'阶段':<28}{'次数':>6}{'总耗时(s)':>11}{'平均(ms)':>10}{'p95(ms)':>10}{'CPU占比':>8}{'内存峰值(KB)':>14}"]
+    for name in sorted(by_stage, key=lambda n: -sum(r.wall_ms for r in by_stage[n])):
+        items = by_stage[name]
+        walls = [r.wall_ms for r in items]
+        total = sum(walls)
+        cpu = sum(r.cpu_ms for r in items)
+        peaks = [r.mem_peak_kb for r in items if r.mem_peak_kb is not None]
+        lines.append(f"{name:<28}{len(items):>6}{total / 1000:>11.2f}{total / len(items):>10.1f}"
+                     f"{_percentile(walls, 0.95):>10.1f}{(cpu / total if total else 0):>8.0%}"
+                     f"{(max(peaks) if peaks else float('nan')):>14.0f}")
+
+    if samples:
+        by_path: Dict[Tuple[str, ...], Counter] = {}
+        for (stage_path, stack), count in samples.items():
+            by_path.setdefault(stage_path, Counter())[stack] += count
+        for stage_path in sorted(by_path, key=lambda p: -sum(by_path[p].values())):
+            stacks = by_path[stage_path]
+            total = sum(stacks.values())
+            own = Counter()
+            cumulative = Counter()
+            for stack, count in stacks.items():
+                if stack:
+                    own[stack[-1]] += count
+                for frame in set(stack):
+                    cumulative[frame] += count
+            lines.append('')
+            lines.append(f"[{'/'.join(stage_path)}] 采样 {total} 次")
+            lines.append(f"  {'自身':>6}{'累计':>8}  函数")
+            for frame, count in own.most_common(top):
+                lines.append(f"  {count / total:>6.1%}{cumulative[frame] / total:>8.1%}  {frame}")
+    for name, stage_stats in stats.items():
+        buf = io.StringIO()
+        stage_stats.stream = buf
+        stage_stats.sort_stats('tottime').print_stats(top)
+        lines.append('')
+        lines.append(f"[{name}] cProfile（按自身耗时排序）")
+        lines.append(buf.getvalue().strip())
+    return '\n'.join(lines) + '\n'
+
+
+_profiler: Optional[Profiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> Profiler:
+    """全局的性能分析器，按 .env 中的 PROFILE 配置创建"""
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = Profiler()
+    return _profiler
+
+
+def configure(mode: Optional[str] = None, rate: Optional[float] = None,
+              memory: Optional[bool] = None) -> Profiler:
+    """按命令行参数重新配置；同时写入环境变量，子进程沿用同样的配置"""
+    global _profiler
+    if mode:
+        os.environ['PROFILE'] = mode
+    if rate is not None:
+        os.environ['PROFILE_RATE'] = str(rate)
+    if memory is not None:
+        os.environ['PROFILE_MEMORY'] = 'true' if memory else 'false'
+    with _profiler_lock:
+        if _profiler is not None:
+            _profiler.close()
+        _profiler = Profiler(mode=mode or PROFILE, rate=PROFILE_RATE if rate is None else rate,
+                             memory=PROFILE_MEMORY if memory is None else memory)
+    return _profiler
+
+
+def stage(name: str):
+    """标记处理阶段：with stage('images'): ..."""
+    return get_profiler().stage(name)
+
+
+def article(key: str):
+    """标记一篇文章：with article(url): ..."""
+    return get_profiler().article(key)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """给入口的命令行加上 --profile / --profile-rate"""
+    parser.add_argument('--profile', choices=PROFILE_MODES[1:], default=None,
+                        help="按阶段记录性能分析（sample=调用栈采样，cprofile=确定性分析），报告保存到 PROFILE_DIR")
+    parser.add_argument('--profile-rate', type=float, default=None, help="抽样分析的文章比例（0~1）")
+
+
+def apply_arguments(args: argparse.Namespace) -> None:
+    if getattr(args, 'profile', None) or getattr(args, 'profile_rate', None) is not None:
+        configure(args.profile, args.profile_rate)
+
+
+def load_report(out_dir: str) -> Tuple[List[StageRecord], Counter]:
+    """读取 report() 的输出（阶段记录和 collapsed-stack）"""
+    records = []
+    with open(os.path.join(out_dir, 'stages.jsonl'), 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                records.append(StageRecord(**json.loads(line)))
+    samples: Counter = Counter()
+    collapsed = os.path.join(out_dir, 'collapsed.txt')
+    if os.path.exists(collapsed):
+        with open(collapsed, 'r', encoding='utf-8') as f:
+            for line in f:
+                frames, _, count = line.rstrip('\n').rpartition(' ')
+                parts = frames.split(';')
+                # 阶段名不含 ':'，函数帧都是 文件:函数
+                split = next((i for i, part in enumerate(parts) if ':' in part), len(parts))
+                samples[(tuple(parts[:split]), tuple(parts[split:]))] += int(count)
+    return records, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合并多个进程的性能分析报告")
+    parser.add_argument('dirs', nargs='+', help="report() 输出的目录")
+    parser.add_argument('--top', type=int, default=PROFILE_TOP)
+    parser.add_argument('--out', default=None, help="合并后的 collapsed-stack 文件")
+    args = parser.parse_args()
+
+    import pstats
+
+    records: List[StageRecord] = []
+    samples: Counter = Counter()
+    stats: Dict[str, object] = {}
+    for out_dir in args.dirs:
+        dir_records, dir_samples = load_report(out_dir)
+        records.extend(dir_records)
+        samples.update(dir_samples)
+        for name in os.listdir(out_dir):
+            if name.endswith('.prof'):
+                stage_name = name[:-len('.prof')]
+                path = os.path.join(out_dir, name)
+                if stage_name in stats:
+                    stats[stage_name].add(path)
+                else:
+                    stats[stage_name] = pstats.Stats(path)
+    print(format_summary(records, samples, stats, args.top))
+    if args.out and samples:
+        write_collapsed(args.out, samples)
+        print(f"合并后的 collapsed-stack 已保存到：{args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import os
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+# 自适应超时：观测到的 p99 乘以系数再加余量，限制在 [下限, 服务商配置的超时] 之间
+TIMEOUT_MARGIN = float(os.getenv('LLM_TIMEOUT_MARGIN', '1.5'))
+TIMEOUT_PAD = float(os.getenv('LLM_TIMEOUT_PAD', '2'))
+TIMEOUT_FLOOR = float(os.getenv('LLM_TIMEOUT_FLOOR', '5'))
+# 样本数达到该值后才按分位数计算超时
+MIN_SAMPLES = 20
+
+# 熔断：连续失败次数或窗口内错误率超过阈值时打开，打开一段时间后放行探测请求
+BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '5'))
+BREAKER_ERROR_RATE = float(os.getenv('LLM_BREAKER_ERROR_RATE', '0.5'))
+BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', '30'))
+# 熔断后重新打开的等待时间按倍数增长，不超过该上限（秒）
+BREAKER_MAX_RESET = 600
+# 计算错误率的窗口大小和最少请求数
+ERROR_WINDOW = 50
+ERROR_MIN_REQUESTS = 10
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+@dataclass
+class LatencyWindow:
+    """最近若干次请求的延迟样本"""
+    size: int = 200
+    samples: deque = field(default_factory=deque)
+
+    def add(self, value: float) -> None:
+        self.samples.append(value)
+        while len(self.samples) > self.size:
+            self.samples.popleft()
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class ProviderHealth:
+    """单个服务商/模型的健康状态：延迟分位数、错误率和熔断器
+
+    熔断器三种状态：
+    - closed：正常放行
+    - open：连续失败或错误率过高后打开，在 reset 时间内直接拒绝，调用方快速失败或改用备用服务商
+    - half_open：reset 时间到后只放行一个探测请求，成功则关闭，失败则重新打开并加倍等待时间
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURES,
+                 error_rate: float = BREAKER_ERROR_RATE, reset_timeout: float = BREAKER_RESET):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate
+        self.base_reset = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.first_token = LatencyWindow()
+        self.total = LatencyWindow()
+        self.outcomes: deque = deque(maxlen=ERROR_WINDOW)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.rejected = 0
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    # ---- 延迟和超时 ----
+
+    def record_first_token(self, latency: float) -> None:
+        with self._lock:
+            self.first_token.add(latency)
+
+    def timeout(self, ceiling: float, first_token: bool = True) -> float:
+        """根据观测到的 p99 计算读取超时，样本不足时用服务商配置的超时
+
+        流式请求的读取超时约束的是等待下一块数据的时间，其中最长的是等待首个 token，
+        所以流式请求用首 token 延迟，非流式请求用总耗时。
+        """
+        window = self.first_token if first_token else self.total
+        with self._lock:
+            if len(window.samples) < MIN_SAMPLES:
+                return ceiling
+            p99 = window.percentile(0.99)
+        return min(ceiling, max(TIMEOUT_FLOOR, p99 * TIMEOUT_MARGIN + TIMEOUT_PAD))
+
+    # ---- 熔断 ----
+
+    def allow(self) -> bool:
+        """是否放行请求；半开状态只放行一个探测请求"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                self.probing = False
+            # 半开
+            if self.probing:
+                self.rejected += 1
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self, duration: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.total.add(duration)
+            self.outcomes.append(True)
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                print(f"[{self.name}] 探测成功，熔断器关闭")
+            self.state = CLOSED
+            self.probing = False
+            self.reset_timeout = self.base_reset
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            self.outcomes.append(False)
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN:
+                self.reset_timeout = min(self.reset_timeout * 2, BREAKER_MAX_RESET)
+                self._open('探测失败')
+            elif self.state == CLOSED:
+                if self.consecutive_failures >= self.failure_threshold:
+                    self._open(f'连续失败 {self.consecutive_failures} 次')
+                elif len(self.outcomes) >= ERROR_MIN_REQUESTS and self._error_rate() >= self.error_rate_threshold:
+                    self._open(f'错误率 {self._error_rate():.0%}')
+
+    def release(self) -> None:
+        """请求被取消（既不算成功也不算失败），释放半开状态的探测名额"""
+        with self._lock:
+            self.probing = False
+
+    def _open(self, reason: str) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.probing = False
+        print(f"[{self.name}] 熔断器打开（{reason}），{self.reset_timeout:.0f}s 后探测")
+
+    def _error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def snapshot(self, ceiling: Optional[float] = None) -> Dict[str, object]:
+        """监控用的状态快照"""
+        with self._lock:
+            def ms(window: LatencyWindow, p: float):
+                value = window.percentile(p)
+                return None if value is None else round(value * 1000)
+
+            snapshot = {
+                'state': self.state,
+                'requests': self.requests,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'error_rate': round(self._error_rate(), 3),
+                'consecutive_failures': self.consecutive_failures,
+                'first_token_ms': {f'p{int(p * 100)}': ms(self.first_token, p) for p in (0.5, 0.95, 0.99)},
+                'total_ms': {f'p{int(p * 100)}': ms(self.total, p) for p in (0.5, 0.95, 0.99)},
+            }
+        if ceiling is not None:
+            snapshot['timeout'] = round(self.timeout(ceiling), 2)
+        return snapshot
+
+
+_registry: Dict[str, ProviderHealth] = {}
+_registry_lock = threading.Lock()
+
+
+def get_health(name: str) -> ProviderHealth:
+    """进程内共享的服务商健康状态，多个转换器实例共用同一个熔断器"""
+    health = _registry.get(name)
+    if health is None:
+        with _registry_lock:
+            health = _registry.setdefault(name, ProviderHealth(name))
+    return health
+
+
+def health_snapshot() -> Dict[str, Dict[str, object]]:
+    """所有服务商的状态快照"""
+    return {name: health.snapshot() for name, health in list(_registry.items())}
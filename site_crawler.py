@@ -0,0 +1,531 @@
+import os
+import re
+import gzip
+import math
+import json
+import time
+import heapq
+import sqlite3
+import hashlib
+import argparse
+import threading
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from dotenv import load_dotenv
+from article_store import canonical_url
+from http_client import get_client
+from politeness import ThrottledError, get_scheduler
+from ua_pool import random_user_agent
+from xhs_converter import RESULT_DUPLICATE, RESULT_FAILED, RESULT_THROTTLED
+import profiler
+
+# 加载环境变量
+load_dotenv()
+
+# 数据目录，抓取进度保存在这里
+DATA_ROOT = r"E:\fy\智企内推\data"
+SITE_DB = 'site_crawl.db'
+
+# 同时处理的页面数（同一域名的请求速率仍由 politeness 按域名限速）
+SITE_CRAWL_WORKERS = int(os.getenv('SITE_CRAWL_WORKERS', '8'))
+# 从起始页开始最多跟随的链接层数（sitemap 中的页面算第 0 层）
+SITE_MAX_DEPTH = int(os.getenv('SITE_MAX_DEPTH', '5'))
+# 每个栏目最多收录的页面数
+SITE_MAX_PAGES = int(os.getenv('SITE_MAX_PAGES', '5000'))
+# 布隆过滤器的误判率，容量按栏目最多收录的页面数确定
+BLOOM_ERROR_RATE = 0.001
+# 处理失败的页面在之后的运行中最多尝试的次数
+MAX_ATTEMPTS = 3
+# sitemap 索引最多展开的子 sitemap 数
+MAX_CHILD_SITEMAPS = 50
+# 按 robots.txt 中这个名称的规则抓取
+ROBOTS_AGENT = '*'
+
+# 链接指向的不是网页
+SKIP_EXTENSIONS = ('.pdf', '.zip', '.rar', '.7z', '.gz', '.tar', '.exe', '.dmg', '.apk', '.msi',
+                   '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.bmp',
+                   '.mp4', '.mp3', '.avi', '.mov', '.wav', '.doc', '.docx', '.xls', '.xlsx',
+                   '.ppt', '.pptx', '.css', '.js', '.json', '.xml', '.txt')
+DEFAULT_PORTS = {'http': ':80', 'https': ':443'}
+
+# 页面状态
+PAGE_QUEUED = 'queued'
+PAGE_DONE = 'done'
+PAGE_FAILED = 'failed'
+# 只抓取保存、不转换时的处理结果
+RESULT_SAVED = 'saved'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    section TEXT NOT NULL,
+    url TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    discovered_at REAL NOT NULL,
+    fetched_at REAL,
+    PRIMARY KEY (section, url)
+);
+"""
+
+
+class BloomFilter:
+    """布隆过滤器：判断URL“一定没见过”或“可能见过”，误判率 0.1% 时每个URL约占 1.8 字节
+
+    可能见过的再到数据库中精确确认，绝大多数新链接不用查库。
+    """
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> List[int]:
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item: str) -> None:
+        for p in self._positions(item):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+
+def normalize_link(base: str, href: str) -> Optional[str]:
+    """转为绝对地址并规范化（去掉跟踪参数、锚点、默认端口和末尾斜杠），不是 http(s) 链接时返回 None"""
+    href = href.strip()
+    if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:', 'data:')):
+        return None
+    parts = urlsplit(urljoin(base, href))
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        return None
+    netloc = parts.netloc.lower()
+    if netloc.endswith(DEFAULT_PORTS[scheme]):
+        netloc = netloc[:-len(DEFAULT_PORTS[scheme])]
+    return canonical_url(urlunsplit((scheme, netloc, parts.path, parts.query, '')))
+
+
+@dataclass
+class SiteScope:
+    """抓取范围：起始页所在域名下、路径以任一前缀开头的页面"""
+    start_url: str
+    prefixes: List[str] = field(default_factory=list)
+    max_depth: int = SITE_MAX_DEPTH
+    max_pages: int = SITE_MAX_PAGES
+    exclude: str = ''
+
+    def __post_init__(self):
+        self.start_url = normalize_link(self.start_url, self.start_url) or self.start_url
+        parts = urlsplit(self.start_url)
+        self.host = parts.netloc
+        if not self.prefixes:
+            # 默认为起始页所在目录，如 /solutions/overview.html -> /solutions
+            path = parts.path
+            last = path.rsplit('/', 1)[-1]
+            self.prefixes = [path.rsplit('/', 1)[0] if '.' in last else path]
+        self.prefixes = ['/' + prefix.strip('/') for prefix in self.prefixes]
+        self._exclude = re.compile(self.exclude) if self.exclude else None
+
+    @property
+    def section(self) -> str:
+        """栏目标识，抓取进度按栏目保存"""
+        return self.host + ','.join(sorted(self.prefixes))
+
+    def allows(self, url: str) -> bool:
+        parts = urlsplit(url)
+        if parts.netloc != self.host:
+            return False
+        path = parts.path or '/'
+        if not any(prefix == '/' or path == prefix or path.startswith(prefix + '/') for prefix in self.prefixes):
+            return False
+        if path.lower().endswith(SKIP_EXTENSIONS):
+            return False
+        return not (self._exclude and self._exclude.search(url))
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _timestamp(value: str) -> Optional[float]:
+    """解析 sitemap 的 lastmod（W3C 日期时间）"""
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def parse_sitemap(body: bytes) -> Tuple[List[Tuple[str, Optional[float]]], List[str]]:
+    """解析 sitemap，返回 ([(页面地址, lastmod 时间戳)], 子 sitemap 地址)"""
+    if body[:2] == b'\x1f\x8b':
+        body = gzip.decompress(body)
+    root = ET.fromstring(body)
+    entries: List[Tuple[str, Optional[float]]] = []
+    children: List[str] = []
+    for element in root:
+        kind = _local_name(element.tag)
+        if kind not in ('url', 'sitemap'):
+            continue
+        loc, lastmod = None, None
+        for child in element:
+            name = _local_name(child.tag)
+            if name == 'loc' and child.text:
+                loc = child.text.strip()
+            elif name == 'lastmod' and child.text:
+                lastmod = _timestamp(child.text)
+        if loc:
+            if kind == 'sitemap':
+                children.append(loc)
+            else:
+                entries.append((loc, lastmod))
+    return entries, children
+
+
+# ---- 抓取进度 ----
+
+class SiteState:
+    """抓取进度：每个栏目发现过的页面（精确集合）、层数、状态和抓取时间，重新运行时从中断处继续"""
+
+    def __init__(self, root: str = DATA_ROOT):
+        os.makedirs(root, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, SITE_DB))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def urls(self, section: str) -> Iterable[str]:
+        for row in self.conn.execute('SELECT url FROM pages WHERE section = ?', (section,)):
+            yield row[0]
+
+    def count(self, section: str) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM pages WHERE section = ?', (section,)).fetchone()[0]
+
+    def exists(self, section: str, url: str) -> bool:
+        return self.conn.execute('SELECT 1 FROM pages WHERE section = ? AND url = ?', (section, url)).fetchone() is not None
+
+    def add(self, section: str, pages: List[Tuple[str, int]]) -> None:
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO pages (section, url, depth, status, discovered_at) VALUES (?, ?, ?, ?, ?)',
+                [(section, url, depth, PAGE_QUEUED, now) for url, depth in pages],
+            )
+
+    def pending(self, section: str) -> List[Tuple[str, int]]:
+        """待处理的页面：未处理过的，以及失败次数未超过上限的，按层数排序"""
+        rows = self.conn.execute(
+            'SELECT url, depth FROM pages WHERE section = ? AND (status = ? OR (status = ? AND attempts < ?)) '
+            'ORDER BY depth, discovered_at', (section, PAGE_QUEUED, PAGE_FAILED, MAX_ATTEMPTS),
+        ).fetchall()
+        return [(row['url'], row['depth']) for row in rows]
+
+    def requeue_modified(self, section: str, lastmods: Dict[str, float]) -> int:
+        """sitemap 中 lastmod 晚于上次抓取时间的页面重新处理"""
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                'UPDATE pages SET status = ?, attempts = 0 WHERE section = ? AND url = ? AND status != ? '
+                'AND fetched_at < ?',
+                [(PAGE_QUEUED, section, url, PAGE_QUEUED, lastmod) for url, lastmod in lastmods.items()],
+            )
+            return self.conn.total_changes - before
+
+    def record(self, section: str, url: str, status: str, counted: bool = True) -> None:
+        with self.conn:
+            self.conn.execute('UPDATE pages SET status = ?, attempts = attempts + ?, fetched_at = ? '
+                              'WHERE section = ? AND url = ?', (status, int(counted), time.time(), section, url))
+
+
+# ---- 抓取 ----
+
+class SiteCrawler:
+    """抓取并转换一个栏目（如 /solutions/ 下的所有页面）
+
+    - 从起始页和 sitemap 出发，跟随范围内（同一域名、路径前缀、层数）的链接，链接先规范化再去重
+    - 去重：布隆过滤器判断一定没见过的链接直接入队，可能见过的再查数据库中的精确集合；
+      抓取进度持久化，中断后重新运行只处理剩下的页面
+    - 遵守 robots.txt 的 Disallow 和 Crawl-delay，读取其中声明的 sitemap（没有时尝试 /sitemap.xml）；
+      sitemap 中 lastmod 晚于上次抓取时间的页面重新处理
+    - 多个页面并发处理，请求速率由 politeness 按域名控制；被限流的页面暂停结束后重新排队
+    """
+
+    def __init__(self, scope: SiteScope, root: str = DATA_ROOT, workers: int = SITE_CRAWL_WORKERS,
+                 convert: bool = True, robots: bool = True, sitemaps: bool = True):
+        self.scope = scope
+        self.root = root
+        self.workers = max(1, workers)
+        self.convert = convert
+        self.use_robots = robots
+        self.use_sitemaps = sitemaps
+        self.state = SiteState(root)
+        self.bloom = BloomFilter(scope.max_pages)
+        self.robots = None
+        self.headers = {'User-Agent': random_user_agent()}
+        self.discovered = 0
+        self.stats: Dict[str, int] = {'robots_blocked': 0, 'duplicate_links': 0, 'out_of_scope': 0,
+                                      'requeued': 0}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.engines = []
+
+    def close(self) -> None:
+        self.state.close()
+
+    # ---- robots.txt 和 sitemap ----
+
+    def _get(self, url: str) -> Optional[bytes]:
+        try:
+            response = get_client().get(url, headers=self.headers)
+        except Exception as e:
+            print(f"请求失败 {url}: {str(e)}")
+            return None
+        if response.status_code != 200:
+            return None
+        return response.content
+
+    def load_robots(self) -> List[str]:
+        """读取 robots.txt，按 Crawl-delay 限制该域名的速率，返回其中声明的 sitemap"""
+        from urllib.robotparser import RobotFileParser
+
+        scheme = urlsplit(self.scope.start_url).scheme
+        body = self._get(f'{scheme}://{self.scope.host}/robots.txt')
+        if body is None:
+            return []
+        parser = RobotFileParser()
+        parser.parse(body.decode('utf-8', errors='replace').splitlines())
+        self.robots = parser
+        delay = parser.crawl_delay(ROBOTS_AGENT)
+        rate = parser.request_rate(ROBOTS_AGENT)
+        max_rate = 0.0
+        if delay:
+            max_rate = 1 / float(delay)
+        if rate and rate.seconds:
+            max_rate = min(max_rate or math.inf, rate.requests / rate.seconds)
+        if max_rate:
+            get_scheduler().set_max_rate(self.scope.start_url, max_rate)
+            print(f"robots.txt 限制请求速率为 {max_rate:g} 次/秒")
+        return parser.site_maps() or []
+
+    def allowed_by_robots(self, url: str) -> bool:
+        return self.robots is None or self.robots.can_fetch(ROBOTS_AGENT, url)
+
+    def load_sitemaps(self, sitemaps: List[str]) -> List[Tuple[str, Optional[float]]]:
+        """读取 sitemap（含 sitemap 索引），返回范围内的页面和 lastmod"""
+        if not sitemaps:
+            scheme = urlsplit(self.scope.start_url).scheme
+            sitemaps = [f'{scheme}://{self.scope.host}/sitemap.xml']
+        entries: List[Tuple[str, Optional[float]]] = []
+        queue = deque(sitemaps)
+        fetched = 0
+        while queue and fetched < MAX_CHILD_SITEMAPS:
+            sitemap = queue.popleft()
+            fetched += 1
+            body = self._get(sitemap)
+            if body is None:
+                continue
+            try:
+                found, children = parse_sitemap(body)
+            except (ET.ParseError, OSError, EOFError) as e:
+                print(f"解析 sitemap 失败 {sitemap}: {str(e)}")
+                continue
+            queue.extend(children)
+            for loc, lastmod in found:
+                url = normalize_link(sitemap, loc)
+                if url and self.scope.allows(url):
+                    entries.append((url, lastmod))
+        return entries
+
+    # ---- 链接去重 ----
+
+    def _seen(self, url: str) -> bool:
+        """布隆过滤器说没见过就一定没见过；可能见过时查精确集合确认"""
+        return url in self.bloom and self.state.exists(self.scope.section, url)
+
+    def discover(self, base: str, hrefs: Iterable[str], depth: int) -> List[Tuple[str, int]]:
+        """规范化、筛选并登记新链接，返回需要处理的 [(地址, 层数)]"""
+        if depth > self.scope.max_depth:
+            return []
+        new: List[Tuple[str, int]] = []
+        batch: Set[str] = set()
+        for href in hrefs:
+            url = normalize_link(base, href)
+            if not url or not self.scope.allows(url):
+                self.stats['out_of_scope'] += 1
+                continue
+            if url in batch or self._seen(url):
+                self.stats['duplicate_links'] += 1
+                continue
+            batch.add(url)
+            if not self.allowed_by_robots(url):
+                self.stats['robots_blocked'] += 1
+                continue
+            if self.discovered >= self.scope.max_pages:
+                break
+            self.bloom.add(url)
+            new.append((url, depth))
+            self.discovered += 1
+        if new:
+            self.state.add(self.scope.section, new)
+        return new
+
+    # ---- 处理单个页面（工作线程） ----
+
+    def _pipeline(self):
+        """每个工作线程一套爬虫和转换器（各自的数据库连接），查重索引所有线程共用（get_index）"""
+        if not hasattr(self._local, 'page'):
+            import xhs_converte_page
+            self._local.page = xhs_converte_page.PageCrawler(base_save_path=self.root)
+            self._local.converter = xhs_converte_page.XHSConverter() if self.convert else None
+            if self._local.converter and self._local.converter.engine:
+                with self._lock:
+                    self.engines.append(self._local.converter.engine)
+        return self._local.page, self._local.converter
+
+    def process(self, url: str) -> Tuple[str, List[str], float]:
+        """处理页面，返回 (处理结果, 页面中的链接, 被限流时的暂停秒数)"""
+        from xhs_converte_page import convert_page_url
+
+        page, converter = self._pipeline()
+        links: List[str] = []
+        retry_after = 0.0
+        if converter:
+            status = convert_page_url(url, page, converter, links.append)
+            if status == RESULT_THROTTLED:
+                retry_after = get_scheduler().cooldown_remaining(url)
+        else:
+            try:
+                with profiler.get_profiler().article(url):
+                    content = page.process_url(url, links.append)
+                status = (RESULT_FAILED if not content else
+                          RESULT_DUPLICATE if content.duplicate_of else RESULT_SAVED)
+            except ThrottledError as e:
+                print(f"获取页面时被限流，稍后重试: {str(e)}")
+                status, retry_after = RESULT_THROTTLED, e.retry_after
+        return status, links, retry_after
+
+    # ---- 主循环 ----
+
+    def seed(self) -> deque:
+        """登记起始页和 sitemap 中的页面，返回待处理队列"""
+        section = self.scope.section
+        for url in self.state.urls(section):
+            self.bloom.add(url)
+        self.discovered = self.state.count(section)
+        if self.discovered:
+            print(f"继续上次的抓取：已发现 {self.discovered} 个页面")
+        sitemaps = self.load_robots() if self.use_robots else []
+        seeds = [self.scope.start_url]
+        if self.use_sitemaps:
+            entries = self.load_sitemaps(sitemaps)
+            print(f"sitemap 中有 {len(entries)} 个范围内的页面")
+            lastmods = {url: lastmod for url, lastmod in entries if lastmod}
+            if lastmods:
+                changed = self.state.requeue_modified(section, lastmods)
+                if changed:
+                    print(f"sitemap 显示 {changed} 个页面有更新，重新处理")
+            seeds.extend(url for url, _ in entries)
+        self.discover(self.scope.start_url, seeds, 0)
+        return deque(self.state.pending(section))
+
+    def crawl(self) -> Dict[str, object]:
+        """抓取整个栏目，返回统计"""
+        started = time.perf_counter()
+        frontier = self.seed()
+        # 被限流的页面：(可以重新处理的时间, 地址, 层数)
+        deferred: List[Tuple[float, str, int]] = []
+        outcomes: Dict[str, int] = {}
+        processed = 0
+        print(f"开始抓取 {self.scope.host}{'、'.join(self.scope.prefixes)}：待处理 {len(frontier)} 个页面，"
+              f"{self.workers} 个并发")
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='site-crawl') as pool:
+            running = {}
+            while frontier or running or deferred:
+                now = time.monotonic()
+                while deferred and deferred[0][0] <= now:
+                    _, url, depth = heapq.heappop(deferred)
+                    frontier.append((url, depth))
+                while frontier and len(running) < self.workers:
+                    url, depth = frontier.popleft()
+                    running[pool.submit(self.process, url)] = (url, depth)
+                if not running:
+                    time.sleep(max(0.0, deferred[0][0] - time.monotonic()))
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = running.pop(future)
+                    try:
+                        status, links, retry_after = future.result()
+                    except Exception as e:
+                        print(f"处理页面出错 {url}: {str(e)}")
+                        status, links, retry_after = RESULT_FAILED, [], 0.0
+                    if status == RESULT_THROTTLED:
+                        self.stats['requeued'] += 1
+                        self.state.record(self.scope.section, url, PAGE_QUEUED, counted=False)
+                        heapq.heappush(deferred, (time.monotonic() + retry_after, url, depth))
+                        continue
+                    processed += 1
+                    outcomes[status] = outcomes.get(status, 0) + 1
+                    self.state.record(self.scope.section, url,
+                                      PAGE_FAILED if status == RESULT_FAILED else PAGE_DONE)
+                    frontier.extend(self.discover(url, links, depth + 1))
+                    if processed % 50 == 0:
+                        print(f"已处理 {processed} 个页面，已发现 {self.discovered} 个，待处理 {len(frontier)} 个")
+        seconds = time.perf_counter() - started
+        result: Dict[str, object] = {'processed': processed, 'discovered': self.discovered, **outcomes, **self.stats,
+                                     'seconds': round(seconds, 1),
+                                     'pages_per_minute': round(processed / seconds * 60, 1) if seconds else 0.0}
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抓取并转换网站的一个栏目（如 /solutions/ 下的所有页面）")
+    parser.add_argument('url', help="起始页")
+    parser.add_argument('--prefix', action='append', default=[],
+                        help="只抓取路径以此开头的页面，可多次指定；默认为起始页所在目录")
+    parser.add_argument('--depth', type=int, default=SITE_MAX_DEPTH, help="从起始页开始最多跟随的链接层数")
+    parser.add_argument('--max-pages', type=int, default=SITE_MAX_PAGES, help="最多收录的页面数")
+    parser.add_argument('--exclude', default='', help="跳过匹配此正则的地址")
+    parser.add_argument('--workers', type=int, default=SITE_CRAWL_WORKERS, help="同时处理的页面数")
+    parser.add_argument('--crawl-only', action='store_true', help="只抓取保存到文章库，不转换")
+    parser.add_argument('--ignore-robots', action='store_true', help="不读取 robots.txt（仅用于自己的网站）")
+    parser.add_argument('--no-sitemap', action='store_true', help="不读取 sitemap")
+    parser.add_argument('--root', default=DATA_ROOT, help="数据目录")
+    profiler.add_arguments(parser)
+    args = parser.parse_args()
+    profiler.apply_arguments(args)
+
+    scope = SiteScope(args.url, args.prefix, args.depth, args.max_pages, args.exclude)
+    crawler = SiteCrawler(scope, root=args.root, workers=args.workers, convert=not args.crawl_only,
+                          robots=not args.ignore_robots, sitemaps=not args.no_sitemap)
+    try:
+        stats = crawler.crawl()
+        print(f"\n抓取统计：{json.dumps(stats, ensure_ascii=False)}")
+    except KeyboardInterrupt:
+        print("\n已停止，重新运行同样的命令从中断处继续")
+    finally:
+        crawler.close()
+        for engine in crawler.engines:
+            print(f"大模型调用统计：{engine.stats()}")
+        get_client().report()
+        get_scheduler().report()
+        profiler.get_profiler().report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import os
+import codecs
+import threading
+from html.parser import HTMLParser
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from http_client import get_client
+
+# 加载环境变量：配置在导入时读取
+load_dotenv()
+
+# HTML 解析方式：stream=边下载边增量解析（默认），bs4=下载完整页面后用 BeautifulSoup 解析
+HTML_PARSER = os.getenv('HTML_PARSER', 'stream').lower()
+
+# 每次从响应中读取的字节数
+CHUNK_SIZE = 16 * 1024
+# 边解析边下载图片的线程数
+IMAGE_PREFETCH_WORKERS = int(os.getenv('IMAGE_PREFETCH_WORKERS', '4'))
+
+# 内容不参与提取的标签
+SKIP_TAGS = ('script', 'style', 'noscript', 'template')
+# 没有结束标签的元素
+VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                       'link', 'meta', 'source', 'track', 'wbr'))
+
+# 元素匹配条件：('id', 值)、('class', 值) 或 ('tag', 标签名)
+Selector = Tuple[str, str]
+
+
+def _matches(selector: Selector, tag: str, attrs: Dict[str, str]) -> bool:
+    kind, value = selector
+    if kind == 'id':
+        return attrs.get('id') == value
+    if kind == 'class':
+        return value in (attrs.get('class') or '').split()
+    return tag == value
+
+
+class StreamingExtractor(HTMLParser):
+    """增量 HTML 提取器
+
+    分块 feed，边解析边通过回调输出文本块和图片地址：
+    - 只处理内容容器（如 #js_content）内的元素，容器外只提取标题等元数据
+    - 跳过 script/style 的内容
+    - 文本块按开始标签的顺序输出，和 BeautifulSoup 的 find_all + get_text 结果一致
+    - 只保存尚未闭合的文本块，内存与文章正文成正比，与整个页面大小无关
+    """
+
+    def __init__(self, container: Optional[Selector] = None, block_tags=('p', 'span'),
+                 image_attr: str = 'data-src', meta: Optional[Dict[str, Selector]] = None,
+                 dedupe: bool = True, on_text: Optional[Callable[[str], None]] = None,
+                 on_image: Optional[Callable[[str, Dict[str, str]], None]] = None,
+                 markers: Tuple[str, ...] = (), on_link: Optional[Callable[[str], None]] = None):
+        super().__init__(convert_charrefs=True)
+        self.container = container
+        self.block_tags = frozenset(block_tags)
+        self.image_attr = image_attr
+        self.meta_selectors = meta or {}
+        self.dedupe = dedupe
+        self.on_text = on_text
+        self.on_image = on_image
+        # 页面中所有 <a href> 链接（不限于内容容器），用于发现同一站点的其他页面
+        self.on_link = on_link
+        # 需要留意的文字（如验证页的提示），出现过的记在 matched_markers
+        self.markers = markers
+        self.matched_markers = set()
+
+        self.texts: List[str] = []
+        self.images: List[str] = []
+        self.meta: Dict[str, str] = {}
+        self.found_container = container is None
+        # 容器已经结束，后面的内容不用再下载
+        self.done = False
+        # 跳转后的最终地址，由 stream_parse 填入
+        self.url = ''
+
+        self._skip_depth = 0
+        # 容器内尚未闭合的元素栈：[标签名, 文本块序号或 None]，容器本身在栈底
+        self._stack: List[list] = []
+        # 正在收集的元数据：名称 -> [标签名, 嵌套层数, 文本片段]
+        self._meta_open: Dict[str, list] = {}
+        # 文本块按开始顺序占位，闭合后填入；前面的都闭合后才输出，保证顺序
+        self._slots: List[Optional[str]] = []
+        self._slot_base = 0
+        # 尚未闭合的文本块：序号 -> 在 _buffer 中的起始位置；嵌套的文本块共用同一份文本片段
+        self._open_blocks: Dict[int, int] = {}
+        self._buffer: List[str] = []
+        self._seen_texts = set()
+        self._seen_images = set()
+
+    @property
+    def in_content(self) -> bool:
+        return self.container is None or bool(self._stack)
+
+    # ---- 标签处理 ----
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or '' for name, value in attrs}
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+        if tag == 'a' and self.on_link and attrs.get('href'):
+            self.on_link(attrs['href'])
+
+        for name, (open_tag, depth, parts) in list(self._meta_open.items()):
+            if tag == open_tag and tag not in VOID_TAGS:
+                self._meta_open[name][1] = depth + 1
+        for name, selector in self.meta_selectors.items():
+            if name not in self.meta and name not in self._meta_open and _matches(selector, tag, attrs):
+                self._meta_open[name] = [tag, 1, []]
+
+        if not self.in_content:
+            if self.done or not _matches(self.container, tag, attrs):
+                return
+            self.found_container = True
+            self._stack.append([tag, None])
+            return
+
+        if tag == 'img':
+            url = attrs.get(self.image_attr)
+            if url and not (self.dedupe and url in self._seen_images):
+                self._seen_images.add(url)
+                self.images.append(url)
+                if self.on_image:
+                    self.on_image(url, attrs)
+        if tag in VOID_TAGS:
+            return
+        index = None
+        if tag in self.block_tags:
+            index = self._slot_base + len(self._slots)
+            self._slots.append(None)
+            self._open_blocks[index] = len(self._buffer)
+        self._stack.append([tag, index])
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+            return
+        if self._skip_depth:
+            return
+
+        for name, entry in list(self._meta_open.items()):
+            if tag == entry[0]:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self.meta[name] = ''.join(entry[2]).strip()
+                    del self._meta_open[name]
+
+        if not self.in_content:
+            return
+        # 和 html.parser 建树的方式一致：关闭到最近的同名元素，中间漏写结束标签的一并关闭；
+        # 找不到同名元素的结束标签忽略
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                while len(self._stack) > i:
+                    self._pop()
+                break
+        if self.container is not None and not self._stack:
+            self.done = True
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        for marker in self.markers:
+            if marker in data:
+                self.matched_markers.add(marker)
+        for entry in self._meta_open.values():
+            entry[2].append(data)
+        if self._open_blocks and self.in_content:
+            self._buffer.append(data)
+
+    # ---- 文本块输出 ----
+
+    def _pop(self):
+        _, index = self._stack.pop()
+        if index is not None:
+            start = self._open_blocks.pop(index)
+            self._slots[index - self._slot_base] = ''.join(self._buffer[start:]).strip()
+            if not self._open_blocks:
+                self._buffer.clear()
+            self._flush()
+
+    def _flush(self):
+        """按开始顺序输出已经闭合的文本块"""
+        emitted = 0
+        for text in self._slots:
+            if text is None:
+                break
+            emitted += 1
+            if not text or (self.dedupe and text in self._seen_texts):
+                continue
+            self._seen_texts.add(text)
+            self.texts.append(text)
+            if self.on_text:
+                self.on_text(text)
+        if emitted:
+            del self._slots[:emitted]
+            self._slot_base += emitted
+
+    def close(self):
+        super().close()
+        while self._stack:
+            self._pop()
+        for name, entry in list(self._meta_open.items()):
+            self.meta.setdefault(name, ''.join(entry[2]).strip())
+        self._meta_open.clear()
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _prefetch_pool() -> ThreadPoolExecutor:
+    """进程内共享的图片预取线程池"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=IMAGE_PREFETCH_WORKERS,
+                                           thread_name_prefix='image-prefetch')
+    return _pool
+
+
+class ImagePrefetcher:
+    """解析过程中一发现图片地址就开始下载，和页面剩余部分的下载、解析重叠"""
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None):
+        self.headers = headers
+        self.futures: Dict[str, Future] = {}
+
+    def _download(self, url: str) -> Optional[bytes]:
+        try:
+            response = get_client().get(url, headers=self.headers)
+            if response.status_code == 200:
+                return response.content
+            print(f"下载图片失败 {response.status_code}: {url}")
+        except Exception as e:
+            print(f"下载图片失败: {url} {str(e)}")
+        return None
+
+    def submit(self, url: str) -> None:
+        if url not in self.futures:
+            self.futures[url] = _prefetch_pool().submit(self._download, url)
+
+    def get(self, url: str) -> Optional[bytes]:
+        """等待并返回图片内容，没有提前下载的当场下载；下载失败返回 None"""
+        future = self.futures.get(url)
+        if future is None or future.cancelled():
+            return self._download(url)
+        return future.result()
+
+    def discard(self, urls) -> None:
+        """不再需要的图片（如未入选图片预算），取消还没开始的下载"""
+        for url in urls:
+            future = self.futures.pop(url, None)
+            if future:
+                future.cancel()
+
+    def cancel(self) -> None:
+        """取消还没开始的下载（如文章被判定为重复）"""
+        for future in self.futures.values():
+            future.cancel()
+
+
+def stream_parse(url: str, extractor: StreamingExtractor, headers: Optional[Dict[str, str]] = None,
+                 encoding: Optional[str] = None, chunk_size: int = CHUNK_SIZE) -> StreamingExtractor:
+    """流式下载并增量解析页面；内容容器结束后不再读取剩余部分
+
+    encoding: 指定页面编码；不指定时使用响应头中的 charset，没有则按 UTF-8
+    """
+    response = get_client().get(url, headers=headers, stream=True)
+    try:
+        extractor.url = response.url
+        response.raise_for_status()
+        if not encoding:
+            declared = 'charset' in response.headers.get('Content-Type', '').lower()
+            encoding = response.encoding if declared and response.encoding else 'utf-8'
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        for chunk in response.iter_content(chunk_size):
+            extractor.feed(decoder.decode(chunk))
+            if extractor.done:
+                break
+        else:
+            extractor.feed(decoder.decode(b'', final=True))
+        extractor.close()
+        return extractor
+    finally:
+        response.close()
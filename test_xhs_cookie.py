@@ -1,14 +1,23 @@
 import os
+import sys
 import json
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from cookie_health import describe, get_checker
+
+def check_cookie():
+    """不启动浏览器，用一次请求检查 .cookies.json 是否有效"""
+    health = get_checker().check_file('.cookies.json', force=True)
+    print(describe(health))
+    if health.needs_login:
+        print("请运行 python test_xhs_login.py 重新登录")
+    return health.valid
 
 def test_cookie():
+    """在浏览器中加载 Cookie 并查看页面（需要 Chrome）"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    
     try:
         print("正在初始化Chrome浏览器...")
         
@@ -77,4 +86,8 @@ def test_cookie():
             driver.quit()
 
 if __name__ == "__main__":
-    test_cookie() 
\ No newline at end of file
+    # --browser：在浏览器中查看页面，默认只做请求检查
+    if '--browser' in sys.argv:
+        test_cookie()
+    else:
+        sys.exit(0 if check_cookie() else 1) 
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""ArticleStore 重复抓取同一URL时的状态"""
+from article_store import STATUS_FETCHED, STATUS_PUBLISHED, ArticleStore, canonical_url
+
+URL = 'https://mp.weixin.qq.com/s?__biz=MzA&mid=1&idx=1&sn=abc&chksm=x'
+
+
+def published_store(tmp_path) -> ArticleStore:
+    store = ArticleStore(str(tmp_path))
+    store.save_article(URL, '标题', '正文')
+    store.set_converted(URL, '小红书内容')
+    store.set_published(URL, 'https://www.xiaohongshu.com/explore/1')
+    return store
+
+
+def test_refetch_with_same_content_keeps_state(tmp_path):
+    store = published_store(tmp_path)
+
+    record = store.save_article(URL, '新标题', '正文')
+
+    assert record.title == '新标题'
+    assert record.status == STATUS_PUBLISHED
+    assert store.read_text(record.converted_blob) == '小红书内容'
+    assert record.post_url == 'https://www.xiaohongshu.com/explore/1'
+
+
+def test_refetch_with_changed_content_resets_state(tmp_path):
+    store = published_store(tmp_path)
+
+    record = store.save_article(URL, '标题', '修改后的正文')
+
+    assert record.status == STATUS_FETCHED
+    assert store.read_text(record.original_blob) == '修改后的正文'
+    assert record.converted_blob is None and record.converted_at is None
+    assert record.published_at is None and record.post_url is None
+    assert [r.url for r in store.list_pending()] == []
+
+
+def test_canonical_url_strips_weixin_params_only_on_weixin():
+    assert canonical_url('https://mp.weixin.qq.com/s/AbC?scene=1&from=timeline&lang=zh_CN') == \
+        'https://mp.weixin.qq.com/s/AbC'
+    assert canonical_url('https://Example.com/docs/?lang=en&version=2&key=abc&page=3&utm_source=x&fbclid=1#top') == \
+        'https://example.com/docs?key=abc&lang=en&page=3&version=2'
@@ -0,0 +1,40 @@
+"""ArtifactWriter 后台写入"""
+import os
+
+from artifact_writer import ArtifactWriter
+
+
+def test_flush_waits_for_directory(tmp_path):
+    writer = ArtifactWriter(io_threads=2)
+    save_dir = str(tmp_path / 'article')
+    batch = writer.begin(save_dir)
+    paths = [batch.add_bytes(f'images/image_{i}.jpg', b'x' * 1024) for i in range(1, 4)]
+    future = batch.commit()
+
+    writer.flush(save_dir)
+
+    assert all(os.path.exists(path) for path in paths)
+    assert future.result() == paths
+    assert not [name for name in os.listdir(save_dir) if name.startswith('.staging-')]
+    writer.close()
+
+
+def test_small_buffer_still_writes_every_commit(tmp_path):
+    writer = ArtifactWriter(buffer_mb=0.01, io_threads=1)
+    futures = [writer.submit(str(tmp_path / f'a{i}'), [('original.txt', b'x' * 8192)]) for i in range(20)]
+    writer.close()
+
+    assert all(len(future.result()) == 1 for future in futures)
+    assert writer.stats()['commits'] == 20
+
+
+def test_write_error_is_reported_on_future(tmp_path, capsys):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    writer = ArtifactWriter()
+    future = writer.submit(str(blocker / 'article'), [('original.txt', b'x')])
+    writer.flush()
+
+    assert isinstance(future.exception(), OSError)
+    assert '写入文件失败' in capsys.readouterr().out
+    writer.close()
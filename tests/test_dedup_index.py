@@ -0,0 +1,42 @@
+"""DedupIndex 近似重复判断"""
+from dedup_index import DedupIndex, check_duplicate, register_article
+
+ARTICLE = '今天我们来聊一聊如何用三个简单的步骤整理家里的书架，让每一本书都能很快找到。' * 3
+
+
+def test_near_duplicate_is_found(tmp_path):
+    index = DedupIndex(str(tmp_path))
+    register_article(index, str(tmp_path / 'a'), ARTICLE)
+
+    match = check_duplicate(index, str(tmp_path / 'b'), ARTICLE + '（转载）')
+
+    assert match is not None and match.key == 'a'
+
+
+def test_short_text_is_not_checked_or_registered(tmp_path):
+    index = DedupIndex(str(tmp_path))
+    for name, text in (('a', ''), ('b', '！！！……'), ('c', '图片')):
+        assert check_duplicate(index, str(tmp_path / name), text) is None
+        register_article(index, str(tmp_path / name), text)
+
+    assert index.entries == {}
+    assert check_duplicate(index, str(tmp_path / 'd'), '') is None
+
+
+def test_concurrent_claims_keep_one_copy(tmp_path):
+    index = DedupIndex(str(tmp_path))
+    first = check_duplicate(index, str(tmp_path / 'a'), ARTICLE)
+    second = check_duplicate(index, str(tmp_path / 'b'), ARTICLE)
+
+    assert first is None
+    assert second is not None and second.key == 'a'
+
+
+def test_other_process_appends_are_seen(tmp_path):
+    ours = DedupIndex(str(tmp_path))
+    theirs = DedupIndex(str(tmp_path))
+    register_article(theirs, str(tmp_path / 'a'), ARTICLE)
+
+    match = check_duplicate(ours, str(tmp_path / 'b'), ARTICLE)
+
+    assert match is not None and match.key == 'a'
@@ -0,0 +1,113 @@
+"""任务队列的领取、租约过期和死信，SQLite 队列和网络队列各跑一遍"""
+import threading
+import time
+
+import pytest
+
+from job_queue import (DEPENDENCY_DEAD, JOB_DEAD, JOB_DONE, JOB_LEASED, JOB_READY, HttpQueue, JobQueue,
+                       SQLiteQueue, make_server)
+
+
+@pytest.fixture(params=['sqlite', 'http'])
+def queue(request, tmp_path):
+    local = SQLiteQueue(str(tmp_path / 'jobs.db'))
+    if request.param == 'sqlite':
+        yield local
+    else:
+        server = make_server(local, port=0, token='')
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        yield HttpQueue(f'http://127.0.0.1:{server.server_address[1]}', token='')
+        server.shutdown()
+        server.server_close()
+    local.close()
+
+
+def statuses(queue: JobQueue, stage: str):
+    return queue.stats().get(stage, {})
+
+
+def test_job_queue_is_abstract():
+    with pytest.raises(TypeError):
+        JobQueue()
+
+
+def test_lease_waits_for_dependencies(queue):
+    crawl = queue.enqueue('crawl', {'url': 'a'}, dedupe_key='crawl:a')
+    assert queue.enqueue('crawl', {'url': 'a'}, dedupe_key='crawl:a') == crawl
+    convert = queue.enqueue('convert', {'url': 'a'}, depends_on=[crawl])
+
+    assert queue.lease(['convert'], 'w1') is None
+    job = queue.lease(['crawl', 'convert'], 'w1')
+    assert (job.id, job.status, job.attempts, job.payload) == (crawl, JOB_LEASED, 1, {'url': 'a'})
+    assert queue.lease(['crawl'], 'w2') is None
+
+    assert queue.complete(crawl, 'w1', {'title': 't'})
+    job = queue.lease(['convert'], 'w2')
+    assert job.id == convert
+    assert statuses(queue, 'crawl') == {JOB_DONE: 1}
+
+
+def test_expired_lease_is_released(queue):
+    job_id = queue.enqueue('crawl', {'url': 'a'})
+    assert queue.lease(['crawl'], 'w1', visibility=0).id == job_id
+    time.sleep(0.01)
+
+    job = queue.lease(['crawl'], 'w2')
+    assert (job.id, job.worker, job.attempts) == (job_id, 'w2', 2)
+    # 原来的持有者不能再续约或完成
+    assert not queue.heartbeat(job_id, 'w1')
+    assert not queue.complete(job_id, 'w1')
+    assert queue.heartbeat(job_id, 'w2')
+    assert queue.complete(job_id, 'w2')
+
+
+def test_defer_does_not_count_attempt(queue):
+    job_id = queue.enqueue('crawl', {'url': 'a'}, max_attempts=1)
+    queue.lease(['crawl'], 'w1')
+    assert queue.defer(job_id, 'w1', 0, '限流')
+    job = queue.lease(['crawl'], 'w1')
+    assert (job.id, job.attempts) == (job_id, 1)
+
+
+def test_failure_retries_with_backoff(queue):
+    job_id = queue.enqueue('crawl', {'url': 'a'}, max_attempts=2)
+    queue.lease(['crawl'], 'w1')
+    assert queue.fail(job_id, 'w1', '出错') == JOB_READY
+    # 退避期间不能领取
+    assert queue.lease(['crawl'], 'w1') is None
+    assert statuses(queue, 'crawl') == {JOB_READY: 1}
+
+
+def test_dead_letter_cascades_and_retry_restores(queue):
+    crawl = queue.enqueue('crawl', {'url': 'a'}, max_attempts=1)
+    image = queue.enqueue('image', {'url': 'a'}, depends_on=[crawl])
+    publish = queue.enqueue('publish', {'url': 'a'}, depends_on=[image], max_attempts=1)
+    other = queue.enqueue('crawl', {'url': 'b'})
+
+    queue.lease(['crawl'], 'w1')
+    assert queue.fail(crawl, 'w1', '获取文章失败') == JOB_DEAD
+
+    dead = {job.id: job for job in queue.dead_letters()}
+    assert set(dead) == {crawl, image, publish}
+    assert dead[crawl].error == '获取文章失败'
+    assert dead[image].error == dead[publish].error == DEPENDENCY_DEAD
+    assert queue.lease(['crawl'], 'w1').id == other
+
+    # 重新处理源头任务时连带恢复的任务一并恢复
+    assert queue.retry_dead([crawl]) == 3
+    assert queue.dead_letters() == []
+    job = queue.lease(['crawl'], 'w1')
+    assert (job.id, job.attempts) == (crawl, 1)
+
+
+def test_expired_lease_without_attempts_left_is_buried(queue):
+    crawl = queue.enqueue('crawl', {'url': 'a'}, max_attempts=1)
+    convert = queue.enqueue('convert', {'url': 'a'}, depends_on=[crawl])
+    queue.lease(['crawl'], 'w1', visibility=0)
+    time.sleep(0.01)
+
+    assert queue.lease(['crawl'], 'w2') is None
+    dead = {job.id: job.error for job in queue.dead_letters()}
+    assert set(dead) == {crawl, convert}
+    assert dead[convert] == DEPENDENCY_DEAD
+    assert queue.retry_dead() == 2
@@ -0,0 +1,50 @@
+"""站点抓取的链接规范化和抓取范围"""
+import pytest
+
+from site_crawler import SiteScope, normalize_link
+
+
+@pytest.mark.parametrize('base, href, expected', [
+    ('https://Example.com/a/b.html', 'c.html', 'https://example.com/a/c.html'),
+    ('https://example.com/a/b.html', '../c/?utm_source=x&id=2#top', 'https://example.com/c?id=2'),
+    ('https://example.com:443/a/', '/x/?b=2&a=1', 'https://example.com/x?a=1&b=2'),
+    ('http://example.com/', 'HTTP://EXAMPLE.COM:80/Path', 'http://example.com/Path'),
+    ('https://example.com:8443/', '/x', 'https://example.com:8443/x'),
+    ('https://example.com/a/', '//cdn.example.com/p', 'https://cdn.example.com/p'),
+])
+def test_normalize_link(base, href, expected):
+    assert normalize_link(base, href) == expected
+
+
+@pytest.mark.parametrize('href', ['', '  ', '#top', 'javascript:void(0)', 'mailto:a@b.com', 'tel:123',
+                                  'data:image/png;base64,xx', 'ftp://example.com/file'])
+def test_normalize_link_skips_non_http(href):
+    assert normalize_link('https://example.com/a/', href) is None
+
+
+def test_scope_defaults_to_start_page_directory():
+    scope = SiteScope('https://Example.com/solutions/overview.html?utm_source=x')
+    assert scope.host == 'example.com'
+    assert scope.prefixes == ['/solutions']
+    assert scope.allows('https://example.com/solutions')
+    assert scope.allows('https://example.com/solutions/ai/index.html')
+    assert not scope.allows('https://example.com/solutions-old/x')
+    assert not scope.allows('https://example.com/about')
+    assert not scope.allows('https://www.example.com/solutions/ai')
+
+
+def test_scope_prefixes_extensions_and_exclude():
+    scope = SiteScope('https://example.com/', prefixes=['products/', '/cases'], exclude=r'/print/|[?&]page=')
+    assert scope.prefixes == ['/products', '/cases']
+    assert scope.allows('https://example.com/products/a')
+    assert scope.allows('https://example.com/cases')
+    assert not scope.allows('https://example.com/news/a')
+    assert not scope.allows('https://example.com/products/manual.PDF')
+    assert not scope.allows('https://example.com/products/print/a')
+    assert not scope.allows('https://example.com/cases?page=2')
+
+
+def test_scope_root_prefix_allows_whole_host():
+    scope = SiteScope('https://example.com/', prefixes=['/'])
+    assert scope.allows('https://example.com/anything/here')
+    assert not scope.allows('https://other.com/anything')
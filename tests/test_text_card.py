@@ -0,0 +1,50 @@
+"""文字卡片的折行规则（每个字符宽度为 1）"""
+import pytest
+
+from text_card import NO_LINE_END, NO_LINE_START, wrap_text
+
+
+def wrap(text: str, width: float):
+    return wrap_text(text, len, width)
+
+
+def test_wraps_chinese_by_character():
+    assert wrap('今天天气很好我们去公园', 5) == ['今天天气很', '好我们去公', '园']
+
+
+def test_keeps_words_and_numbers_together():
+    assert wrap('hello world foo', 7) == ['hello', 'world', 'foo']
+    assert wrap('增长 2024.5% 以上', 8) == ['增长', '2024.5%', '以上']
+
+
+def test_splits_words_longer_than_a_line():
+    assert wrap('supercalifragilistic', 6) == ['superc', 'alifra', 'gilist', 'ic']
+
+
+def test_hangs_one_punctuation_mark_at_line_end():
+    assert wrap('今天天气很好，我们去公园。', 6) == ['今天天气很好，', '我们去公园。']
+
+
+def test_carries_previous_character_when_punctuation_cannot_hang():
+    assert wrap('一二三四五。」后面', 5) == ['一二三四', '五。」后面']
+
+
+def test_opening_bracket_moves_to_next_line():
+    assert wrap('一二三四（五）', 5) == ['一二三四', '（五）']
+
+
+def test_drops_spaces_at_line_breaks():
+    assert wrap('abc def ghi', 3) == ['abc', 'def', 'ghi']
+
+
+@pytest.mark.parametrize('width', [4, 7, 12])
+def test_rules_hold_for_mixed_text(width):
+    text = '企业在数字化转型过程中（尤其是客户服务），需要重新梳理流程。用 Excel 也能起步，关键是字段统一！'
+    lines = wrap(text, width)
+    assert ''.join(lines).replace(' ', '') == text.replace(' ', '')
+    for line in lines:
+        assert len(line) <= width + 1
+    for line in lines[1:]:
+        assert line[0] not in NO_LINE_START
+    for line in lines[:-1]:
+        assert line[-1] not in NO_LINE_END
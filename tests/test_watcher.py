@@ -0,0 +1,75 @@
+"""Watcher 中途出错或中断时不丢失新文章"""
+import pytest
+
+import watcher
+from watcher import Source, Watcher
+
+FEED_URL = 'https://example.com/feed.xml'
+ARTICLE = 'https://example.com/posts/1'
+FEED = (b'<?xml version="1.0"?><rss><channel><item><link>' + ARTICLE.encode()
+        + b'</link></item></channel></rss>')
+
+
+class FakeResponse:
+    status_code = 200
+    encoding = 'utf-8'
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.headers = {'ETag': '"v1"', 'Content-Type': 'application/xml'}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeClient:
+    def get(self, url, headers=None):
+        return FakeResponse(FEED)
+
+
+@pytest.fixture(autouse=True)
+def fake_client(monkeypatch):
+    monkeypatch.setattr(watcher, 'get_client', FakeClient)
+
+
+def make_watcher(tmp_path, handler) -> Watcher:
+    source = Source(name='example', url=FEED_URL, type='feed')
+    return Watcher([source], root=str(tmp_path), backfill=10, handlers={'page': handler})
+
+
+def test_extract_error_does_not_save_validators(tmp_path, monkeypatch):
+    def broken(*args):
+        raise ValueError('解析失败')
+
+    monkeypatch.setattr(watcher, 'extract_links', broken)
+    first = make_watcher(tmp_path, lambda url: 'ok')
+    assert first.run_once()['errors'] == 1
+    assert first.state.get_source(FEED_URL) is None
+    first.close()
+
+    monkeypatch.undo()
+    monkeypatch.setattr(watcher, 'get_client', FakeClient)
+    processed = []
+    second = make_watcher(tmp_path, lambda url: processed.append(url) or 'ok')
+    second.run_once()
+    second.close()
+    assert processed == [ARTICLE]
+
+
+def test_interrupted_processing_is_retried_after_restart(tmp_path):
+    def interrupted(url):
+        raise KeyboardInterrupt
+
+    first = make_watcher(tmp_path, interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        first.run_once()
+    assert first.state.get_source(FEED_URL)['etag'] == '"v1"'
+    first.close()
+
+    processed = []
+    second = make_watcher(tmp_path, lambda url: processed.append(url) or 'ok')
+    stats = second.run_once()
+    assert stats['unchanged'] == 1 and stats['retried'] == 1
+    assert processed == [watcher.canonical_url(ARTICLE)]
+    assert not second.retry
+    second.close()
@@ -0,0 +1,102 @@
+"""ApiPublisher 对接本地模拟服务（benchmarks/mock_xhs_api.py）"""
+import json
+
+import pytest
+
+from cookie_health import CookieHealthChecker
+from mock_xhs_api import ME_PATH, SESSION, MockState, start_mock_server
+from xhs_api_publisher import ApiPublisher
+from xhs_publisher import PublishResult
+
+
+def write_cookies(path, session: str) -> str:
+    with open(path, 'w') as f:
+        json.dump([{'name': 'web_session', 'value': session, 'domain': '.xiaohongshu.com', 'path': '/'},
+                   {'name': 'a1', 'value': 'test', 'domain': '.xiaohongshu.com', 'path': '/'}], f)
+    return str(path)
+
+
+@pytest.fixture
+def mock_api():
+    state = MockState()
+    server, address = start_mock_server(state)
+    yield state, address
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def images(tmp_path):
+    from PIL import Image
+
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'image_{i}.jpg'
+        Image.new('RGB', (60, 80), (i * 60, 120, 200)).save(path)
+        paths.append(str(path))
+    return paths
+
+
+def make_publisher(cookie_path: str, address: str) -> ApiPublisher:
+    publisher = ApiPublisher(cookie_path, upload_workers=2, fallback=True, creator_api=address,
+                             edith_api=address, sign_url='',
+                             checker=CookieHealthChecker(url=address + ME_PATH, cache_path=None))
+    publisher.browser_calls = []
+
+    def publish_browser(title, content, image_paths):
+        publisher.browser_calls.append(title)
+        return PublishResult(success=True, message="浏览器发布成功")
+
+    publisher._publish_browser = publish_browser
+    return publisher
+
+
+def test_publish_through_api(mock_api, images, tmp_path):
+    state, address = mock_api
+    publisher = make_publisher(write_cookies(tmp_path / 'cookies.json', SESSION), address)
+
+    result = publisher.publish_note('标题', '正文', images)
+
+    assert result.success
+    assert publisher.browser_calls == []
+    assert len(state.notes) == 1
+    note = state.notes[0]
+    assert (note['title'], note['desc']) == ('标题', '正文')
+    assert result.post_url.endswith(note['id'])
+    assert len(note['images']) == 3 and all(file_id in state.uploaded for file_id in note['images'])
+
+
+def test_expired_cookie_falls_back_to_browser(mock_api, images, tmp_path):
+    state, address = mock_api
+    publisher = make_publisher(write_cookies(tmp_path / 'cookies.json', 'expired'), address)
+
+    result = publisher.publish_note('标题', '正文', images)
+
+    assert result.success and result.message == "浏览器发布成功"
+    assert publisher.browser_calls == ['标题']
+    assert state.uploaded == {} and state.notes == []
+    # Cookie 文件没有更新前直接用浏览器，不再请求接口
+    checks = state.me_requests
+    publisher.publish_note('标题2', '正文', images)
+    assert publisher.browser_calls == ['标题', '标题2']
+    assert state.me_requests == checks
+
+
+def test_network_error_after_create_note_does_not_fall_back(mock_api, images, tmp_path, monkeypatch):
+    state, address = mock_api
+    publisher = make_publisher(write_cookies(tmp_path / 'cookies.json', SESSION), address)
+    post = publisher.client.post
+
+    def post_then_disconnect(url, *args, **kwargs):
+        # 请求已经到达服务端，笔记已创建，但客户端没有收到响应
+        post(url, *args, **kwargs)
+        raise ConnectionResetError("连接被重置")
+
+    monkeypatch.setattr(publisher.client, 'post', post_then_disconnect)
+
+    result = publisher.publish_note('标题', '正文', images)
+
+    assert not result.success
+    assert '请确认是否已发布' in result.message
+    assert publisher.browser_calls == []
+    assert len(state.notes) == 1
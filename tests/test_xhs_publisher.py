@@ -0,0 +1,24 @@
+"""发布前提取标题和正文"""
+import pytest
+
+from gzh2xhs import WeixinToXiaohongshu
+from xhs_publisher import process_content
+
+TEXT = '第一段讲的是整理书架的三个步骤。\n第二段讲的是如何给书分类。\n第三段讲的是怎样长期保持整洁。'
+
+
+def test_local_conversion_uses_fallback_title(tmp_path):
+    converted = WeixinToXiaohongshu(base_save_path=str(tmp_path)).convert_to_xhs_style('整理书架的方法', TEXT)
+
+    title, content = process_content(converted, '整理书架的方法')
+
+    assert title == '整理书架的方法'
+    assert '✨ 整理书架的方法 ✨' not in content
+    assert '第二段讲的是如何给书分类。' in content
+
+
+def test_missing_title_without_fallback_is_rejected(tmp_path):
+    converted = WeixinToXiaohongshu(base_save_path=str(tmp_path)).convert_to_xhs_style('整理书架的方法', TEXT)
+
+    with pytest.raises(ValueError):
+        process_content(converted)
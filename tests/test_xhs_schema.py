@@ -0,0 +1,70 @@
+"""模型输出的 JSON 修复和笔记解析"""
+import json
+
+from xhs_schema import TAG_MAX_COUNT, repair_json, parse_note
+
+BODY = '今天分享一个提升工作效率的小方法✨每天早上花十分钟列出当天最重要的三件事，先做完再看消息，坚持一周就能感受到变化。'
+
+
+def test_repair_json_fixes_raw_newlines_and_trailing_commas():
+    text = '{"titles": ["标题一", "标题二",], "body": "第一段\n第二段\t结束",}'
+    assert json.loads(repair_json(text)) == {'titles': ['标题一', '标题二'], 'body': '第一段\n第二段\t结束'}
+
+
+def test_repair_json_closes_truncated_output():
+    assert json.loads(repair_json('{"titles": ["标题"], "body": "正文被截')) == {'titles': ['标题'], 'body': '正文被截'}
+    assert json.loads(repair_json('{"titles": ["标题"], "tags": ["#a", "#b"')) == {'titles': ['标题'], 'tags': ['#a', '#b']}
+    # 截断在键名或冒号之后时去掉不完整的键值对
+    assert json.loads(repair_json('{"titles": ["标题"], "body":')) == {'titles': ['标题']}
+    assert json.loads(repair_json('{"titles": ["标题"], "body"')) == {'titles': ['标题']}
+    assert json.loads(repair_json('{"titles": ["标题"], "bo')) == {'titles': ['标题']}
+    assert json.loads(repair_json('{"note": {"bo')) == {'note': {}}
+
+
+def test_repair_json_keeps_escapes():
+    text = '{"body": "他说\\"你好\\"\\n'
+    assert json.loads(repair_json(text)) == {'body': '他说"你好"\n'}
+
+
+def test_parse_note_json_in_code_fence():
+    text = '好的，结果如下：\n```json\n' + json.dumps(
+        {'titles': ['1. “效率翻倍的小习惯🔥”', '效率翻倍的小习惯🔥'], 'body': BODY, 'tags': ['效率', '#职场', '效率']},
+        ensure_ascii=False) + '\n```'
+    result = parse_note(text)
+    assert result.ok
+    assert result.note.titles == ['效率翻倍的小习惯🔥']
+    assert result.note.body == BODY
+    assert result.note.tags == ['#效率', '#职场']
+
+
+def test_parse_note_truncated_json_is_repaired():
+    text = json.dumps({'titles': ['效率小习惯'], 'body': BODY}, ensure_ascii=False)[:-2]
+    result = parse_note(text)
+    assert result.repaired
+    assert result.note.title == '效率小习惯'
+    assert set(result.errors) == {'tags'}
+
+
+def test_parse_note_legacy_text():
+    text = f"一. 标题\n1. 效率翻倍的小习惯\n2. 打工人必看\n\n二. 正文\n{BODY}\n标签：#效率 #职场 #自律"
+    result = parse_note(text)
+    assert result.ok
+    assert result.note.titles == ['效率翻倍的小习惯', '打工人必看']
+    assert result.note.body == BODY
+    assert result.note.tags == ['#效率', '#职场', '#自律']
+
+
+def test_parse_note_moves_trailing_hashtags_out_of_body():
+    tags = ' '.join(f'#话题{i}' for i in range(TAG_MAX_COUNT + 2))
+    result = parse_note(json.dumps({'titles': ['标题'], 'body': f'{BODY}\n{tags}', 'tags': []}, ensure_ascii=False))
+    assert result.ok and result.repaired
+    assert result.note.body == BODY
+    assert len(result.note.tags) == TAG_MAX_COUNT
+
+
+def test_parse_note_reports_invalid_fields():
+    result = parse_note(json.dumps({'titles': ['这是一个远远超过二十个字限制的非常非常长的标题'], 'body': '太短',
+                                    'tags': ['#a']}, ensure_ascii=False))
+    assert set(result.errors) == {'titles', 'body'}
+    # 只校验指定的字段
+    assert parse_note(json.dumps({'tags': ['#a']}), fields=['tags']).ok
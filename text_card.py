@@ -0,0 +1,677 @@
+import os
+import re
+import sys
+import math
+import argparse
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from io import BytesIO
+from typing import Callable, List, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+from artifact_writer import get_writer
+from image_budget import IMAGE_BUDGET, MAX_ASPECT, MIN_SIDE
+from profiler import stage
+from xhs_schema import parse_note
+
+# 加载环境变量
+load_dotenv()
+
+# 卡片尺寸，默认小红书笔记的主流比例 3:4
+CARD_WIDTH = int(os.getenv('TEXT_CARD_WIDTH', '1080'))
+CARD_HEIGHT = int(os.getenv('TEXT_CARD_HEIGHT', '1440'))
+# 文章可用图片少于这个数量时，用文字卡片补足（不超过 IMAGE_BUDGET）；0 表示不生成
+TEXT_CARD_MIN_IMAGES = int(os.getenv('TEXT_CARD_MIN_IMAGES', '3'))
+# 正文字体、标题字体和彩色表情字体，未设置时依次尝试常见的系统字体
+TEXT_CARD_FONT = os.getenv('TEXT_CARD_FONT', '')
+TEXT_CARD_TITLE_FONT = os.getenv('TEXT_CARD_TITLE_FONT', '')
+TEXT_CARD_EMOJI_FONT = os.getenv('TEXT_CARD_EMOJI_FONT', '')
+# 批量渲染的进程数
+TEXT_CARD_WORKERS = int(os.getenv('TEXT_CARD_WORKERS', str(min(4, os.cpu_count() or 1))))
+TEXT_CARD_QUALITY = 90
+
+# 卡片文件名：排在文章原有图片（image_N.jpg）之后
+CARD_PREFIX = 'text_card_'
+# 登记到文章库时的来源
+CARD_SOURCE = 'text-card'
+
+FONT_CANDIDATES = (
+    r'C:\Windows\Fonts\msyh.ttc',
+    r'C:\Windows\Fonts\simhei.ttf',
+    '/System/Library/Fonts/PingFang.ttc',
+    '/System/Library/Fonts/STHeiti Medium.ttc',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+    '/usr/share/fonts/wqy-microhei/wqy-microhei.ttc',
+)
+TITLE_FONT_CANDIDATES = (
+    r'C:\Windows\Fonts\msyhbd.ttc',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc',
+    '/usr/share/fonts/google-noto-cjk/NotoSansCJK-Bold.ttc',
+)
+EMOJI_FONT_CANDIDATES = (
+    r'C:\Windows\Fonts\seguiemj.ttf',
+    '/System/Library/Fonts/Apple Color Emoji.ttc',
+    '/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf',
+    '/usr/share/fonts/noto/NotoColorEmoji.ttf',
+    '/usr/share/fonts/google-noto-emoji/NotoColorEmoji.ttf',
+)
+# 位图表情字体只能按固定字号加载（Noto Color Emoji 为 109，Apple Color Emoji 有 160 等），渲染后再缩放
+EMOJI_BITMAP_SIZES = (109, 160, 136, 96, 64)
+
+# 表情所在的码位范围，这些字符用表情字体渲染
+EMOJI_RANGES = ((0x1F000, 0x1FAFF), (0x2300, 0x23FF), (0x2600, 0x27BF), (0x2B00, 0x2BFF))
+# 变体选择符、零宽连接符、肤色修饰符、组合键帽等不单独绘制；没有文字排版引擎（raqm）时组合表情按单个表情显示
+IGNORED_CHARS = frozenset(['\ufe0e', '\ufe0f', '\u200d', '\u20e3'] + [chr(c) for c in range(0x1F3FB, 0x1F400)])
+
+# 避头点：不能出现在行首的标点；避尾点：不能出现在行尾的标点
+NO_LINE_START = frozenset('，。、；：！？）》」』】〕〉’”…—～%,.;:!?)]}~·')
+NO_LINE_END = frozenset('（《「『【〔〈‘“([{')
+# 连续的字母、数字作为一个单词换行，其余字符逐字换行
+_UNIT_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9_\-'’.@/#%+&]*|\s|.", re.S)
+# 只有话题标签的行
+_TAG_LINE_RE = re.compile(r'^\s*#\S+(\s+#\S+)*\s*$')
+# 每种字体缓存的字形串数
+RUN_CACHE_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class CardStyle:
+    background: Tuple[int, int, int] = (255, 250, 242)
+    text: Tuple[int, int, int] = (51, 51, 51)
+    muted: Tuple[int, int, int] = (150, 140, 130)
+    accent: Tuple[int, int, int] = (255, 36, 66)
+    margin: int = 90
+    title_size: int = 80
+    body_size: int = 46
+    small_size: int = 32
+    # 行高为字号的倍数
+    title_spacing: float = 1.4
+    line_spacing: float = 1.65
+    # 段落之间额外留出的行数
+    paragraph_gap: float = 0.5
+    # 封面标题最多行数
+    title_lines: int = 6
+
+
+def is_emoji(ch: str) -> bool:
+    code = ord(ch)
+    return any(start <= code <= end for start, end in EMOJI_RANGES)
+
+
+def find_font(configured: str, candidates: Sequence[str]) -> Optional[str]:
+    """配置的字体，或候选中第一个存在的字体"""
+    if configured:
+        if os.path.exists(configured):
+            return configured
+        print(f"字体文件不存在: {configured}")
+        return None
+    return next((path for path in candidates if os.path.exists(path)), None)
+
+
+def wrap_text(text: str, measure: Callable[[str], float], max_width: float) -> List[str]:
+    """按宽度把一段文字拆成多行
+
+    中文逐字换行，英文单词和数字不拆开（超过一行时才拆）；
+    避头点放不下时挂在行尾（最多一个字宽），仍放不下时带上前一个字一起换行；避尾点移到下一行
+    """
+    units = _UNIT_RE.findall(text)
+    units.reverse()
+    lines: List[str] = []
+    line, width = '', 0.0
+    hang = measure('，') or max_width / 20
+    while units:
+        unit = units.pop()
+        unit_width = measure(unit)
+        if unit_width > max_width and len(unit) > 1:
+            units.extend(reversed(unit))
+            continue
+        if not line and unit.isspace():
+            continue
+        if line and width + unit_width > max_width:
+            if unit.isspace():
+                lines.append(line.rstrip())
+                line, width = '', 0.0
+                continue
+            carry = ''
+            if unit in NO_LINE_START:
+                if width + unit_width <= max_width + hang:
+                    line += unit
+                    width += unit_width
+                    continue
+                # 连同行尾挂着的标点和它前面的一个字一起换行
+                cut = len(line)
+                while cut > 1 and line[cut - 1] in NO_LINE_START:
+                    cut -= 1
+                if cut > 1:
+                    cut -= 1
+                carry, line = line[cut:], line[:cut]
+            while len(line) > 1 and line[-1] in NO_LINE_END:
+                carry = line[-1] + carry
+                line = line[:-1]
+            lines.append(line.rstrip())
+            line, width = carry, measure(carry)
+        line += unit
+        width += unit_width
+    if line.strip():
+        lines.append(line.rstrip())
+    return lines
+
+
+class Face:
+    """一种字体的一个字号，表情改用表情字体渲染
+
+    字宽、单个字形和整段字形串（同一字体的连续文字）都缓存在进程内，跨卡片、跨文章复用：
+    绘制一行时按字体拆成字形串，字形串命中缓存直接贴到卡片上，未命中时用缓存的字形拼出来，
+    只有第一次出现的字才交给 FreeType 栅格化。
+    """
+
+    def __init__(self, path: str, size: int, emoji_path: Optional[str] = None):
+        from PIL import ImageFont
+
+        self.size = size
+        self.font = ImageFont.truetype(path, size)
+        self.ascent, self.descent = self.font.getmetrics()
+        self.emoji, self.emoji_scale = self._load_emoji(emoji_path, size) if emoji_path else (None, 1.0)
+        self._pad = max(2, size // 4)
+        self._advances = {}
+        self._glyphs = {}
+        self._runs: 'OrderedDict[Tuple[str, bool], object]' = OrderedDict()
+        self._solids = {}
+        self._lock = threading.Lock()
+        self.glyph_misses = 0
+        self.run_hits = 0
+        self.run_misses = 0
+
+    @staticmethod
+    def _load_emoji(path: str, size: int):
+        from PIL import ImageFont
+
+        try:
+            return ImageFont.truetype(path, size), 1.0
+        except OSError:
+            pass
+        for native in EMOJI_BITMAP_SIZES:
+            try:
+                return ImageFont.truetype(path, native), size / native
+            except OSError:
+                continue
+        print(f"无法加载表情字体: {path}")
+        return None, 1.0
+
+    def _kind(self, ch: str) -> Optional[bool]:
+        """True=表情字体，False=文字字体，None=不绘制（没有表情字体时表情也不绘制，避免显示方框）"""
+        if ch in IGNORED_CHARS:
+            return None
+        if is_emoji(ch):
+            return True if self.emoji else None
+        return False
+
+    def advance(self, ch: str) -> float:
+        width = self._advances.get(ch)
+        if width is None:
+            kind = self._kind(ch)
+            if kind is None:
+                width = 0.0
+            elif kind:
+                width = self.emoji.getlength(ch) * self.emoji_scale
+            else:
+                width = self.font.getlength(ch)
+            self._advances[ch] = width
+        return width
+
+    def measure(self, text: str) -> float:
+        return sum(self.advance(ch) for ch in text)
+
+    def split(self, text: str) -> List[Tuple[bool, str]]:
+        """按字体拆成字形串 [(是否表情, 文字)]"""
+        runs: List[Tuple[bool, str]] = []
+        for ch in text:
+            kind = self._kind(ch)
+            if kind is None:
+                continue
+            if runs and runs[-1][0] == kind:
+                runs[-1] = (kind, runs[-1][1] + ch)
+            else:
+                runs.append((kind, ch))
+        return runs
+
+    def glyph(self, ch: str, emoji: bool):
+        """单个字形：(图像, 相对基线原点的偏移)；文字为灰度蒙版，表情为 RGBA；空白字符为 None"""
+        key = (ch, emoji)
+        if key in self._glyphs:
+            return self._glyphs[key]
+        from PIL import Image, ImageDraw
+
+        self.glyph_misses += 1
+        font = self.emoji if emoji else self.font
+        x0, y0, x1, y1 = font.getbbox(ch, anchor='ls')
+        glyph = None
+        if x1 > x0 and y1 > y0:
+            if emoji:
+                image = Image.new('RGBA', (x1 - x0, y1 - y0), (0, 0, 0, 0))
+                ImageDraw.Draw(image).text((-x0, -y0), ch, font=font, anchor='ls', embedded_color=True)
+                scale = self.emoji_scale
+                if scale != 1.0:
+                    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+                    image = image.resize(size, Image.LANCZOS)
+                glyph = (image, x0 * scale, y0 * scale)
+            else:
+                image = Image.new('L', (x1 - x0, y1 - y0), 0)
+                ImageDraw.Draw(image).text((-x0, -y0), ch, font=font, fill=255, anchor='ls')
+                glyph = (image, x0, y0)
+        self._glyphs[key] = glyph
+        return glyph
+
+    def run(self, text: str, emoji: bool):
+        """一段同一字体的文字拼成的图像，裁掉空白：(图像, 相对基线原点的偏移)；全是空白时为 None"""
+        key = (text, emoji)
+        with self._lock:
+            if key in self._runs:
+                self._runs.move_to_end(key)
+                self.run_hits += 1
+                return self._runs[key]
+        from PIL import Image
+
+        pad = self._pad
+        width = math.ceil(self.measure(text)) + 2 * pad
+        height = self.ascent + self.descent + 2 * pad
+        image = Image.new('RGBA', (width, height), (0, 0, 0, 0)) if emoji else Image.new('L', (width, height), 0)
+        pen, baseline = float(pad), pad + self.ascent
+        for ch in text:
+            glyph = self.glyph(ch, emoji)
+            if glyph:
+                mark, dx, dy = glyph
+                position = (round(pen + dx), round(baseline + dy))
+                if emoji:
+                    image.paste(mark, position, mark)
+                else:
+                    image.paste(255, position, mark)
+            pen += self.advance(ch)
+        # 贴到卡片上的耗时和面积成正比，只保留有笔画的部分
+        box = image.getbbox()
+        run = (image.crop(box), box[0] - pad, box[1] - baseline) if box else None
+        with self._lock:
+            self.run_misses += 1
+            self._runs[key] = run
+            if len(self._runs) > RUN_CACHE_SIZE:
+                self._runs.popitem(last=False)
+        return run
+
+    def _solid(self, color: Tuple[int, int, int], size: Tuple[int, int]):
+        """纯色图像：带蒙版贴图比直接用颜色填充快"""
+        from PIL import Image
+
+        solid = self._solids.get(color)
+        if solid is None or solid.width < size[0] or solid.height < size[1]:
+            width, height = max(size[0], solid.width if solid else 0), max(size[1], solid.height if solid else 0)
+            solid = Image.new('RGB', (width, height), color)
+            self._solids[color] = solid
+        if solid.size == size:
+            return solid
+        return solid.crop((0, 0) + size)
+
+    def draw(self, card, x: float, top: float, text: str, color: Tuple[int, int, int], line_height: float) -> None:
+        """在卡片上绘制一行文字，文字在 line_height 高的行内垂直居中"""
+        baseline = top + (line_height - self.ascent - self.descent) / 2 + self.ascent
+        for emoji, segment in self.split(text):
+            run = self.run(segment, emoji)
+            if run:
+                image, dx, dy = run
+                position = (round(x + dx), round(baseline + dy))
+                if emoji:
+                    card.paste(image, position, image)
+                else:
+                    card.paste(self._solid(color, image.size), position, image)
+            x += self.measure(segment)
+
+    def ellipsize(self, text: str, max_width: float) -> str:
+        """超过宽度时截断并加省略号"""
+        if self.measure(text) <= max_width:
+            return text
+        while text and self.measure(text + '…') > max_width:
+            text = text[:-1]
+        return text.rstrip() + '…'
+
+    def stats(self) -> dict:
+        return {'glyphs': len(self._glyphs), 'glyph_misses': self.glyph_misses,
+                'runs': len(self._runs), 'run_hits': self.run_hits, 'run_misses': self.run_misses}
+
+
+@lru_cache(maxsize=32)
+def get_face(path: str, size: int, emoji_path: Optional[str] = None) -> Face:
+    """进程内共享的字体对象，同一字体、字号只加载一次"""
+    return Face(path, size, emoji_path)
+
+
+class CardRenderer:
+    """把标题和正文渲染成小红书尺寸的文字卡片：第一张是标题封面，之后按行分页，每页带页码"""
+
+    def __init__(self, font_path: Optional[str] = None, title_font_path: Optional[str] = None,
+                 emoji_font_path: Optional[str] = None, width: int = CARD_WIDTH, height: int = CARD_HEIGHT,
+                 style: Optional[CardStyle] = None):
+        self.font_path = font_path or find_font(TEXT_CARD_FONT, FONT_CANDIDATES)
+        self.title_font_path = (title_font_path or find_font(TEXT_CARD_TITLE_FONT, TITLE_FONT_CANDIDATES)
+                                or self.font_path)
+        self.emoji_font_path = (emoji_font_path if emoji_font_path is not None
+                                else find_font(TEXT_CARD_EMOJI_FONT, EMOJI_FONT_CANDIDATES))
+        self.width = width
+        self.height = height
+        self.style = style or CardStyle()
+
+    @property
+    def available(self) -> bool:
+        return bool(self.font_path)
+
+    def faces(self) -> Tuple[Face, Face, Face]:
+        """(标题, 正文, 页眉页脚) 字体"""
+        style = self.style
+        return (get_face(self.title_font_path, style.title_size, self.emoji_font_path),
+                get_face(self.font_path, style.body_size, self.emoji_font_path),
+                get_face(self.font_path, style.small_size, self.emoji_font_path))
+
+    def paginate(self, body: str, face: Face) -> List[List[Tuple[str, bool]]]:
+        """正文分页，每页是 [(一行文字, 是否段落第一行)]"""
+        style = self.style
+        line_height = style.body_size * style.line_spacing
+        gap = line_height * style.paragraph_gap
+        _, content_top, content_bottom = self._body_box()
+        content_height = content_bottom - content_top
+        pages: List[List[Tuple[str, bool]]] = []
+        page: List[Tuple[str, bool]] = []
+        used = 0.0
+        for paragraph in body.splitlines():
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            for i, line in enumerate(wrap_text(paragraph, face.measure, self.width - 2 * style.margin)):
+                needed = line_height + (gap if i == 0 and page else 0)
+                if page and used + needed > content_height:
+                    pages.append(page)
+                    page, used, needed = [], 0.0, line_height
+                page.append((line, i == 0))
+                used += needed
+        if page:
+            pages.append(page)
+        return pages
+
+    def _body_box(self) -> Tuple[float, float, float]:
+        """正文页的 (页眉分隔线位置, 正文顶部, 正文底部)"""
+        style = self.style
+        small_line = style.small_size * style.line_spacing
+        rule = style.margin + small_line + 16
+        return rule, rule + 40, self.height - style.margin - small_line - 16
+
+    def render(self, title: str, body: str, tags: Sequence[str] = (), max_cards: int = IMAGE_BUDGET) -> list:
+        """渲染卡片，返回 PIL 图像列表；正文超出 max_cards 张时截断并以省略号结尾"""
+        if not self.available or max_cards < 1:
+            return []
+        title_face, body_face, small_face = self.faces()
+        pages = self.paginate(body, body_face)
+        if len(pages) > max_cards - 1:
+            pages = pages[:max_cards - 1]
+            if pages:
+                last, first = pages[-1][-1]
+                pages[-1][-1] = (body_face.ellipsize(last + '…', self.width - 2 * self.style.margin), first)
+        total = len(pages) + 1
+        cards = [self._cover(title, tags, total, title_face, small_face)]
+        for number, page in enumerate(pages, 2):
+            cards.append(self._page(title, page, number, total, body_face, small_face))
+        return cards
+
+    def _new_card(self):
+        from PIL import Image
+
+        return Image.new('RGB', (self.width, self.height), self.style.background)
+
+    def _footer(self, card, number: int, total: int, face: Face) -> None:
+        style = self.style
+        line_height = style.small_size * style.line_spacing
+        text = f'{number}/{total}'
+        x = self.width - style.margin - face.measure(text)
+        face.draw(card, x, self.height - style.margin - line_height, text, style.muted, line_height)
+
+    def _cover(self, title: str, tags: Sequence[str], total: int, face: Face, small_face: Face):
+        from PIL import ImageDraw
+
+        style = self.style
+        card = self._new_card()
+        text_width = self.width - 2 * style.margin
+        top = style.margin * 2
+        ImageDraw.Draw(card).rectangle((style.margin, top, style.margin + 120, top + 12), fill=style.accent)
+        lines = wrap_text(title.strip(), face.measure, text_width)
+        if len(lines) > style.title_lines:
+            lines = lines[:style.title_lines]
+            lines[-1] = face.ellipsize(lines[-1] + '…', text_width)
+        line_height = style.title_size * style.title_spacing
+        y = top + 80
+        for line in lines:
+            face.draw(card, style.margin, y, line, style.text, line_height)
+            y += line_height
+        if tags:
+            small_height = style.small_size * style.line_spacing
+            text = small_face.ellipsize(' '.join(tags), text_width)
+            small_face.draw(card, style.margin, self.height - style.margin - 2 * small_height - 16, text,
+                            style.accent, small_height)
+        if total > 1:
+            self._footer(card, 1, total, small_face)
+        return card
+
+    def _page(self, title: str, lines: List[Tuple[str, bool]], number: int, total: int,
+              face: Face, small_face: Face):
+        from PIL import ImageDraw
+
+        style = self.style
+        card = self._new_card()
+        text_width = self.width - 2 * style.margin
+        rule, y, _ = self._body_box()
+        small_height = style.small_size * style.line_spacing
+        small_face.draw(card, style.margin, style.margin, small_face.ellipsize(title.strip(), text_width),
+                        style.muted, small_height)
+        ImageDraw.Draw(card).line((style.margin, rule, self.width - style.margin, rule), fill=style.muted, width=2)
+        line_height = style.body_size * style.line_spacing
+        for i, (line, paragraph_start) in enumerate(lines):
+            if paragraph_start and i:
+                y += line_height * style.paragraph_gap
+            face.draw(card, style.margin, y, line, style.text, line_height)
+            y += line_height
+        self._footer(card, number, total, small_face)
+        return card
+
+    def render_jpeg(self, title: str, body: str, tags: Sequence[str] = (),
+                    max_cards: int = IMAGE_BUDGET) -> List[bytes]:
+        """渲染并编码为 JPEG"""
+        encoded = []
+        for card in self.render(title, body, tags, max_cards):
+            buffer = BytesIO()
+            card.save(buffer, 'JPEG', quality=TEXT_CARD_QUALITY)
+            encoded.append(buffer.getvalue())
+        return encoded
+
+    def render_many(self, notes: Sequence[Tuple[str, str, Sequence[str], int]],
+                    workers: int = TEXT_CARD_WORKERS) -> List[List[bytes]]:
+        """批量渲染多篇笔记 [(标题, 正文, 标签, 最多卡片数)]，在进程池中并行；
+        每个进程的字体和字形缓存在整批笔记间复用"""
+        jobs = [(title, body, tuple(tags), max_cards) for title, body, tags, max_cards in notes]
+        if workers <= 1 or len(jobs) <= 1:
+            return [self.render_jpeg(*job) for job in jobs]
+        from concurrent.futures import ProcessPoolExecutor
+
+        config = (self.font_path, self.title_font_path, self.emoji_font_path, self.width, self.height, self.style)
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_init_worker,
+                                 initargs=config) as pool:
+            return list(pool.map(_render_job, jobs))
+
+
+# 进程池中每个进程的渲染器
+_worker_renderer: Optional[CardRenderer] = None
+
+
+def _init_worker(*config) -> None:
+    global _worker_renderer
+    _worker_renderer = CardRenderer(*config)
+    if _worker_renderer.available:
+        _worker_renderer.faces()
+
+
+def _render_job(job) -> List[bytes]:
+    return _worker_renderer.render_jpeg(*job)
+
+
+_renderer: Optional[CardRenderer] = None
+_renderer_lock = threading.Lock()
+_missing_font_reported = False
+
+
+def get_renderer() -> CardRenderer:
+    """进程内共享的渲染器"""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = CardRenderer()
+    return _renderer
+
+
+def note_parts(converted: str, fallback_title: str = '') -> Tuple[str, str, List[str]]:
+    """从转换后的内容取出 (标题, 正文, 标签)
+
+    不是笔记格式时（如 gzh2xhs.py 的本地转换）用 fallback_title 作为标题，
+    去掉包含标题的第一行，末尾只有话题标签的行作为标签，其余作为正文
+    """
+    result = parse_note(converted)
+    note = result.note
+    # 有标题和正文时按笔记格式取出，字段不合格（标题数量、字数等）也照常使用
+    if note.titles and note.body:
+        return note.title or fallback_title, note.body, note.tags
+    lines = converted.strip().splitlines()
+    tags: List[str] = []
+    while lines and (not lines[-1].strip() or _TAG_LINE_RE.match(lines[-1])):
+        tags = lines.pop().split() + tags
+    if lines and fallback_title and fallback_title in lines[0]:
+        lines.pop(0)
+    return fallback_title, '\n'.join(lines).strip(), tags
+
+
+def usable_images(paths: List[str]) -> List[str]:
+    """尺寸适合作为笔记图片的本地图片（不含文字卡片），只读取文件头"""
+    from PIL import Image
+
+    usable = []
+    for path in paths:
+        if os.path.basename(path).startswith(CARD_PREFIX):
+            continue
+        try:
+            with Image.open(path) as img:
+                short, long = sorted(img.size)
+        except Exception:
+            continue
+        if short >= MIN_SIDE and long / short <= MAX_ASPECT:
+            usable.append(path)
+    return usable
+
+
+def card_slots(paths: List[str], min_images: int = TEXT_CARD_MIN_IMAGES) -> int:
+    """需要生成的卡片数：可用图片不足 min_images 张时补到 IMAGE_BUDGET 张，已有卡片时不再生成"""
+    if min_images <= 0 or any(os.path.basename(path).startswith(CARD_PREFIX) for path in paths):
+        return 0
+    usable = len(usable_images(paths))
+    return IMAGE_BUDGET - usable if usable < min_images else 0
+
+
+def write_cards(save_dir: str, cards: List[bytes]) -> List[str]:
+    """写入 images/text_card_N.jpg，返回路径"""
+    batch = get_writer().begin(save_dir)
+    paths = [batch.add_bytes(f'images/{CARD_PREFIX}{i}.jpg', data) for i, data in enumerate(cards, 1)]
+    batch.commit()
+    return paths
+
+
+def add_text_cards(store, url: str, save_dir: str, title: str, body: str, tags: Sequence[str] = (),
+                   min_images: int = TEXT_CARD_MIN_IMAGES) -> List[str]:
+    """文章可用图片不足时生成文字卡片，写入文章的 images 目录并登记到文章库（排在原有图片之后）
+
+    已经生成过卡片的文章不再生成；没有中文字体或出错时只打印提示，返回空列表
+    """
+    global _missing_font_reported
+    record = store.get(url)
+    if not record:
+        return []
+    # 文章图片可能还在写入
+    get_writer().flush(save_dir)
+    slots = card_slots(store.get_images(record.id), min_images)
+    if not slots:
+        return []
+    renderer = get_renderer()
+    if not renderer.available:
+        if not _missing_font_reported:
+            _missing_font_reported = True
+            print("未找到中文字体，跳过文字卡片（在 .env 中设置 TEXT_CARD_FONT）")
+        return []
+    try:
+        with stage('cards'):
+            paths = write_cards(save_dir, renderer.render_jpeg(title, body, tags, slots))
+    except Exception as e:
+        print(f"生成文字卡片失败: {str(e)}")
+        return []
+    store.append_images(record.id, [(f'{CARD_SOURCE}:{i}', path) for i, path in enumerate(paths, 1)])
+    print(f"图片不足，已生成 {len(paths)} 张文字卡片")
+    return paths
+
+
+def _directory_job(content_dir: str, min_images: int, force: bool):
+    """导出目录需要渲染的 (标题, 正文, 标签, 卡片数)，不需要时返回 None"""
+    image_dir = os.path.join(content_dir, 'images')
+    names = sorted(os.listdir(image_dir)) if os.path.isdir(image_dir) else []
+    if force:
+        for name in names:
+            if name.startswith(CARD_PREFIX):
+                os.remove(os.path.join(image_dir, name))
+        names = [name for name in names if not name.startswith(CARD_PREFIX)]
+    paths = [os.path.join(image_dir, name) for name in names if name.lower().endswith(('.png', '.jpg', '.jpeg'))]
+    slots = card_slots(paths, min_images)
+    if not slots:
+        return None
+    json_path = os.path.join(content_dir, 'xiaohongshu.json')
+    text_path = os.path.join(content_dir, 'xiaohongshu.txt')
+    path = json_path if os.path.exists(json_path) else text_path
+    with open(path, 'r', encoding='utf-8') as f:
+        title, body, tags = note_parts(f.read(), os.path.basename(os.path.normpath(content_dir)))
+    return title, body, tags, slots
+
+
+def main():
+    parser = argparse.ArgumentParser(description="为图片不足的导出目录生成文字卡片（images/text_card_N.jpg）")
+    parser.add_argument('dirs', nargs='+', help="转换结果所在的文章目录（包含 xiaohongshu.json 或 xiaohongshu.txt）")
+    parser.add_argument('--min-images', type=int, default=TEXT_CARD_MIN_IMAGES,
+                        help="可用图片少于这个数量时生成卡片")
+    parser.add_argument('--workers', type=int, default=TEXT_CARD_WORKERS, help="渲染进程数")
+    parser.add_argument('--force', action='store_true', help="删除已有的卡片重新生成")
+    args = parser.parse_args()
+
+    renderer = get_renderer()
+    if not renderer.available:
+        print("未找到中文字体，请在 .env 中设置 TEXT_CARD_FONT")
+        sys.exit(1)
+    jobs = []
+    for content_dir in args.dirs:
+        try:
+            job = _directory_job(content_dir, args.min_images, args.force)
+        except OSError as e:
+            print(f"读取 {content_dir} 失败: {str(e)}")
+            continue
+        if job:
+            jobs.append((content_dir, job))
+    results = renderer.render_many([job for _, job in jobs], args.workers)
+    for (content_dir, _), cards in zip(jobs, results):
+        write_cards(content_dir, cards)
+        print(f"{content_dir}: 生成 {len(cards)} 张文字卡片")
+    print(f"共处理 {len(args.dirs)} 个目录，其中 {len(jobs)} 个生成了卡片")
+
+
+if __name__ == "__main__":
+    main()
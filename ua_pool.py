@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import random
+import threading
+from typing import List, Optional
+
+# 内置的常见浏览器 User-Agent，没有缓存文件时使用，启动时不需要联网
+BUILTIN_USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:121.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.6099.144 Mobile Safari/537.36',
+]
+
+# 本地缓存文件，可用 `python ua_pool.py refresh` 更新
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'gzh2xhs', 'user_agents.json')
+
+
+class UserAgentPool:
+    """本地 User-Agent 池，按打乱后的顺序轮换
+
+    只读取本地缓存文件或内置列表，不在启动时加载 fake_useragent 的浏览器数据库。
+    """
+
+    def __init__(self, agents: Optional[List[str]] = None, cache_path: str = CACHE_PATH):
+        self.cache_path = cache_path
+        self.agents = list(agents) if agents else self.load()
+        self._lock = threading.Lock()
+        self._order: List[str] = []
+
+    def load(self) -> List[str]:
+        """读取缓存文件，没有或损坏时用内置列表"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                agents = [a for a in json.load(f) if isinstance(a, str) and a]
+            if agents:
+                return agents
+        except (OSError, ValueError):
+            pass
+        return list(BUILTIN_USER_AGENTS)
+
+    def next(self) -> str:
+        """轮换取下一个 User-Agent，每轮重新打乱顺序"""
+        with self._lock:
+            if not self._order:
+                self._order = random.sample(self.agents, len(self.agents))
+            return self._order.pop()
+
+    def random(self) -> str:
+        """随机取一个 User-Agent"""
+        return random.choice(self.agents)
+
+    def refresh(self, count: int = 50) -> int:
+        """用 fake_useragent 生成一批 User-Agent 写入缓存，可能需要联网"""
+        from fake_useragent import UserAgent
+
+        ua = UserAgent()
+        agents = list(dict.fromkeys(ua.random for _ in range(count * 3)))[:count]
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump(agents, f, ensure_ascii=False, indent=2)
+        with self._lock:
+            self.agents = agents
+            self._order = []
+        return len(agents)
+
+
+_pool: Optional[UserAgentPool] = None
+
+
+def get_pool() -> UserAgentPool:
+    """全局共享的 User-Agent 池"""
+    global _pool
+    if _pool is None:
+        _pool = UserAgentPool()
+    return _pool
+
+
+def random_user_agent() -> str:
+    """从全局池中轮换取一个 User-Agent"""
+    return get_pool().next()
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'refresh':
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+        print(f"已缓存 {get_pool().refresh(count)} 个 User-Agent：{CACHE_PATH}")
+    else:
+        pool = get_pool()
+        print(f"共 {len(pool.agents)} 个 User-Agent")
+        for agent in pool.agents:
+            print(agent)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,575 @@
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlsplit
+from dotenv import load_dotenv
+from article_store import ArticleStore, canonical_url
+from http_client import get_client
+from politeness import get_scheduler
+from ua_pool import random_user_agent
+from xhs_converter import RESULT_FAILED, RESULT_THROTTLED
+import profiler
+
+# 加载环境变量
+load_dotenv()
+
+# 数据目录，文章库和轮询状态都保存在这里
+DATA_ROOT = r"E:\fy\智企内推\data"
+WATCH_DB = 'watch.db'
+
+# 来源列表（JSON），格式见 sources.example.json
+SOURCES_PATH = os.getenv('WATCH_SOURCES_PATH', 'sources.json')
+# 默认轮询间隔（秒），来源中的 interval 可单独覆盖
+WATCH_INTERVAL = float(os.getenv('WATCH_INTERVAL', '900'))
+# 同时轮询的来源数
+WATCH_POLL_WORKERS = int(os.getenv('WATCH_POLL_WORKERS', '8'))
+# 新来源第一次轮询时处理的文章数，其余只记为已见，避免把历史文章全部转换一遍
+WATCH_BACKFILL = int(os.getenv('WATCH_BACKFILL', '0'))
+# 处理失败的文章在后续轮次中最多尝试的次数
+MAX_ATTEMPTS = 3
+# sitemap 索引最多展开的子 sitemap 数
+MAX_CHILD_SITEMAPS = 50
+
+# 来源类型：auto=按内容自动识别，feed=RSS/Atom，sitemap=站点地图，index=文章列表页（HTML）
+SOURCE_TYPES = ('auto', 'feed', 'sitemap', 'index')
+# 处理新文章的流程：weixin=公众号文章，page=普通网页；留空按链接域名自动选择
+CRAWLERS = ('weixin', 'page')
+WEIXIN_HOST = 'mp.weixin.qq.com'
+# 文章列表页中公众号文章链接的默认匹配规则
+WEIXIN_ARTICLE_PATTERN = r'^https?://mp\.weixin\.qq\.com/s[/?]'
+
+# 已见文章的状态
+SEEN_BASELINE = 'baseline'  # 来源第一次轮询时已经存在
+SEEN_KNOWN = 'known'  # 文章库中已有（如之前手动处理过）
+SEEN_QUEUED = 'queued'  # 已加入任务队列，由工作进程处理（--enqueue）
+SEEN_PENDING = 'pending'  # 已发现还没有处理完，中断后重启时重试
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body_hash TEXT,
+    children TEXT,
+    polled_at REAL,
+    changed_at REAL
+);
+CREATE TABLE IF NOT EXISTS seen (
+    url TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+@dataclass
+class Source:
+    name: str
+    url: str
+    type: str = 'auto'
+    crawler: str = ''
+    pattern: str = ''
+    interval: float = WATCH_INTERVAL
+    next_poll: float = 0.0
+
+    def __post_init__(self):
+        if self.type not in SOURCE_TYPES:
+            raise ValueError(f"来源类型必须是 {', '.join(SOURCE_TYPES)} 之一：{self.type}")
+        if self.crawler and self.crawler not in CRAWLERS:
+            raise ValueError(f"处理流程必须是 {', '.join(CRAWLERS)} 之一：{self.crawler}")
+        pattern = self.pattern
+        if not pattern and self.type == 'index' and self.crawler != 'page':
+            # 文章列表页上的导航等链接很多，公众号来源默认只要文章链接
+            pattern = WEIXIN_ARTICLE_PATTERN if urlsplit(self.url).netloc == WEIXIN_HOST else ''
+        self._pattern = re.compile(pattern) if pattern else None
+
+    def matches(self, link: str) -> bool:
+        return self._pattern is None or bool(self._pattern.search(link))
+
+    def crawler_for(self, link: str) -> str:
+        if self.crawler:
+            return self.crawler
+        return 'weixin' if urlsplit(link).netloc.lower() == WEIXIN_HOST else 'page'
+
+
+def load_sources(path: str = SOURCES_PATH) -> List[Source]:
+    """读取来源列表，格式不正确的条目打印错误后跳过"""
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    sources = []
+    for entry in entries:
+        try:
+            sources.append(Source(
+                name=entry.get('name') or entry['url'],
+                url=entry['url'],
+                type=entry.get('type', 'auto'),
+                crawler=entry.get('crawler', ''),
+                pattern=entry.get('pattern', ''),
+                interval=float(entry.get('interval', WATCH_INTERVAL)),
+            ))
+        except (KeyError, ValueError, re.error) as e:
+            print(f"跳过格式不正确的来源 {entry}: {str(e)}")
+    return sources
+
+
+# ---- 链接提取 ----
+
+class _LinkParser(HTMLParser):
+    """提取页面中的链接（href，以及公众号合集页使用的 data-link）"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        for name, value in attrs:
+            if value and (name == 'data-link' or (name == 'href' and tag == 'a')):
+                self.links.append(value.strip())
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_xml(body: bytes) -> Tuple[str, List[str], List[str]]:
+    """解析 sitemap / RSS / Atom，返回 (类型, 文章链接, 子 sitemap 地址)"""
+    root = ET.fromstring(body)
+    kind = _local_name(root.tag)
+    links: List[str] = []
+    children: List[str] = []
+    if kind in ('urlset', 'sitemapindex'):
+        target = children if kind == 'sitemapindex' else links
+        for element in root.iter():
+            if _local_name(element.tag) == 'loc' and element.text:
+                target.append(element.text.strip())
+        return 'sitemap', links, children
+    if kind == 'feed':
+        for entry in root.iter():
+            if _local_name(entry.tag) != 'entry':
+                continue
+            for link in entry:
+                if _local_name(link.tag) == 'link' and link.get('rel', 'alternate') == 'alternate' and link.get('href'):
+                    links.append(link.get('href').strip())
+                    break
+        return 'feed', links, children
+    # RSS 2.0 / RSS 1.0 (RDF)
+    for item in root.iter():
+        if _local_name(item.tag) != 'item':
+            continue
+        for child in item:
+            if _local_name(child.tag) == 'link' and child.text:
+                links.append(child.text.strip())
+                break
+    return 'feed', links, children
+
+
+def extract_links(source: Source, url: str, body: bytes, encoding: Optional[str]) -> Tuple[List[str], List[str]]:
+    """按来源类型提取 (文章链接, 子 sitemap 地址)，链接转为绝对地址"""
+    kind = source.type
+    if kind == 'auto':
+        head = body.lstrip()[:200].lower()
+        xml_markers = (b'<?xml', b'<rss', b'<feed', b'<urlset', b'<sitemapindex', b'<rdf')
+        kind = 'sitemap' if head.startswith(xml_markers) else 'index'
+    if kind in ('feed', 'sitemap'):
+        _, links, children = parse_xml(body)
+    else:
+        parser = _LinkParser()
+        parser.feed(body.decode(encoding or 'utf-8', errors='replace'))
+        parser.close()
+        links, children = parser.links, []
+    absolute = []
+    for link in links:
+        if link.startswith(('javascript:', 'mailto:', '#')):
+            continue
+        absolute.append(urljoin(url, link))
+    return absolute, children
+
+
+# ---- 轮询状态 ----
+
+class WatchState:
+    """轮询状态：每个来源的条件请求校验值（ETag / Last-Modified / 内容哈希）和已见过的文章URL"""
+
+    def __init__(self, root: str = DATA_ROOT):
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(root, WATCH_DB), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get_source(self, url: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self.conn.execute('SELECT * FROM sources WHERE url = ?', (url,)).fetchone()
+
+    def save_source(self, url: str, etag: Optional[str], last_modified: Optional[str],
+                    body_hash: Optional[str], changed: bool) -> None:
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                'INSERT INTO sources (url, etag, last_modified, body_hash, polled_at, changed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(url) DO UPDATE SET '
+                'etag = excluded.etag, last_modified = excluded.last_modified, body_hash = excluded.body_hash, '
+                'polled_at = excluded.polled_at, changed_at = COALESCE(excluded.changed_at, sources.changed_at)',
+                (url, etag, last_modified, body_hash, now, now if changed else None),
+            )
+
+    def save_children(self, url: str, children: List[str]) -> None:
+        """sitemap 索引中的子 sitemap 地址，索引没有变化时仍要逐个轮询"""
+        with self._lock, self.conn:
+            self.conn.execute('UPDATE sources SET children = ? WHERE url = ?', (json.dumps(children), url))
+
+    def get_children(self, url: str) -> List[str]:
+        with self._lock:
+            row = self.conn.execute('SELECT children FROM sources WHERE url = ?', (url,)).fetchone()
+        return json.loads(row['children']) if row and row['children'] else []
+
+    def touch_source(self, url: str) -> None:
+        """来源没有变化，只更新轮询时间"""
+        with self._lock, self.conn:
+            self.conn.execute('UPDATE sources SET polled_at = ? WHERE url = ?', (time.time(), url))
+
+    def load_seen(self) -> Tuple[Set[str], Dict[str, str]]:
+        """返回 (不再处理的URL, 可以重试的失败、被限流或上次没处理完的URL -> 来源名称)"""
+        done: Set[str] = set()
+        retry: Dict[str, str] = {}
+        with self._lock:
+            rows = self.conn.execute('SELECT url, source, status, attempts FROM seen').fetchall()
+        for row in rows:
+            if (row['status'] == RESULT_FAILED and row['attempts'] < MAX_ATTEMPTS
+                    or row['status'] in (RESULT_THROTTLED, SEEN_PENDING)):
+                retry[row['url']] = row['source']
+            else:
+                done.add(row['url'])
+        return done, retry
+
+    def mark_seen(self, urls: List[str], source: str, status: str) -> None:
+        """批量记为已见（不处理）"""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO seen (url, source, first_seen, status) VALUES (?, ?, ?, ?)',
+                [(url, source, now, status) for url in urls],
+            )
+
+    def record_result(self, url: str, source: str, status: str) -> int:
+        """记录处理结果，返回累计尝试次数；被限流不算一次尝试"""
+        counted = 0 if status == RESULT_THROTTLED else 1
+        with self._lock, self.conn:
+            self.conn.execute(
+                'INSERT INTO seen (url, source, first_seen, status, attempts) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(url) DO UPDATE SET status = excluded.status, attempts = seen.attempts + ?',
+                (url, source, time.time(), status, counted, counted),
+            )
+            return self.conn.execute('SELECT attempts FROM seen WHERE url = ?', (url,)).fetchone()[0]
+
+
+# ---- 轮询和处理 ----
+
+@dataclass
+class PollResult:
+    source: Source
+    status: str  # changed / not_modified / unchanged / error
+    links: List[str]
+    first_poll: bool = False
+    bytes: int = 0
+    requests: int = 0
+    # 本次拿到的校验值 [(url, ETag, Last-Modified, 内容哈希, 是否变化)]，新链接登记后才保存
+    validators: List[Tuple[str, Optional[str], Optional[str], str, bool]] = field(default_factory=list)
+    # sitemap 索引变化后的子 sitemap 地址，和校验值一起保存
+    children: Optional[List[str]] = None
+
+
+class Watcher:
+    """监控模式：按计划轮询来源，只把新文章交给抓取和转换流程
+
+    - 条件请求（If-None-Match / If-Modified-Since），来源没有变化时服务端返回 304，不传输内容；
+      不支持条件请求的来源比较内容哈希，没有变化时不再解析
+    - 已见过的文章URL（规范化后）持久化在 watch.db，重启后不会重复处理
+    - 处理失败的文章在后续轮次中重试，最多 MAX_ATTEMPTS 次；被限流的文章不计次数，一直重试
+    """
+
+    def __init__(self, sources: List[Source], root: str = DATA_ROOT, backfill: int = WATCH_BACKFILL,
+                 handlers: Optional[Dict[str, Callable[[str], str]]] = None):
+        self.sources = sources
+        self.root = root
+        self.backfill = backfill
+        self.state = WatchState(root)
+        self.store = ArticleStore(root)
+        self.seen, self.retry = self.state.load_seen()
+        self.headers = {
+            'User-Agent': random_user_agent(),
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        }
+        # 处理流程：crawler 名称 -> 处理函数(url) -> 处理结果，默认按需创建
+        self.handlers: Dict[str, Callable[[str], str]] = dict(handlers or {})
+        self.engines = []
+
+    def close(self) -> None:
+        self.state.close()
+        self.store.close()
+
+    # ---- 轮询 ----
+
+    def _fetch(self, url: str, result: PollResult) -> Tuple[str, bytes, Optional[str]]:
+        """条件请求，返回 (状态, 内容, 编码)；状态为 changed / not_modified / unchanged
+
+        校验值先记在 result 中，等链接提取并登记后再保存，否则中途出错或中断会漏掉这次的新文章
+        """
+        saved = self.state.get_source(url)
+        headers = dict(self.headers)
+        if saved and saved['etag']:
+            headers['If-None-Match'] = saved['etag']
+        if saved and saved['last_modified']:
+            headers['If-Modified-Since'] = saved['last_modified']
+        response = get_client().get(url, headers=headers)
+        if response.status_code == 304:
+            self.state.touch_source(url)
+            return 'not_modified', b'', None
+        response.raise_for_status()
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        changed = not saved or saved['body_hash'] != digest
+        result.validators.append((url, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                                  digest, changed))
+        declared = 'charset' in response.headers.get('Content-Type', '').lower()
+        return ('changed' if changed else 'unchanged'), body, response.encoding if declared else None
+
+    def poll(self, source: Source) -> PollResult:
+        """轮询一个来源，返回其中的文章链接（没有变化时为空）"""
+        result = PollResult(source, 'unchanged', [], first_poll=self.state.get_source(source.url) is None)
+        try:
+            status, body, encoding = self._fetch(source.url, result)
+            result.requests += 1
+            result.bytes += len(body)
+            result.status = status
+            if status == 'changed':
+                links, children = extract_links(source, source.url, body, encoding)
+                result.children = children
+            else:
+                # 子 sitemap 更新时索引本身往往不变，仍要轮询上次记录的子 sitemap
+                links, children = [], self.state.get_children(source.url)
+            # sitemap 索引：逐个条件请求子 sitemap，没有变化的不再解析
+            for child in children[:MAX_CHILD_SITEMAPS]:
+                child_status, child_body, child_encoding = self._fetch(child, result)
+                result.requests += 1
+                result.bytes += len(child_body)
+                if child_status == 'changed':
+                    links.extend(extract_links(source, child, child_body, child_encoding)[0])
+                    result.status = 'changed'
+            result.links = links
+        except Exception as e:
+            result.status = 'error'
+            result.validators = []
+            result.children = None
+            print(f"轮询来源失败 [{source.name}] {source.url}: {str(e)}")
+        return result
+
+    # ---- 处理新文章 ----
+
+    def _handler(self, crawler: str) -> Callable[[str], str]:
+        """按需创建抓取和转换流程，同类文章共用一个爬虫和转换器"""
+        handler = self.handlers.get(crawler)
+        if handler:
+            return handler
+        if crawler == 'weixin':
+            from weixin_crawler import WeixinCrawler
+            from xhs_converter import XHSConverter, convert_weixin_url
+            weixin, converter = WeixinCrawler(base_save_path=self.root), XHSConverter()
+            handler = lambda url: convert_weixin_url(url, weixin, converter)  # noqa: E731
+        else:
+            import xhs_converte_page
+            page = xhs_converte_page.PageCrawler(base_save_path=self.root)
+            converter = xhs_converte_page.XHSConverter()
+            handler = lambda url: xhs_converte_page.convert_page_url(url, page, converter)  # noqa: E731
+        if converter.engine:
+            self.engines.append(converter.engine)
+        self.handlers[crawler] = handler
+        return handler
+
+    def new_links(self, result: PollResult) -> List[Tuple[str, str]]:
+        """筛选出需要处理的新文章 [(原始链接, 规范化URL)]，同时登记不需要处理的链接"""
+        candidates = []
+        known = []
+        batch = set()
+        for link in result.links:
+            if not result.source.matches(link):
+                continue
+            url = canonical_url(link)
+            if url in self.seen or url in self.retry or url in batch:
+                continue
+            batch.add(url)
+            if self.store.get(url):
+                known.append(url)
+                continue
+            candidates.append((link, url))
+        if known:
+            self.state.mark_seen(known, result.source.name, SEEN_KNOWN)
+            self.seen.update(known)
+        if result.first_poll:
+            # 新来源：只处理最前面的 backfill 篇，其余记为已见
+            baseline = [url for _, url in candidates[self.backfill:]]
+            self.state.mark_seen(baseline, result.source.name, SEEN_BASELINE)
+            self.seen.update(baseline)
+            candidates = candidates[:self.backfill]
+        if candidates:
+            # 先记为待处理，处理中途中断时下次启动会重试，不会因为来源已保存为没有变化而丢失
+            pending = [url for _, url in candidates]
+            self.state.mark_seen(pending, result.source.name, SEEN_PENDING)
+            self.retry.update((url, result.source.name) for url in pending)
+        return candidates
+
+    def save_poll_state(self, result: PollResult) -> None:
+        """新链接登记完成后保存来源的校验值，之后同样的内容不再解析"""
+        for url, etag, last_modified, body_hash, changed in result.validators:
+            self.state.save_source(url, etag, last_modified, body_hash, changed)
+        if result.children is not None:
+            self.state.save_children(result.source.url, result.children)
+
+    def process(self, source: Source, link: str, url: str) -> str:
+        """交给抓取和转换流程，返回处理结果"""
+        print(f"\n[{source.name}] 发现新文章：{link}")
+        try:
+            status = self._handler(source.crawler_for(link))(link)
+        except Exception as e:
+            print(f"处理文章出错: {str(e)}")
+            status = RESULT_FAILED
+        attempts = self.state.record_result(url, source.name, status)
+        if status == RESULT_FAILED and attempts < MAX_ATTEMPTS or status == RESULT_THROTTLED:
+            self.retry[url] = source.name
+        else:
+            self.retry.pop(url, None)
+            self.seen.add(url)
+        return status
+
+    def run_once(self) -> Dict[str, object]:
+        """轮询到期的来源并处理新文章，返回本轮统计"""
+        started = time.perf_counter()
+        now = time.time()
+        due = [source for source in self.sources if source.next_poll <= now]
+        stats: Dict[str, object] = {
+            'sources': len(due), 'changed': 0, 'not_modified': 0, 'unchanged': 0, 'errors': 0,
+            'requests': 0, 'poll_kb': 0.0, 'links': 0, 'new': 0, 'retried': 0,
+        }
+        if not due:
+            return stats
+        with ThreadPoolExecutor(max_workers=max(1, min(WATCH_POLL_WORKERS, len(due)))) as pool:
+            results = list(pool.map(self.poll, due))
+        poll_seconds = time.perf_counter() - started
+
+        # 之前处理失败的文章，跟随所属来源的轮询周期重试，与来源是否变化无关
+        by_name = {source.name: source for source in due}
+        retries = [(url, by_name[name]) for url, name in self.retry.items() if name in by_name]
+
+        outcomes: Dict[str, int] = {}
+        for result in results:
+            result.source.next_poll = now + result.source.interval
+            stats['errors' if result.status == 'error' else result.status] += 1
+            stats['requests'] += result.requests
+            stats['poll_kb'] += result.bytes / 1024
+            stats['links'] += len(result.links)
+            candidates = self.new_links(result)
+            self.save_poll_state(result)
+            for link, url in candidates:
+                stats['new'] += 1
+                status = self.process(result.source, link, url)
+                outcomes[status] = outcomes.get(status, 0) + 1
+        for url, source in retries:
+            stats['retried'] += 1
+            status = self.process(source, url, url)
+            outcomes[status] = outcomes.get(status, 0) + 1
+        stats.update(outcomes)
+        stats['poll_kb'] = round(stats['poll_kb'], 1)
+        stats['poll_seconds'] = round(poll_seconds, 3)
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        return stats
+
+    def run_forever(self) -> None:
+        """持续轮询，直到 Ctrl+C"""
+        cycle = 0
+        try:
+            while True:
+                stats = self.run_once()
+                if stats['sources']:
+                    cycle += 1
+                    print(f"第 {cycle} 轮统计：{json.dumps(stats, ensure_ascii=False)}")
+                wait = max(0.0, min(source.next_poll for source in self.sources) - time.time())
+                time.sleep(wait)
+        except KeyboardInterrupt:
+            print("\n停止监控")
+        finally:
+            for engine in self.engines:
+                print(f"大模型调用统计：{engine.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="监控模式：轮询公众号和网站，自动转换新文章")
+    parser.add_argument('--sources', default=SOURCES_PATH, help="来源列表（JSON）")
+    parser.add_argument('--root', default=DATA_ROOT, help="数据目录")
+    parser.add_argument('--once', action='store_true', help="只轮询一轮")
+    parser.add_argument('--backfill', type=int, default=WATCH_BACKFILL,
+                        help="新来源第一次轮询时处理的文章数")
+    parser.add_argument('--enqueue', action='store_true',
+                        help="新文章只加入任务队列，由工作进程（worker.py）抓取和转换")
+    parser.add_argument('--publish', action='store_true', help="配合 --enqueue，转换完成后发布到小红书")
+    profiler.add_arguments(parser)
+    args = parser.parse_args()
+    profiler.apply_arguments(args)
+
+    if not os.path.exists(args.sources):
+        print(f"未找到来源列表：{args.sources}（参考 sources.example.json）")
+        sys.exit(1)
+    sources = load_sources(args.sources)
+    if not sources:
+        print("来源列表为空")
+        sys.exit(1)
+    print(f"监控 {len(sources)} 个来源")
+
+    handlers = None
+    queue = None
+    if args.enqueue:
+        from job_queue import get_queue
+        from worker import enqueue_url
+        queue = get_queue()
+
+        def make_handler(kind: str) -> Callable[[str], str]:
+            def handler(url: str) -> str:
+                enqueue_url(queue, url, kind, args.publish)
+                return SEEN_QUEUED
+            return handler
+        handlers = {kind: make_handler(kind) for kind in CRAWLERS}
+
+    watcher = Watcher(sources, root=args.root, backfill=args.backfill, handlers=handlers)
+    try:
+        if args.once:
+            print(f"本轮统计：{json.dumps(watcher.run_once(), ensure_ascii=False)}")
+        else:
+            watcher.run_forever()
+    finally:
+        watcher.close()
+        if queue:
+            queue.close()
+        get_client().report()
+        get_scheduler().report()
+        profiler.get_profiler().report()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,18 @@
 import os
 import re
-import requests
 from io import BytesIO
-from bs4 import BeautifulSoup
-from PIL import Image
-from fake_useragent import UserAgent
-from dataclasses import dataclass
-from typing import List, Dict, Optional
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple
+from dedup_index import check_duplicate, get_index, register_article
+from article_store import ArticleStore
+from ua_pool import random_user_agent
+from http_client import get_client
+from http2_client import get_fetcher
+from stream_parser import HTML_PARSER, ImagePrefetcher, StreamingExtractor, stream_parse
+from image_budget import ImageBudget
+from politeness import VERIFY_TEXT_MARKERS, ThrottledError, check_response, get_scheduler, is_verify_page
+from profiler import get_profiler, stage
+from artifact_writer import get_writer
 
 @dataclass
 class ArticleContent:
@@ -14,22 +20,35 @@ class ArticleContent:
     text: str
     images: List[str]
     save_dir: str
+    duplicate_of: Optional[str] = None
+    url: str = ''
+    account: str = ''
+    # 图片预算选出的图片，只有这些会下载和发布，其余只登记地址
+    selected_images: List[str] = field(default_factory=list)
+    # 流式解析时边解析边下载的图片
+    prefetcher: Optional[ImagePrefetcher] = field(default=None, repr=False)
 
 class WeixinCrawler:
     def __init__(self, base_save_path: str = r"E:\fy\智企内推\data"):
         self.headers = {
-            'User-Agent': UserAgent().random,
+            'User-Agent': random_user_agent(),
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2',
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         }
         self.base_save_path = base_save_path
+        self.dedup_index = get_index(base_save_path)
+        self.store = ArticleStore(base_save_path)
+        
+    def save_directory(self, title: str) -> str:
+        """文章的保存目录（不创建）"""
+        safe_title = re.sub(r'[\\/:*?"<>|]', '_', title)
+        return os.path.join(self.base_save_path, safe_title)
         
     def create_save_directory(self, title: str) -> str:
         """创建保存目录"""
-        safe_title = re.sub(r'[\\/:*?"<>|]', '_', title)
-        save_dir = os.path.join(self.base_save_path, safe_title)
+        save_dir = self.save_directory(title)
         
         # 创建目录
         os.makedirs(save_dir, exist_ok=True)
@@ -38,113 +57,253 @@ class WeixinCrawler:
         return save_dir
         
     def save_content(self, save_dir: str, content: str) -> None:
-        """保存原始文本内容"""
-        with open(os.path.join(save_dir, 'original.txt'), 'w', encoding='utf-8') as f:
-            f.write(content)
+        """保存原始文本内容（原子写入，不会留下半截文件）"""
+        batch = get_writer().begin(save_dir)
+        batch.add_text('original.txt', content)
+        batch.commit()
             
-    def save_images(self, save_dir: str, images: List[str]) -> List[str]:
+    def save_images(self, save_dir: str, images: List[str],
+                    prefetcher: Optional[ImagePrefetcher] = None) -> List[str]:
         """下载并保存图片"""
+        from PIL import Image
+        
+        # HTTP/2 后端先在一条连接上并发下载全部图片，否则逐张下载
+        fetcher = get_fetcher() if prefetcher is None else None
+        prefetched = fetcher.fetch_many(images, self.headers) if fetcher else None
+        
+        # 全部处理完后一起原子写入
+        batch = get_writer().begin(save_dir)
         saved_images = []
         for i, img_url in enumerate(images):
             try:
                 print(f"正在下载第 {i+1}/{len(images)} 张图片...")
-                response = requests.get(img_url, headers=self.headers)
-                img = Image.open(BytesIO(response.content))
-                
-                # 如果图片是RGBA模式，转换为RGB
-                if img.mode == 'RGBA':
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    background.paste(img, mask=img.split()[3])
-                    img = background
-                elif img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # 保存图片
-                save_path = os.path.join(save_dir, 'images', f'image_{i+1}.jpg')
-                img.save(save_path, 'JPEG', quality=95)
+                with stage('image_download'):
+                    if prefetcher is not None:
+                        # 解析页面时已经开始下载
+                        data = prefetcher.get(img_url)
+                        if data is None:
+                            raise Exception("图片下载失败")
+                    elif prefetched is not None:
+                        if prefetched[i] is None:
+                            raise Exception("图片下载失败")
+                        data = prefetched[i]
+                    else:
+                        data = get_client().get(img_url, headers=self.headers).content
+                with stage('image_encode'):
+                    img = Image.open(BytesIO(data))
+                    
+                    # 如果图片是RGBA模式，转换为RGB
+                    if img.mode == 'RGBA':
+                        background = Image.new('RGB', img.size, (255, 255, 255))
+                        background.paste(img, mask=img.split()[3])
+                        img = background
+                    elif img.mode != 'RGB':
+                        img = img.convert('RGB')
+                    
+                    # 保存图片
+                    save_path = batch.add_image(f'images/image_{i+1}.jpg', img, 'JPEG', quality=95)
                 saved_images.append(save_path)
-                print(f"图片已保存: {save_path}")
                 
             except Exception as e:
                 print(f"处理第 {i+1} 张图片时出错: {str(e)}")
                 continue
                 
+        # 写文件交给 I/O 线程，之后读取图片的步骤（文字卡片、发布）先等待写完
+        with stage('image_write'):
+            batch.commit()
+        for save_path in saved_images:
+            print(f"图片已保存: {save_path}")
         return saved_images
         
-    def get_article_content(self, url: str) -> Optional[ArticleContent]:
-        """获取微信公众号文章内容"""
-        try:
-            print("正在访问文章链接...")
-            response = requests.get(url, headers=self.headers, timeout=30)
-            response.raise_for_status()
+    def parse_with_bs4(self, url: str, budget: Optional[ImageBudget] = None,
+                       headers: Optional[Dict[str, str]] = None) -> Tuple[str, str, List[str], List[str]]:
+        """下载完整页面后用 BeautifulSoup 解析，返回 (标题, 公众号名称, 文本块, 图片地址)"""
+        from bs4 import BeautifulSoup
+        
+        response = get_client().get(url, headers=headers or self.headers)
+        check_response(response)
+        response.raise_for_status()
+        
+        print("解析文章内容...")
+        soup = BeautifulSoup(response.text, 'html.parser')
+        
+        # 获取文章内容
+        content_div = soup.find(id="js_content")
+        if not content_div:
+            if is_verify_page(text=soup.get_text()):
+                raise ThrottledError("返回了验证页")
+            raise Exception("未找到文章内容")
             
-            print("解析文章内容...")
-            soup = BeautifulSoup(response.text, 'html.parser')
+        # 获取文章标题
+        title = soup.find(class_="rich_media_title").get_text().strip() if soup.find(class_="rich_media_title") else ""
+        
+        # 获取公众号名称
+        account = soup.find(id="js_name").get_text().strip() if soup.find(id="js_name") else ""
             
-            # 获取文章内容
-            content_div = soup.find(id="js_content")
-            if not content_div:
-                raise Exception("未找到文章内容")
+        # 提取文本和图片
+        text_content = []
+        images = []
+        seen_texts = set()  # 用于去重
+        
+        # 提取文本
+        for p in content_div.find_all(['p', 'span']):
+            text = p.get_text().strip()
+            if text and text not in seen_texts:
+                text_content.append(text)
+                seen_texts.add(text)
                 
-            # 获取文章标题
-            title = soup.find(class_="rich_media_title").get_text().strip() if soup.find(class_="rich_media_title") else ""
+        # 提取图片
+        for img in content_div.find_all('img'):
+            img_url = img.get('data-src')
+            if img_url and img_url not in images:  # 去重
+                images.append(img_url)
+                if budget:
+                    budget.add(img_url, img.attrs)
                 
-            # 提取文本和图片
-            text_content = []
-            images = []
-            seen_texts = set()  # 用于去重
+        return title, account, text_content, images
+        
+    def parse_streaming(self, url: str, prefetcher: Optional[ImagePrefetcher] = None,
+                        budget: Optional[ImageBudget] = None, headers: Optional[Dict[str, str]] = None
+                        ) -> Tuple[str, str, List[str], List[str]]:
+        """边下载边解析，只处理 #js_content 内的内容，发现值得下载的图片就交给 prefetcher 开始下载"""
+        import requests
+        
+        def on_image(img_url: str, attrs: Dict[str, str]) -> None:
+            admitted = budget.add(img_url, attrs) if budget else True
+            if admitted and prefetcher:
+                prefetcher.submit(img_url)
+                
+        extractor = StreamingExtractor(
+            container=('id', 'js_content'),
+            block_tags=('p', 'span'),
+            image_attr='data-src',
+            meta={'title': ('class', 'rich_media_title'), 'account': ('id', 'js_name')},
+            on_image=on_image,
+            markers=VERIFY_TEXT_MARKERS,
+        )
+        print("边下载边解析文章内容...")
+        try:
+            stream_parse(url, extractor, headers or self.headers)
+        except requests.HTTPError as e:
+            check_response(e.response)
+            raise
+        if not extractor.found_container:
+            if is_verify_page(extractor.url, ''.join(extractor.matched_markers)):
+                raise ThrottledError("返回了验证页")
+            raise Exception("未找到文章内容")
+        return extractor.meta.get('title', ''), extractor.meta.get('account', ''), extractor.texts, extractor.images
+        
+    def get_article_content(self, url: str, prefetch: bool = True) -> Optional[ArticleContent]:
+        """获取微信公众号文章内容；被限流时抛出 ThrottledError，由调用方稍后重试"""
+        prefetcher = None
+        try:
+            print("正在访问文章链接...")
+            budget = ImageBudget(headers=self.headers)
+            # HTTP/2 后端在解析完成后一次性并发下载，其余情况边解析边下载图片
+            if HTML_PARSER != 'bs4' and prefetch and not get_fetcher():
+                prefetcher = ImagePrefetcher(self.headers)
             
-            # 提取文本
-            for p in content_div.find_all(['p', 'span']):
-                text = p.get_text().strip()
-                if text and text not in seen_texts:
-                    text_content.append(text)
-                    seen_texts.add(text)
-                    
-            # 提取图片
-            for img in content_div.find_all('img'):
-                img_url = img.get('data-src')
-                if img_url and img_url not in images:  # 去重
-                    images.append(img_url)
-                    
-            # 创建保存目录
-            save_dir = self.create_save_directory(title)
+            def fetch(headers: Dict[str, str]) -> Tuple[str, str, List[str], List[str]]:
+                if HTML_PARSER == 'bs4':
+                    return self.parse_with_bs4(url, budget, headers)
+                return self.parse_streaming(url, prefetcher, budget, headers)
             
-            # 构建返回对象
+            # 按域名自适应限速，被限流时换身份重试
+            title, account, text_content, images = get_scheduler().call(url, fetch, self.headers)
+                
+            # 只有入选预算的图片做完整下载和处理
+            selected_images = budget.select_urls()
+            if prefetcher:
+                prefetcher.discard(set(images) - set(selected_images))
+                    
+            # 构建返回对象，保存目录在查重通过后再创建
             article = ArticleContent(
                 title=title,
                 text='\n'.join(text_content),
                 images=images,
-                save_dir=save_dir
+                save_dir=self.save_directory(title),
+                url=url,
+                account=account,
+                selected_images=selected_images,
+                prefetcher=prefetcher
             )
             
             return article
             
+        except ThrottledError:
+            if prefetcher:
+                prefetcher.cancel()
+            raise
         except Exception as e:
+            if prefetcher:
+                prefetcher.cancel()
             print(f"获取微信文章失败: {str(e)}")
             return None
             
-    def process_url(self, url: str) -> Optional[ArticleContent]:
-        """处理单个URL"""
+    def process_text(self, url: str, prefetch: bool = True) -> Optional[ArticleContent]:
+        """获取文章、查重并保存文本内容；图片由 process_images 处理
+        prefetch: 是否在解析时提前下载图片（图片交给其他进程处理时关闭）
+        被限流时抛出 ThrottledError
+        """
         print(f"\n开始处理URL: {url}")
         
         # 1. 获取文章内容
-        article = self.get_article_content(url)
+        with stage('fetch_parse'):
+            article = self.get_article_content(url, prefetch)
         if not article:
             print("获取文章失败！")
             return None
             
         print(f"\n成功获取文章：{article.title}")
+        
+        # 2. 查重，近似重复的文章不创建目录、不保存和下载图片
+        with stage('dedup'):
+            match = check_duplicate(self.dedup_index, article.save_dir, article.text)
+        if match:
+            article.duplicate_of = match.save_dir
+            if article.prefetcher:
+                article.prefetcher.cancel()
+            return article
+        
+        self.create_save_directory(article.title)
         print(f"创建保存目录：{article.save_dir}")
         
-        # 2. 保存文本内容
-        self.save_content(article.save_dir, article.text)
+        # 3. 保存文本内容，保存成功后登记到查重索引
+        with stage('save_text'):
+            self.save_content(article.save_dir, article.text)
+            self.store.save_article(article.url, article.title, article.text,
+                                    account=article.account, save_dir=article.save_dir)
+            register_article(self.dedup_index, article.save_dir, article.text)
         print("文本内容已保存")
+        return article
         
-        # 3. 下载并保存图片
-        saved_images = self.save_images(article.save_dir, article.images)
+    def process_images(self, url: str, save_dir: str, images: List[str], selected_images: List[str],
+                       prefetcher: Optional[ImagePrefetcher] = None) -> List[str]:
+        """下载并保存入选的图片，登记到文章库；未入选的图片只登记地址，需要时再下载"""
+        os.makedirs(os.path.join(save_dir, 'images'), exist_ok=True)
+        with stage('images'):
+            saved_images = self.save_images(save_dir, selected_images, prefetcher)
+        saved = set(saved_images)
+        paths = {img_url: os.path.join(save_dir, 'images', f'image_{i+1}.jpg')
+                 for i, img_url in enumerate(selected_images)}
+        image_refs = [(img_url, paths[img_url] if paths.get(img_url) in saved else None)
+                      for img_url in images]
+        record = self.store.get(url)
+        if record:
+            self.store.add_images(record.id, image_refs)
         print(f"共保存 {len(saved_images)} 张图片")
+        return saved_images
+        
+    def process_url(self, url: str) -> Optional[ArticleContent]:
+        """处理单个URL"""
+        article = self.process_text(url)
+        if not article or article.duplicate_of:
+            return article
         
+        # 4. 下载并保存图片
+        self.process_images(article.url, article.save_dir, article.images, article.selected_images,
+                            article.prefetcher)
+        article.prefetcher = None
         return article
 
 def main():
@@ -153,7 +312,13 @@ def main():
     print(f"开始处理URL: {url}")
     
     crawler = WeixinCrawler()
-    article = crawler.process_url(url)
+    try:
+        with get_profiler().article(url):
+            article = crawler.process_url(url)
+    except ThrottledError as e:
+        print(f"获取文章失败: {str(e)}")
+        article = None
+    get_profiler().report()
     
     if article:
         print(f"\n成功获取文章：{article.title}")
@@ -170,14 +335,14 @@ def main():
         print("文本内容已保存")
         
         # 保存图片
-        if article.images:
+        if article.selected_images:
             images_dir = os.path.join(save_dir, "images")
             os.makedirs(images_dir, exist_ok=True)
             
-            for i, image_url in enumerate(article.images, 1):
-                print(f"正在下载第 {i}/{len(article.images)} 张图片...")
+            for i, image_url in enumerate(article.selected_images, 1):
+                print(f"正在下载第 {i}/{len(article.selected_images)} 张图片...")
                 try:
-                    response = requests.get(image_url, verify=False)
+                    response = get_client().get(image_url)
                     if response.status_code == 200:
                         image_path = os.path.join(images_dir, f"image_{i}.jpg")
                         with open(image_path, "wb") as f:
@@ -186,7 +351,7 @@ def main():
                 except Exception as e:
                     print(f"下载图片失败: {str(e)}")
                     
-            print(f"共保存 {len(article.images)} 张图片")
+            print(f"共保存 {len(article.selected_images)} 张图片")
             
         return article
     else:
@@ -0,0 +1,392 @@
+import os
+import json
+import time
+import socket
+import argparse
+import threading
+import multiprocessing
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+from article_store import ArticleStore, canonical_url
+from artifact_writer import get_writer
+from http_client import get_client
+from politeness import ThrottledError, get_scheduler
+import profiler
+from job_queue import STAGES, JOB_DEAD, JOB_LEASED, JOB_READY, JOB_VISIBILITY, Job, JobQueue, get_queue
+
+# 加载环境变量
+load_dotenv()
+
+# 数据目录（多台机器运行时需要是共享目录）
+DATA_ROOT = r"E:\fy\智企内推\data"
+# 没有可领取的任务时，间隔多久再次查询（秒）
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '2'))
+# 每个工作进程同时处理的任务数
+WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', '2'))
+
+# 文章类型：weixin=公众号文章，page=普通网页
+KINDS = ('weixin', 'page')
+WEIXIN_HOST = 'mp.weixin.qq.com'
+
+
+def enqueue_url(queue: JobQueue, url: str, kind: str = '', publish: bool = False) -> int:
+    """把一篇文章加入抓取队列，同一篇文章（规范化URL）只入队一次"""
+    kind = kind or ('weixin' if urlsplit(url).netloc.lower() == WEIXIN_HOST else 'page')
+    return queue.enqueue('crawl', {'url': url, 'kind': kind, 'publish': publish},
+                         dedupe_key=f'crawl:{canonical_url(url)}')
+
+
+class StageHandlers:
+    """各阶段的处理函数，爬虫和转换器按需创建，每个工作线程一份
+
+    - crawl：抓取文本并保存到文章库，再拆分出 image、convert 任务（发布时加上依赖这两个任务的 publish）；
+      普通网页的抓取流程同时下载图片，只拆分出 convert 任务
+    - image：下载并处理入选的图片
+    - convert：读取文章库中的原文，调用大模型转换
+    - publish：发布到小红书，同一进程只打开一个浏览器
+    失败时抛出异常，由队列按退避时间重试
+    """
+
+    _publish_lock = threading.Lock()
+    _publisher = None
+
+    def __init__(self, queue: JobQueue, root: str = DATA_ROOT):
+        self.queue = queue
+        self.root = root
+        self._weixin = None
+        self._page = None
+        self._store = None
+        self._converters: Dict[str, object] = {}
+
+    @property
+    def weixin(self):
+        if self._weixin is None:
+            from weixin_crawler import WeixinCrawler
+            self._weixin = WeixinCrawler(base_save_path=self.root)
+        return self._weixin
+
+    @property
+    def page(self):
+        if self._page is None:
+            import xhs_converte_page
+            self._page = xhs_converte_page.PageCrawler(base_save_path=self.root)
+        return self._page
+
+    @property
+    def store(self) -> ArticleStore:
+        if self._store is None:
+            self._store = ArticleStore(self.root)
+        return self._store
+
+    def converter(self, kind: str):
+        if kind not in self._converters:
+            if kind == 'page':
+                from xhs_converte_page import XHSConverter
+            else:
+                from xhs_converter import XHSConverter
+            self._converters[kind] = XHSConverter()
+        return self._converters[kind]
+
+    def engines(self) -> list:
+        return [converter.engine for converter in self._converters.values() if converter.engine]
+
+    def handle(self, job: Job) -> Optional[dict]:
+        result = getattr(self, job.stage)(job.payload)
+        # 后续阶段可能在其他进程中读取这一阶段写入的文件，任务完成前等待写完
+        record = self.store.get(job.payload['url'])
+        if record and record.save_dir:
+            get_writer().flush(record.save_dir)
+        return result
+
+    def crawl(self, payload: dict) -> dict:
+        url, kind = payload['url'], payload.get('kind', 'weixin')
+        depends_on: List[int] = []
+        if kind == 'weixin':
+            # 图片交给 image 任务下载，抓取时不提前下载
+            article = self.weixin.process_text(url, prefetch=False)
+            if not article:
+                raise RuntimeError("获取文章失败")
+            if article.duplicate_of:
+                # 近似重复的文章由之前那篇的任务转换
+                return {'duplicate_of': article.duplicate_of}
+            url, title = article.url, article.title
+            depends_on.append(self.queue.enqueue(
+                'image',
+                {'url': url, 'save_dir': article.save_dir, 'images': article.images,
+                 'selected': article.selected_images},
+                dedupe_key=f'image:{canonical_url(url)}',
+            ))
+        else:
+            page = self.page.process_url(url)
+            if not page:
+                raise RuntimeError("获取页面内容失败")
+            if page.duplicate_of:
+                return {'duplicate_of': page.duplicate_of}
+            url, title = page.url, page.title
+        depends_on.append(self.queue.enqueue('convert', {'url': url, 'kind': kind},
+                                             dedupe_key=f'convert:{canonical_url(url)}'))
+        if payload.get('publish'):
+            # 发布失败时可能已经发出，不自动重试，进入死信后人工确认再 retry-dead
+            self.queue.enqueue('publish', {'url': url}, dedupe_key=f'publish:{canonical_url(url)}',
+                               depends_on=depends_on, max_attempts=1)
+        return {'title': title}
+
+    def image(self, payload: dict) -> dict:
+        saved = self.weixin.process_images(payload['url'], payload['save_dir'], payload['images'],
+                                           payload['selected'])
+        if payload['selected'] and not saved:
+            raise RuntimeError("图片全部下载失败")
+        return {'saved': len(saved)}
+
+    def convert(self, payload: dict) -> dict:
+        record = self.store.get(payload['url'])
+        if not record:
+            raise RuntimeError(f"文章库中没有该文章: {payload['url']}")
+        text = self.store.read_text(record.original_blob)
+        xhs_content = self.converter(payload.get('kind', 'weixin')).convert(record.title, text, record.save_dir)
+        if not xhs_content:
+            raise RuntimeError("转换失败")
+        self.store.set_converted(record.url, xhs_content.content)
+        return {'save_path': xhs_content.save_path}
+
+    def publish(self, payload: dict) -> dict:
+        from image_budget import IMAGE_BUDGET, select_files
+        from text_card import add_text_cards, note_parts
+        from xhs_publisher import create_publisher, process_content
+
+        record = self.store.get(payload['url'])
+        if not record or not record.converted_blob:
+            raise RuntimeError(f"文章库中没有可发布的内容: {payload['url']}")
+        converted = self.store.read_text(record.converted_blob)
+        title, content = process_content(converted, record.title)
+        # image、convert 任务都已完成，图片不足时用文字卡片补足
+        add_text_cards(self.store, record.url, record.save_dir, *note_parts(converted, record.title))
+        get_writer().flush(record.save_dir)
+        image_paths = select_files(self.store.get_images(record.id), IMAGE_BUDGET)
+        with StageHandlers._publish_lock:
+            if StageHandlers._publisher is None:
+                StageHandlers._publisher = create_publisher()
+            result = StageHandlers._publisher.publish_note(title=title, content=content, image_paths=image_paths)
+        if not result.success:
+            raise RuntimeError(result.message)
+        self.store.set_published(record.url, result.post_url)
+        return {'post_url': result.post_url}
+
+    @classmethod
+    def close_publisher(cls) -> None:
+        if cls._publisher is not None:
+            cls._publisher.close()
+            cls._publisher = None
+
+
+class Worker:
+    """工作进程：从队列中领取指定阶段的任务并处理
+
+    每个线程循环领取任务，处理期间由心跳线程每隔 visibility/3 秒续约；
+    处理成功标记完成，抛出异常标记失败（队列决定重试还是进入死信）。
+    """
+
+    def __init__(self, queue: JobQueue, stages: List[str], concurrency: int = WORKER_CONCURRENCY,
+                 visibility: float = JOB_VISIBILITY, root: str = DATA_ROOT,
+                 handlers: Optional[Dict[str, Callable[[Job], Optional[dict]]]] = None,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        unknown = set(stages) - set(STAGES)
+        if unknown:
+            raise ValueError(f"阶段必须是 {', '.join(STAGES)} 之一：{', '.join(sorted(unknown))}")
+        self.queue = queue
+        self.stages = list(stages)
+        self.concurrency = max(1, concurrency)
+        self.visibility = visibility
+        self.root = root
+        self.poll_interval = poll_interval
+        # 阶段 -> 处理函数(job)；未指定的阶段使用 StageHandlers
+        self.handlers = dict(handlers or {})
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self._stop = threading.Event()
+        self._active: Dict[int, Job] = {}
+        self._lock = threading.Lock()
+        self._stage_handlers: List[StageHandlers] = []
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _count(self, stage: str, outcome: str) -> None:
+        with self._lock:
+            stage_counts = self.counts.setdefault(stage, {})
+            stage_counts[outcome] = stage_counts.get(outcome, 0) + 1
+
+    def _heartbeat(self) -> None:
+        """为正在处理的任务续约"""
+        while not self._stop.wait(self.visibility / 3):
+            with self._lock:
+                active = list(self._active.values())
+            for job in active:
+                try:
+                    if not self.queue.heartbeat(job.id, self.name, self.visibility):
+                        print(f"任务 {job.id}（{job.stage}）的租约已失效，可能被其他进程重复处理")
+                except Exception as e:
+                    print(f"任务续约失败: {str(e)}")
+
+    def _idle(self) -> bool:
+        """负责的阶段及其上游阶段（上游任务还会拆分出新任务）都没有待处理和处理中的任务"""
+        last = max(STAGES.index(stage) for stage in self.stages)
+        stats = self.queue.stats()
+        return not any(stats.get(stage, {}).get(status)
+                       for stage in STAGES[:last + 1] for status in (JOB_READY, JOB_LEASED))
+
+    def _loop(self, drain: bool) -> None:
+        handlers = StageHandlers(self.queue, self.root)
+        with self._lock:
+            self._stage_handlers.append(handlers)
+        while not self._stop.is_set():
+            try:
+                job = self.queue.lease(self.stages, self.name, self.visibility)
+            except Exception as e:
+                print(f"领取任务失败: {str(e)}")
+                job = None
+            if job is None:
+                if drain and self._idle():
+                    self._stop.set()
+                    break
+                self._stop.wait(self.poll_interval)
+                continue
+            with self._lock:
+                self._active[job.id] = job
+            print(f"\n[{self.name}] 开始处理任务 {job.id}（{job.stage}，第 {job.attempts} 次）")
+            try:
+                handler = self.handlers.get(job.stage) or handlers.handle
+                with profiler.get_profiler().article(job.payload.get('url', str(job.id))), profiler.stage(job.stage):
+                    result = handler(job)
+                if not self.queue.complete(job.id, self.name, result):
+                    print(f"任务 {job.id} 的租约已失效，处理结果未记录")
+                self._count(job.stage, 'done')
+            except ThrottledError as e:
+                # 被目标网站限流：放回队列，暂停结束后再处理，不计入尝试次数
+                self.queue.defer(job.id, self.name, e.retry_after, f"{type(e).__name__}: {str(e)}")
+                print(f"任务 {job.id}（{job.stage}）被限流，{e.retry_after:.0f} 秒后重试")
+                self._count(job.stage, 'throttled')
+            except Exception as e:
+                status = self.queue.fail(job.id, self.name, f"{type(e).__name__}: {str(e)}")
+                print(f"任务 {job.id}（{job.stage}）失败: {str(e)}" + ("，已进入死信" if status == JOB_DEAD else "，稍后重试"))
+                self._count(job.stage, 'dead' if status == JOB_DEAD else 'retry')
+            finally:
+                with self._lock:
+                    self._active.pop(job.id, None)
+
+    def run(self, drain: bool = False) -> Dict[str, Dict[str, int]]:
+        """开始处理，直到 Ctrl+C；drain=True 时队列中没有负责阶段的任务后退出。返回各阶段处理统计"""
+        print(f"工作进程 {self.name} 处理阶段：{', '.join(self.stages)}，并发 {self.concurrency}")
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+        heartbeat.start()
+        threads = [threading.Thread(target=self._loop, args=(drain,), daemon=True) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            print("\n正在停止，等待处理中的任务完成...")
+            self.stop()
+            for thread in threads:
+                thread.join()
+        finally:
+            self.stop()
+            for handlers in self._stage_handlers:
+                for engine in handlers.engines():
+                    print(f"大模型调用统计：{engine.stats()}")
+            StageHandlers.close_publisher()
+        print(f"工作进程 {self.name} 处理统计：{json.dumps(self.counts, ensure_ascii=False)}")
+        return self.counts
+
+
+def run_worker(stages: List[str], concurrency: int, visibility: float, root: str, drain: bool) -> None:
+    """在当前进程中启动一个工作进程（多进程时作为子进程入口）"""
+    queue = get_queue()
+    try:
+        Worker(queue, stages, concurrency, visibility, root).run(drain)
+    finally:
+        queue.close()
+        get_client().report()
+        get_scheduler().report()
+        profiler.get_profiler().report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分布式工作模式：抓取、图片、转换、发布任务通过队列分发给多个进程")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help="启动工作进程")
+    run_parser.add_argument('--stages', default=','.join(STAGES),
+                            help=f"负责的阶段，逗号分隔（{', '.join(STAGES)}）")
+    run_parser.add_argument('--concurrency', type=int, default=WORKER_CONCURRENCY, help="每个进程同时处理的任务数")
+    run_parser.add_argument('--processes', type=int, default=1, help="启动的进程数")
+    run_parser.add_argument('--visibility', type=float, default=JOB_VISIBILITY, help="任务租约时长（秒）")
+    run_parser.add_argument('--root', default=DATA_ROOT, help="数据目录")
+    run_parser.add_argument('--drain', action='store_true', help="处理完队列中的任务后退出")
+    profiler.add_arguments(run_parser)
+
+    enqueue_parser = sub.add_parser('enqueue', help="把文章加入抓取队列")
+    enqueue_parser.add_argument('urls', nargs='+')
+    enqueue_parser.add_argument('--kind', choices=KINDS, default='', help="文章类型，默认按域名判断")
+    enqueue_parser.add_argument('--publish', action='store_true', help="转换完成后发布到小红书")
+
+    sub.add_parser('stats', help="各阶段任务数")
+    dead_parser = sub.add_parser('dead', help="列出死信任务")
+    dead_parser.add_argument('--limit', type=int, default=50)
+    retry_parser = sub.add_parser('retry-dead', help="重新处理死信任务（默认全部）")
+    retry_parser.add_argument('ids', nargs='*', type=int)
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        # 写入环境变量，spawn 出的子进程沿用同样的分析配置，各自输出报告
+        profiler.apply_arguments(args)
+        stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+        if 'publish' in stages:
+            # 启动前不开浏览器检查登录状态：需要重新登录时不领取发布任务，任务留在队列中
+            from cookie_health import describe, get_checker
+            health = get_checker().check_file('.cookies.json')
+            if health.needs_login:
+                print(f"小红书登录已失效，不处理发布阶段（python test_xhs_login.py 重新登录）: {describe(health)}")
+                stages.remove('publish')
+                if not stages:
+                    return
+        if args.processes <= 1:
+            run_worker(stages, args.concurrency, args.visibility, args.root, args.drain)
+            return
+        # 图片处理占用 CPU，多进程才能用上多个核心
+        ctx = multiprocessing.get_context('spawn')
+        processes = [ctx.Process(target=run_worker,
+                                 args=(stages, args.concurrency, args.visibility, args.root, args.drain))
+                     for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.join()
+        return
+
+    queue = get_queue()
+    try:
+        if args.command == 'enqueue':
+            for url in args.urls:
+                print(f"已入队：任务 {enqueue_url(queue, url, args.kind, args.publish)} {url}")
+        elif args.command == 'stats':
+            print(json.dumps(queue.stats(), ensure_ascii=False, indent=2))
+        elif args.command == 'dead':
+            for job in queue.dead_letters(args.limit):
+                print(f"[{job.id}] {job.stage} 尝试 {job.attempts} 次 {json.dumps(job.payload, ensure_ascii=False)}")
+                print(f"    {job.error}")
+        elif args.command == 'retry-dead':
+            print(f"重新放回队列 {queue.retry_dead(args.ids or None)} 个任务")
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
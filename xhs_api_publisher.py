@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+from dotenv import load_dotenv
+from cookie_health import CookieHealthChecker, cookie_header, describe, get_checker, load_cookie_file
+from http_client import get_client
+from profiler import stage
+from xhs_publisher import PublishResult
+
+# 加载环境变量
+load_dotenv()
+
+# 创作者平台的接口地址：申请上传凭证、上传图片、创建笔记；可以指向本地模拟服务
+XHS_CREATOR_API = os.getenv('XHS_CREATOR_API', 'https://creator.xiaohongshu.com').rstrip('/')
+XHS_EDITH_API = os.getenv('XHS_EDITH_API', 'https://edith.xiaohongshu.com').rstrip('/')
+XHS_NOTE_URL = os.getenv('XHS_NOTE_URL', 'https://www.xiaohongshu.com/explore/{note_id}')
+# 接口请求签名服务（x-s / x-t），未配置时不签名
+XHS_SIGN_URL = os.getenv('XHS_SIGN_URL', '')
+# 同时上传的图片数
+XHS_UPLOAD_WORKERS = int(os.getenv('XHS_UPLOAD_WORKERS', '4'))
+# 接口不可用（未登录、签名被拒）时改用浏览器发布
+XHS_PUBLISH_FALLBACK = os.getenv('XHS_PUBLISH_FALLBACK', 'true').lower() not in ('0', 'false', 'no', 'off')
+
+PERMIT_PATH = '/api/media/v1/upload/web/permit'
+NOTE_PATH = '/web_api/sns/v2/note'
+# 表示未登录或请求签名无效的状态码和返回码
+AUTH_STATUSES = frozenset((401, 403, 461, 471))
+AUTH_CODES = frozenset((-100, -101, -104, 300011, 300012))
+# 图片上传失败时的重试次数
+UPLOAD_RETRIES = 2
+
+
+class ApiUnavailable(Exception):
+    """接口当前不可用（未登录、Cookie 过期、签名被拒），笔记一定没有创建，可以改用浏览器发布"""
+
+
+class ApiError(Exception):
+    """接口返回错误"""
+
+
+def image_size(path: str) -> Tuple[int, int]:
+    """只读取文件头得到图片尺寸，读不出时返回 (0, 0)"""
+    from PIL import Image
+
+    try:
+        with Image.open(path) as image:
+            return image.size
+    except OSError:
+        return 0, 0
+
+
+class ApiPublisher:
+    """不启动浏览器，直接调用创作者平台的上传和发布接口
+
+    - 使用浏览器登录后保存的 .cookies.json，文件更新后自动重新读取；发布前先检查登录状态（结果有缓存），
+      Cookie 已过期或失效时不申请上传凭证
+    - 一次申请全部图片的上传凭证，多张图片并发上传
+    - 接口不可用（没有 Cookie、Cookie 过期、签名被拒）时改用 XHSPublisher 在浏览器中发布，
+      直到 Cookie 文件更新前不再尝试接口；创建笔记的请求已发出但结果未知时不改用浏览器，避免重复发布
+    """
+
+    def __init__(self, cookie_path: str = '.cookies.json', upload_workers: int = XHS_UPLOAD_WORKERS,
+                 fallback: bool = XHS_PUBLISH_FALLBACK, creator_api: str = XHS_CREATOR_API,
+                 edith_api: str = XHS_EDITH_API, sign_url: str = XHS_SIGN_URL,
+                 checker: Optional[CookieHealthChecker] = None):
+        self.cookie_path = cookie_path
+        self.upload_workers = max(1, upload_workers)
+        self.fallback = fallback
+        self.creator_api = creator_api.rstrip('/')
+        self.edith_api = edith_api.rstrip('/')
+        self.sign_url = sign_url
+        self.client = get_client()
+        self.checker = checker or get_checker()
+        self._cookie_list: List[dict] = []
+        self._cookie_header = ''
+        self._cookies: Dict[str, str] = {}
+        self._cookie_mtime: Optional[float] = None
+        # Cookie 文件为这个修改时间时接口不可用，文件更新前直接用浏览器
+        self._unavailable_mtime: Optional[float] = None
+        self._browser = None
+        self._lock = threading.Lock()
+
+    # ---- 登录状态 ----
+
+    def _load_cookies(self) -> None:
+        if not os.path.exists(self.cookie_path):
+            raise ApiUnavailable(f"没有已保存的登录 Cookie: {self.cookie_path}")
+        mtime = os.path.getmtime(self.cookie_path)
+        if mtime == self._unavailable_mtime:
+            raise ApiUnavailable("Cookie 未更新，接口仍不可用")
+        if mtime != self._cookie_mtime:
+            self._cookie_list = load_cookie_file(self.cookie_path)
+            self._cookies = {cookie['name']: cookie['value'] for cookie in self._cookie_list if cookie.get('name')}
+            self._cookie_header = cookie_header(self._cookie_list)
+            self._cookie_mtime = mtime
+        # 无法确认（网络错误等）时照常调用接口，由接口的返回判断
+        health = self.checker.check(self._cookie_list, self.cookie_path)
+        if health.needs_login:
+            raise ApiUnavailable(describe(health))
+
+    def _headers(self, path: str, data: Optional[str] = None) -> Dict[str, str]:
+        headers = {
+            'Cookie': self._cookie_header,
+            'Origin': 'https://creator.xiaohongshu.com',
+            'Referer': 'https://creator.xiaohongshu.com/',
+        }
+        if self.sign_url:
+            headers.update(self._sign(path, data))
+        return headers
+
+    def _sign(self, path: str, data: Optional[str]) -> Dict[str, str]:
+        """请签名服务计算 x-s / x-t"""
+        try:
+            response = self.client.post(self.sign_url, json={'uri': path, 'data': data, 'a1': self._cookies.get('a1', '')})
+            response.raise_for_status()
+            signature = response.json()
+            return {'x-s': signature['x-s'], 'x-t': str(signature['x-t'])}
+        except (OSError, ValueError, KeyError) as e:
+            raise ApiUnavailable(f"请求签名失败: {str(e)}")
+
+    def _check(self, response) -> dict:
+        """检查接口响应，未登录或签名无效时抛出 ApiUnavailable，其他错误抛出 ApiError"""
+        if response.status_code in AUTH_STATUSES:
+            raise ApiUnavailable(f"接口拒绝请求（HTTP {response.status_code}）")
+        try:
+            body = response.json()
+        except ValueError:
+            raise ApiError(f"接口返回的不是 JSON（HTTP {response.status_code}）")
+        if body.get('code') in AUTH_CODES:
+            raise ApiUnavailable(f"登录已失效: {body.get('msg', '')}")
+        if response.status_code != 200 or not body.get('success'):
+            raise ApiError(f"接口返回错误（HTTP {response.status_code}）: {body.get('msg', '')}")
+        return body.get('data') or {}
+
+    # ---- 上传图片 ----
+
+    def _permits(self, count: int) -> List[Tuple[str, str, str]]:
+        """申请 count 张图片的上传凭证，返回 [(上传地址, 文件ID, token)]"""
+        query = urlencode({'biz_name': 'spectrum', 'scene': 'image', 'file_count': count,
+                           'version': 1, 'source': 'web'})
+        path = f'{PERMIT_PATH}?{query}'
+        data = self._check(self.client.get(self.creator_api + path, headers=self._headers(path)))
+        slots = []
+        for permit in data.get('uploadTempPermits', []):
+            address = permit['uploadAddr']
+            if '://' not in address:
+                address = f'https://{address}'
+            slots.extend((address.rstrip('/'), file_id, permit['token']) for file_id in permit['fileIds'])
+        if len(slots) < count:
+            raise ApiError(f"上传凭证不足：需要 {count} 个，只拿到 {len(slots)} 个")
+        return slots[:count]
+
+    def _upload(self, path: str, slot: Tuple[str, str, str]) -> dict:
+        """上传一张图片，返回发布接口需要的图片信息"""
+        address, file_id, token = slot
+        content_type = mimetypes.guess_type(path)[0] or 'image/jpeg'
+        with open(path, 'rb') as f:
+            body = f.read()
+        for attempt in range(UPLOAD_RETRIES + 1):
+            try:
+                response = self.client.request('PUT', f'{address}/{file_id}', data=body, headers={
+                    'X-Cos-Security-Token': token, 'Content-Type': content_type,
+                })
+            except OSError as e:
+                if attempt == UPLOAD_RETRIES:
+                    raise ApiError(f"上传图片失败 {os.path.basename(path)}: {str(e)}")
+                continue
+            if response.status_code in AUTH_STATUSES:
+                raise ApiUnavailable(f"上传凭证被拒绝（HTTP {response.status_code}）")
+            if response.status_code < 300:
+                break
+            if attempt == UPLOAD_RETRIES:
+                raise ApiError(f"上传图片失败 {os.path.basename(path)}（HTTP {response.status_code}）")
+        width, height = image_size(path)
+        return {'file_id': file_id, 'width': width, 'height': height, 'metadata': {'source': -1},
+                'stickers': {'version': 2, 'floating': []}, 'extra_info_json': '{"mimeType":"%s"}' % content_type}
+
+    def upload_images(self, image_paths: List[str]) -> List[dict]:
+        """并发上传图片，结果按原来的顺序排列"""
+        if not image_paths:
+            return []
+        slots = self._permits(len(image_paths))
+        workers = min(self.upload_workers, len(image_paths))
+        if workers == 1:
+            return [self._upload(path, slot) for path, slot in zip(image_paths, slots)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(self._upload, image_paths, slots))
+
+    # ---- 发布 ----
+
+    def create_note(self, title: str, content: str, images: List[dict]) -> str:
+        """创建图文笔记，返回笔记ID"""
+        payload = {
+            'common': {
+                'type': 'normal', 'title': title, 'note_id': '', 'desc': content, 'ats': [], 'hash_tag': [],
+                'source': '{"type":"web","ids":"","extraInfo":"{\\"subType\\":\\"official\\"}"}',
+                'business_binds': '{"version":1,"noteId":0,"noteOrderBind":{},"notePostTiming":{},'
+                                  '"noteCollectionBind":{"id":""}}',
+                'post_loc': {}, 'privacy_info': {'op_type': 1, 'type': 0},
+            },
+            'image_info': {'images': images},
+            'video_info': None,
+        }
+        data = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+        headers = self._headers(NOTE_PATH, data)
+        headers['Content-Type'] = 'application/json;charset=UTF-8'
+        body = self._check(self.client.post(self.edith_api + NOTE_PATH, data=data.encode('utf-8'), headers=headers))
+        note_id = body.get('id') or body.get('note_id')
+        if not note_id:
+            raise ApiError("发布接口没有返回笔记ID")
+        return note_id
+
+    def _publish_api(self, title: str, content: str, image_paths: List[str]) -> PublishResult:
+        self._load_cookies()
+        with stage('upload'):
+            try:
+                images = self.upload_images(image_paths)
+            except OSError as e:
+                raise ApiError(f"上传图片失败: {str(e)}")
+        with stage('create_note'):
+            note_id = self.create_note(title, content, images)
+        return PublishResult(success=True, message="发布成功", post_url=XHS_NOTE_URL.format(note_id=note_id))
+
+    def _publish_browser(self, title: str, content: str, image_paths: List[str]) -> PublishResult:
+        from xhs_publisher import XHSPublisher
+
+        if self._browser is None:
+            try:
+                self._browser = XHSPublisher(self.cookie_path)
+            except Exception as e:
+                return PublishResult(success=False, message=f"启动浏览器失败: {str(e)}")
+        return self._browser.publish_note(title=title, content=content, image_paths=image_paths)
+
+    def publish_note(self, title: str, content: str, image_paths: List[str]) -> PublishResult:
+        """发布笔记，接口不可用时改用浏览器"""
+        with self._lock:
+            started = time.perf_counter()
+            try:
+                result = self._publish_api(title, content, image_paths)
+                print(f"通过接口发布成功，耗时 {time.perf_counter() - started:.1f} 秒")
+                return result
+            except ApiUnavailable as e:
+                if os.path.exists(self.cookie_path):
+                    self._unavailable_mtime = os.path.getmtime(self.cookie_path)
+                if not self.fallback:
+                    return PublishResult(success=False, message=f"发布失败: {str(e)}")
+                print(f"接口不可用，改用浏览器发布: {str(e)}")
+            except ApiError as e:
+                return PublishResult(success=False, message=f"发布失败: {str(e)}")
+            except OSError as e:
+                # 创建笔记的请求可能已经到达服务端，不改用浏览器重发
+                return PublishResult(success=False, message=f"发布失败（网络错误，请确认是否已发布）: {str(e)}")
+            return self._publish_browser(title, content, image_paths)
+
+    def close(self):
+        """关闭浏览器（如果改用过浏览器发布）"""
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
@@ -1,12 +1,20 @@
 import os
-import json
-import requests
-import time
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Callable, Optional, List, Tuple, Dict
 from dataclasses import dataclass
 from dotenv import load_dotenv
+from xhs_converter import XHSConverter as BaseConverter, RESULT_CONVERTED, RESULT_DUPLICATE, RESULT_FAILED, RESULT_THROTTLED
+from dedup_index import check_duplicate, get_index, register_article
+from article_store import ArticleStore
+from ua_pool import random_user_agent
+from http_client import get_client
+from http2_client import get_fetcher
+from stream_parser import HTML_PARSER, ImagePrefetcher, StreamingExtractor, stream_parse
+from image_budget import ImageBudget
+from politeness import ThrottledError, check_response, get_scheduler, is_verify_page
+from profiler import get_profiler, stage
+from artifact_writer import get_writer
+from text_card import add_text_cards, note_parts
 import sys
 
 # 加载环境变量
@@ -21,110 +29,212 @@ class PageContent:
     text: str
     images: List[str]
     save_dir: str
-
-@dataclass
-class XHSContent:
-    title: str
-    content: str
-    save_path: str
+    url: str = ''
+    duplicate_of: Optional[str] = None
 
 class PageCrawler:
-    def __init__(self):
+    def __init__(self, base_save_path: str = BASE_SAVE_PATH):
         """初始化爬虫"""
         self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            'User-Agent': random_user_agent()
         }
+        self.base_save_path = base_save_path
+        self.dedup_index = get_index(base_save_path)
+        self.store = ArticleStore(base_save_path)
         
-    def download_image(self, url: str, save_path: str) -> bool:
-        """下载图片"""
+    def download_image(self, url: str) -> Optional[bytes]:
+        """下载图片，失败时返回 None"""
         try:
-            response = requests.get(url, headers=self.headers, verify=False)
+            response = get_client().get(url, headers=self.headers)
             if response.status_code == 200:
-                with open(save_path, 'wb') as f:
-                    f.write(response.content)
-                return True
+                return response.content
         except Exception as e:
             print(f"下载图片失败: {str(e)}")
-        return False
+        return None
+        
+    def parse_with_bs4(self, url: str, budget: Optional[ImageBudget] = None,
+                       headers: Optional[Dict[str, str]] = None,
+                       on_link: Optional[Callable[[str], None]] = None) -> Optional[Tuple[str, List[str], List[str]]]:
+        """下载完整页面后用 BeautifulSoup 解析，返回 (标题, 文本块, 图片地址)"""
+        from bs4 import BeautifulSoup
+        
+        response = get_client().get(url, headers=headers or self.headers)
+        response.encoding = 'utf-8'
+        check_response(response)
+        
+        if response.status_code != 200:
+            print(f"访问页面失败: {response.status_code}")
+            return None
+            
+        # 解析页面
+        print("解析页面内容...")
+        soup = BeautifulSoup(response.text, 'html.parser')
+        if on_link:
+            for a in soup.find_all('a', href=True):
+                on_link(a['href'])
+        
+        # 获取标题
+        title = soup.find('h1').get_text().strip()
         
-    def process_url(self, url: str) -> Optional[PageContent]:
-        """处理URL，获取页面内容"""
+        # 获取正文内容
+        texts = [element.get_text().strip()
+                 for element in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])]
+        images = []
+        for img in soup.find_all('img'):
+            src = img.get('src')
+            images.append(src)
+            if budget and src and not src.startswith('data:'):
+                budget.add(urljoin(url, src), img.attrs)
+        return title, texts, images
+        
+    def parse_streaming(self, url: str, prefetcher: Optional[ImagePrefetcher] = None,
+                        budget: Optional[ImageBudget] = None, headers: Optional[Dict[str, str]] = None,
+                        on_link: Optional[Callable[[str], None]] = None) -> Optional[Tuple[str, List[str], List[str]]]:
+        """边下载边解析，发现值得下载的图片就交给 prefetcher 开始下载"""
+        import requests
+        
+        def on_image(src: str, attrs: Dict[str, str]) -> None:
+            if src.startswith('data:'):
+                return
+            image_url = urljoin(url, src)
+            admitted = budget.add(image_url, attrs) if budget else True
+            if admitted and prefetcher:
+                prefetcher.submit(image_url)
+                
+        extractor = StreamingExtractor(
+            block_tags=('p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'),
+            image_attr='src',
+            meta={'title': ('tag', 'h1')},
+            dedupe=False,
+            on_image=on_image,
+            on_link=on_link,
+        )
+        print("边下载边解析页面内容...")
+        try:
+            stream_parse(url, extractor, headers or self.headers, encoding='utf-8')
+        except requests.HTTPError as e:
+            check_response(e.response)
+            print(f"访问页面失败: {e.response.status_code}")
+            return None
+        if is_verify_page(extractor.url):
+            raise ThrottledError("跳转到了验证页")
+        if 'title' not in extractor.meta:
+            raise Exception("未找到页面标题")
+        return extractor.meta['title'], extractor.texts, extractor.images
+        
+    def process_url(self, url: str, on_link: Optional[Callable[[str], None]] = None) -> Optional[PageContent]:
+        """处理URL，获取页面内容；被限流时抛出 ThrottledError，由调用方稍后重试
+        on_link: 解析时对页面中的每个链接（原始 href）调用，页面缺少标题等处理失败时也会调用
+        """
+        prefetcher = None
         try:
             print(f"\n开始处理URL: {url}")
             
-            # 发送请求
             print("正在访问页面...")
-            response = requests.get(url, headers=self.headers, verify=False)
-            response.encoding = 'utf-8'
+            budget = ImageBudget(headers=self.headers)
+            # HTTP/2 后端在解析完成后一次性并发下载，其余情况边解析边下载图片
+            if HTML_PARSER != 'bs4' and not get_fetcher():
+                prefetcher = ImagePrefetcher(self.headers)
             
-            if response.status_code != 200:
-                print(f"访问页面失败: {response.status_code}")
-                return None
-                
-            # 解析页面
-            print("解析页面内容...")
-            soup = BeautifulSoup(response.text, 'html.parser')
+            def fetch(headers: Dict[str, str]) -> Optional[Tuple[str, List[str], List[str]]]:
+                if HTML_PARSER == 'bs4':
+                    return self.parse_with_bs4(url, budget, headers, on_link)
+                return self.parse_streaming(url, prefetcher, budget, headers, on_link)
             
-            # 获取标题
-            title = soup.find('h1').get_text().strip()
+            with stage('fetch_parse'):
+                # 按域名自适应限速，被限流时换身份重试
+                parsed = get_scheduler().call(url, fetch, self.headers)
+            if parsed is None:
+                return None
+            title, texts, images = parsed
             
-            # 获取正文内容
-            content_elements = soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-            text_content = []
+            # 只有入选预算的图片做完整下载，其余只登记地址
+            image_urls = budget.select_urls()
+            all_image_urls = [urljoin(url, src) for src in images
+                              if src and not src.startswith('data:')]
+            if prefetcher:
+                prefetcher.discard(set(all_image_urls) - set(image_urls))
             
-            for element in content_elements:
-                text = element.get_text().strip()
-                if text and not text.startswith(('Copyright', '联系方式')):
-                    text_content.append(text)
+            text_content = [text for text in texts
+                            if text and not text.startswith(('Copyright', '联系方式'))]
             
             text = '\n\n'.join(text_content)
+            save_dir = os.path.join(self.base_save_path, title)
+            
+            # 查重，近似重复的页面不创建目录、不下载图片
+            with stage('dedup'):
+                match = check_duplicate(self.dedup_index, save_dir, text)
+            if match:
+                if prefetcher:
+                    prefetcher.cancel()
+                return PageContent(title=title, text=text, images=[], save_dir=save_dir, url=url,
+                                   duplicate_of=match.save_dir)
             
             # 创建保存目录
-            save_dir = os.path.join(BASE_SAVE_PATH, title)
             os.makedirs(save_dir, exist_ok=True)
             
             # 下载图片
             images_dir = os.path.join(save_dir, "images")
             os.makedirs(images_dir, exist_ok=True)
             
-            image_urls = []
-            for img in soup.find_all('img'):
-                src = img.get('src')
-                if src and not src.startswith('data:'):
-                    image_urls.append(urljoin(url, src))
-            
-            saved_images = []
-            for i, image_url in enumerate(image_urls, 1):
-                print(f"正在下载第 {i}/{len(image_urls)} 张图片...")
-                image_path = os.path.join(images_dir, f"image_{i}.jpg")
-                if self.download_image(image_url, image_path):
-                    saved_images.append(image_path)
+            with stage('images'):
+                # 流式解析时图片已经在下载；HTTP/2 后端先并发下载全部图片
+                fetcher = get_fetcher() if prefetcher is None else None
+                prefetched = fetcher.fetch_many(image_urls, self.headers) if fetcher else None
+                if prefetcher is not None:
+                    prefetched = [prefetcher.get(image_url) for image_url in image_urls]
+                
+                # 全部下载完后一起原子写入
+                batch = get_writer().begin(save_dir)
+                saved_images = []
+                for i, image_url in enumerate(image_urls, 1):
+                    print(f"正在下载第 {i}/{len(image_urls)} 张图片...")
+                    data = prefetched[i - 1] if prefetched is not None else self.download_image(image_url)
+                    if data is None:
+                        continue
+                    saved_images.append(batch.add_bytes(f"images/image_{i}.jpg", data))
+                with stage('image_write'):
+                    batch.commit()
+                for image_path in saved_images:
                     print(f"图片已保存: {image_path}")
             
             print(f"共保存 {len(saved_images)} 张图片")
             
+            # 登记到文章库，保存成功后登记到查重索引
+            with stage('save_text'):
+                record = self.store.save_article(url, title, text, save_dir=save_dir)
+                register_article(self.dedup_index, save_dir, text)
+            saved = set(saved_images)
+            paths = {image_url: os.path.join(images_dir, f"image_{i}.jpg")
+                     for i, image_url in enumerate(image_urls, 1)}
+            image_refs = [(image_url, paths[image_url] if paths.get(image_url) in saved else None)
+                          for image_url in dict.fromkeys(all_image_urls)]
+            self.store.add_images(record.id, image_refs)
+            
             return PageContent(
                 title=title,
                 text=text,
                 images=saved_images,
-                save_dir=save_dir
+                save_dir=save_dir,
+                url=url
             )
             
+        except ThrottledError:
+            if prefetcher:
+                prefetcher.cancel()
+            raise
         except Exception as e:
+            if prefetcher:
+                prefetcher.cancel()
             print(f"处理页面时出错: {str(e)}")
             return None
 
-class XHSConverter:
-    def __init__(self, api_key: Optional[str] = None):
-        """初始化转换器"""
-        self.api_key = api_key or os.getenv('ZHI_API_KEY')
-        self.base_url = os.getenv('BASE_URL')
-        
-        if not self.api_key:
-            raise ValueError("需要设置ZHI_API_KEY环境变量或在初始化时提供api_key")
-        if not self.base_url:
-            raise ValueError("需要在环境变量中设置 BASE_URL")
-            
+class XHSConverter(BaseConverter):
+    """产品介绍页面转小红书内容，与文章转换共用大模型引擎"""
+    DEFAULT_PROVIDER = 'qwen-max'
+    SYSTEM_PROMPT = '你是一个专业的小红书内容创作者，擅长将产品介绍转换成吸引人的小红书风格。'
+    FOOTER = "了解更多详情，请访问网易数智官网"
+
     def get_prompt(self, title: str, content: str) -> str:
         """生成Prompt模板"""
         return f"""你是一位小红书爆款写作专家，请将以下产品介绍页面转换成小红书风格的内容。
@@ -150,86 +260,48 @@ class XHSConverter:
 原文内容：
 {content}
 
-请按照如下格式输出：
-一. 标题
-[5个标题，每行一个]
+{self.output_instructions()}"""
 
-二. 正文
-[正文内容]
-标签：[标签列表]"""
 
-    def call_openai_api(self, prompt: str) -> Optional[str]:
-        """调用API"""
-        try:
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            data = {
-                'messages': [
-                    {'role': 'system', 'content': '你是一个专业的小红书内容创作者，擅长将产品介绍转换成吸引人的小红书风格。'},
-                    {'role': 'user', 'content': prompt}
-                ],
-                'model': 'qwen-max',
-                'temperature': 0.7
-            }
-            
-            response = requests.post(
-                f'{self.base_url}/chat/completions',
-                headers=headers,
-                json=data,
-                timeout=60,
-                verify=False
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                print(f"API响应内容: {result}")
-                
-                if 'choices' not in result:
-                    print("API响应格式错误")
-                    return None
-                    
-                return result['choices'][0]['message']['content']
-            else:
-                print(f"API调用失败: {response.status_code}")
-                print(f"错误信息: {response.text}")
-                return None
-                
-        except Exception as e:
-            print(f"调用API时出错: {str(e)}")
-            return None
-            
-    def save_content(self, save_dir: str, content: str) -> str:
-        """保存转换后的内容"""
-        save_path = os.path.join(save_dir, 'xiaohongshu.txt')
-        with open(save_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-        return save_path
+def convert_page_url(url: str, crawler: PageCrawler, converter: XHSConverter,
+                     on_link: Optional[Callable[[str], None]] = None) -> str:
+    """抓取网页、转换为小红书风格并登记到文章库，返回处理结果
+    on_link: 见 PageCrawler.process_url
+    """
+    with get_profiler().article(url):
+        return _convert_page_url(url, crawler, converter, on_link)
+
+def _convert_page_url(url: str, crawler: PageCrawler, converter: XHSConverter,
+                      on_link: Optional[Callable[[str], None]] = None) -> str:
+    # 1. 获取页面内容
+    try:
+        page = crawler.process_url(url, on_link)
+    except ThrottledError as e:
+        print(f"获取页面时被限流，稍后重试: {str(e)}")
+        return RESULT_THROTTLED
+    
+    if not page:
+        print("获取页面内容失败！")
+        return RESULT_FAILED
+    
+    # 近似重复的页面不再转换
+    if page.duplicate_of:
+        print(f"\n跳过转换，与已有页面近似重复：{page.duplicate_of}")
+        return RESULT_DUPLICATE
         
-    def convert(self, title: str, content: str, save_dir: str) -> Optional[XHSContent]:
-        """转换内容为小红书风格"""
-        try:
-            print("正在生成小红书风格内容...")
-            
-            prompt = self.get_prompt(title, content)
-            converted_content = self.call_openai_api(prompt)
-            
-            if not converted_content:
-                return None
-                
-            save_path = self.save_content(save_dir, converted_content)
-            
-            return XHSContent(
-                title=title,
-                content=converted_content,
-                save_path=save_path
-            )
-            
-        except Exception as e:
-            print(f"转换内容时出错: {str(e)}")
-            return None
+    # 2. 转换为小红书风格
+    xhs_content = converter.convert(page.title, page.text, page.save_dir)
+    
+    if xhs_content:
+        crawler.store.set_converted(page.url, xhs_content.content)
+        # 3. 图片不足时用文字卡片补足
+        title, body, tags = note_parts(xhs_content.content, page.title)
+        add_text_cards(crawler.store, page.url, page.save_dir, title, body, tags)
+        print("\n转换完成！")
+        print(f"小红书风格内容已保存到：{xhs_content.save_path}")
+        return RESULT_CONVERTED
+    print("\n转换失败！")
+    return RESULT_FAILED
 
 def main():
     if len(sys.argv) < 2:
@@ -240,23 +312,14 @@ def main():
     url = sys.argv[1]
     print(f"开始处理URL: {url}")
     
-    # 1. 获取页面内容
     crawler = PageCrawler()
-    page = crawler.process_url(url)
-    
-    if not page:
-        print("获取页面内容失败！")
-        return
-        
-    # 2. 转换为小红书风格
     converter = XHSConverter()
-    xhs_content = converter.convert(page.title, page.text, page.save_dir)
-    
-    if xhs_content:
-        print("\n转换完成！")
-        print(f"小红书风格内容已保存到：{xhs_content.save_path}")
-    else:
-        print("\n转换失败！")
+    convert_page_url(url, crawler, converter)
+    if converter.engine:
+        print(f"大模型调用统计：{converter.engine.stats()}")
+    get_client().report()
+    get_scheduler().report()
+    get_profiler().report()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
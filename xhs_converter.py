@@ -1,31 +1,139 @@
 import os
 import json
-import requests
-from typing import Optional, Dict, Any
-from dataclasses import dataclass
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
+from fast_converter import FastConverter
+from http_client import get_client
+from llm_engine import LLMEngine, load_providers
+from politeness import ThrottledError, get_scheduler
+from profiler import get_profiler, stage
+from artifact_writer import get_writer
+from text_card import add_text_cards, note_parts
+from xhs_schema import (FIELDS, TITLE_COUNT, TITLE_MAX_LENGTH, IncrementalNoteParser, ParseResult, XHSNote,
+                        normalize, note_schema, parse_note, parse_variants, variants_schema)
 
 # 加载环境变量
 load_dotenv()
 
+# 转换方式
+CONVERT_MODES = ('llm', 'local', 'auto')
+# 大模型输出格式：json=结构化输出（校验、修复并只重新生成不合格的字段），text=原来的纯文本格式
+OUTPUT_FORMATS = ('json', 'text')
+# 不合格字段最多重新生成的次数
+FIELD_RETRIES = 2
+
+# 内置文案风格：名称 -> 正文的写作要求；CONVERT_STYLES_PATH 指向的JSON对象可以追加或覆盖
+STYLES = {
+    'lively': '轻松活泼，口语化，像和朋友聊天一样分享',
+    'expert': '专业干货，条理清晰，突出方法、步骤和数据，适合收藏',
+    'story': '第一人称讲述亲身经历，先讲故事再引出观点',
+    'list': '清单种草，用序号列出要点，每条一两句话说清楚',
+    'emotional': '情感共鸣，从读者的痛点和感受切入，语气温暖真诚',
+}
+# 多风格生成的方式：combined=所有风格在一个请求中生成（原文只发送一次），
+# parallel=每个风格一个请求、共享原文前缀，第一个请求开始输出后再并发发出其余请求，命中服务商的前缀缓存
+VARIANT_STRATEGIES = ('combined', 'parallel')
+# parallel 方式等待第一个请求开始输出的最长时间（秒）
+PREFIX_WARM_TIMEOUT = 15
+
+# 单篇文章的处理结果
+RESULT_CONVERTED = 'converted'
+RESULT_DUPLICATE = 'duplicate'
+RESULT_FAILED = 'failed'
+# 被目标网站限流，没有算作失败，稍后重新处理
+RESULT_THROTTLED = 'throttled'
+
 @dataclass
 class XHSContent:
     title: str
     content: str
     save_path: str
+    note: Optional[XHSNote] = None
+    # 多风格生成时的各个版本：风格名称 -> 笔记，第一个版本同时作为 note
+    variants: Dict[str, XHSNote] = field(default_factory=dict)
+
+def load_styles() -> Dict[str, str]:
+    """内置文案风格，加上 CONVERT_STYLES_PATH 指向的JSON对象（风格名称 -> 写作要求）"""
+    styles = dict(STYLES)
+    path = os.getenv('CONVERT_STYLES_PATH')
+    if path:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                extra = json.load(f)
+            if not isinstance(extra, dict):
+                raise ValueError("风格文件必须是 风格名称->写作要求 的JSON对象")
+            styles.update({str(k): str(v) for k, v in extra.items()})
+        except Exception as e:
+            print(f"加载文案风格失败，使用内置风格: {str(e)}")
+    return styles
+
+def resolve_styles(names: List[str], styles: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """风格名称列表 -> {版本名称: 写作要求}；同一风格出现多次时生成多个版本，依次命名为 name、name_2、name_3"""
+    styles = styles if styles is not None else load_styles()
+    unknown = [name for name in names if name not in styles]
+    if unknown:
+        raise ValueError(f"未知的文案风格: {', '.join(unknown)}，可选: {', '.join(styles)}")
+    variants: Dict[str, str] = {}
+    counts: Dict[str, int] = {}
+    for name in names:
+        counts[name] = counts.get(name, 0) + 1
+        variants[name if counts[name] == 1 else f'{name}_{counts[name]}'] = styles[name]
+    return variants
 
 class XHSConverter:
-    def __init__(self, api_key: Optional[str] = None):
+    # 默认服务商、系统提示词和本地转换的结尾语，子类可覆盖
+    DEFAULT_PROVIDER = 'gpt-4'
+    SYSTEM_PROMPT = '你是一个专业的小红书内容创作者，擅长将普通文章改写成小红书风格。'
+    FOOTER = "转载自微信公众号：网易智企"
+
+    def __init__(self, api_key: Optional[str] = None, mode: Optional[str] = None,
+                 provider: Optional[str] = None, hedge_provider: Optional[str] = None,
+                 output_format: Optional[str] = None, styles: Optional[List[str]] = None,
+                 variant_strategy: Optional[str] = None):
         """初始化转换器
-        api_key: API密钥
+        api_key: API密钥，覆盖服务商配置中的密钥
+        mode: 转换方式，llm=大模型，local=本地快速转换，auto=大模型失败或超时时自动改用本地转换
+        provider: 服务商名称，默认读取 LLM_PROVIDER
+        hedge_provider: 对冲请求的备用服务商，默认读取 LLM_HEDGE_PROVIDER，为空时不对冲
+        output_format: 大模型输出格式，json 或 text，默认读取 CONVERT_OUTPUT
+        styles: 多风格生成的风格名称列表，默认读取 CONVERT_STYLES（逗号分隔），为空时只生成一个版本
+        variant_strategy: 多风格生成的方式，combined 或 parallel，默认读取 CONVERT_VARIANT_STRATEGY
         """
-        self.api_key = api_key or os.getenv('ZHI_API_KEY')
-        self.base_url = os.getenv('BASE_URL')
+        self.mode = mode or os.getenv('CONVERT_MODE', 'llm')
+        self.output_format = output_format or os.getenv('CONVERT_OUTPUT', 'json')
+        self.variant_strategy = variant_strategy or os.getenv('CONVERT_VARIANT_STRATEGY', 'combined')
+        if styles is None:
+            styles = [name.strip() for name in os.getenv('CONVERT_STYLES', '').split(',') if name.strip()]
+        self.styles = resolve_styles(styles) if styles else {}
+        self.fast_converter = FastConverter(footer=self.FOOTER)
+        self.engine = None
+        
+        if self.mode not in CONVERT_MODES:
+            raise ValueError(f"不支持的转换方式: {self.mode}，可选: {', '.join(CONVERT_MODES)}")
+        if self.output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式: {self.output_format}，可选: {', '.join(OUTPUT_FORMATS)}")
+        if self.variant_strategy not in VARIANT_STRATEGIES:
+            raise ValueError(f"不支持的多风格生成方式: {self.variant_strategy}，可选: {', '.join(VARIANT_STRATEGIES)}")
+        if self.mode == 'local':
+            return
         
-        if not self.api_key:
-            raise ValueError("需要设置ZHI_API_KEY环境变量或在初始化时提供api_key")
-        if not self.base_url:
-            raise ValueError("需要在环境变量中设置 BASE_URL")
+        providers = load_providers()
+        if api_key:
+            for config in providers.values():
+                config.api_key = api_key
+        self.engine = LLMEngine(
+            provider or os.getenv('LLM_PROVIDER') or self.DEFAULT_PROVIDER,
+            hedge_provider or os.getenv('LLM_HEDGE_PROVIDER') or None,
+            providers=providers,
+        )
+        for config in filter(None, (self.engine.primary, self.engine.secondary)):
+            if not config.api_key:
+                raise ValueError("需要设置ZHI_API_KEY环境变量或在初始化时提供api_key")
+            if not config.base_url:
+                raise ValueError("需要在环境变量中设置 BASE_URL")
             
     def get_prompt(self, title: str, content: str) -> str:
         """生成Prompt模板"""
@@ -52,7 +160,14 @@ class XHSConverter:
 原文内容：
 {content}
 
-请按照如下格式输出：
+{self.output_instructions()}"""
+
+    def output_instructions(self) -> str:
+        """Prompt 末尾的输出格式要求"""
+        if self.output_format == 'json':
+            return f"""请只输出一个JSON对象，不要输出其他内容，字段按以下顺序：
+{{"titles": ["{TITLE_COUNT}个标题，每个不超过{TITLE_MAX_LENGTH}字"], "body": "正文内容，不含话题标签", "tags": ["#话题1", "#话题2"]}}"""
+        return """请按照如下格式输出：
 一. 标题
 [5个标题，每行一个]
 
@@ -62,118 +177,308 @@ class XHSConverter:
 
     def call_openai_api(self, prompt: str) -> Optional[str]:
         """调用API"""
-        try:
-            headers = {
-                'Authorization': self.api_key,
-                'Content-Type': 'application/json'
-            }
-            
-            data = {
-                'model': 'gpt-4',
-                'messages': [
-                    {'role': 'system', 'content': '你是一个专业的小红书内容创作者，擅长将普通文章改写成小红书风格。'},
-                    {'role': 'user', 'content': prompt}
-                ],
-                'temperature': 0.7
-            }
-            
-            response = requests.post(
-                f'{self.base_url}/chat/completions',
-                headers=headers,
-                json=data,
-                timeout=60,
-                verify=False
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                print(f"API响应内容: {result}")  # 添加调试信息
-                
-                # 检查响应格式
-                if 'choices' not in result:
-                    print(f"API响应格式错误，缺少 'choices' 字段")
-                    return None
-                    
-                if not result['choices'] or 'message' not in result['choices'][0]:
-                    print(f"API响应格式错误，无法获取生成的内容")
-                    return None
-                    
-                return result['choices'][0]['message']['content']
-            else:
-                print(f"API调用失败: {response.status_code}")
-                print(f"错误信息: {response.text}")
-                return None
-                
-        except requests.exceptions.Timeout:
-            print("API请求超时，请检查网络连接或稍后重试")
+        return self.engine.complete([
+            {'role': 'system', 'content': self.SYSTEM_PROMPT},
+            {'role': 'user', 'content': prompt}
+        ])
+
+    def generate_note(self, prompt: str,
+                      on_titles: Optional[Callable[[List[str]], None]] = None) -> Optional[XHSNote]:
+        """结构化生成：边生成边解析，标题一完成就回调 on_titles；
+        结果校验不通过时修复小问题，只重新生成不合格的字段"""
+        messages = [
+            {'role': 'system', 'content': self.SYSTEM_PROMPT},
+            {'role': 'user', 'content': prompt}
+        ]
+        parsers: Dict[str, IncrementalNoteParser] = {}
+        announced = []
+
+        def on_delta(provider: str, text: str):
+            parser = parsers.setdefault(provider, IncrementalNoteParser())
+            for name, value in parser.feed(text):
+                if name == 'titles' and not announced:
+                    titles = normalize({'titles': value}, ['titles'])[0].titles
+                    if titles:
+                        announced.append(titles)
+                        (on_titles or self.print_titles)(titles)
+
+        raw = self.engine.complete(messages, json_schema=note_schema(), on_delta=on_delta)
+        if not raw:
             return None
-        except requests.exceptions.ConnectionError:
-            print("连接错误，请检查API地址是否正确")
+        result = parse_note(raw)
+        if result.repaired:
+            print("已修复输出中的格式问题")
+
+        for attempt in range(FIELD_RETRIES):
+            if result.ok:
+                break
+            invalid = [name for name in FIELDS if name in result.errors]
+            reasons = '；'.join(f"{name}：{result.errors[name]}" for name in invalid)
+            print(f"字段不符合要求（{reasons}），只重新生成这些字段（第 {attempt + 1} 次）...")
+            fix = self.engine.complete(messages + [
+                {'role': 'assistant', 'content': raw},
+                {'role': 'user', 'content': self.fix_prompt(invalid, result.errors)},
+            ], json_schema=note_schema(invalid))
+            if not fix:
+                break
+            result = result.merge(parse_note(fix, invalid), invalid)
+
+        if not result.ok:
+            print(f"输出仍不符合要求：{result.errors}")
             return None
-        except json.JSONDecodeError as e:
-            print(f"API响应解析失败: {str(e)}")
-            print(f"原始响应: {response.text}")
+        return result.note
+
+    def fix_prompt(self, fields: List[str], errors: Dict[str, str]) -> str:
+        """只重新生成不合格字段的 Prompt"""
+        problems = '\n'.join(f"- {name}：{errors[name]}" for name in fields)
+        example = {'titles': '["标题1", "标题2"]', 'body': '"正文内容"', 'tags': '["#话题1", "#话题2"]'}
+        shape = ', '.join(f'"{name}": {example[name]}' for name in fields)
+        return f"""上面的输出中以下字段不符合要求：
+{problems}
+
+其他字段保持不变，请只重新生成这些字段，只输出JSON：{{{shape}}}
+标题每个不超过{TITLE_MAX_LENGTH}字，正文不含话题标签。"""
+
+    # ---- 多风格生成 ----
+
+    def variant_rules(self) -> str:
+        """多风格生成的写作要求，与文章和风格无关，放在系统提示词中"""
+        return f"""请将用户提供的原文改写成小红书笔记，按用户指定的每种风格各写一版，各版本的标题和正文不要雷同。每一版都要求：
+一、{TITLE_COUNT}个小红书风格的标题（含emoji表情），每个不超过{TITLE_MAX_LENGTH}字，使用吸引人的爆款关键词，简短有力，突出重点
+二、正文：开篇抓人眼球，结构清晰、分段合理，每段话口语化、简短，在段落中使用合适的emoji表情，加入互动引导，正文最后显示{self.FOOTER}
+三、3-6个相关的话题标签，不要写在正文中"""
+
+    def variant_messages(self, title: str, content: str, styles: Dict[str, str]) -> List[Dict[str, str]]:
+        """多风格生成的消息：不变的系统提示词和写作要求在最前，其次是原文，最后是本次的风格要求和输出格式，
+        同一篇文章的多个请求（并发生成、重新生成）前缀相同，服务商的前缀缓存可以命中系统提示词和原文"""
+        style_lines = '\n'.join(f"- {name}：{instruction}" for name, instruction in styles.items())
+        shape = ', '.join(f'"{name}": {{"titles": [...], "body": "...", "tags": [...]}}' for name in styles)
+        return [
+            {'role': 'system', 'content': f"{self.SYSTEM_PROMPT}\n\n{self.variant_rules()}"},
+            {'role': 'user', 'content': f"""原文标题：{title}
+
+原文内容：
+{content}
+
+请按以下风格各写一版：
+{style_lines}
+
+请只输出一个JSON对象，不要输出其他内容，键为上面的风格名称，按顺序输出：
+{{{shape}}}"""},
+        ]
+
+    def _combined_variants(self, title: str, content: str,
+                           styles: Dict[str, str]) -> Optional[Dict[str, ParseResult]]:
+        """所有风格在一个请求中生成"""
+        names = list(styles)
+        raw = self.engine.complete(self.variant_messages(title, content, styles), json_schema=variants_schema(names))
+        return parse_variants(raw, names) if raw else None
+
+    def _sample_variants(self, title: str, content: str,
+                         styles: Dict[str, str]) -> Optional[Dict[str, ParseResult]]:
+        """同一风格的多个版本：用 n 参数一次请求返回多个结果"""
+        names = list(styles)
+        style = {names[0]: styles[names[0]]}
+        choices = self.engine.complete_choices(self.variant_messages(title, content, style), len(names),
+                                               json_schema=variants_schema(names[:1]))
+        if not choices:
             return None
-        except Exception as e:
-            print(f"调用API时出错: {str(e)}")
+        missing = ParseResult(XHSNote([], '', []), {'note': '没有返回这个版本'})
+        results = [parse_variants(raw, names[:1])[names[0]] for raw in choices]
+        return {name: results[i] if i < len(results) else missing for i, name in enumerate(names)}
+
+    def _parallel_variants(self, title: str, content: str,
+                           styles: Dict[str, str]) -> Optional[Dict[str, ParseResult]]:
+        """每个风格一个请求：第一个请求开始输出时服务商已处理并缓存共享的前缀，再并发发出其余请求"""
+        names = list(styles)
+        warmed = threading.Event()
+
+        def generate(name: str) -> Optional[ParseResult]:
+            on_delta = (lambda provider, text: warmed.set()) if name == names[0] else None
+            try:
+                raw = self.engine.complete(self.variant_messages(title, content, {name: styles[name]}),
+                                           json_schema=variants_schema([name]), on_delta=on_delta)
+            finally:
+                warmed.set()
+            return parse_variants(raw, [name])[name] if raw else None
+
+        with ThreadPoolExecutor(max_workers=len(names)) as pool:
+            futures = {names[0]: pool.submit(generate, names[0])}
+            warmed.wait(PREFIX_WARM_TIMEOUT)
+            for name in names[1:]:
+                futures[name] = pool.submit(generate, name)
+            results = {name: future.result() for name, future in futures.items()}
+        if not any(results.values()):
             return None
+        failed = ParseResult(XHSNote([], '', []), {'note': '请求失败'})
+        return {name: result or failed for name, result in results.items()}
+
+    def generate_variants(self, title: str, content: str, styles: Dict[str, str]) -> Dict[str, XHSNote]:
+        """生成多个风格的版本，返回 风格名称 -> 笔记（按 styles 的顺序，不含生成失败的风格）
+
+        同一风格的多个版本在服务商支持时用 n 参数，其他按 variant_strategy 生成；
+        不符合要求的风格合并成一个请求重新生成（前缀相同，可以命中前缀缓存）"""
+        notes: Dict[str, XHSNote] = {}
+        pending = list(styles)
+        errors: Dict[str, Dict[str, str]] = {}
+        for attempt in range(FIELD_RETRIES + 1):
+            batch = {name: styles[name] for name in pending}
+            if attempt:
+                reasons = '；'.join(f"{name}（{'，'.join(errors[name].values())}）" for name in pending)
+                print(f"以下风格不符合要求，重新生成（第 {attempt} 次）：{reasons}")
+                results = self._combined_variants(title, content, batch)
+            elif len(batch) > 1 and len(set(batch.values())) == 1 and self.engine.supports_n():
+                results = self._sample_variants(title, content, batch)
+            elif len(batch) > 1 and self.variant_strategy == 'parallel':
+                results = self._parallel_variants(title, content, batch)
+            else:
+                results = self._combined_variants(title, content, batch)
+            if results is None:
+                break
+            for name, result in results.items():
+                if result.ok:
+                    notes[name] = result.note
+                else:
+                    errors[name] = result.errors
+            pending = [name for name in pending if name not in notes]
+            if not pending:
+                break
+        if pending:
+            print(f"以下风格生成失败：{', '.join(pending)}")
+        if notes:
+            print(f"已生成 {len(notes)} 个风格的版本：{', '.join(name for name in styles if name in notes)}")
+        return {name: notes[name] for name in styles if name in notes}
+
+    def print_titles(self, titles: List[str]) -> None:
+        """标题先于正文生成完成时打印"""
+        print(f"标题已生成：{' / '.join(titles)}")
             
-    def save_content(self, save_dir: str, content: str) -> str:
-        """保存转换后的内容"""
-        save_path = os.path.join(save_dir, 'xiaohongshu.txt')
-        with open(save_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+    def save_content(self, save_dir: str, content: str, note: Optional[XHSNote] = None,
+                     variants: Optional[Dict[str, XHSNote]] = None) -> str:
+        """保存转换后的内容，有结构化结果时同时保存 xiaohongshu.json；
+        多风格生成时每个版本另存为 variants/<风格>.txt 和 variants/<风格>.json"""
+        batch = get_writer().begin(save_dir)
+        save_path = batch.add_text('xiaohongshu.txt', content)
+        if note:
+            batch.add_json('xiaohongshu.json', note.to_dict())
+        for name, variant in (variants or {}).items():
+            batch.add_text(f'variants/{name}.txt', variant.to_text())
+            batch.add_json(f'variants/{name}.json', variant.to_dict())
+        batch.commit()
         return save_path
         
-    def convert(self, title: str, content: str, save_dir: str) -> Optional[XHSContent]:
-        """转换内容为小红书风格"""
+    def convert(self, title: str, content: str, save_dir: str,
+                on_titles: Optional[Callable[[List[str]], None]] = None) -> Optional[XHSContent]:
+        """转换内容为小红书风格
+        on_titles: 结构化输出时标题先于正文生成完成，完成后回调
+        """
+        with stage('convert'):
+            return self._convert(title, content, save_dir, on_titles)
+            
+    def _convert(self, title: str, content: str, save_dir: str,
+                 on_titles: Optional[Callable[[List[str]], None]] = None) -> Optional[XHSContent]:
         try:
             print("正在生成小红书风格内容...")
             
-            # 生成prompt
-            prompt = self.get_prompt(title, content)
-            
-            # 调用API
-            converted_content = self.call_openai_api(prompt)
+            note = None
+            variants: Dict[str, XHSNote] = {}
+            if self.mode == 'local':
+                # 本地快速转换，不调用API
+                converted_content = self.fast_converter.render(title, content)
+            else:
+                # 生成prompt
+                prompt = self.get_prompt(title, content)
+                
+                # 调用API
+                with stage('llm'):
+                    if self.styles:
+                        # 多风格：第一个生成成功的版本作为发布用的主版本
+                        variants = self.generate_variants(title, content, self.styles)
+                        note = next(iter(variants.values()), None)
+                        converted_content = note.to_text() if note else None
+                    elif self.output_format == 'json':
+                        note = self.generate_note(prompt, on_titles)
+                        converted_content = note.to_text() if note else None
+                    else:
+                        converted_content = self.call_openai_api(prompt)
+                if not converted_content and self.mode == 'auto':
+                    print("大模型转换失败或超时，改用本地快速转换...")
+                    converted_content = self.fast_converter.render(title, content)
             if not converted_content:
                 return None
+            if note is None:
+                parsed = parse_note(converted_content)
+                note = parsed.note if parsed.ok else None
                 
             # 保存内容
-            save_path = self.save_content(save_dir, converted_content)
+            save_path = self.save_content(save_dir, converted_content, note, variants)
             
             return XHSContent(
                 title=title,
                 content=converted_content,
-                save_path=save_path
+                save_path=save_path,
+                note=note,
+                variants=variants
             )
             
         except Exception as e:
             print(f"转换内容时出错: {str(e)}")
             return None
 
-def main():
-    # 测试代码
-    from weixin_crawler import WeixinCrawler
-    
-    url = input("请输入微信公众号文章URL：")
-    
+def convert_weixin_url(url: str, crawler, converter: 'XHSConverter') -> str:
+    """抓取公众号文章、转换为小红书风格并登记到文章库，返回处理结果"""
+    with get_profiler().article(url):
+        return _convert_weixin_url(url, crawler, converter)
+
+def _convert_weixin_url(url: str, crawler, converter: 'XHSConverter') -> str:
     # 1. 获取文章内容
-    crawler = WeixinCrawler()
-    article = crawler.process_url(url)
+    try:
+        article = crawler.process_url(url)
+    except ThrottledError as e:
+        print(f"获取文章时被限流，稍后重试: {str(e)}")
+        return RESULT_THROTTLED
     
     if not article:
         print("获取文章失败！")
-        return
+        return RESULT_FAILED
+        
+    # 近似重复的文章不再转换，由之前那篇的转换结果代替
+    if article.duplicate_of:
+        earlier = os.path.join(article.duplicate_of, 'xiaohongshu.txt')
+        if os.path.exists(earlier):
+            print(f"\n跳过转换，复用已有内容：{earlier}")
+        else:
+            print(f"\n跳过转换，之前的文章尚未转换：{article.duplicate_of}")
+        return RESULT_DUPLICATE
         
     # 2. 转换为小红书风格
-    converter = XHSConverter()
     xhs_content = converter.convert(article.title, article.text, article.save_dir)
     
     if xhs_content:
+        crawler.store.set_converted(article.url, xhs_content.content)
+        # 3. 图片不足时用文字卡片补足
+        title, body, tags = note_parts(xhs_content.content, article.title)
+        add_text_cards(crawler.store, article.url, article.save_dir, title, body, tags)
         print("\n转换完成！")
         print(f"小红书风格内容已保存到：{xhs_content.save_path}")
-    else:
-        print("\n转换失败！")
+        return RESULT_CONVERTED
+    print("\n转换失败！")
+    return RESULT_FAILED
+
+def main():
+    # 测试代码
+    from weixin_crawler import WeixinCrawler
+    
+    url = input("请输入微信公众号文章URL：")
+    
+    crawler = WeixinCrawler()
+    converter = XHSConverter()
+    convert_weixin_url(url, crawler, converter)
+    if converter.engine:
+        print(f"大模型调用统计：{converter.engine.stats()}")
+    get_client().report()
+    get_scheduler().report()
+    get_profiler().report()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main() 
@@ -1,14 +1,23 @@
 import os
+import re
+import sys
 import json
 import time
-from typing import List, Optional, Dict
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.options import Options
+from typing import List, Optional, Dict, Tuple
 from dataclasses import dataclass
+from dotenv import load_dotenv
+from article_store import ArticleStore
+from xhs_schema import TITLE_MAX_LENGTH, XHSNote, parse_note
+from image_budget import IMAGE_BUDGET, select_files
+from profiler import get_profiler, stage
+
+# 加载环境变量
+load_dotenv()
+
+# 文章库所在的数据目录
+DATA_ROOT = r"E:\fy\智企内推\data"
+# 发布方式：browser=用浏览器发布（默认），api=直接调用发布接口（不可用时改用浏览器，需要配置签名服务 XHS_SIGN_URL）
+XHS_PUBLISH_BACKEND = os.getenv('XHS_PUBLISH_BACKEND', 'browser')
 
 @dataclass
 class PublishResult:
@@ -19,6 +28,10 @@ class PublishResult:
 class XHSPublisher:
     def __init__(self, cookie_path: str = '.cookies.json'):
         """初始化发布器"""
+        # selenium 只在真正发布时才加载
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        
         self.cookie_path = cookie_path
         
         # 配置Chrome选项
@@ -32,19 +45,31 @@ class XHSPublisher:
         
     def login(self) -> bool:
         """登录小红书，如果有cookie则使用cookie登录"""
+        from selenium.webdriver.common.by import By
+        
+        from cookie_health import describe, get_checker
+        
         try:
+            # 先用一次请求检查 Cookie（不需要页面），确认有效或失效时省去刷新页面和查找登录按钮
+            health = get_checker().check_file(self.cookie_path)
+            print(f"登录状态: {describe(health)}")
+            
             print("正在访问小红书...")
             self.driver.get('https://www.xiaohongshu.com')
             time.sleep(2)
             
-            if os.path.exists(self.cookie_path):
+            if os.path.exists(self.cookie_path) and not health.needs_login:
                 print("正在使用已保存的Cookie登录...")
                 with open(self.cookie_path, 'r') as f:
                     cookies = json.load(f)
                 for cookie in cookies:
                     self.driver.add_cookie(cookie)
                 
-                # 刷新页面应用cookie
+                if health.valid:
+                    print("自动登录成功！")
+                    return True
+                
+                # 无法确认时按原来的方式：刷新页面应用cookie后检查
                 self.driver.refresh()
                 time.sleep(3)
                 
@@ -76,8 +101,12 @@ class XHSPublisher:
             
     def publish_note(self, title: str, content: str, image_paths: List[str]) -> PublishResult:
         """发布笔记"""
+        from selenium.webdriver.common.by import By
+        
         try:
-            if not self.login():
+            with stage('login'):
+                logged_in = self.login()
+            if not logged_in:
                 return PublishResult(success=False, message="登录失败")
             
             print("正在打开发布页面...")
@@ -124,61 +153,103 @@ class XHSPublisher:
         if self.driver:
             self.driver.quit()
 
-def process_content(content: str) -> tuple[str, str]:
-    """处理转换后的内容，提取标题和正文"""
-    try:
-        # 分割内容
-        parts = content.split("二. 正文")
-        if len(parts) != 2:
-            raise ValueError("内容格式不正确")
-            
-        # 处理标题部分
-        titles_part = parts[0].split("一. 标题")[1].strip()
-        titles = [t.strip() for t in titles_part.split("\n") if t.strip()]
-        
-        # 选择第一个标题（通常是最好的）
-        title = titles[0] if titles else "未找到标题"
-        
-        # 处理正文部分
-        content = parts[1].strip()
-        
-        return title, content
-    except Exception as e:
-        print(f"处理内容时出错: {str(e)}")
-        return "默认标题", content
+def create_publisher(backend: str = XHS_PUBLISH_BACKEND, cookie_path: str = '.cookies.json'):
+    """按发布方式创建发布器，两者都提供 publish_note(title, content, image_paths) 和 close()"""
+    if backend == 'browser':
+        return XHSPublisher(cookie_path)
+    if backend != 'api':
+        raise ValueError(f"XHS_PUBLISH_BACKEND 必须是 api 或 browser：{backend}")
+    from xhs_api_publisher import ApiPublisher
+    return ApiPublisher(cookie_path)
+
+def process_content(content: str, fallback_title: str = '') -> tuple[str, str]:
+    """处理转换后的内容，提取标题和正文
+
+    兼容结构化 JSON 输出和 "一. 标题 / 二. 正文" 纯文本格式，格式有偏差时自动修复；
+    不是笔记格式的内容（如 gzh2xhs.py 的本地转换）用 fallback_title（文章库中的原标题）作为标题；
+    仍然缺少必要字段时抛出 ValueError，不再用默认标题发布
+    """
+    result = parse_note(content)
+    if result.ok:
+        return result.note.title, result.note.publish_text()
+    if fallback_title and 'titles' in result.errors:
+        from text_card import note_parts
+        _, body, tags = note_parts(content, fallback_title)
+        if body:
+            note = XHSNote(titles=[fallback_title[:TITLE_MAX_LENGTH]], body=body, tags=tags)
+            return note.title, note.publish_text()
+    problems = '；'.join(f"{name}：{reason}" for name, reason in result.errors.items())
+    raise ValueError(f"内容格式不正确（{problems}）")
+
+def _natural_key(name: str) -> list:
+    """按编号排序，image_10 排在 image_9 之后"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+def load_from_directory(content_dir: str) -> Tuple[str, List[str]]:
+    """从导出的文章目录读取转换后的内容和图片，优先使用结构化的 xiaohongshu.json"""
+    json_path = os.path.join(content_dir, "xiaohongshu.json")
+    text_path = os.path.join(content_dir, "xiaohongshu.txt")
+    with open(json_path if os.path.exists(json_path) else text_path, "r", encoding="utf-8") as f:
+        raw_content = f.read()
+    image_dir = os.path.join(content_dir, "images")
+    image_paths = []
+    if os.path.exists(image_dir):
+        for file in sorted(os.listdir(image_dir), key=_natural_key):
+            if file.lower().endswith(('.png', '.jpg', '.jpeg')):
+                image_paths.append(os.path.join(image_dir, file))
+    return raw_content, image_paths
 
 def main():
-    publisher = XHSPublisher()
+    # 用法：python xhs_publisher.py [文章URL | 文章目录]
+    # 不带参数时发布文章库中所有已转换、未发布的文章
+    target = sys.argv[1] if len(sys.argv) > 1 else None
+    store = ArticleStore(DATA_ROOT)
+    
+    jobs = []
+    if target and os.path.isdir(target):
+        raw_content, image_paths = load_from_directory(target)
+        jobs.append((None, raw_content, image_paths))
+    else:
+        records = [store.get(target)] if target else store.list_pending()
+        for record in records:
+            if not record or not record.converted_blob:
+                print(f"文章库中没有可发布的内容: {target}")
+                continue
+            jobs.append((record, store.read_text(record.converted_blob), store.get_images(record.id)))
+    
+    if not jobs:
+        print("没有待发布的文章")
+        store.close()
+        return
+    
+    publisher = create_publisher()
     try:
-        # 从文件读取内容
-        content_dir = r"E:\fy\智企内推\data\CES 上最火的 AI 眼镜，竟然是中国美瞳一哥做的"
-        
-        # 读取转换后的内容
-        with open(os.path.join(content_dir, "xiaohongshu.txt"), "r", encoding="utf-8") as f:
-            raw_content = f.read()
-        
-        # 处理内容，提取标题和正文
-        title, content = process_content(raw_content)
-        print(f"使用标题: {title}")
-        
-        # 获取图片路径
-        image_dir = os.path.join(content_dir, "images")
-        image_paths = []
-        if os.path.exists(image_dir):
-            for file in os.listdir(image_dir):
-                if file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    image_paths.append(os.path.join(image_dir, file))
+        for record, raw_content, image_paths in jobs:
+            # 处理内容，提取标题和正文
+            try:
+                title, content = process_content(raw_content, record.title if record else '')
+            except ValueError as e:
+                print(f"跳过发布，需要重新转换: {str(e)}")
+                continue
+            print(f"使用标题: {title}")
             print(f"找到 {len(image_paths)} 张图片")
-        
-        # 发布笔记
-        result = publisher.publish_note(
-            title=title,
-            content=content,
-            image_paths=image_paths
-        )
-        print(f"发布结果: {result}")
+            # 超出图片预算的不上传
+            image_paths = select_files(image_paths, IMAGE_BUDGET)
+            
+            # 发布笔记
+            with get_profiler().article(record.url if record else target), stage('publish'):
+                result = publisher.publish_note(
+                    title=title,
+                    content=content,
+                    image_paths=image_paths
+                )
+            print(f"发布结果: {result}")
+            if record and result.success:
+                store.set_published(record.url, result.post_url)
     finally:
         publisher.close()
+        store.close()
+        get_profiler().report()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
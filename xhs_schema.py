@@ -0,0 +1,414 @@
+import re
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 结构化输出的字段，按模型输出顺序排列：标题先于正文，流式解析时标题可以提前拿到
+FIELDS = ('titles', 'body', 'tags')
+
+TITLE_COUNT = 5
+# 小红书标题最多 20 个字
+TITLE_MAX_LENGTH = 20
+BODY_MIN_LENGTH = 50
+TAG_MAX_COUNT = 6
+
+XHS_NOTE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'titles': {
+            'type': 'array',
+            'items': {'type': 'string', 'maxLength': TITLE_MAX_LENGTH},
+            'minItems': 1,
+            'maxItems': TITLE_COUNT,
+        },
+        'body': {'type': 'string'},
+        'tags': {
+            'type': 'array',
+            'items': {'type': 'string'},
+            'minItems': 1,
+            'maxItems': TAG_MAX_COUNT,
+        },
+    },
+    'required': list(FIELDS),
+    'additionalProperties': False,
+}
+
+# 旧的纯文本格式："一. 标题" / "二. 正文" / "标签："，允许常见变体
+TITLE_HEADING = re.compile(r'^\s*(?:#+\s*)?(?:\*\*)?\s*(?:[一1]\s*[\.、．:：]?\s*)?标题\s*(?:\*\*)?\s*[:：]?\s*$', re.M)
+BODY_HEADING = re.compile(r'^\s*(?:#+\s*)?(?:\*\*)?\s*(?:[二2]\s*[\.、．:：]?\s*)?正文\s*(?:\*\*)?\s*[:：]?\s*$', re.M)
+TAGS_LINE = re.compile(r'^\s*(?:\*\*)?(?:标签|话题标签|话题)(?:\*\*)?\s*[:：]\s*(.*)$', re.M)
+HASHTAG = re.compile(r'#([^\s#，,、]+)')
+TRAILING_TAGS = re.compile(r'\s*(?:#[^\s#]+\s*)+')
+# 标题前的编号、引号和加粗
+TITLE_PREFIX = re.compile(r'^\s*(?:[-*•]\s*|\d+\s*[\.、．)）]\s*|[（(]?\d+[)）]\s*|[一二三四五]\s*[\.、．]\s*)')
+TITLE_WRAPPERS = '"\'“”‘’「」『』*《》 '
+
+
+def note_schema(fields: Optional[List[str]] = None) -> Dict:
+    """完整 schema，或只包含部分字段的 schema（用于只重新生成不合格的字段）"""
+    if not fields:
+        return XHS_NOTE_SCHEMA
+    return {
+        'type': 'object',
+        'properties': {name: XHS_NOTE_SCHEMA['properties'][name] for name in fields},
+        'required': list(fields),
+        'additionalProperties': False,
+    }
+
+
+def variants_schema(names: List[str]) -> Dict:
+    """多风格输出的 schema：每个风格名称对应一篇完整的笔记"""
+    return {
+        'type': 'object',
+        'properties': {name: XHS_NOTE_SCHEMA for name in names},
+        'required': list(names),
+        'additionalProperties': False,
+    }
+
+
+@dataclass
+class XHSNote:
+    titles: List[str]
+    body: str
+    tags: List[str]
+
+    @property
+    def title(self) -> str:
+        return self.titles[0] if self.titles else ''
+
+    def to_dict(self) -> Dict[str, object]:
+        return {'titles': self.titles, 'body': self.body, 'tags': self.tags}
+
+    def to_text(self) -> str:
+        """渲染成原来的纯文本格式，保存为 xiaohongshu.txt"""
+        lines = ["一. 标题"]
+        lines.extend(f"{i}. {t}" for i, t in enumerate(self.titles, 1))
+        lines.append("")
+        lines.append("二. 正文")
+        lines.append(self.body)
+        lines.append(f"标签：{' '.join(self.tags)}")
+        return "\n".join(lines)
+
+    def publish_text(self) -> str:
+        """发布用的正文：正文加话题标签"""
+        return f"{self.body}\n\n{' '.join(self.tags)}" if self.tags else self.body
+
+
+@dataclass
+class ParseResult:
+    note: XHSNote
+    # 不合格的字段 -> 原因
+    errors: Dict[str, str] = field(default_factory=dict)
+    # 是否修复过 JSON 语法或字段格式
+    repaired: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def merge(self, other: 'ParseResult', fields: List[str]) -> 'ParseResult':
+        """用重新生成的结果替换指定字段"""
+        values = self.note.to_dict()
+        errors = dict(self.errors)
+        for name in fields:
+            if name in other.errors:
+                errors[name] = other.errors[name]
+            else:
+                values[name] = other.note.to_dict()[name]
+                errors.pop(name, None)
+        return ParseResult(XHSNote(**values), errors, self.repaired or other.repaired)
+
+
+# ---- JSON 提取和修复 ----
+
+def _strip_fences(text: str) -> str:
+    """去掉 ```json 代码块标记"""
+    match = re.search(r'```(?:json)?\s*\n?(.*?)(?:```|$)', text, re.S)
+    return match.group(1) if match else text
+
+
+def repair_json(text: str) -> str:
+    """修复常见的小问题：字符串中的裸换行/制表符、多余的尾逗号、输出被截断时未闭合的引号和括号"""
+    out = []
+    stack = []
+    in_string = False
+    escape = False
+    # 对象中还没有冒号的键名在 out 中的起始位置，输出截断在这里时整个去掉
+    key_start = None
+    expect_key = False
+    for ch in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+            elif ch == '\n':
+                ch = '\\n'
+            elif ch == '\r':
+                ch = '\\r'
+            elif ch == '\t':
+                ch = '\\t'
+            out.append(ch)
+            continue
+        if ch == '"':
+            in_string = True
+            if expect_key:
+                key_start = len(out)
+        elif ch == ':':
+            key_start = None
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+        elif ch in '}]':
+            if stack:
+                stack.pop()
+        if not ch.isspace():
+            expect_key = ch in '{,' and stack[-1:] == ['}']
+        out.append(ch)
+    if key_start is not None:
+        del out[key_start:]
+    elif in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    repaired = ''.join(out).rstrip()
+    # 截断在键名或冒号之后时去掉不完整的键值对
+    repaired = re.sub(r',?\s*"[^"]*"\s*:\s*$', '', repaired)
+    repaired = repaired.rstrip().rstrip(',')
+    repaired += ''.join(reversed(stack))
+    return re.sub(r',\s*([}\]])', r'\1', repaired)
+
+
+def load_json_object(text: str) -> Tuple[Optional[Dict], bool]:
+    """从模型输出中取出 JSON 对象，返回 (对象, 是否经过修复)；没有 JSON 时返回 (None, False)"""
+    body = _strip_fences(text)
+    start = body.find('{')
+    if start < 0:
+        return None, False
+    end = body.rfind('}')
+    if end > start:
+        try:
+            data = json.loads(body[start:end + 1])
+            if isinstance(data, dict):
+                return data, False
+        except json.JSONDecodeError:
+            pass
+    try:
+        data = json.loads(repair_json(body[start:]))
+    except json.JSONDecodeError:
+        return None, False
+    return (data, True) if isinstance(data, dict) else (None, False)
+
+
+# ---- 纯文本格式 ----
+
+def parse_legacy(text: str) -> Dict[str, object]:
+    """解析 "一. 标题 / 二. 正文 / 标签：" 格式，找不到的字段为空"""
+    data: Dict[str, object] = {'titles': [], 'body': '', 'tags': []}
+    # 先用子串判断，没有关键字时跳过正则
+    title_match = TITLE_HEADING.search(text) if '标题' in text else None
+    body_match = BODY_HEADING.search(text) if '正文' in text else None
+    if body_match:
+        head = text[title_match.end():body_match.start()] if title_match else text[:body_match.start()]
+        data['titles'] = head.splitlines()
+        body = text[body_match.end():]
+    else:
+        body = text[title_match.end():] if title_match else text
+    tags_match = TAGS_LINE.search(body) if ('标签' in body or '话题' in body) else None
+    if tags_match:
+        data['tags'] = tags_match.group(1)
+        body = body[:tags_match.start()] + body[tags_match.end():]
+    data['body'] = body
+    return data
+
+
+# ---- 字段校验 ----
+
+def _clean_title(title: str) -> str:
+    title = TITLE_PREFIX.sub('', title.strip())
+    return title.strip(TITLE_WRAPPERS)
+
+
+def _normalize_tags(value) -> List[str]:
+    if isinstance(value, str):
+        found = HASHTAG.findall(value)
+        value = found or re.split(r'[\s，,、]+', value)
+    tags = []
+    for tag in value or []:
+        if not isinstance(tag, str):
+            continue
+        tag = tag.strip().lstrip('#').strip()
+        if tag and f'#{tag}' not in tags:
+            tags.append(f'#{tag}')
+    return tags[:TAG_MAX_COUNT]
+
+
+def normalize(data: Dict, fields=FIELDS) -> Tuple[XHSNote, Dict[str, str], bool]:
+    """校验并整理字段，返回 (笔记, 不合格字段, 是否修复过)"""
+    errors: Dict[str, str] = {}
+    repaired = False
+
+    titles = data.get('titles', [])
+    if isinstance(titles, str):
+        titles = titles.splitlines()
+        repaired = True
+    cleaned = []
+    for title in titles if isinstance(titles, list) else []:
+        if not isinstance(title, str):
+            continue
+        title = _clean_title(title)
+        if title and title not in cleaned:
+            cleaned.append(title)
+    valid_titles = [t for t in cleaned if len(t) <= TITLE_MAX_LENGTH][:TITLE_COUNT]
+    if cleaned != valid_titles:
+        repaired = True
+    if 'titles' in fields and not valid_titles:
+        errors['titles'] = f'没有不超过{TITLE_MAX_LENGTH}字的标题' if cleaned else '缺少标题'
+
+    body = data.get('body', '')
+    if isinstance(body, list):
+        body = '\n\n'.join(str(p) for p in body)
+        repaired = True
+    body = body.strip() if isinstance(body, str) else ''
+    tags = _normalize_tags(data.get('tags'))
+    # 正文末尾混入的标签行移到 tags
+    tail = TAGS_LINE.search(body) if ('标签' in body or '话题' in body) else None
+    if tail:
+        tags = tags or _normalize_tags(tail.group(1))
+        body = (body[:tail.start()] + body[tail.end():]).strip()
+        repaired = True
+    if not tags and '#' in body:
+        # 只检查最后一行，避免在整段正文上回溯
+        head, _, last = body.rpartition('\n')
+        if TRAILING_TAGS.fullmatch(last):
+            tags = _normalize_tags(last)
+            body = head.rstrip()
+            repaired = True
+    if 'body' in fields and len(body) < BODY_MIN_LENGTH:
+        errors['body'] = f'正文少于{BODY_MIN_LENGTH}字' if body else '缺少正文'
+    if 'tags' in fields and not tags:
+        errors['tags'] = '缺少话题标签'
+
+    return XHSNote(valid_titles, body, tags), errors, repaired
+
+
+def parse_note(text: str, fields: Optional[List[str]] = None) -> ParseResult:
+    """解析模型输出：优先按 JSON 解析（必要时修复），没有 JSON 时按旧的纯文本格式解析
+
+    fields: 只校验这些字段（只重新生成部分字段时使用）
+    """
+    fields = list(fields or FIELDS)
+    data, repaired = load_json_object(text or '')
+    if data is None:
+        data = parse_legacy(text or '')
+    note, errors, fixed = normalize(data, fields)
+    return ParseResult(note, errors, repaired or fixed)
+
+
+def parse_variants(text: str, names: List[str]) -> Dict[str, ParseResult]:
+    """解析多风格输出（风格名称 -> 笔记），缺少的风格记为不合格；输出被截断时已完成的风格照常使用"""
+    data, repaired = load_json_object(text or '')
+    results = {}
+    for name in names:
+        value = (data or {}).get(name)
+        if not isinstance(value, dict):
+            results[name] = ParseResult(XHSNote([], '', []), {'note': '缺少该风格的输出'}, repaired)
+            continue
+        note, errors, fixed = normalize(value)
+        results[name] = ParseResult(note, errors, repaired or fixed)
+    return results
+
+
+# ---- 流式增量解析 ----
+
+class IncrementalNoteParser:
+    """在流式输出过程中增量解析 JSON，顶层字段一完成就回调
+
+    只跟踪字符串、括号和顶层键，不构建完整的解析树；模型按 titles、body、tags 的顺序输出时，
+    标题在正文开始生成前就能拿到。
+    """
+
+    def __init__(self, on_field: Optional[Callable[[str, object], None]] = None):
+        self.on_field = on_field
+        self.fields: Dict[str, object] = {}
+        self.buffer = ''
+        self.pos = 0
+        self.started = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        self.key: Optional[str] = None
+        self.after_colon = False
+        self.items: Optional[List[str]] = None
+
+    def _decode(self, raw: str) -> str:
+        try:
+            return json.loads(f'"{raw}"')
+        except json.JSONDecodeError:
+            return raw.replace('\\n', '\n').replace('\\"', '"')
+
+    def _emit(self, name: str, value) -> Tuple[str, object]:
+        self.fields[name] = value
+        if self.on_field:
+            self.on_field(name, value)
+        return name, value
+
+    def feed(self, chunk: str) -> List[Tuple[str, object]]:
+        """输入一段输出，返回新完成的 (字段, 值)"""
+        self.buffer += chunk
+        done = []
+        buffer = self.buffer
+        i = self.pos
+        while i < len(buffer):
+            ch = buffer[i]
+            if not self.started:
+                if ch == '{':
+                    self.started = True
+                    self.depth = 1
+                i += 1
+                continue
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    value = self._decode(buffer[self.string_start:i])
+                    if self.depth == 1:
+                        if self.after_colon:
+                            done.append(self._emit(self.key, value))
+                        else:
+                            self.key = value
+                    elif self.depth == 2 and self.items is not None:
+                        self.items.append(value)
+                i += 1
+                continue
+            if ch == '"':
+                self.in_string = True
+                self.string_start = i + 1
+            elif ch == ':' and self.depth == 1:
+                self.after_colon = True
+            elif ch == ',' and self.depth == 1:
+                self.after_colon = False
+                self.key = None
+            elif ch in '{[':
+                self.depth += 1
+                if self.depth == 2 and ch == '[' and self.after_colon:
+                    self.items = []
+            elif ch in '}]':
+                if self.depth == 2 and self.items is not None:
+                    done.append(self._emit(self.key, self.items))
+                    self.items = None
+                self.depth -= 1
+            i += 1
+        self.pos = i
+        return done
+
+    def partial(self, name: str) -> Optional[List[str]]:
+        """正在生成中的数组字段已完成的元素"""
+        if self.key == name and self.items is not None:
+            return list(self.items)
+        return None